@@ -0,0 +1,95 @@
+import argparse
+import sys
+from typing import List
+
+import grpc
+
+from src.fanout import (
+    DEFAULT_FANOUT_PARALLEL,
+    DEFAULT_HOST_TIMEOUT,
+    fanout_summary,
+    rpc_fanout,
+)
+from src.pool import ChannelPool
+
+
+def read_hosts(args) -> List[str]:
+    """hosts of -H (comma separated, repeatable) and --hosts-file, port defaults to --port"""
+    hosts = [h for value in args.hosts for h in value.split(",") if h.strip()]
+    if args.hosts_file:
+        with open(args.hosts_file) as f:
+            hosts += [
+                line.split("#")[0].strip() for line in f if line.split("#")[0].strip()
+            ]
+    return [h.strip() if ":" in h else f"{h.strip()}:{args.port}" for h in hosts]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="run a command on many rpi-rpc servers in parallel"
+    )
+    parser.add_argument("command", help="bash command to run on every host")
+    parser.add_argument(
+        "-H",
+        "--hosts",
+        action="append",
+        default=[],
+        help="host[:port], comma separated, may be repeated",
+    )
+    parser.add_argument("-f", "--hosts-file", help="file with one host[:port] per line")
+    parser.add_argument("--port", default="50051", help="port of hosts without one")
+    parser.add_argument(
+        "-p",
+        "--parallel",
+        type=int,
+        default=DEFAULT_FANOUT_PARALLEL,
+        help="hosts running the command at the same time",
+    )
+    parser.add_argument(
+        "-t",
+        "--timeout",
+        type=float,
+        default=DEFAULT_HOST_TIMEOUT,
+        help="seconds per host",
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="only print status lines"
+    )
+    args = parser.parse_args(argv)
+    hosts = read_hosts(args)
+    if not hosts:
+        parser.error("no hosts, use -H or --hosts-file")
+
+    # 每台主机一个 channel，不在 fan-out 过程中互相淘汰
+    pool = ChannelPool(max_size=len(hosts))
+    results = []
+    try:
+        for result in rpc_fanout(
+            args.command, hosts, args.parallel, args.timeout, pool=pool
+        ):
+            results.append(result)
+            status = (
+                f"rc={result.returncode}"
+                if result.code == grpc.StatusCode.OK
+                else result.code.name
+            )
+            print(f"[{result.addr_port}] {status} {result.latency * 1e3:.1f}ms")
+            if args.quiet:
+                continue
+            for src, text in (("", result.stdout), ("stderr: ", result.stderr)):
+                for line in text.splitlines():
+                    print(f"[{result.addr_port}] {src}{line}")
+    finally:
+        pool.close()
+
+    summary = fanout_summary(results)
+    print(
+        f"{summary['ok']}/{summary['hosts']} ok, {summary['failed']} failed, "
+        f"p50={summary['p50'] * 1e3:.1f}ms p99={summary['p99'] * 1e3:.1f}ms "
+        f"max={summary['max'] * 1e3:.1f}ms"
+    )
+    return 0 if not summary["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
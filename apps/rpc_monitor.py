@@ -1,47 +1,82 @@
-import os
+import asyncio
+import heapq
 import queue
 import threading
 import time
+from concurrent import futures
 from multiprocessing import Queue
 from typing import Dict, List, Optional, Tuple
 
 from loguru import logger
 
-from src.impl import rpc_bg
+from src.client import rpc_bg
+from src.logsink import LogSink
+from src.matcher import Keyword, MatchEngine, Watch
+from src.ring import DEFAULT_MAX_BYTES, DEFAULT_MAX_LINES, LineRing
 
 
 class RpcStreamIOMonitor:
     """
     监控流式数据并支持多关键词异步检查。
-    PipedRpcStreamProcess 继承自 multiprocessing.Process，通过队列传递数据。
+    rpc_bg() 返回的 RpcStreamThread（或 PipedRpcStreamProcess）通过队列传递数据。
+
+    所有任务的关键词由一个 MatchEngine 统一匹配：每行到达时只匹配一次，
+    任务在读取线程上完成并立即通知等待者。
+    收到的行保存在一个有上限的共享环形缓冲区 history 中，行号即游标，
+    见 cursor() / lines() 以及 assert_keywords 的 since 参数。
+    所有任务的超时由一个定时线程按截止时间堆处理，任务数不影响线程数；
+    每个任务对应一个 concurrent.futures.Future，见 future() / result_async()。
     """
 
     @logger.catch
-    def __init__(self, p, file_path: Optional[str] = None):
+    def __init__(
+        self,
+        p,
+        file_path: Optional[str] = None,
+        max_lines: int = DEFAULT_MAX_LINES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        overflow: str = "evict",
+        sink: Optional[LogSink] = None,
+        log_lines: bool = False,
+    ):
         """
-        :param p: PipedRpcStreamProcess 实例，需实现 msgq() 方法返回 Queue
-        :param file_path: 可选，将接收到的数据实时写入文件
+        :param p: RpcStreamThread / PipedRpcStreamProcess 实例，需实现 msgq() 方法返回 Queue
+        :param file_path: 可选，将接收到的数据写入文件（LogSink 默认参数：批量写入，最多延迟 1 秒）
+        :param sink: 可选，自行配置的 LogSink（轮转、压缩、fsync 等），与 file_path 二选一
+        :param max_lines: history 最多保存的行数
+        :param max_bytes: history 最多占用的内存
+        :param overflow: history 满时的策略，evict / drop / block，见 LineRing
+        :param log_lines: 每收到一行都 logger.debug，默认关闭（格式化日志比处理该行更慢）
         """
         self.p = p
-        self.tasks: Dict[int, dict] = {}  # 存储所有检查任务 {task_id: {result, lines}}
+        self.tasks: Dict[int, dict] = (
+            {}
+        )  # 存储所有检查任务 {task_id: {result, watch, cursor}}
+        self.engine = MatchEngine()  # 所有未完成任务的关键词
+        self.watch_tasks: Dict[Watch, int] = {}
+        self.history = LineRing(max_lines, max_bytes, overflow)
         self.lock = threading.Lock()  # 线程安全锁
+        self.deadlines: List[Tuple[float, int]] = []  # 超时堆 (deadline, task_id)
+        self.timer_cond = threading.Condition(self.lock)
+        self.resolved: List[Tuple[futures.Future, tuple]] = []  # 待在锁外设置的结果
         self.task_id_counter = 0  # 任务ID生成器
         self.running = True  # 控制后台线程退出
         self.file_path = file_path
-        self.file = None
+        self.log_lines = log_lines
+        # 写文件由 LogSink 的写线程批量完成，读取线程只负责入队
+        self.sink = sink
+        if self.sink is None and self.file_path:
+            self.sink = LogSink(self.file_path)
 
-        if self.file_path:
-            if os.path.dirname(self.file_path):
-                os.makedirs(os.path.dirname(self.file_path))
-            self.file = open(self.file_path, "a", encoding="utf-8", errors="ignore")
-
-        # 启动后台读取线程
+        # 启动后台读取线程和超时线程
         self.thread = threading.Thread(target=self._read_stream, daemon=True)
         self.thread.start()
+        self.timer = threading.Thread(target=self._expire_tasks, daemon=True)
+        self.timer.start()
 
     def _read_stream(self):
         """持续从队列读取数据并分发给任务"""
-        q: Queue = self.p.msgq()
+        q: "queue.Queue | Queue" = self.p.msgq()
         while self.running:
             try:
                 line = q.get(timeout=1)  # 阻塞式读取，超时1秒检查 running 状态
@@ -54,51 +89,75 @@ class RpcStreamIOMonitor:
                 except Exception:
                     continue  # 跳过无法处理的乱码数据
 
-                logger.debug(f"read: {line}")
+                if self.log_lines:
+                    logger.debug(f"read: {line}")
                 # 写入文件
-                if self.file:
-                    try:
-                        self.file.write(line + "\n")
-                        self.file.flush()
-                    except (IOError, UnicodeError):
-                        pass
+                if self.sink:
+                    self.sink.write(line + "\n")
+
+                # block 策略：history 中仍被任务引用的行不能丢弃，等待任务结束
+                while not self.history.wait_writable(line, timeout=1):
+                    if not self.running:
+                        return
 
                 with self.lock:
-                    for task in self.tasks.values():
-                        task["lines"].append(line)  # 记录当前行到所有任务
+                    self.history.append(line)
+                    for watch in self.engine.feed(line):
+                        self._complete(self.watch_tasks[watch])
+                self._resolve()
 
             except queue.Empty:
                 continue
             except (AttributeError, ValueError, EOFError):
                 break  # 队列异常或进程终止
 
-    def assert_keywords(self, keywords: List[str], timeout: float) -> int:
+    def assert_keywords(
+        self,
+        keywords: List[Keyword],
+        timeout: float,
+        ordered: bool = False,
+        since: Optional[int] = None,
+    ) -> int:
         """
-        添加关键词检查任务
-        :param keywords: 需要匹配的关键词列表
+        添加关键词检查任务，默认只匹配任务创建之后到达的行
+        :param keywords: 需要匹配的关键词列表，字符串按子串匹配，re.compile() 的结果按正则匹配
         :param timeout: 超时时间（秒）
+        :param ordered: True 时关键词必须按顺序出现，每个关键词在前一个之后的行中
+        :param since: cursor() 返回的游标，先匹配 history 中从该行开始的内容，
+            避免触发操作与创建任务之间到达的行被漏掉
         :return: task_id 用于后续查询结果
         """
         task_id = self._generate_task_id()
+        watch = Watch(keywords, ordered)
         result = {
             "keywords": keywords,
             "timeout": timeout,
-            "found": [False] * len(keywords),
-            "matched_lines": [None] * len(keywords),
-            "start_time": time.time(),
+            "found": watch.found,
+            "matched_lines": watch.matched_lines,
+            "deadline": time.monotonic() + timeout,
             "completed": False,
-            "condition": threading.Condition(),  # 用于等待结果
+            "future": futures.Future(),  # 任务结束时设置结果
         }
 
         with self.lock:
-            self.tasks[task_id] = {"result": result, "lines": []}
-
-        # 启动监控线程
-        threading.Thread(
-            target=self._monitor_task,
-            args=(task_id,),
-            daemon=True,
-        ).start()
+            cursor = self.history.end if since is None else since
+            self.tasks[task_id] = {"result": result, "watch": watch, "cursor": cursor}
+            heapq.heappush(self.deadlines, (result["deadline"], task_id))
+            if self.deadlines[0][1] == task_id:
+                self.timer_cond.notify()
+            self.history.pin(cursor)
+            if since is not None:
+                replay = MatchEngine()
+                replay.add(watch)
+                for line in self.history.since(since):
+                    if replay.feed(line):
+                        break
+            if watch.done():
+                self._complete(task_id)
+            else:
+                self.engine.add(watch)
+                self.watch_tasks[watch] = task_id
+        self._resolve()
 
         return task_id
 
@@ -119,58 +178,93 @@ class RpcStreamIOMonitor:
         result = task["result"]
 
         if wait and not result["completed"]:
-            with result["condition"]:
-                result["condition"].wait(
-                    result["timeout"] - (time.time() - result["start_time"])
-                )
+            try:
+                result["future"].result(result["deadline"] - time.monotonic())
+            except futures.TimeoutError:
+                pass
 
         with self.lock:
             if not result["completed"]:
-                return None
-
-            all_matched = all(result["found"])
-            status_list = result["found"].copy()
-            lines_list = result["matched_lines"].copy()
-
-            return (all_matched, status_list, lines_list)
+                if time.monotonic() < result["deadline"]:
+                    return None
+                # 已超时但定时线程还未处理，直接结束任务
+                self._complete(task_id)
+            # 结果只返回一次，之后移除任务
+            self.tasks.pop(task_id, None)
+        self._resolve()
+        return self._outcome(result)
+
+    def future(self, task_id: int) -> futures.Future:
+        """
+        任务结束（全部匹配或超时）时完成的 Future，结果与 result() 相同
+        :raise KeyError: 任务不存在或结果已被 result() 取走
+        """
+        with self.lock:
+            return self.tasks[task_id]["result"]["future"]
 
-    def _monitor_task(self, task_id: int):
-        """监控任务超时和关键词匹配"""
-        start_time = time.time()
-        while self.running:
+    async def result_async(
+        self, task_id: int
+    ) -> Optional[Tuple[bool, List[bool], List[Optional[str]]]]:
+        """asyncio 版本的 result(task_id, wait=True)"""
+        try:
+            future = self.future(task_id)
+        except KeyError:
+            return None
+        await asyncio.wrap_future(future)
+        return self.result(task_id)
+
+    @staticmethod
+    def _outcome(result: dict) -> Tuple[bool, List[bool], List[Optional[str]]]:
+        """(是否全部匹配, 每个关键词匹配状态, 每个关键词匹配的行)"""
+        return (
+            all(result["found"]),
+            result["found"].copy(),
+            result["matched_lines"].copy(),
+        )
+
+    def _expire_tasks(self):
+        """定时线程：等待最近的截止时间，结束超时的任务"""
+        while True:
             with self.lock:
-                task = self.tasks.get(task_id)
-                if not task:
-                    return
-
-                result = task["result"]
-                elapsed = time.time() - start_time
-
-                if elapsed > result["timeout"] or all(result["found"]):
-                    result["completed"] = True
-                    with result["condition"]:
-                        result["condition"].notify_all()
-                    self._remove_task(task_id)
+                if not self.running:
                     return
+                now = time.monotonic()
+                while self.deadlines and self.deadlines[0][0] <= now:
+                    _, task_id = heapq.heappop(self.deadlines)
+                    task = self.tasks.get(task_id)
+                    if task and not task["result"]["completed"]:
+                        self._complete(task_id)
+                if not self.resolved:
+                    # 新任务的截止时间更早时 assert_keywords 会提前唤醒
+                    timeout = self.deadlines[0][0] - now if self.deadlines else None
+                    self.timer_cond.wait(timeout)
+            self._resolve()
+
+    def _complete(self, task_id: int):
+        """结束任务，调用者需持有 self.lock，之后在锁外调用 _resolve() 通知等待者"""
+        task = self.tasks[task_id]
+        self.engine.remove(task["watch"])
+        self.watch_tasks.pop(task["watch"], None)
+        self.history.unpin(task["cursor"])
+        result = task["result"]
+        result["completed"] = True
+        self.resolved.append((result["future"], self._outcome(result)))
 
-                # 检查每个关键词是否匹配
-                for i, keyword in enumerate(result["keywords"]):
-                    if result["found"][i]:
-                        continue
-
-                    for line in task["lines"]:
-                        if keyword in line:
-                            result["found"][i] = True
-                            result["matched_lines"][i] = line
-                            break
-
-            time.sleep(0.05)
+    def _resolve(self):
+        """设置已结束任务的 Future；在锁外执行，回调中可以再调用 monitor"""
+        with self.lock:
+            resolved, self.resolved = self.resolved, []
+        for future, outcome in resolved:
+            future.set_result(outcome)
 
-    def _remove_task(self, task_id: int):
-        """安全移除任务"""
+    def cursor(self) -> int:
+        """游标：下一行到达后的行号，可传给 lines() 或 assert_keywords(since=...)"""
         with self.lock:
-            if task_id in self.tasks:
-                del self.tasks[task_id]
+            return self.history.end
+
+    def lines(self, since: int = 0, until: Optional[int] = None) -> List[str]:
+        """history 中 [since, until) 范围内仍保存的行"""
+        return self.history.since(since, until)
 
     def _generate_task_id(self) -> int:
         """生成唯一递增ID"""
@@ -180,25 +274,30 @@ class RpcStreamIOMonitor:
 
     def stop(self):
         """停止监控器并清理资源"""
-        self.running = False
+        with self.lock:
+            self.running = False
+            self.timer_cond.notify()
+        self.history.close()
         if self.thread.is_alive():
             logger.debug("join read")
             self.thread.join()
+        self.timer.join()
 
-        if self.file:
+        if self.sink:
             try:
-                self.file.close()
-            except:
-                pass
+                self.sink.close()
+            except OSError as e:
+                logger.warning(f"close log sink: {e}")
 
         with self.lock:
             # 通知所有等待的任务
-            for task in self.tasks.values():
+            for task_id, task in self.tasks.items():
                 logger.debug(f"join task {task}")
-                task["result"]["completed"] = True
-                with task["result"]["condition"]:
-                    task["result"]["condition"].notify_all()
+                if not task["result"]["completed"]:
+                    self._complete(task_id)
             self.tasks.clear()
+            self.deadlines.clear()
+        self._resolve()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,152 @@
+"""
+rpi-rpc: one-shot client for scripts and CI, which may start it thousands
+of times, so it only imports grpc, the protos and src.client (startup is
+measured by bench/bench_startup.py)
+
+    python -m apps.rpi_rpc exec "uname -a"      # exits with the command's status
+    python -m apps.rpi_rpc stream "tail -f /var/log/syslog"
+    python -m apps.rpi_rpc ping -n 5
+
+    alias rpi-rpc="python -m apps.rpi_rpc"
+
+the server is -a host:port, default $RPI_RPC_ADDR or localhost:50051.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import grpc
+
+from proto import command_pb2, command_pb2_grpc
+from src.client import NOT_EXIT, POLICIES, policy_value
+
+DEFAULT_ADDR = "localhost:50051"
+# 连接失败或 RPC 出错时的退出码（与 ssh 相同）
+EXIT_RPC_ERROR = 255
+EXIT_INTERRUPTED = 130
+
+
+def exit_status(returncode: int) -> int:
+    """server errors (-1) and out of range codes become EXIT_RPC_ERROR"""
+    return returncode if 0 <= returncode < 256 else EXIT_RPC_ERROR
+
+
+def write(stream, data: bytes):
+    if data:
+        stream.buffer.write(data)
+        stream.buffer.flush()
+
+
+def run_exec(stub, args) -> int:
+    response = stub.Execute(
+        command_pb2.CommandRequest(
+            command=args.command,
+            binary=True,
+            timeout_ms=int(args.timeout * 1000),
+        ),
+        # 服务端先按 timeout_ms 结束命令并返回，这里多留一些时间
+        timeout=args.timeout + 5 if args.timeout else None,
+    )
+    write(sys.stdout, response.stdout_bytes)
+    write(sys.stderr, response.stderr_bytes)
+    return exit_status(response.returncode)
+
+
+def run_stream(stub, args) -> int:
+    call = stub.ExecuteStream(
+        command_pb2.CommandRequest(
+            command=args.command,
+            binary=True,
+            chunk_size=args.chunk_size,
+            flush_interval_ms=args.flush_interval_ms,
+            backpressure=policy_value(args.backpressure),
+        )
+    )
+    returncode = EXIT_RPC_ERROR
+    try:
+        for response in call:
+            write(sys.stdout, response.stdout_bytes)
+            write(sys.stderr, response.stderr_bytes)
+            if response.returncode != NOT_EXIT:
+                returncode = exit_status(response.returncode)
+                if response.dropped_bytes or response.coalesced_bytes:
+                    print(
+                        f"rpi-rpc: {response.dropped_bytes} bytes dropped, "
+                        f"{response.coalesced_bytes} coalesced",
+                        file=sys.stderr,
+                    )
+    except KeyboardInterrupt:
+        # 取消 RPC，服务端随之结束命令
+        call.cancel()
+        return EXIT_INTERRUPTED
+    return returncode
+
+
+def run_ping(stub, args) -> int:
+    for i in range(args.count):
+        start = time.perf_counter()
+        # wait_for_ready: 等待连接建立而不是立即以 UNAVAILABLE 失败，最多 timeout 秒
+        response = stub.Execute(
+            command_pb2.CommandRequest(command="true"),
+            timeout=args.timeout,
+            wait_for_ready=True,
+        )
+        elapsed = time.perf_counter() - start
+        print(f"{args.addr}: seq={i} rc={response.returncode} {elapsed * 1e3:.2f} ms")
+    return 0
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="rpi-rpc", description="run commands on an rpi-rpc server"
+    )
+    parser.add_argument(
+        "-a",
+        "--addr",
+        default=os.environ.get("RPI_RPC_ADDR", DEFAULT_ADDR),
+        help="host:port of the server, default $RPI_RPC_ADDR or %(default)s",
+    )
+    commands = parser.add_subparsers(dest="action", required=True)
+
+    exec_ = commands.add_parser("exec", help="run a command, exit with its status")
+    exec_.add_argument("command")
+    exec_.add_argument(
+        "-t", "--timeout", type=float, default=0, help="seconds, 0 for the server's"
+    )
+
+    stream = commands.add_parser("stream", help="print the output as it arrives")
+    stream.add_argument("command")
+    stream.add_argument("--chunk-size", type=int, default=0)
+    stream.add_argument("--flush-interval-ms", type=int, default=0)
+    stream.add_argument(
+        "--backpressure",
+        choices=list(POLICIES),
+        default="block",
+        help="what the server does when this client falls behind",
+    )
+
+    ping = commands.add_parser("ping", help="check that the server runs commands")
+    ping.add_argument("-n", "--count", type=int, default=1)
+    ping.add_argument("-t", "--timeout", type=float, default=5.0)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = parser().parse_args(argv)
+    with grpc.insecure_channel(args.addr) as channel:
+        stub = command_pb2_grpc.CommandStub(channel)
+        try:
+            if args.action == "exec":
+                return run_exec(stub, args)
+            if args.action == "stream":
+                return run_stream(stub, args)
+            return run_ping(stub, args)
+        except grpc.RpcError as e:
+            print(f"rpi-rpc: {e.code().name}: {e.details()}", file=sys.stderr)
+            return EXIT_RPC_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,183 @@
+import argparse
+import asyncio
+from concurrent import futures
+from typing import Optional
+
 import grpc
 from loguru import logger
-from concurrent import futures
+
 from proto import command_pb2_grpc
-from src.api import Commander
+from src.aio_server import install_child_watcher
+from src.api import AsyncCommander, Commander
+from src.cache import DEFAULT_CACHE_ENTRIES, ResultCache
+from src.jobs import DEFAULT_MAX_JOBS, JobManager
+from src.metrics import ServerMetrics, serve_metrics
+from src.scheduler import DEFAULT_MAX_CHILDREN, DEFAULT_MAX_QUEUE, Scheduler
+
+# 允许客户端 channel 池在空闲时发送 keepalive ping（见 src/pool.py）
+SERVER_OPTIONS = [
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.min_ping_interval_without_data_ms", 10000),
+    ("grpc.http2.max_ping_strikes", 0),
+]
+
+
+def start_metrics(metrics: ServerMetrics, port: int):
+    """GET /metrics on port, 0 to not serve them"""
+    if port:
+        serve_metrics(metrics.registry, port)
+        print(f"Metrics on http://0.0.0.0:{port}/metrics")
 
 
 @logger.catch()
-def serve():
-    port = "50051"
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    command_pb2_grpc.add_CommandServicer_to_server(Commander(), server)
+def serve(
+    port: str = "50051",
+    max_workers: int = 10,
+    cache_entries: int = DEFAULT_CACHE_ENTRIES,
+    scheduler: Optional[Scheduler] = None,
+    metrics_port: int = 0,
+    log_lines: bool = False,
+    jobs: Optional[JobManager] = None,
+):
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=max_workers), options=SERVER_OPTIONS
+    )
+    metrics = ServerMetrics()
+    command_pb2_grpc.add_CommandServicer_to_server(
+        Commander(
+            cache=ResultCache(cache_entries),
+            scheduler=scheduler,
+            metrics=metrics,
+            log_lines=log_lines,
+            jobs=jobs,
+        ),
+        server,
+    )
     server.add_insecure_port("[::]:" + port)
+    start_metrics(metrics, metrics_port)
     server.start()
     print("Server started, listening on " + port)
     server.wait_for_termination()
 
 
+@logger.catch()
+async def serve_async(
+    port: str = "50051",
+    cache_entries: int = DEFAULT_CACHE_ENTRIES,
+    scheduler: Optional[Scheduler] = None,
+    metrics_port: int = 0,
+    log_lines: bool = False,
+    jobs: Optional[JobManager] = None,
+):
+    """grpc.aio 服务端：所有流式命令共享一个事件循环，不受线程池大小限制"""
+    install_child_watcher()
+    server = grpc.aio.server(options=SERVER_OPTIONS)
+    metrics = ServerMetrics()
+    command_pb2_grpc.add_CommandServicer_to_server(
+        AsyncCommander(
+            cache=ResultCache(cache_entries),
+            scheduler=scheduler,
+            metrics=metrics,
+            log_lines=log_lines,
+            jobs=jobs,
+        ),
+        server,
+    )
+    server.add_insecure_port("[::]:" + port)
+    start_metrics(metrics, metrics_port)
+    await server.start()
+    print("Async server started, listening on " + port)
+    await server.wait_for_termination()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="rpi-rpc command server")
+    parser.add_argument("--port", default="50051")
+    parser.add_argument(
+        "--backend",
+        choices=["sync", "async"],
+        default="sync",
+        help="sync: thread pool Commander; async: grpc.aio AsyncCommander",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=10,
+        help="thread pool size (sync only); streams and queued requests hold a thread",
+    )
+    parser.add_argument(
+        "--cache-entries",
+        type=int,
+        default=DEFAULT_CACHE_ENTRIES,
+        help="results kept for Execute requests with cache_ttl_ms",
+    )
+    parser.add_argument(
+        "--max-children",
+        type=int,
+        default=DEFAULT_MAX_CHILDREN,
+        help="commands running at the same time",
+    )
+    parser.add_argument(
+        "--max-streams",
+        type=int,
+        default=None,
+        help="of which ExecuteStream commands, default 3/4 of --max-children",
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=DEFAULT_MAX_QUEUE,
+        help="requests waiting for a slot per kind, more are rejected "
+        "with RESOURCE_EXHAUSTED",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=0,
+        help="serve prometheus metrics on http://host:PORT/metrics, 0 to disable",
+    )
+    parser.add_argument(
+        "--spool-dir",
+        default=None,
+        help="directory of the background job output, default $TMPDIR/rpi-rpc-jobs",
+    )
+    parser.add_argument(
+        "--max-jobs",
+        type=int,
+        default=DEFAULT_MAX_JOBS,
+        help="background jobs kept (running or finished); running jobs also take "
+        "a stream slot, so at most --max-streams of them run at once",
+    )
+    parser.add_argument(
+        "--log-lines",
+        action="store_true",
+        help="log every ExecuteStream message at debug level (slow)",
+    )
+    args = parser.parse_args()
+    scheduler = Scheduler(args.max_children, args.max_streams, args.max_queue)
+    jobs = JobManager(args.spool_dir, args.max_jobs, scheduler=scheduler)
+    if args.backend == "async":
+        asyncio.run(
+            serve_async(
+                args.port,
+                args.cache_entries,
+                scheduler,
+                args.metrics_port,
+                args.log_lines,
+                jobs,
+            )
+        )
+    else:
+        serve(
+            args.port,
+            args.max_workers,
+            args.cache_entries,
+            scheduler,
+            args.metrics_port,
+            args.log_lines,
+            jobs,
+        )
+
+
 if __name__ == "__main__":
-    serve()
+    main()
@@ -0,0 +1,4 @@
+import os
+
+# 进程内服务端 fork 子进程时 grpc 会打印 fork_posix 提示，压测时屏蔽
+os.environ.setdefault("GRPC_VERBOSITY", "ERROR")
@@ -0,0 +1,47 @@
+"""
+200 simultaneous ExecuteStream calls against the thread pool server
+(--backend sync, 10 workers) and the grpc.aio server (--backend async)
+
+    python -m bench.bench_aio_concurrency [streams] [seconds]
+"""
+
+import asyncio
+import sys
+import time
+
+import grpc
+
+from bench.common import percentile, server_process
+from proto import command_pb2, command_pb2_grpc
+
+
+async def one_stream(stub, command: str) -> float:
+    start = time.perf_counter()
+    async for _ in stub.ExecuteStream(command_pb2.CommandRequest(command=command)):
+        pass
+    return time.perf_counter() - start
+
+
+async def fan_out(addr_port: str, streams: int, seconds: int):
+    command = f"echo start; sleep {seconds}; echo done"
+    async with grpc.aio.insecure_channel(addr_port) as channel:
+        stub = command_pb2_grpc.CommandStub(channel)
+        start = time.perf_counter()
+        samples = await asyncio.gather(
+            *(one_stream(stub, command) for _ in range(streams))
+        )
+        return time.perf_counter() - start, samples
+
+
+def main(streams: int = 200, seconds: int = 1):
+    for backend in ("async", "sync"):
+        with server_process("--backend", backend) as addr_port:
+            wall, samples = asyncio.run(fan_out(addr_port, streams, seconds))
+        print(
+            f"{backend:<6} {streams} streams of sleep {seconds}: wall {wall:7.2f}s "
+            f"p50 {percentile(samples, 50):7.2f}s p99 {percentile(samples, 99):7.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,33 @@
+"""
+wall time of N small commands: one Execute per command vs one ExecuteBatch
+
+    python -m bench.bench_batch [n]
+"""
+
+import sys
+import time
+
+from bench.common import local_server
+from src.impl import RpcClient
+
+
+def wall(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main(n: int = 100):
+    commands = [f"echo {i}" for i in range(n)]
+    with local_server() as addr_port, RpcClient(addr_port) as client:
+        client.rpc("true")  # connect before measuring
+        loop = wall(lambda: [client.rpc(c) for c in commands])
+        sequential = wall(lambda: client.rpc_batch(commands))
+        parallel = wall(lambda: client.rpc_batch(commands, parallel=True))
+    print(f"{n} x Execute            {loop:7.3f}s")
+    print(f"ExecuteBatch sequential  {sequential:7.3f}s")
+    print(f"ExecuteBatch parallel    {parallel:7.3f}s")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
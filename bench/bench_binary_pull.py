@@ -0,0 +1,89 @@
+"""
+pull a large binary file (default 200 MB of 16-bit PCM-like samples) off the
+server with ExecuteStream:
+
+- text + base64, the previous workaround (33% larger, decoded on the client)
+- binary chunks
+- binary chunks with gzip / deflate (cpu bound on loopback, only pays off
+  when the link is slower than the device compresses, eg. Wi-Fi)
+
+    python -m bench.bench_binary_pull [size_mb]
+"""
+
+import base64
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+import grpc
+
+from bench.common import local_server
+from src.impl import RpcClient
+
+BLOCK_SAMPLES = 512 * 1024
+
+
+def make_pcm(path: str, size: int):
+    """sine wave with noise in the low bits: compresses a bit, like a recording"""
+    samples = bytearray()
+    for i in range(BLOCK_SAMPLES):
+        value = int(8000 * math.sin(i / 20)) + random.randint(-64, 64)
+        samples += value.to_bytes(2, "little", signed=True)
+    with open(path, "wb") as f:
+        written = 0
+        while written < size:
+            block = bytes(samples[: size - written])
+            f.write(block)
+            written += len(block)
+
+
+def pull(client: RpcClient, command: str, **kwargs) -> list:
+    p = client.rpc_bg(command, chunk_size=256 * 1024, **kwargs)
+    p.join()
+    messages = list(p.msgq().queue)
+    assert messages[-1] == "returncode: 0", messages[-1]
+    return messages[:-1]
+
+
+def main(size_mb: int = 200):
+    size = size_mb * 1024 * 1024
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "record.raw")
+        make_pcm(path, size)
+        with local_server() as addr_port, RpcClient(addr_port) as client:
+            client.rpc("true")  # connect before measuring
+            cases = {
+                "text + base64": lambda: base64.b64decode(
+                    "".join(pull(client, f"base64 -w0 {path}"))
+                ),
+                "binary": lambda: b"".join(pull(client, f"cat {path}", binary=True)),
+                "binary + gzip": lambda: b"".join(
+                    pull(
+                        client,
+                        f"cat {path}",
+                        binary=True,
+                        compression=grpc.Compression.Gzip,
+                    )
+                ),
+                "binary + deflate": lambda: b"".join(
+                    pull(
+                        client,
+                        f"cat {path}",
+                        binary=True,
+                        compression=grpc.Compression.Deflate,
+                    )
+                ),
+            }
+            for name, fn in cases.items():
+                start = time.perf_counter()
+                data = fn()
+                elapsed = time.perf_counter() - start
+                assert len(data) == size, (name, len(data))
+                print(f"{name:<18} {elapsed:7.3f}s {size / elapsed / 1e6:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
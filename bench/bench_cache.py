@@ -0,0 +1,53 @@
+"""
+throughput of 50 dashboard pollers calling read-only commands in a loop,
+with cache_ttl_ms=1000 (served from the ResultCache, single-flight) and
+without (every call forks bash + stdbuf on the server)
+
+    python -m bench.bench_cache [pollers] [seconds]
+"""
+
+import sys
+import threading
+import time
+
+from bench.common import server_process, summary
+from src.impl import RpcClient
+from src.pool import ChannelPool
+
+COMMANDS = ["cat /proc/loadavg", "cat /proc/uptime", "ls -la $HOME"]
+
+
+def poll(addr_port: str, pollers: int, seconds: float, cache_ttl_ms: int):
+    pool = ChannelPool()
+    client = RpcClient(addr_port, pool)
+    samples = [[] for _ in range(pollers)]
+    deadline = time.monotonic() + seconds
+
+    def poller(i: int):
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            client.rpc(COMMANDS[i % len(COMMANDS)], cache_ttl_ms=cache_ttl_ms)
+            samples[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=poller, args=(i,)) for i in range(pollers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.close()
+    return [s for per_poller in samples for s in per_poller]
+
+
+def main(pollers: int = 50, seconds: int = 5):
+    for backend in ("sync", "async"):
+        with server_process("--backend", backend) as addr_port:
+            for name, ttl in (("no cache", 0), ("cache 1s", 1000)):
+                samples = poll(addr_port, pollers, seconds, ttl)
+                print(
+                    f"{backend:<5} {name:<8} {len(samples) / seconds:8.0f} calls/s  "
+                    + summary("latency", samples)
+                )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
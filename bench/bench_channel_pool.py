@@ -0,0 +1,34 @@
+"""
+per-call latency of `echo` with a fresh channel per call vs pooled channels
+
+    python -m bench.bench_channel_pool [n]
+"""
+
+import sys
+
+import grpc
+
+from bench.common import local_server, summary, timeit
+from proto import command_pb2, command_pb2_grpc
+from src.impl import RpcClient
+
+
+def fresh_channel_echo(addr_port: str):
+    # 旧实现：每次调用都新建并关闭 channel
+    with grpc.insecure_channel(addr_port) as channel:
+        stub = command_pb2_grpc.CommandStub(channel)
+        stub.Execute(command_pb2.CommandRequest(command="echo 1"))
+
+
+def main(n: int = 500):
+    with local_server() as addr_port:
+        fresh_channel_echo(addr_port)  # warm up the server side
+        print(
+            summary("fresh channel", timeit(lambda: fresh_channel_echo(addr_port), n))
+        )
+        with RpcClient(addr_port) as client:
+            print(summary("pooled channel", timeit(lambda: client.rpc("echo 1"), n)))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
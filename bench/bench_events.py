@@ -0,0 +1,108 @@
+"""
+bytes per line of ExecuteEvents (StreamEvent: seq, time_us, oneof) against
+ExecuteStream (CommandResponse with returncode=NOT_EXIT), first as encoded
+message sizes for typical line lengths, then end to end over an in-process
+server: messages, payload bytes per line, lines/s, and the per-line latency
+that time_us makes measurable (server and client share the clock here).
+
+both rpcs add the same 5 byte grpc message prefix and HTTP/2 framing per
+message, which is left out of the sizes.
+
+    python -m bench.bench_events [lines]
+"""
+
+import sys
+import time
+from typing import List
+
+from bench.common import local_server, percentile
+from proto import command_pb2
+from src.client import NOT_EXIT, RpcClient
+
+LINE_SIZES = (2, 8, 40, 120, 400)
+SEQS = (1, 1_000, 1_000_000)
+
+
+def stream_size(line: bytes, src: str = "stdout") -> int:
+    return command_pb2.CommandResponse(
+        returncode=NOT_EXIT, **{src: line.decode()}
+    ).ByteSize()
+
+
+def event_size(line: bytes, seq: int, src: str = "stdout") -> int:
+    return command_pb2.StreamEvent(
+        seq=seq,
+        time_us=time.time_ns() // 1000,
+        data=command_pb2.DataChunk(
+            src=command_pb2.Source.Value(src.upper()), data=line
+        ),
+    ).ByteSize()
+
+
+def message_sizes():
+    print("encoded bytes of one line message (ExecuteEvents: extra bytes in ())")
+    print(
+        f"{'src':<7}{'line':>5}{'stream':>8}"
+        + "".join(f"{f'seq={seq}':>14}" for seq in SEQS)
+    )
+    for src in ("stdout", "stderr"):
+        for size in LINE_SIZES:
+            line = b"x" * (size - 1) + b"\n"
+            stream = stream_size(line, src)
+            events = [event_size(line, seq, src) for seq in SEQS]
+            print(
+                f"{src:<7}{size:>5}{stream:>8}"
+                + "".join(f"{f'{e} (+{e - stream})':>14}" for e in events)
+            )
+
+
+def drain_stream(client: RpcClient, command: str, lines: int) -> str:
+    messages = size = 0
+    start = time.perf_counter()
+    with client.pool.lease(client.addr_port) as pooled:
+        for response in pooled.stub.ExecuteStream(
+            command_pb2.CommandRequest(command=command)
+        ):
+            messages += 1
+            size += response.ByteSize()
+    elapsed = time.perf_counter() - start
+    return (
+        f"{messages:>8} msgs {size / lines:6.2f} B/line "
+        f"{lines / elapsed:10.0f} lines/s  (no exit status)"
+    )
+
+
+def drain_events(client: RpcClient, command: str, lines: int) -> str:
+    messages = size = 0
+    latencies: List[float] = []
+    last_seq = 0
+    start = time.perf_counter()
+    for event in client.rpc_events(command):
+        messages += 1
+        size += event.ByteSize()
+        assert event.seq == last_seq + 1
+        last_seq = event.seq
+        latencies.append(time.time_ns() // 1000 - event.time_us)
+    elapsed = time.perf_counter() - start
+    return (
+        f"{messages:>8} msgs {size / lines:6.2f} B/line "
+        f"{lines / elapsed:10.0f} lines/s  "
+        f"latency p50 {percentile(latencies, 50) / 1e3:.2f} ms "
+        f"p99 {percentile(latencies, 99) / 1e3:.2f} ms"
+    )
+
+
+def main(lines: int = 200_000):
+    message_sizes()
+    print()
+    # 短行（seq 的输出）最能体现每条消息的固定开销
+    command = f"seq {lines}"
+    with local_server() as addr_port, RpcClient(addr_port) as client:
+        drain_stream(client, "seq 1000", 1000)  # 预热连接和线程池
+        print(f"`{command}`")
+        print(f"  ExecuteStream {drain_stream(client, command, lines)}")
+        print(f"  ExecuteEvents {drain_events(client, command, lines)}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
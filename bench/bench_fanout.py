@@ -0,0 +1,52 @@
+"""
+run one command on N hosts (local Commander servers on different ports):
+the serial `for addr in hosts: rpc(cmd, addr)` loop vs rpc_fanout, with a
+command that takes 50 ms on the device
+
+    python -m bench.bench_fanout [hosts] [max_parallel]
+"""
+
+import sys
+import time
+from contextlib import ExitStack
+
+from bench.common import local_server, summary
+from src.fanout import fanout_summary, rpc_fanout
+from src.impl import _execute
+from src.pool import ChannelPool
+
+COMMAND = "sleep 0.05; uname -a"
+
+
+def main(hosts: int = 16, max_parallel: int = 16):
+    with ExitStack() as stack:
+        addr_ports = [stack.enter_context(local_server(4)) for _ in range(hosts)]
+        pool = ChannelPool(max_size=hosts)
+        # 预先建立连接，只比较执行方式
+        list(rpc_fanout("true", addr_ports, pool=pool))
+
+        start = time.perf_counter()
+        samples = []
+        for addr_port in addr_ports:
+            host_start = time.perf_counter()
+            with pool.lease(addr_port) as pooled:
+                _execute(pooled.stub, COMMAND)
+            samples.append(time.perf_counter() - host_start)
+        serial = time.perf_counter() - start
+        print(f"serial loop     total {serial * 1e3:8.1f}ms")
+        print(summary("serial per host", samples))
+
+        start = time.perf_counter()
+        results = list(rpc_fanout(COMMAND, addr_ports, max_parallel, pool=pool))
+        total = time.perf_counter() - start
+        stats = fanout_summary(results)
+        print(
+            f"fan-out x{max_parallel:<4} total {total * 1e3:8.1f}ms "
+            f"({stats['ok']}/{stats['hosts']} ok)"
+        )
+        print(summary("fan-out per host", [r.latency for r in results]))
+        pool.close()
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,54 @@
+"""
+loopback throughput of PushFile / PullFile per chunk size, next to pulling
+the same file with a binary ExecuteStream of `cat`
+
+    python -m bench.bench_file_transfer [size_mb]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from bench.common import local_server
+from src.impl import RpcClient
+
+CHUNK_SIZES = [64 * 1024, 256 * 1024, 1024 * 1024, 2 * 1024 * 1024]
+
+
+def rate(size: int, fn) -> str:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    return f"{elapsed:7.3f}s {size / elapsed / 1e6:8.1f} MB/s"
+
+
+def main(size_mb: int = 200):
+    size = size_mb * 1024 * 1024
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "src.bin")
+        dst = os.path.join(tmp, "dst.bin")
+        with open(src, "wb") as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1024 * 1024))
+        with local_server() as addr_port, RpcClient(addr_port) as client:
+            client.rpc("true")  # connect before measuring
+            for chunk_size in CHUNK_SIZES:
+                kib = chunk_size // 1024
+                push = rate(size, lambda: client.rpc_push(src, dst, chunk_size))
+                print(f"PushFile {kib:>5} KiB  {push}")
+                pull = rate(size, lambda: client.rpc_pull(src, dst, chunk_size))
+                print(f"PullFile {kib:>5} KiB  {pull}")
+
+            def cat():
+                p = client.rpc_bg(f"cat {src}", chunk_size=1024 * 1024, binary=True)
+                p.join()
+                with open(dst, "wb") as f:
+                    f.writelines(list(p.msgq().queue)[:-1])
+
+            print(f"cat (binary stream)  {rate(size, cat)}")
+            assert os.path.getsize(dst) == size
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,78 @@
+"""
+background jobs: spool write throughput (Spool.append alone and a job
+writing as fast as it can), and reattach latency (AttachJob until the first
+chunk) at the tail of a running job and at offset 0 of a full spool
+
+    python -m bench.bench_jobs [spool_mb] [attaches]
+"""
+
+import sys
+import tempfile
+import time
+
+from bench.common import local_server, summary
+from src.impl import RpcClient
+from src.spool import Spool
+
+BLOCK = 64 * 1024
+TICKER = "sh -c 'while true; do echo tick; sleep 0.01; done'"
+
+
+def spool_append(total_mb: int) -> str:
+    block = b"x" * BLOCK
+    count = total_mb * 1024 * 1024 // BLOCK
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = Spool(f"{tmp}/job", max_bytes=64 * 1024 * 1024)
+        start = time.perf_counter()
+        for _ in range(count):
+            spool.append(block)
+        elapsed = time.perf_counter() - start
+        spool.close()
+    return f"Spool.append 64KiB      {total_mb / elapsed:9.1f} MB/s"
+
+
+def job_write(client: RpcClient, total_mb: int) -> str:
+    start = time.perf_counter()
+    job = client.start_job(f"head -c {total_mb}M /dev/zero", total_mb * 1024 * 1024)
+    while job.status().running:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    assert job.info.size == total_mb * 1024 * 1024
+    return f"job head -c {total_mb}M       {total_mb / elapsed:9.1f} MB/s"
+
+
+def first_chunk(client: RpcClient, job_id: str, offset: int) -> float:
+    job = client.job(job_id)
+    start = time.perf_counter()
+    for _ in job.attach(offset):
+        return time.perf_counter() - start
+    return time.perf_counter() - start
+
+
+def main(spool_mb: int = 256, attaches: int = 100):
+    print(spool_append(spool_mb))
+    with local_server() as addr_port, RpcClient(addr_port) as client:
+        print(job_write(client, spool_mb))
+
+        ticker = client.start_job(TICKER)
+        time.sleep(0.5)
+        tail = [
+            first_chunk(client, ticker.job_id, ticker.status().size)
+            for _ in range(attaches)
+        ]
+        print(summary("reattach at tail", tail))
+        ticker.cancel()
+
+        full = client.start_job(f"head -c {spool_mb}M /dev/zero")
+        while full.status().running:
+            time.sleep(0.01)
+        head = [first_chunk(client, full.job_id, 0) for _ in range(attaches)]
+        print(summary("reattach at offset 0", head))
+        start = time.perf_counter()
+        size = sum(len(data) for _, data in client.job(full.job_id).attach(0))
+        elapsed = time.perf_counter() - start
+        print(f"replay {size / 1e6:.0f} MB of spool  {size / 1e6 / elapsed:9.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
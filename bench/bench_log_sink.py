@@ -0,0 +1,82 @@
+"""
+line ingestion rate of RpcStreamIOMonitor with a log file: LogSink (one
+writer thread, batched writes) vs the previous write()+flush() per line on
+the reader thread (modelled by LineSink below), and without a file. with
+an fsync policy LogSink syncs once per batch instead of once per line
+
+    python -m bench.bench_log_sink [lines]
+"""
+
+import os
+import queue
+import sys
+import tempfile
+import time
+
+from apps.rpc_monitor import RpcStreamIOMonitor
+from src.logsink import LogSink
+
+
+class Stream:
+    def __init__(self):
+        self.q: queue.Queue = queue.Queue()
+
+    def msgq(self):
+        return self.q
+
+
+class LineSink:
+    """the old file handling: one write() and flush() (and fsync) per line"""
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.file = open(path, "a", encoding="utf-8", errors="ignore")
+        self.fsync = fsync
+
+    def write(self, line: str):
+        self.file.write(line)
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+def measure(make_sink, lines: int) -> float:
+    """lines per second until the monitor read the last line and the sink closed"""
+    stream = Stream()
+    for i in range(lines):
+        stream.q.put(f"2024-01-01 00:00:00 INFO worker {i % 16}: request {i} ok\n")
+    stream.q.put("last\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = make_sink(os.path.join(tmp, "monitor.log"))
+        start = time.perf_counter()
+        monitor = RpcStreamIOMonitor(stream, sink=sink)
+        task_id = monitor.assert_keywords(["last"], timeout=600, since=0)
+        monitor.result(task_id, wait=True)
+        monitor.stop()
+        elapsed = time.perf_counter() - start
+    return lines / elapsed
+
+
+def main(lines: int = 200_000):
+    for name, make_sink in (
+        ("no file", lambda path: None),
+        ("write+flush (before)", LineSink),
+        ("LogSink", LogSink),
+        (
+            "LogSink rotate+gzip",
+            lambda path: LogSink(path, rotate_bytes=4 << 20, compress="gzip"),
+        ),
+        ("write+flush+fsync", lambda path: LineSink(path, fsync=True)),
+        ("LogSink fsync=flush", lambda path: LogSink(path, fsync="flush")),
+    ):
+        rate = measure(make_sink, lines)
+        print(f"{name:<22} {rate:>10,.0f} lines/s")
+
+
+if __name__ == "__main__":
+    from loguru import logger
+
+    logger.remove()
+    main(*map(int, sys.argv[1:]))
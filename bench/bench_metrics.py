@@ -0,0 +1,73 @@
+"""
+cost of the server instrumentation: line mode ExecuteStream throughput and
+short Execute latency with metrics off (NullMetrics), on (ServerMetrics) and
+on with --log-lines writing every message to a debug log, plus the per-call
+cost of the hot-path hooks
+
+    python -m bench.bench_metrics [lines] [calls]
+"""
+
+import os
+import sys
+import time
+
+from loguru import logger
+
+from bench.common import local_server, summary, timeit
+from proto import command_pb2
+from src.impl import Commander, RpcClient
+from src.metrics import NullMetrics, ServerMetrics
+
+
+def stream(client: RpcClient, lines: int) -> float:
+    request = command_pb2.CommandRequest(command=f"yes | head -n {lines}")
+    start = time.perf_counter()
+    with client.pool.lease(client.addr_port) as pooled:
+        for _ in pooled.stub.ExecuteStream(request):
+            pass
+    return time.perf_counter() - start
+
+
+def hooks(n: int):
+    metrics = ServerMetrics()
+    response = command_pb2.CommandResponse(returncode=65537, stdout="y\n")
+    with metrics.call("ExecuteStream") as call:
+        start = time.perf_counter()
+        for _ in range(n):
+            call.sent(response)
+        sent = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(n):
+        with metrics.call("Execute"):
+            pass
+    calls = time.perf_counter() - start
+    print(f"call.sent()       {sent / n * 1e9:8.1f}ns per message")
+    print(f"metrics.call()    {calls / n * 1e9:8.1f}ns per rpc")
+
+
+def main(lines: int = 200_000, calls: int = 300):
+    # 与 --log-lines 在生产中一样写入一个 DEBUG 级别的日志文件
+    logger.remove()
+    logger.add(open(os.devnull, "w"), level="DEBUG")
+    hooks(100_000)
+    for label, commander in (
+        ("metrics off", Commander(metrics=NullMetrics())),
+        ("metrics on", Commander(metrics=ServerMetrics())),
+        ("metrics + log-lines", Commander(metrics=ServerMetrics(), log_lines=True)),
+    ):
+        with local_server(commander=commander) as addr_port, RpcClient(
+            addr_port
+        ) as client:
+            client.rpc("true")
+            elapsed = min(stream(client, lines) for _ in range(3))
+            print(
+                f"{label:<20} stream {lines} lines {elapsed:7.3f}s "
+                f"{lines / elapsed:9.0f} lines/s"
+            )
+            print(
+                summary(f"{label} Execute", timeit(lambda: client.rpc("true"), calls))
+            )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
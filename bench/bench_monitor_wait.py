@@ -0,0 +1,127 @@
+"""
+match-to-notify latency and thread count of RpcStreamIOMonitor with N
+pending tasks: one timer thread + futures completed on the reader thread,
+vs the previous design (one thread per task polling every 50 ms, modelled
+by PollingMonitor below)
+
+    python -m bench.bench_monitor_wait [tasks]
+"""
+
+import queue
+import sys
+import threading
+import time
+
+from apps.rpc_monitor import RpcStreamIOMonitor
+from bench.common import summary
+
+
+class Stream:
+    def __init__(self):
+        self.q: queue.Queue = queue.Queue()
+
+    def msgq(self):
+        return self.q
+
+
+class PollingMonitor:
+    """thread-per-task polling loop of the old monitor, without the file sink"""
+
+    def __init__(self, p):
+        self.p = p
+        self.tasks = {}
+        self.lock = threading.Lock()
+        self.counter = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._read_stream, daemon=True)
+        self.thread.start()
+
+    def _read_stream(self):
+        while self.running:
+            try:
+                line = self.p.msgq().get(timeout=1).strip()
+            except queue.Empty:
+                continue
+            with self.lock:
+                for task in self.tasks.values():
+                    task["lines"].append(line)
+
+    def assert_keywords(self, keywords, timeout):
+        with self.lock:
+            self.counter += 1
+            task_id = self.counter
+            self.tasks[task_id] = {
+                "keywords": keywords,
+                "found": [False] * len(keywords),
+                "lines": [],
+                "completed": False,
+                "condition": threading.Condition(),
+                "deadline": time.time() + timeout,
+            }
+        threading.Thread(
+            target=self._monitor_task, args=(task_id,), daemon=True
+        ).start()
+        return task_id
+
+    def _monitor_task(self, task_id):
+        while self.running:
+            with self.lock:
+                task = self.tasks[task_id]
+                for i, keyword in enumerate(task["keywords"]):
+                    if any(keyword in line for line in task["lines"]):
+                        task["found"][i] = True
+                if all(task["found"]) or time.time() > task["deadline"]:
+                    task["completed"] = True
+                    with task["condition"]:
+                        task["condition"].notify_all()
+                    del self.tasks[task_id]
+                    return
+            time.sleep(0.05)
+
+    def result(self, task_id, wait=False):
+        with self.lock:
+            task = self.tasks.get(task_id)
+        if task is None:
+            return True  # 已完成并移除
+        with task["condition"]:
+            task["condition"].wait_for(lambda: task["completed"], 5)
+        return all(task["found"])
+
+    def stop(self):
+        self.running = False
+
+
+def measure(monitor_cls, tasks: int):
+    stream = Stream()
+    base = threading.active_count()
+    monitor = monitor_cls(stream)
+    task_ids = [
+        monitor.assert_keywords([f"event {i}"], timeout=60) for i in range(tasks)
+    ]
+    threads = threading.active_count() - base
+    samples = []
+    for i, task_id in enumerate(task_ids[:100]):
+        start = time.perf_counter()
+        stream.q.put(f"event {i}")
+        monitor.result(task_id, wait=True)
+        samples.append(time.perf_counter() - start)
+    monitor.stop()
+    return threads, samples
+
+
+def main(tasks: int = 500):
+    # 先测 events：PollingMonitor 的线程在 stop() 后还会存活一段时间
+    for name, cls in (
+        ("events", RpcStreamIOMonitor),
+        ("polling (before)", PollingMonitor),
+    ):
+        threads, samples = measure(cls, tasks)
+        print(f"{name:<17} extra threads for {tasks} tasks: {threads}")
+        print(summary(f"{name} latency", samples))
+
+
+if __name__ == "__main__":
+    from loguru import logger
+
+    logger.remove()
+    main(*map(int, sys.argv[1:]))
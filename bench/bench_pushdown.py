@@ -0,0 +1,83 @@
+"""
+bytes on the wire and time to a keyword match when a client watches a
+chatty command (n lines, 1% ERROR, "MATCH ready" halfway through):
+
+- client side, the current approach: every line is streamed and searched
+  on the client, which cancels the call once it sees the keyword
+- pushdown: the server only sends ERROR lines, watches for the keyword and
+  ends the command with a MatchEvent (StreamFilter, stop_on_match)
+
+bytes are the serialized messages plus the 5 byte grpc frame header each,
+http/2 framing not included.
+
+    python -m bench.bench_pushdown [lines] [repeat]
+"""
+
+import statistics
+import sys
+import time
+
+from bench.common import server_process
+from proto import command_pb2
+from src.pool import default_pool
+from src.pushdown import StreamFilter
+
+GRPC_FRAME_HEADER = 5
+
+
+def chatty_command(lines: int) -> str:
+    return (
+        f"python3 -c 'import sys; w = sys.stdout.write; n = {lines}; "
+        '[w("MATCH ready\\n") if i == n // 2 else '
+        'w(("ERROR" if i % 100 == 0 else "INFO") '
+        '+ " worker %d request %d done in 12ms\\n" % (i % 16, i)) '
+        "for i in range(n)]'"
+    )
+
+
+def client_side(stub, command: str):
+    start = time.perf_counter()
+    call = stub.ExecuteStream(command_pb2.CommandRequest(command=command))
+    wire = 0
+    for response in call:
+        wire += response.ByteSize() + GRPC_FRAME_HEADER
+        if "ready" in response.stdout:
+            elapsed = time.perf_counter() - start
+            call.cancel()
+            return wire, elapsed
+    raise RuntimeError("keyword not seen")
+
+
+def pushdown(stub, command: str):
+    stream_filter = StreamFilter(
+        include=["ERROR"], watches=[["ready"]], stop_on_match=True
+    )
+    start = time.perf_counter()
+    call = stub.ExecuteStream(
+        command_pb2.CommandRequest(command=command, **stream_filter.request_fields())
+    )
+    wire = 0
+    for response in call:
+        wire += response.ByteSize() + GRPC_FRAME_HEADER
+        if response.HasField("match"):
+            return wire, time.perf_counter() - start
+    raise RuntimeError("no match event")
+
+
+def main(lines: int = 200_000, repeat: int = 3):
+    command = chatty_command(lines)
+    for backend in ("sync", "async"):
+        with server_process("--backend", backend) as addr_port:
+            with default_pool().lease(addr_port) as pooled:
+                for name, fn in (("client side", client_side), ("pushdown", pushdown)):
+                    results = [fn(pooled.stub, command) for _ in range(repeat)]
+                    wire = results[0][0]
+                    elapsed = statistics.median(r[1] for r in results)
+                    print(
+                        f"{backend:<5} {name:<12} {wire / 1e6:8.2f} MB on the wire, "
+                        f"match after {elapsed * 1e3:8.1f}ms"
+                    )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,79 @@
+"""
+peak RSS of the monitor's line storage with 50 tasks on a 10M-line stream:
+
+- legacy: every task appends every line to its own list (the monitor
+  before LineRing); run on a tenth of the lines and extrapolated, since the
+  full run needs several GB
+- ring: one shared LineRing with the default caps, each task only pins a
+  cursor
+
+each mode runs in its own interpreter so the peaks do not mix.
+
+    python -m bench.bench_ring_buffer [lines] [tasks]
+"""
+
+import resource
+import subprocess
+import sys
+import time
+
+LEGACY_FRACTION = 10
+
+
+def line(i: int) -> str:
+    return f"2026-10-17 12:00:{i % 60:02d}.{i % 1000:03d} [INFO] sensor value={i}"
+
+
+def run(mode: str, lines: int, tasks: int):
+    start = time.perf_counter()
+    if mode == "legacy":
+        task_lines = [[] for _ in range(tasks)]
+        for i in range(lines):
+            text = line(i)
+            for stored in task_lines:
+                stored.append(text)
+        stats = {"lines": len(task_lines[0])}
+    else:
+        from src.ring import LineRing
+
+        ring = LineRing()
+        for t in range(tasks):
+            ring.pin(t * lines // tasks)
+        for i in range(lines):
+            ring.append(line(i))
+        stats = ring.stats()
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode} {lines} {peak_mb:.1f} {elapsed:.3f} {stats}")
+
+
+def child(mode: str, lines: int, tasks: int):
+    output = subprocess.run(
+        [sys.executable, "-m", "bench.bench_ring_buffer", mode, str(lines), str(tasks)],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split(maxsplit=4)
+    return float(output[2]), float(output[3]), output[4].strip()
+
+
+def main(lines: int = 10_000_000, tasks: int = 50):
+    baseline, _, _ = child("ring", 0, tasks)
+    legacy_lines = lines // LEGACY_FRACTION
+    legacy, legacy_time, _ = child("legacy", legacy_lines, tasks)
+    ring, ring_time, stats = child("ring", lines, tasks)
+    estimate = baseline + (legacy - baseline) * LEGACY_FRACTION
+    print(f"interpreter baseline              {baseline:9.1f} MB")
+    print(
+        f"legacy, {legacy_lines:>9} lines          {legacy:9.1f} MB "
+        f"{legacy_time:7.2f}s (x{LEGACY_FRACTION} -> ~{estimate:.0f} MB)"
+    )
+    print(f"LineRing, {lines:>9} lines        {ring:9.1f} MB {ring_time:7.2f}s")
+    print(f"LineRing stats: {stats}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4:
+        run(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]))
+    else:
+        main(*map(int, sys.argv[1:]))
@@ -0,0 +1,53 @@
+"""
+startup time and memory of 100 background commands: forked
+PipedRpcStreamProcess vs in-process RpcStreamThread
+
+    python -m bench.bench_rpc_bg [count]
+"""
+
+import resource
+import sys
+import time
+
+from bench.common import server_process
+from src.impl import PipedRpcStreamProcess, RpcStreamThread
+
+
+def rss_kb(pid) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def launch(cls, addr_port: str, count: int) -> str:
+    base = rss_kb("self")
+    start = time.perf_counter()
+    handles = [cls("echo started; sleep 30", addr_port) for _ in range(count)]
+    for p in handles:
+        p.start()
+    for p in handles:
+        p.msgq().get(timeout=30)
+    elapsed = time.perf_counter() - start
+    rss = rss_kb("self") - base
+    rss += sum(rss_kb(p.pid) for p in handles if getattr(p, "pid", None))
+    for p in handles:
+        p.stop()
+    return (
+        f"{cls.__name__:<22} {count} started in {elapsed:7.3f}s "
+        f"({elapsed / count * 1e3:7.2f}ms each), extra RSS {rss / 1024:8.1f} MB"
+    )
+
+
+def main(count: int = 100):
+    with server_process("--backend", "async") as addr_port:
+        # fork 必须在本进程的 grpc 线程繁忙之前进行，所以先测 PipedRpcStreamProcess
+        print(launch(PipedRpcStreamProcess, addr_port, count))
+        print(launch(RpcStreamThread, addr_port, count))
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"client peak RSS {peak / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,79 @@
+"""
+latency of short Execute commands while 20 long ExecuteStream commands are
+running, and what a burst of concurrent 200 ms commands does with the scheduler
+limits (--max-children 32 --max-queue 32: at most 12 short commands next to
+the streams, the excess rejected with RESOURCE_EXHAUSTED) vs practically
+unlimited (every request forks at once)
+
+    python -m bench.bench_scheduler [streams] [burst]
+"""
+
+import asyncio
+import sys
+import time
+
+import grpc
+
+from bench.common import server_process, summary, timeit
+from proto import command_pb2
+from src.aio_client import aclose, arpc
+from src.impl import RpcClient
+
+SHORT = "cat /proc/loadavg"
+BURST = "sleep 0.2; cat /proc/loadavg"
+LONG = "sh -c 'while true; do echo tick; sleep 0.1; done'"
+
+
+def burst(addr_port: str, n: int):
+    """n concurrent 200 ms commands from asyncio, so they really arrive together"""
+
+    async def call():
+        start = time.perf_counter()
+        try:
+            await arpc(BURST, addr_port)
+        except grpc.RpcError as e:
+            return e.code(), time.perf_counter() - start
+        return grpc.StatusCode.OK, time.perf_counter() - start
+
+    async def run():
+        results = await asyncio.gather(*(call() for _ in range(n)))
+        await aclose()
+        return results
+
+    results = asyncio.run(run())
+    ok = [latency for code, latency in results if code == grpc.StatusCode.OK]
+    rejected = sum(code == grpc.StatusCode.RESOURCE_EXHAUSTED for code, _ in results)
+    return ok, rejected
+
+
+def main(streams: int = 20, burst_size: int = 200):
+    for label, limits in (
+        ("limited", ["--max-children", "32", "--max-queue", "32"]),
+        ("unlimited", ["--max-children", "10000", "--max-queue", "10000"]),
+    ):
+        with server_process("--backend", "async", *limits) as addr_port:
+            client = RpcClient(addr_port)
+            client.rpc("true")
+            print(f"{label}: {' '.join(limits)}")
+            print(summary("  idle", timeit(lambda: client.rpc(SHORT), 50)))
+            with client.pool.lease(addr_port) as pooled:
+                calls = [
+                    pooled.stub.ExecuteStream(command_pb2.CommandRequest(command=LONG))
+                    for _ in range(streams)
+                ]
+                for call in calls:
+                    next(call)
+                print(
+                    summary(
+                        f"  {streams} streams", timeit(lambda: client.rpc(SHORT), 50)
+                    )
+                )
+                ok, rejected = burst(addr_port, burst_size)
+                print(summary(f"  burst of {burst_size}", ok) + f" rejected={rejected}")
+                for call in calls:
+                    call.cancel()
+            client.close()
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,24 @@
+"""
+per-command latency of `true`: fresh bash + stdbuf per Execute vs a warm session
+
+    python -m bench.bench_session [n]
+"""
+
+import sys
+
+from bench.common import local_server, summary, timeit
+from src.impl import RpcClient
+
+
+def main(n: int = 1000):
+    with local_server() as addr_port, RpcClient(addr_port) as client:
+        client.rpc("true")  # connect before measuring
+        spawn = timeit(lambda: client.rpc("true"), n)
+        with client.session() as session:
+            warm = timeit(lambda: session.rpc("true"), n)
+    print(summary(f"{n} x Execute", spawn))
+    print(summary(f"{n} x session", warm))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
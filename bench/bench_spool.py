@@ -0,0 +1,74 @@
+"""
+producer throughput with a deliberately slow consumer: the same command
+streamed with ExecuteStream directly (the child blocks once its pipe and the
+grpc window are full) and with spool=True (the child writes into the spool
+on disk at its own pace), plus ReadOutput latency of random ranges
+
+    python -m bench.bench_spool [output_mb] [consumer_mb_per_s] [reads]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from bench.common import local_server, summary
+from proto import command_pb2
+from src.impl import RpcClient
+
+READ_LENGTH = 64 * 1024
+
+
+def slow_stream(client: RpcClient, size: int, rate: float, spool: bool) -> str:
+    """consume size bytes at rate bytes/s, return when the producer and consumer ended"""
+    with tempfile.TemporaryDirectory() as tmp:
+        done = os.path.join(tmp, "done")
+        # 子进程写完输出的时间由它自己记录
+        command = f"sh -c 'head -c {size} /dev/zero; date +%s.%N > {done}'"
+        request = command_pb2.CommandRequest(command=command, binary=True, spool=spool)
+        received = 0
+        start = time.time()
+        with client.pool.lease(client.addr_port) as pooled:
+            for response in pooled.stub.ExecuteStream(request):
+                received += len(response.stdout_bytes)
+                delay = start + received / rate - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+        consumer = time.time() - start
+        with open(done) as f:
+            producer = float(f.read()) - start
+    assert received == size
+    mb = size / 1e6
+    return (
+        f"{'spool' if spool else 'direct':<6} producer {producer:6.2f}s "
+        f"{mb / producer:8.1f} MB/s   consumer {consumer:6.2f}s {mb / consumer:6.1f} MB/s"
+    )
+
+
+def read_output(client: RpcClient, size: int, reads: int) -> str:
+    job = client.start_job(f"head -c {size} /dev/urandom")
+    while job.status().running:
+        time.sleep(0.01)
+    samples = []
+    for _ in range(reads):
+        offset = random.randrange(0, size - READ_LENGTH)
+        start = time.perf_counter()
+        _, data = job.read(offset, READ_LENGTH)
+        samples.append(time.perf_counter() - start)
+        assert len(data) == READ_LENGTH
+    return summary("ReadOutput 64KiB random", samples)
+
+
+def main(output_mb: int = 32, consumer_mb_per_s: int = 8, reads: int = 200):
+    size = output_mb * 1024 * 1024
+    rate = consumer_mb_per_s * 1e6
+    with local_server() as addr_port, RpcClient(addr_port) as client:
+        client.rpc("true")
+        print(slow_stream(client, size, rate, spool=False))
+        print(slow_stream(client, size, rate, spool=True))
+        print(read_output(client, size, reads))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,131 @@
+"""
+client startup: import time (-X importtime, best of runs) of the client
+entry points against the floor of grpc + the generated protos, which we do
+not control, and the wall time of `rpi-rpc ping` / `rpi-rpc exec` as CI runs
+them. fails (exit 1) when importing apps.rpi_rpc costs more than budget_ms
+above that floor, or when a client entry point loads server-side modules
+
+    python -m bench.bench_startup [budget_ms] [runs]
+"""
+
+import compileall
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from bench.common import server_process, summary
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FLOOR = "import grpc, proto.command_pb2_grpc"
+TARGETS = {
+    "floor (grpc + protos)": FLOOR,
+    "from src.api import rpc": "from src.api import rpc",
+    "import apps.rpi_rpc": "import apps.rpi_rpc",
+    "import src.impl (server)": "import src.impl",
+}
+# 客户端入口不应加载的模块
+SERVER_ONLY = [
+    "loguru",
+    "multiprocessing",
+    "http.server",
+    "src.impl",
+    "src.aio_client",
+    "src.aio_server",
+    "src.metrics",
+    "src.jobs",
+    "src.backpressure",
+]
+
+
+def import_times(code: str) -> Dict[str, int]:
+    """cumulative microseconds of the top level imports of code"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # 顶层模块前只有一个空格，嵌套的模块按层级缩进
+        if not name.startswith("  "):
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def import_ms(code: str, runs: int) -> float:
+    # 取最小值：单核机器上其他进程的干扰只会让导入变慢
+    return min(sum(import_times(code).values()) / 1000 for _ in range(runs))
+
+
+def loaded(code: str) -> List[str]:
+    """modules of SERVER_ONLY that code imports"""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"{code}\nimport sys\nprint(' '.join(sys.modules))",
+        ],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = set(result.stdout.split())
+    return [name for name in SERVER_ONLY if name in modules]
+
+
+def cli_wall(addr_port: str, args: List[str], runs: int) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "apps.rpi_rpc", "-a", addr_port, *args],
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main(budget_ms: int = 15, runs: int = 15) -> int:
+    # 本环境可能设置了 PYTHONDONTWRITEBYTECODE：先编译，测量的是有 .pyc 的冷启动
+    for directory in ("src", "proto", "apps"):
+        compileall.compile_dir(os.path.join(ROOT, directory), quiet=1)
+
+    results = {name: import_ms(code, runs) for name, code in TARGETS.items()}
+    floor = results["floor (grpc + protos)"]
+    for name, ms in results.items():
+        print(f"{name:<28} {ms:7.1f} ms  (+{ms - floor:5.1f} ms over floor)")
+
+    failed = False
+    for code in ("from src.api import rpc", "import apps.rpi_rpc"):
+        server_modules = loaded(code)
+        if server_modules:
+            print(f"FAIL `{code}` loads {', '.join(server_modules)}")
+            failed = True
+    overhead = results["import apps.rpi_rpc"] - floor
+    if overhead > budget_ms:
+        print(f"FAIL apps.rpi_rpc imports {overhead:.1f} ms over budget {budget_ms} ms")
+        failed = True
+
+    with server_process() as addr_port:
+        print(summary("rpi-rpc ping (wall)", cli_wall(addr_port, ["ping"], runs)))
+        print(
+            summary(
+                "rpi-rpc exec true (wall)", cli_wall(addr_port, ["exec", "true"], runs)
+            )
+        )
+    print("FAILED" if failed else f"ok, budget {budget_ms} ms over the floor")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*map(int, sys.argv[1:])))
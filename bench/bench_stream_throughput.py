@@ -0,0 +1,42 @@
+"""
+end-to-end ExecuteStream throughput of `yes | head -n N`, line mode vs chunk mode
+
+    python -m bench.bench_stream_throughput [lines] [chunk_size] [flush_interval_ms]
+"""
+
+import sys
+import time
+
+from bench.common import local_server
+from proto import command_pb2
+from src.impl import RpcClient
+
+
+def drain(client: RpcClient, request: command_pb2.CommandRequest) -> str:
+    messages = 0
+    size = 0
+    start = time.perf_counter()
+    with client.pool.lease(client.addr_port) as pooled:
+        for response in pooled.stub.ExecuteStream(request):
+            messages += 1
+            size += len(response.stdout)
+    elapsed = time.perf_counter() - start
+    return (
+        f"{elapsed:8.3f}s {messages:>9} msgs "
+        f"{size / elapsed / 1e6:8.2f} MB/s {size / 1e6:8.2f} MB"
+    )
+
+
+def main(lines: int = 5_000_000, chunk_size: int = 64 * 1024, flush_ms: int = 20):
+    command = f"yes | head -n {lines}"
+    with local_server() as addr_port, RpcClient(addr_port) as client:
+        chunked = command_pb2.CommandRequest(
+            command=command, chunk_size=chunk_size, flush_interval_ms=flush_ms
+        )
+        print(f"chunk {chunk_size:>6}B  {drain(client, chunked)}")
+        line = command_pb2.CommandRequest(command=command)
+        print(f"line mode     {drain(client, line)}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
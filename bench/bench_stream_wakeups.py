@@ -0,0 +1,104 @@
+"""
+CPU usage and latency-to-first-byte of ExecuteStream: the legacy
+select(0.1)/poll()/is_active() loop vs the selector-driven OutputPump
+
+    python -m bench.bench_stream_wakeups [idle_seconds] [chatty_seconds]
+"""
+
+import os
+import select
+import signal
+import sys
+import time
+from concurrent import futures
+from contextlib import contextmanager
+
+import grpc
+from loguru import logger
+
+from proto import command_pb2, command_pb2_grpc
+from src.impl import NOT_EXIT, Commander, popen
+
+
+class LegacyCommander(Commander):
+    """the line-mode loop as it was before OutputPump, for comparison"""
+
+    def ExecuteStream(self, request, context):
+        process = popen(request.command)
+        while True:
+            logger.debug("checking context.is_active()")
+            if not context.is_active():
+                os.killpg(os.getpgid(process.pid), signal.SIGINT)
+                break
+            logger.debug("selecting readable streams")
+            rx_io_list, _, _ = select.select(
+                [process.stdout, process.stderr], [], [], 0.1
+            )
+            logger.debug("checking process.poll()")
+            if process.poll() is not None:
+                break
+            for rx_io in rx_io_list:
+                src = "stdout" if rx_io is process.stdout else "stderr"
+                line = rx_io.readline()
+                logger.debug(f"line: {line}")
+                if line and context.is_active():
+                    yield command_pb2.CommandResponse(
+                        returncode=NOT_EXIT, **{src: line}
+                    )
+
+
+@contextmanager
+def serve(servicer):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    command_pb2_grpc.add_CommandServicer_to_server(servicer, server)
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    try:
+        with grpc.insecure_channel(f"localhost:{port}") as channel:
+            yield command_pb2_grpc.CommandStub(channel)
+    finally:
+        server.stop(grace=None)
+
+
+def idle(stub, seconds: int) -> str:
+    cpu = time.process_time()
+    for _ in stub.ExecuteStream(command_pb2.CommandRequest(command=f"sleep {seconds}")):
+        pass
+    used = time.process_time() - cpu
+    return f"idle sleep {seconds}s: cpu {used * 1e3:8.1f}ms"
+
+
+def chatty(stub, seconds: int, chunk_size: int = 0) -> str:
+    request = command_pb2.CommandRequest(command="yes", chunk_size=chunk_size)
+    start = time.perf_counter()
+    cpu = time.process_time()
+    call = stub.ExecuteStream(request)
+    first = None
+    size = 0
+    for response in call:
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(response.stdout)
+        if time.perf_counter() - start > seconds:
+            call.cancel()
+            break
+    used = time.process_time() - cpu
+    return (
+        f"chatty yes {seconds}s: first byte {first * 1e3:7.2f}ms "
+        f"{size / 1e6:8.2f} MB, cpu {used / max(size / 1e6, 1e-9) * 1e3:8.2f}ms/MB"
+    )
+
+
+def main(idle_seconds: int = 5, chatty_seconds: int = 3):
+    logger.remove()
+    logger.add(sys.stderr, level="DEBUG", filter=lambda r: False)
+    for name, servicer in (("legacy", LegacyCommander()), ("pump", Commander())):
+        with serve(servicer) as stub:
+            print(f"{name:<7} {idle(stub, idle_seconds)}")
+            print(f"{name:<7} {chatty(stub, chatty_seconds)}")
+    with serve(Commander()) as stub:
+        print(f"{'chunked':<7} {chatty(stub, chatty_seconds, 64 * 1024)}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,85 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent import futures
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+import grpc
+
+from proto import command_pb2_grpc
+from src.impl import Commander
+
+
+@contextmanager
+def local_server(
+    max_workers: int = 10, commander: Optional[Commander] = None
+) -> Iterator[str]:
+    """
+    start an in-process Commander server on an ephemeral port
+    :param commander: servicer to use, a default Commander() if omitted
+    :return: addr_port of the server, eg. "localhost:39821"
+    """
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+    command_pb2_grpc.add_CommandServicer_to_server(
+        commander if commander is not None else Commander(), server
+    )
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    try:
+        yield f"localhost:{port}"
+    finally:
+        server.stop(grace=None)
+
+
+@contextmanager
+def server_process(*args: str) -> Iterator[str]:
+    """
+    run apps/server.py in a subprocess, eg. server_process("--backend", "async")
+    :return: addr_port of the server
+    """
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, "-m", "apps.server", "--port", str(port), *args],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    addr_port = f"localhost:{port}"
+    try:
+        with grpc.insecure_channel(addr_port) as channel:
+            grpc.channel_ready_future(channel).result(timeout=10)
+        yield addr_port
+    finally:
+        process.terminate()
+        process.wait(10)
+
+
+def timeit(fn: Callable[[], object], n: int) -> List[float]:
+    """run fn n times, return per-call latency in seconds"""
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def summary(name: str, samples: List[float]) -> str:
+    return (
+        f"{name:<24} n={len(samples):<6} "
+        f"mean={sum(samples) / len(samples) * 1e3:8.3f}ms "
+        f"p50={percentile(samples, 50) * 1e3:8.3f}ms "
+        f"p99={percentile(samples, 99) * 1e3:8.3f}ms"
+    )
@@ -0,0 +1,312 @@
+"""
+reproducible load test of an in-process Commander server on an ephemeral
+port (no network, no real device needed). runs the workloads below and
+prints one JSON document with latency percentiles, throughput, CPU and RSS
+per workload, to compare commits:
+
+    python -m bench.suite > before.json
+    git checkout ...
+    python -m bench.suite --baseline before.json > after.json
+
+workloads:
+    echo                unary Execute QPS from --concurrency client threads
+    large_output        Execute of --output-mb MB of stdout
+    stream_lines        line mode ExecuteStream of --lines lines
+    concurrent_streams  --streams simultaneous ExecuteStream calls
+    rpc_bg_startup      rpc_bg() until the first line arrives, --bg commands
+
+client and server share this process, so cpu_seconds is the sum of both;
+children_cpu_seconds is the cpu of the commands (bash, yes, head...).
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+from loguru import logger
+
+from bench.common import local_server, percentile
+from proto import command_pb2
+from src.impl import RpcClient
+
+# --quick 时各参数缩小的倍数
+QUICK_SCALE = 10
+
+
+def latency_stats(samples: List[float]) -> Dict[str, float]:
+    """milliseconds"""
+    return {
+        "n": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1e3 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1e3,
+        "p95_ms": percentile(samples, 95) * 1e3,
+        "p99_ms": percentile(samples, 99) * 1e3,
+        "max_ms": max(samples, default=0.0) * 1e3,
+    }
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measured(fn: Callable[[], dict]) -> dict:
+    """run a workload and add wall time, cpu and memory to its result"""
+    before = os.times()
+    start = time.perf_counter()
+    result = fn()
+    wall = time.perf_counter() - start
+    after = os.times()
+    cpu = (after.user + after.system) - (before.user + before.system)
+    children = (after.children_user + after.children_system) - (
+        before.children_user + before.children_system
+    )
+    result.update(
+        wall_seconds=wall,
+        cpu_seconds=cpu,
+        cpu_percent=cpu / wall * 100 if wall else 0.0,
+        children_cpu_seconds=children,
+        rss_mb=rss_mb(),
+        peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    )
+    return result
+
+
+def in_threads(count: int, fn: Callable[[int], List[float]]) -> List[float]:
+    """run fn(i) in count threads, return all their samples"""
+    results: List[List[float]] = [[] for _ in range(count)]
+
+    def run(i: int):
+        results[i] = fn(i)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return [s for samples in results for s in samples]
+
+
+def drain(client: RpcClient, command: str) -> int:
+    """run command with ExecuteStream, return the number of messages"""
+    messages = 0
+    with client.pool.lease(client.addr_port) as pooled:
+        for _ in pooled.stub.ExecuteStream(command_pb2.CommandRequest(command=command)):
+            messages += 1
+    return messages
+
+
+def echo(client: RpcClient, args) -> dict:
+    deadline = time.perf_counter() + args.duration
+
+    def worker(_):
+        samples = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            client.rpc("echo ok")
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    start = time.perf_counter()
+    samples = in_threads(args.concurrency, worker)
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": args.concurrency,
+        "latency": latency_stats(samples),
+        "throughput": len(samples) / elapsed,
+        "unit": "calls/s",
+    }
+
+
+def large_output(client: RpcClient, args) -> dict:
+    size = int(args.output_mb * 1024 * 1024)
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        returncode, stdout, _ = client.rpc(f"head -c {size} /dev/zero | tr '\\0' x")
+        samples.append(time.perf_counter() - start)
+        assert returncode == 0 and len(stdout) == size
+    return {
+        "bytes": size,
+        "latency": latency_stats(samples),
+        "throughput": size * len(samples) / sum(samples) / 1e6,
+        "unit": "MB/s",
+    }
+
+
+def stream_lines(client: RpcClient, args) -> dict:
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        assert drain(client, f"yes | head -n {args.lines}") == args.lines
+        samples.append(time.perf_counter() - start)
+    return {
+        "lines": args.lines,
+        "latency": latency_stats(samples),
+        "throughput": args.lines * len(samples) / sum(samples),
+        "unit": "lines/s",
+    }
+
+
+def concurrent_streams(client: RpcClient, args) -> dict:
+    command = f"sh -c 'for i in $(seq {args.stream_lines}); do echo $i; done'"
+
+    def worker(_):
+        start = time.perf_counter()
+        assert drain(client, command) == args.stream_lines
+        return [time.perf_counter() - start]
+
+    start = time.perf_counter()
+    samples = in_threads(args.streams, worker)
+    elapsed = time.perf_counter() - start
+    return {
+        "streams": args.streams,
+        "latency": latency_stats(samples),
+        "throughput": args.streams * args.stream_lines / elapsed,
+        "unit": "lines/s",
+    }
+
+
+def rpc_bg_startup(client: RpcClient, args) -> dict:
+    samples = []
+    for _ in range(args.bg):
+        start = time.perf_counter()
+        p = client.rpc_bg("echo ready; sleep 10")
+        p.msgq().get(timeout=30)
+        samples.append(time.perf_counter() - start)
+        p.stop()
+    return {
+        "latency": latency_stats(samples),
+        "throughput": len(samples) / sum(samples),
+        "unit": "starts/s",
+    }
+
+
+WORKLOADS = {
+    "echo": echo,
+    "large_output": large_output,
+    "stream_lines": stream_lines,
+    "concurrent_streams": concurrent_streams,
+    "rpc_bg_startup": rpc_bg_startup,
+}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True,
+            text=True,
+            timeout=10,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def compare(baseline: dict, report: dict) -> List[str]:
+    """throughput and p99 of report relative to baseline, one line per workload"""
+    lines = []
+    for name, result in report["workloads"].items():
+        base = baseline.get("workloads", {}).get(name)
+        if base is None:
+            continue
+        throughput = result["throughput"] / base["throughput"] - 1
+        p99 = result["latency"]["p99_ms"] / (base["latency"]["p99_ms"] or 1) - 1
+        lines.append(
+            f"{name:<20} throughput {throughput * 100:+7.1f}% "
+            f"({result['throughput']:.1f} {result['unit']}), "
+            f"p99 {p99 * 100:+7.1f}% ({result['latency']['p99_ms']:.2f}ms)"
+        )
+    return lines
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="load test an in-process Commander, JSON report on stdout"
+    )
+    parser.add_argument(
+        "workloads",
+        nargs="*",
+        choices=[[], *WORKLOADS],
+        help="workloads to run, default all",
+    )
+    parser.add_argument("--duration", type=float, default=5.0, help="echo seconds")
+    parser.add_argument("--concurrency", type=int, default=4, help="echo threads")
+    parser.add_argument("--output-mb", type=float, default=16.0)
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--streams", type=int, default=50)
+    parser.add_argument(
+        "--stream-lines", type=int, default=200, help="lines per concurrent stream"
+    )
+    parser.add_argument("--bg", type=int, default=50, help="rpc_bg commands")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--quick", action="store_true", help=f"1/{QUICK_SCALE} of every size"
+    )
+    parser.add_argument("-o", "--output", help="write the JSON here, not stdout")
+    parser.add_argument(
+        "--baseline", help="JSON of an earlier run to compare with (on stderr)"
+    )
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.duration /= QUICK_SCALE
+        args.output_mb /= QUICK_SCALE
+        args.lines //= QUICK_SCALE
+        args.streams = max(1, args.streams // QUICK_SCALE)
+        args.bg = max(1, args.bg // QUICK_SCALE)
+        args.repeat = max(1, args.repeat // 2)
+    names = args.workloads or list(WORKLOADS)
+    # 服务端每条命令的 debug 日志不计入测量
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k != "workloads"},
+        },
+        "workloads": {},
+    }
+    # 每个并发流占用一个服务端线程
+    with local_server(max_workers=args.streams + args.concurrency + 4) as addr_port:
+        with RpcClient(addr_port) as client:
+            client.rpc("true")
+            for name in names:
+                print(f"running {name}...", file=sys.stderr)
+                report["workloads"][name] = measured(
+                    lambda: WORKLOADS[name](client, args)
+                )
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline) as f:
+            for line in compare(json.load(f), report):
+                print(line, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,7 +13,7 @@ _sym_db = _symbol_database.Default()
 
 
 DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(
-    b'\n\rcommand.proto\x12\x0brpi.command"!\n\x0e\x43ommandRequest\x12\x0f\n\x07\x63ommand\x18\x01 \x01(\t"E\n\x0f\x43ommandResponse\x12\x12\n\nreturncode\x18\x01 \x01(\x05\x12\x0e\n\x06stdout\x18\x02 \x01(\t\x12\x0e\n\x06stderr\x18\x03 \x01(\t2\xa1\x01\n\x07\x43ommand\x12\x46\n\x07\x45xecute\x12\x1b.rpi.command.CommandRequest\x1a\x1c.rpi.command.CommandResponse"\x00\x12N\n\rExecuteStream\x12\x1b.rpi.command.CommandRequest\x1a\x1c.rpi.command.CommandResponse"\x00\x30\x01\x42!\n\x0brpi.commandB\nRpiCommandP\x01\xa2\x02\x03HLWb\x06proto3'
+    b'\n\rcommand.proto\x12\x0brpi.command"\x9b\x03\n\x0e\x43ommandRequest\x12\x0f\n\x07\x63ommand\x18\x01 \x01(\t\x12\x12\n\nchunk_size\x18\x02 \x01(\r\x12\x19\n\x11\x66lush_interval_ms\x18\x03 \x01(\r\x12\x12\n\ntimeout_ms\x18\x04 \x01(\r\x12\x12\n\nsession_id\x18\x05 \x01(\t\x12\x0e\n\x06\x62inary\x18\x06 \x01(\x08\x12-\n\x0b\x63ompression\x18\x07 \x01(\x0e\x32\x18.rpi.command.Compression\x12\x0f\n\x07include\x18\x08 \x03(\t\x12\x0f\n\x07\x65xclude\x18\t \x03(\t\x12\x14\n\x0csample_every\x18\n \x01(\r\x12\'\n\x07watches\x18\x0b \x03(\x0b\x32\x16.rpi.command.WatchList\x12\x15\n\rstop_on_match\x18\x0c \x01(\x08\x12\x14\n\x0c\x63\x61\x63he_ttl_ms\x18\r \x01(\r\x12\r\n\x05spool\x18\x0e \x01(\x08\x12/\n\x0c\x62\x61\x63kpressure\x18\x0f \x01(\x0e\x32\x19.rpi.command.Backpressure\x12\x14\n\x0c\x62uffer_bytes\x18\x10 \x01(\r";\n\x07Keyword\x12\x0c\n\x04text\x18\x01 \x01(\t\x12\r\n\x05regex\x18\x02 \x01(\x08\x12\x13\n\x0bignore_case\x18\x03 \x01(\x08"D\n\tWatchList\x12&\n\x08keywords\x18\x01 \x03(\x0b\x32\x14.rpi.command.Keyword\x12\x0f\n\x07ordered\x18\x02 \x01(\x08"*\n\nMatchEvent\x12\r\n\x05watch\x18\x01 \x01(\r\x12\r\n\x05lines\x18\x02 \x03(\t"\xd9\x01\n\x0f\x43ommandResponse\x12\x12\n\nreturncode\x18\x01 \x01(\x05\x12\x0e\n\x06stdout\x18\x02 \x01(\t\x12\x0e\n\x06stderr\x18\x03 \x01(\t\x12\x14\n\x0cstdout_bytes\x18\x04 \x01(\x0c\x12\x14\n\x0cstderr_bytes\x18\x05 \x01(\x0c\x12&\n\x05match\x18\x06 \x01(\x0b\x32\x17.rpi.command.MatchEvent\x12\x0e\n\x06job_id\x18\x07 \x01(\t\x12\x15\n\rdropped_bytes\x18\x08 \x01(\x04\x12\x17\n\x0f\x63oalesced_bytes\x18\t \x01(\x04"\xee\x01\n\x0bStreamEvent\x12\x0b\n\x03seq\x18\x01 \x01(\x04\x12\x0f\n\x07time_us\x18\x02 \x01(\x04\x12&\n\x04\x64\x61ta\x18\x03 \x01(\x0b\x32\x16.rpi.command.DataChunkH\x00\x12(\n\x05match\x18\x04 \x01(\x0b\x32\x17.rpi.command.MatchEventH\x00\x12\x10\n\x06job_id\x18\x05 \x01(\tH\x00\x12+\n\x05usage\x18\x06 \x01(\x0b\x32\x1a.rpi.command.ResourceUsageH\x00\x12\'\n\x04\x65xit\x18\x07 \x01(\x0b\x32\x17.rpi.command.ExitStatusH\x00\x42\x07\n\x05\x65vent";\n\tDataChunk\x12 \n\x03src\x18\x01 \x01(\x0e\x32\x13.rpi.command.Source\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c"_\n\nExitStatus\x12\x12\n\nreturncode\x18\x01 \x01(\x05\x12\r\n\x05\x65rror\x18\x02 \x01(\t\x12\x15\n\rdropped_bytes\x18\x03 \x01(\x04\x12\x17\n\x0f\x63oalesced_bytes\x18\x04 \x01(\x04"X\n\rResourceUsage\x12\x0f\n\x07wall_us\x18\x01 \x01(\x04\x12\x0f\n\x07user_us\x18\x02 \x01(\x04\x12\x11\n\tsystem_us\x18\x03 \x01(\x04\x12\x12\n\nmax_rss_kb\x18\x04 \x01(\x04"e\n\x0c\x42\x61tchRequest\x12-\n\x08\x63ommands\x18\x01 \x03(\x0b\x32\x1b.rpi.command.CommandRequest\x12\x10\n\x08parallel\x18\x02 \x01(\x08\x12\x14\n\x0cmax_parallel\x18\x03 \x01(\r">\n\rBatchResponse\x12-\n\x07results\x18\x01 \x03(\x0b\x32\x1c.rpi.command.CommandResponse"\x90\x01\n\x0eSessionRequest\x12\x12\n\nsession_id\x18\x01 \x01(\t\x12\x0b\n\x03\x63wd\x18\x02 \x01(\t\x12\x31\n\x03\x65nv\x18\x03 \x03(\x0b\x32$.rpi.command.SessionRequest.EnvEntry\x1a*\n\x08\x45nvEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01"5\n\x0fSessionResponse\x12\x12\n\nsession_id\x18\x01 \x01(\t\x12\x0e\n\x06\x63losed\x18\x02 \x01(\x08"?\n\x0b\x46ileRequest\x12\x0c\n\x04path\x18\x01 \x01(\t\x12\x0e\n\x06offset\x18\x02 \x01(\x04\x12\x12\n\nchunk_size\x18\x03 \x01(\r"b\n\tFileChunk\x12\x0c\n\x04path\x18\x01 \x01(\t\x12\x0e\n\x06offset\x18\x02 \x01(\x04\x12\x0c\n\x04\x64\x61ta\x18\x03 \x01(\x0c\x12\r\n\x05\x63rc32\x18\x04 \x01(\r\x12\x0c\n\x04size\x18\x05 \x01(\x04\x12\x0c\n\x04mode\x18\x06 \x01(\r"8\n\nFileStatus\x12\x0c\n\x04path\x18\x01 \x01(\t\x12\x0c\n\x04size\x18\x02 \x01(\x04\x12\x0e\n\x06\x65xists\x18\x03 \x01(\x08"B\n\nJobRequest\x12\x0f\n\x07\x63ommand\x18\x01 \x01(\t\x12\x0e\n\x06job_id\x18\x02 \x01(\t\x12\x13\n\x0bspool_bytes\x18\x03 \x01(\x04"\x9c\x01\n\x07JobInfo\x12\x0e\n\x06job_id\x18\x01 \x01(\t\x12\x0f\n\x07\x63ommand\x18\x02 \x01(\t\x12\x0f\n\x07running\x18\x03 \x01(\x08\x12\x12\n\nreturncode\x18\x04 \x01(\x05\x12\x0c\n\x04size\x18\x05 \x01(\x04\x12\x14\n\x0cstart_offset\x18\x06 \x01(\x04\x12\x12\n\nstarted_ms\x18\x07 \x01(\x04\x12\x13\n\x0b\x66inished_ms\x18\x08 \x01(\x04"S\n\rAttachRequest\x12\x0e\n\x06job_id\x18\x01 \x01(\t\x12\x0e\n\x06offset\x18\x02 \x01(\x04\x12\x0e\n\x06\x66ollow\x18\x03 \x01(\x08\x12\x12\n\nchunk_size\x18\x04 \x01(\r"L\n\x08JobChunk\x12\x0e\n\x06offset\x18\x01 \x01(\x04\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c\x12"\n\x04info\x18\x03 \x01(\x0b\x32\x14.rpi.command.JobInfo"K\n\x0bReadRequest\x12\x0e\n\x06job_id\x18\x01 \x01(\t\x12\x0e\n\x06offset\x18\x02 \x01(\x04\x12\x0e\n\x06length\x18\x03 \x01(\r\x12\x0c\n\x04line\x18\x04 \x01(\x04*.\n\x0b\x43ompression\x12\x08\n\x04NONE\x10\x00\x12\x0b\n\x07\x44\x45\x46LATE\x10\x01\x12\x08\n\x04GZIP\x10\x02*D\n\x0c\x42\x61\x63kpressure\x12\t\n\x05\x42LOCK\x10\x00\x12\x0f\n\x0b\x44ROP_OLDEST\x10\x01\x12\x0c\n\x08\x43OALESCE\x10\x02\x12\n\n\x06SAMPLE\x10\x03* \n\x06Source\x12\n\n\x06STDOUT\x10\x00\x12\n\n\x06STDERR\x10\x01\x32\xd1\x07\n\x07\x43ommand\x12\x46\n\x07\x45xecute\x12\x1b.rpi.command.CommandRequest\x1a\x1c.rpi.command.CommandResponse"\x00\x12N\n\rExecuteStream\x12\x1b.rpi.command.CommandRequest\x1a\x1c.rpi.command.CommandResponse"\x00\x30\x01\x12G\n\x0c\x45xecuteBatch\x12\x19.rpi.command.BatchRequest\x1a\x1a.rpi.command.BatchResponse"\x00\x12J\n\x0bOpenSession\x12\x1b.rpi.command.SessionRequest\x1a\x1c.rpi.command.SessionResponse"\x00\x12K\n\x0c\x43loseSession\x12\x1b.rpi.command.SessionRequest\x1a\x1c.rpi.command.SessionResponse"\x00\x12?\n\x08PushFile\x12\x16.rpi.command.FileChunk\x1a\x17.rpi.command.FileStatus"\x00(\x01\x12@\n\x08PullFile\x12\x18.rpi.command.FileRequest\x1a\x16.rpi.command.FileChunk"\x00\x30\x01\x12?\n\x08StatFile\x12\x18.rpi.command.FileRequest\x1a\x17.rpi.command.FileStatus"\x00\x12;\n\x08StartJob\x12\x17.rpi.command.JobRequest\x1a\x14.rpi.command.JobInfo"\x00\x12\x42\n\tAttachJob\x12\x1a.rpi.command.AttachRequest\x1a\x15.rpi.command.JobChunk"\x00\x30\x01\x12<\n\tJobStatus\x12\x17.rpi.command.JobRequest\x1a\x14.rpi.command.JobInfo"\x00\x12<\n\tCancelJob\x12\x17.rpi.command.JobRequest\x1a\x14.rpi.command.JobInfo"\x00\x12?\n\nReadOutput\x12\x18.rpi.command.ReadRequest\x1a\x15.rpi.command.JobChunk"\x00\x12J\n\rExecuteEvents\x12\x1b.rpi.command.CommandRequest\x1a\x18.rpi.command.StreamEvent"\x00\x30\x01\x42!\n\x0brpi.commandB\nRpiCommandP\x01\xa2\x02\x03HLWb\x06proto3'
 )
 
 _globals = globals()
@@ -24,10 +24,58 @@ if _descriptor._USE_C_DESCRIPTORS == False:
     DESCRIPTOR._serialized_options = (
         b"\n\013rpi.commandB\nRpiCommandP\001\242\002\003HLW"
     )
-    _globals["_COMMANDREQUEST"]._serialized_start = 30
-    _globals["_COMMANDREQUEST"]._serialized_end = 63
-    _globals["_COMMANDRESPONSE"]._serialized_start = 65
-    _globals["_COMMANDRESPONSE"]._serialized_end = 134
-    _globals["_COMMAND"]._serialized_start = 137
-    _globals["_COMMAND"]._serialized_end = 298
+    _SESSIONREQUEST_ENVENTRY._options = None
+    _SESSIONREQUEST_ENVENTRY._serialized_options = b"8\001"
+    _globals["_COMPRESSION"]._serialized_start = 2387
+    _globals["_COMPRESSION"]._serialized_end = 2433
+    _globals["_BACKPRESSURE"]._serialized_start = 2435
+    _globals["_BACKPRESSURE"]._serialized_end = 2503
+    _globals["_SOURCE"]._serialized_start = 2505
+    _globals["_SOURCE"]._serialized_end = 2537
+    _globals["_COMMANDREQUEST"]._serialized_start = 31
+    _globals["_COMMANDREQUEST"]._serialized_end = 442
+    _globals["_KEYWORD"]._serialized_start = 444
+    _globals["_KEYWORD"]._serialized_end = 503
+    _globals["_WATCHLIST"]._serialized_start = 505
+    _globals["_WATCHLIST"]._serialized_end = 573
+    _globals["_MATCHEVENT"]._serialized_start = 575
+    _globals["_MATCHEVENT"]._serialized_end = 617
+    _globals["_COMMANDRESPONSE"]._serialized_start = 620
+    _globals["_COMMANDRESPONSE"]._serialized_end = 837
+    _globals["_STREAMEVENT"]._serialized_start = 840
+    _globals["_STREAMEVENT"]._serialized_end = 1078
+    _globals["_DATACHUNK"]._serialized_start = 1080
+    _globals["_DATACHUNK"]._serialized_end = 1139
+    _globals["_EXITSTATUS"]._serialized_start = 1141
+    _globals["_EXITSTATUS"]._serialized_end = 1236
+    _globals["_RESOURCEUSAGE"]._serialized_start = 1238
+    _globals["_RESOURCEUSAGE"]._serialized_end = 1326
+    _globals["_BATCHREQUEST"]._serialized_start = 1328
+    _globals["_BATCHREQUEST"]._serialized_end = 1429
+    _globals["_BATCHRESPONSE"]._serialized_start = 1431
+    _globals["_BATCHRESPONSE"]._serialized_end = 1493
+    _globals["_SESSIONREQUEST"]._serialized_start = 1496
+    _globals["_SESSIONREQUEST"]._serialized_end = 1640
+    _globals["_SESSIONREQUEST_ENVENTRY"]._serialized_start = 1598
+    _globals["_SESSIONREQUEST_ENVENTRY"]._serialized_end = 1640
+    _globals["_SESSIONRESPONSE"]._serialized_start = 1642
+    _globals["_SESSIONRESPONSE"]._serialized_end = 1695
+    _globals["_FILEREQUEST"]._serialized_start = 1697
+    _globals["_FILEREQUEST"]._serialized_end = 1760
+    _globals["_FILECHUNK"]._serialized_start = 1762
+    _globals["_FILECHUNK"]._serialized_end = 1860
+    _globals["_FILESTATUS"]._serialized_start = 1862
+    _globals["_FILESTATUS"]._serialized_end = 1918
+    _globals["_JOBREQUEST"]._serialized_start = 1920
+    _globals["_JOBREQUEST"]._serialized_end = 1986
+    _globals["_JOBINFO"]._serialized_start = 1989
+    _globals["_JOBINFO"]._serialized_end = 2145
+    _globals["_ATTACHREQUEST"]._serialized_start = 2147
+    _globals["_ATTACHREQUEST"]._serialized_end = 2230
+    _globals["_JOBCHUNK"]._serialized_start = 2232
+    _globals["_JOBCHUNK"]._serialized_end = 2308
+    _globals["_READREQUEST"]._serialized_start = 2310
+    _globals["_READREQUEST"]._serialized_end = 2385
+    _globals["_COMMAND"]._serialized_start = 2540
+    _globals["_COMMAND"]._serialized_end = 3517
 # @@protoc_insertion_point(module_scope)
@@ -4,28 +4,303 @@ isort:skip_file
 """
 
 import builtins
+import collections.abc
 import google.protobuf.descriptor
+import google.protobuf.internal.containers
+import google.protobuf.internal.enum_type_wrapper
 import google.protobuf.message
+import sys
 import typing
 
+if sys.version_info >= (3, 10):
+    import typing as typing_extensions
+else:
+    import typing_extensions
+
 DESCRIPTOR: google.protobuf.descriptor.FileDescriptor
 
+class _Compression:
+    ValueType = typing.NewType("ValueType", builtins.int)
+    V: typing_extensions.TypeAlias = ValueType
+
+class _CompressionEnumTypeWrapper(
+    google.protobuf.internal.enum_type_wrapper._EnumTypeWrapper[_Compression.ValueType],
+    builtins.type,
+):
+    DESCRIPTOR: google.protobuf.descriptor.EnumDescriptor
+    NONE: _Compression.ValueType  # 0
+    DEFLATE: _Compression.ValueType  # 1
+    GZIP: _Compression.ValueType  # 2
+
+class Compression(_Compression, metaclass=_CompressionEnumTypeWrapper):
+    """响应使用的 gRPC 消息压缩，取值与 grpc.Compression 一致"""
+
+NONE: Compression.ValueType  # 0
+DEFLATE: Compression.ValueType  # 1
+GZIP: Compression.ValueType  # 2
+global___Compression = Compression
+
+class _Backpressure:
+    ValueType = typing.NewType("ValueType", builtins.int)
+    V: typing_extensions.TypeAlias = ValueType
+
+class _BackpressureEnumTypeWrapper(
+    google.protobuf.internal.enum_type_wrapper._EnumTypeWrapper[
+        _Backpressure.ValueType
+    ],
+    builtins.type,
+):
+    DESCRIPTOR: google.protobuf.descriptor.EnumDescriptor
+    BLOCK: _Backpressure.ValueType  # 0
+    """等待客户端，子进程随之阻塞在管道上"""
+    DROP_OLDEST: _Backpressure.ValueType  # 1
+    """丢弃最早的缓冲消息"""
+    COALESCE: _Backpressure.ValueType  # 2
+    """每个来源只保留最新的一条消息（进度条等只关心最新状态的输出）"""
+    SAMPLE: _Backpressure.ValueType  # 3
+    """隔一条丢弃缓冲的消息，保留均匀的抽样"""
+
+class Backpressure(_Backpressure, metaclass=_BackpressureEnumTypeWrapper):
+    """缓冲已满（客户端读取缓慢）时如何处理新的输出"""
+
+BLOCK: Backpressure.ValueType  # 0
+"""等待客户端，子进程随之阻塞在管道上"""
+DROP_OLDEST: Backpressure.ValueType  # 1
+"""丢弃最早的缓冲消息"""
+COALESCE: Backpressure.ValueType  # 2
+"""每个来源只保留最新的一条消息（进度条等只关心最新状态的输出）"""
+SAMPLE: Backpressure.ValueType  # 3
+"""隔一条丢弃缓冲的消息，保留均匀的抽样"""
+global___Backpressure = Backpressure
+
+class _Source:
+    ValueType = typing.NewType("ValueType", builtins.int)
+    V: typing_extensions.TypeAlias = ValueType
+
+class _SourceEnumTypeWrapper(
+    google.protobuf.internal.enum_type_wrapper._EnumTypeWrapper[_Source.ValueType],
+    builtins.type,
+):
+    DESCRIPTOR: google.protobuf.descriptor.EnumDescriptor
+    STDOUT: _Source.ValueType  # 0
+    STDERR: _Source.ValueType  # 1
+
+class Source(_Source, metaclass=_SourceEnumTypeWrapper): ...
+
+STDOUT: Source.ValueType  # 0
+STDERR: Source.ValueType  # 1
+global___Source = Source
+
 @typing.final
 class CommandRequest(google.protobuf.message.Message):
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
 
     COMMAND_FIELD_NUMBER: builtins.int
+    CHUNK_SIZE_FIELD_NUMBER: builtins.int
+    FLUSH_INTERVAL_MS_FIELD_NUMBER: builtins.int
+    TIMEOUT_MS_FIELD_NUMBER: builtins.int
+    SESSION_ID_FIELD_NUMBER: builtins.int
+    BINARY_FIELD_NUMBER: builtins.int
+    COMPRESSION_FIELD_NUMBER: builtins.int
+    INCLUDE_FIELD_NUMBER: builtins.int
+    EXCLUDE_FIELD_NUMBER: builtins.int
+    SAMPLE_EVERY_FIELD_NUMBER: builtins.int
+    WATCHES_FIELD_NUMBER: builtins.int
+    STOP_ON_MATCH_FIELD_NUMBER: builtins.int
+    CACHE_TTL_MS_FIELD_NUMBER: builtins.int
+    SPOOL_FIELD_NUMBER: builtins.int
+    BACKPRESSURE_FIELD_NUMBER: builtins.int
+    BUFFER_BYTES_FIELD_NUMBER: builtins.int
     command: builtins.str
     """shell command"""
+    chunk_size: builtins.int
+    """ExecuteStream: >0 时按字节块流式返回，缓冲达到该大小即发送"""
+    flush_interval_ms: builtins.int
+    """ExecuteStream 块模式: 缓冲数据最长滞留时间，0 为默认 20ms"""
+    timeout_ms: builtins.int
+    """Execute/ExecuteBatch: 命令超时，0 为默认 60s"""
+    session_id: builtins.str
+    """Execute/ExecuteBatch: 在 OpenSession 创建的 shell 中执行"""
+    binary: builtins.bool
+    """输出以原始字节放在 stdout_bytes/stderr_bytes 中；ExecuteStream 总是按块返回"""
+    compression: global___Compression.ValueType
+    """Execute/ExecuteStream: 服务端压缩响应消息"""
+    sample_every: builtins.int
+    """通过过滤的行每 N 行发送一行，0 为全部发送"""
+    stop_on_match: builtins.bool
+    """所有 watches 完成后结束命令和流"""
+    cache_ttl_ms: builtins.int
+    """Execute: 复用服务端缓存中不超过该时间的相同命令结果，0 为不缓存；session_id 请求不缓存"""
+    spool: builtins.bool
+    """ExecuteStream: 命令作为后台任务运行，输出先写入 spool 再发送，stderr 并入 stdout"""
+    backpressure: global___Backpressure.ValueType
+    """ExecuteStream 客户端读取缓慢时的处理，见 src/backpressure.py"""
+    buffer_bytes: builtins.int
+    """读取子进程与发送之间的缓冲上限，0 为默认 1 MiB（BLOCK 时 0 为不缓冲）"""
+    @property
+    def include(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[builtins.str]:
+        """ExecuteStream 行模式的服务端过滤，见 src/pushdown.py
+        只发送匹配任一正则的行，空为全部
+        """
+
+    @property
+    def exclude(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[builtins.str]:
+        """不发送匹配任一正则的行"""
+
+    @property
+    def watches(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[
+        global___WatchList
+    ]:
+        """在过滤之前匹配所有行，完成时发送 MatchEvent"""
+
     def __init__(
         self,
         *,
         command: builtins.str = ...,
+        chunk_size: builtins.int = ...,
+        flush_interval_ms: builtins.int = ...,
+        timeout_ms: builtins.int = ...,
+        session_id: builtins.str = ...,
+        binary: builtins.bool = ...,
+        compression: global___Compression.ValueType = ...,
+        include: collections.abc.Iterable[builtins.str] | None = ...,
+        exclude: collections.abc.Iterable[builtins.str] | None = ...,
+        sample_every: builtins.int = ...,
+        watches: collections.abc.Iterable[global___WatchList] | None = ...,
+        stop_on_match: builtins.bool = ...,
+        cache_ttl_ms: builtins.int = ...,
+        spool: builtins.bool = ...,
+        backpressure: global___Backpressure.ValueType = ...,
+        buffer_bytes: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing.Literal[
+            "backpressure",
+            b"backpressure",
+            "binary",
+            b"binary",
+            "buffer_bytes",
+            b"buffer_bytes",
+            "cache_ttl_ms",
+            b"cache_ttl_ms",
+            "chunk_size",
+            b"chunk_size",
+            "command",
+            b"command",
+            "compression",
+            b"compression",
+            "exclude",
+            b"exclude",
+            "flush_interval_ms",
+            b"flush_interval_ms",
+            "include",
+            b"include",
+            "sample_every",
+            b"sample_every",
+            "session_id",
+            b"session_id",
+            "spool",
+            b"spool",
+            "stop_on_match",
+            b"stop_on_match",
+            "timeout_ms",
+            b"timeout_ms",
+            "watches",
+            b"watches",
+        ],
     ) -> None: ...
-    def ClearField(self, field_name: typing.Literal["command", b"command"]) -> None: ...
 
 global___CommandRequest = CommandRequest
 
+@typing.final
+class Keyword(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    TEXT_FIELD_NUMBER: builtins.int
+    REGEX_FIELD_NUMBER: builtins.int
+    IGNORE_CASE_FIELD_NUMBER: builtins.int
+    text: builtins.str
+    """子串，regex 为 true 时为正则"""
+    regex: builtins.bool
+    ignore_case: builtins.bool
+    """正则: re.IGNORECASE"""
+    def __init__(
+        self,
+        *,
+        text: builtins.str = ...,
+        regex: builtins.bool = ...,
+        ignore_case: builtins.bool = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing.Literal[
+            "ignore_case", b"ignore_case", "regex", b"regex", "text", b"text"
+        ],
+    ) -> None: ...
+
+global___Keyword = Keyword
+
+@typing.final
+class WatchList(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    KEYWORDS_FIELD_NUMBER: builtins.int
+    ORDERED_FIELD_NUMBER: builtins.int
+    ordered: builtins.bool
+    """关键词必须按顺序出现在先后的行中"""
+    @property
+    def keywords(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[
+        global___Keyword
+    ]:
+        """全部出现后完成"""
+
+    def __init__(
+        self,
+        *,
+        keywords: collections.abc.Iterable[global___Keyword] | None = ...,
+        ordered: builtins.bool = ...,
+    ) -> None: ...
+    def ClearField(
+        self, field_name: typing.Literal["keywords", b"keywords", "ordered", b"ordered"]
+    ) -> None: ...
+
+global___WatchList = WatchList
+
+@typing.final
+class MatchEvent(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    WATCH_FIELD_NUMBER: builtins.int
+    LINES_FIELD_NUMBER: builtins.int
+    watch: builtins.int
+    """完成的 WatchList 在 request.watches 中的下标"""
+    @property
+    def lines(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[builtins.str]:
+        """每个关键词匹配的行"""
+
+    def __init__(
+        self,
+        *,
+        watch: builtins.int = ...,
+        lines: collections.abc.Iterable[builtins.str] | None = ...,
+    ) -> None: ...
+    def ClearField(
+        self, field_name: typing.Literal["lines", b"lines", "watch", b"watch"]
+    ) -> None: ...
+
+global___MatchEvent = MatchEvent
+
 @typing.final
 class CommandResponse(google.protobuf.message.Message):
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
@@ -33,24 +308,714 @@ class CommandResponse(google.protobuf.message.Message):
     RETURNCODE_FIELD_NUMBER: builtins.int
     STDOUT_FIELD_NUMBER: builtins.int
     STDERR_FIELD_NUMBER: builtins.int
+    STDOUT_BYTES_FIELD_NUMBER: builtins.int
+    STDERR_BYTES_FIELD_NUMBER: builtins.int
+    MATCH_FIELD_NUMBER: builtins.int
+    JOB_ID_FIELD_NUMBER: builtins.int
+    DROPPED_BYTES_FIELD_NUMBER: builtins.int
+    COALESCED_BYTES_FIELD_NUMBER: builtins.int
     returncode: builtins.int
     """shell returncode"""
     stdout: builtins.str
     """标准输出内容"""
     stderr: builtins.str
     """标准错误内容"""
+    stdout_bytes: builtins.bytes
+    """binary 请求: 标准输出原始字节"""
+    stderr_bytes: builtins.bytes
+    """binary 请求: 标准错误原始字节（含服务端错误信息）"""
+    job_id: builtins.str
+    """spool 请求的第一条消息: 可用 ReadOutput / AttachJob 读取输出的任务"""
+    dropped_bytes: builtins.int
+    """带 backpressure/buffer_bytes 的流的结束消息: 丢弃的输出字节数"""
+    coalesced_bytes: builtins.int
+    """同上: 被更新的消息覆盖的输出字节数"""
+    @property
+    def match(self) -> global___MatchEvent:
+        """ExecuteStream: 一个 watch 完成，returncode 为 NOT_EXIT"""
+
     def __init__(
         self,
         *,
         returncode: builtins.int = ...,
         stdout: builtins.str = ...,
         stderr: builtins.str = ...,
+        stdout_bytes: builtins.bytes = ...,
+        stderr_bytes: builtins.bytes = ...,
+        match: global___MatchEvent | None = ...,
+        job_id: builtins.str = ...,
+        dropped_bytes: builtins.int = ...,
+        coalesced_bytes: builtins.int = ...,
     ) -> None: ...
+    def HasField(
+        self, field_name: typing.Literal["match", b"match"]
+    ) -> builtins.bool: ...
     def ClearField(
         self,
         field_name: typing.Literal[
-            "returncode", b"returncode", "stderr", b"stderr", "stdout", b"stdout"
+            "coalesced_bytes",
+            b"coalesced_bytes",
+            "dropped_bytes",
+            b"dropped_bytes",
+            "job_id",
+            b"job_id",
+            "match",
+            b"match",
+            "returncode",
+            b"returncode",
+            "stderr",
+            b"stderr",
+            "stderr_bytes",
+            b"stderr_bytes",
+            "stdout",
+            b"stdout",
+            "stdout_bytes",
+            b"stdout_bytes",
         ],
     ) -> None: ...
 
 global___CommandResponse = CommandResponse
+
+@typing.final
+class StreamEvent(google.protobuf.message.Message):
+    """ExecuteEvents: 与 ExecuteStream 相同的请求与输出，每条消息是一个带序号和服务端时间的事件，
+    不再用 returncode == NOT_EXIT 区分输出与结束。未被取消的流总是以 exit 结束（行模式也是）
+    """
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    SEQ_FIELD_NUMBER: builtins.int
+    TIME_US_FIELD_NUMBER: builtins.int
+    DATA_FIELD_NUMBER: builtins.int
+    MATCH_FIELD_NUMBER: builtins.int
+    JOB_ID_FIELD_NUMBER: builtins.int
+    USAGE_FIELD_NUMBER: builtins.int
+    EXIT_FIELD_NUMBER: builtins.int
+    seq: builtins.int
+    """从 1 开始逐条加 1，客户端据此去重、排序、发现缺失"""
+    time_us: builtins.int
+    """服务端生成该消息的 unix 时间（微秒）"""
+    job_id: builtins.str
+    """spool 请求的第一个事件，见 CommandResponse.job_id"""
+    @property
+    def data(self) -> global___DataChunk: ...
+    @property
+    def match(self) -> global___MatchEvent:
+        """一个 watch 完成"""
+
+    @property
+    def usage(self) -> global___ResourceUsage:
+        """紧接在 exit 之前，子进程的资源占用"""
+
+    @property
+    def exit(self) -> global___ExitStatus:
+        """最后一个事件"""
+
+    def __init__(
+        self,
+        *,
+        seq: builtins.int = ...,
+        time_us: builtins.int = ...,
+        data: global___DataChunk | None = ...,
+        match: global___MatchEvent | None = ...,
+        job_id: builtins.str = ...,
+        usage: global___ResourceUsage | None = ...,
+        exit: global___ExitStatus | None = ...,
+    ) -> None: ...
+    def HasField(
+        self,
+        field_name: typing.Literal[
+            "data",
+            b"data",
+            "event",
+            b"event",
+            "exit",
+            b"exit",
+            "job_id",
+            b"job_id",
+            "match",
+            b"match",
+            "usage",
+            b"usage",
+        ],
+    ) -> builtins.bool: ...
+    def ClearField(
+        self,
+        field_name: typing.Literal[
+            "data",
+            b"data",
+            "event",
+            b"event",
+            "exit",
+            b"exit",
+            "job_id",
+            b"job_id",
+            "match",
+            b"match",
+            "seq",
+            b"seq",
+            "time_us",
+            b"time_us",
+            "usage",
+            b"usage",
+        ],
+    ) -> None: ...
+    def WhichOneof(
+        self, oneof_group: typing.Literal["event", b"event"]
+    ) -> typing.Literal["data", "match", "job_id", "usage", "exit"] | None: ...
+
+global___StreamEvent = StreamEvent
+
+@typing.final
+class DataChunk(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    SRC_FIELD_NUMBER: builtins.int
+    DATA_FIELD_NUMBER: builtins.int
+    src: global___Source.ValueType
+    data: builtins.bytes
+    """一行或一块输出，子进程写出的原始字节（非 binary 请求也不解码）"""
+    def __init__(
+        self,
+        *,
+        src: global___Source.ValueType = ...,
+        data: builtins.bytes = ...,
+    ) -> None: ...
+    def ClearField(
+        self, field_name: typing.Literal["data", b"data", "src", b"src"]
+    ) -> None: ...
+
+global___DataChunk = DataChunk
+
+@typing.final
+class ExitStatus(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    RETURNCODE_FIELD_NUMBER: builtins.int
+    ERROR_FIELD_NUMBER: builtins.int
+    DROPPED_BYTES_FIELD_NUMBER: builtins.int
+    COALESCED_BYTES_FIELD_NUMBER: builtins.int
+    returncode: builtins.int
+    """-1: 命令未能执行或超时，见 error"""
+    error: builtins.str
+    """服务端错误信息"""
+    dropped_bytes: builtins.int
+    """见 CommandResponse.dropped_bytes"""
+    coalesced_bytes: builtins.int
+    def __init__(
+        self,
+        *,
+        returncode: builtins.int = ...,
+        error: builtins.str = ...,
+        dropped_bytes: builtins.int = ...,
+        coalesced_bytes: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing.Literal[
+            "coalesced_bytes",
+            b"coalesced_bytes",
+            "dropped_bytes",
+            b"dropped_bytes",
+            "error",
+            b"error",
+            "returncode",
+            b"returncode",
+        ],
+    ) -> None: ...
+
+global___ExitStatus = ExitStatus
+
+@typing.final
+class ResourceUsage(google.protobuf.message.Message):
+    """grpc.aio 服务端（--aio）的非 spool 流只报告 wall_us：子进程由 asyncio 的
+    child watcher 回收，拿不到 rusage，CPU 与内存字段为 0。spool 请求的任务在
+    线程中等待退出，两种服务端都报告完整的资源占用
+    """
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    WALL_US_FIELD_NUMBER: builtins.int
+    USER_US_FIELD_NUMBER: builtins.int
+    SYSTEM_US_FIELD_NUMBER: builtins.int
+    MAX_RSS_KB_FIELD_NUMBER: builtins.int
+    wall_us: builtins.int
+    """启动到退出"""
+    user_us: builtins.int
+    """用户态 CPU 时间，含已退出的子孙进程；无法获得时为 0"""
+    system_us: builtins.int
+    """内核态 CPU 时间，同上"""
+    max_rss_kb: builtins.int
+    """最大常驻内存，同上"""
+    def __init__(
+        self,
+        *,
+        wall_us: builtins.int = ...,
+        user_us: builtins.int = ...,
+        system_us: builtins.int = ...,
+        max_rss_kb: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing.Literal[
+            "max_rss_kb",
+            b"max_rss_kb",
+            "system_us",
+            b"system_us",
+            "user_us",
+            b"user_us",
+            "wall_us",
+            b"wall_us",
+        ],
+    ) -> None: ...
+
+global___ResourceUsage = ResourceUsage
+
+@typing.final
+class BatchRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    COMMANDS_FIELD_NUMBER: builtins.int
+    PARALLEL_FIELD_NUMBER: builtins.int
+    MAX_PARALLEL_FIELD_NUMBER: builtins.int
+    parallel: builtins.bool
+    """true: 并行执行"""
+    max_parallel: builtins.int
+    """并行执行时的最大并发数，0 为默认 8"""
+    @property
+    def commands(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[
+        global___CommandRequest
+    ]:
+        """按顺序执行或并行执行的命令"""
+
+    def __init__(
+        self,
+        *,
+        commands: collections.abc.Iterable[global___CommandRequest] | None = ...,
+        parallel: builtins.bool = ...,
+        max_parallel: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing.Literal[
+            "commands",
+            b"commands",
+            "max_parallel",
+            b"max_parallel",
+            "parallel",
+            b"parallel",
+        ],
+    ) -> None: ...
+
+global___BatchRequest = BatchRequest
+
+@typing.final
+class BatchResponse(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    RESULTS_FIELD_NUMBER: builtins.int
+    @property
+    def results(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[
+        global___CommandResponse
+    ]:
+        """与 commands 一一对应"""
+
+    def __init__(
+        self,
+        *,
+        results: collections.abc.Iterable[global___CommandResponse] | None = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["results", b"results"]) -> None: ...
+
+global___BatchResponse = BatchResponse
+
+@typing.final
+class SessionRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    @typing.final
+    class EnvEntry(google.protobuf.message.Message):
+        DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+        KEY_FIELD_NUMBER: builtins.int
+        VALUE_FIELD_NUMBER: builtins.int
+        key: builtins.str
+        value: builtins.str
+        def __init__(
+            self,
+            *,
+            key: builtins.str = ...,
+            value: builtins.str = ...,
+        ) -> None: ...
+        def ClearField(
+            self, field_name: typing.Literal["key", b"key", "value", b"value"]
+        ) -> None: ...
+
+    SESSION_ID_FIELD_NUMBER: builtins.int
+    CWD_FIELD_NUMBER: builtins.int
+    ENV_FIELD_NUMBER: builtins.int
+    session_id: builtins.str
+    """CloseSession: 要关闭的会话"""
+    cwd: builtins.str
+    """OpenSession: 初始工作目录，空为服务端当前目录"""
+    @property
+    def env(
+        self,
+    ) -> google.protobuf.internal.containers.ScalarMap[builtins.str, builtins.str]:
+        """OpenSession: 额外的环境变量"""
+
+    def __init__(
+        self,
+        *,
+        session_id: builtins.str = ...,
+        cwd: builtins.str = ...,
+        env: collections.abc.Mapping[builtins.str, builtins.str] | None = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing.Literal[
+            "cwd", b"cwd", "env", b"env", "session_id", b"session_id"
+        ],
+    ) -> None: ...
+
+global___SessionRequest = SessionRequest
+
+@typing.final
+class SessionResponse(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    SESSION_ID_FIELD_NUMBER: builtins.int
+    CLOSED_FIELD_NUMBER: builtins.int
+    session_id: builtins.str
+    """OpenSession: 新会话 ID"""
+    closed: builtins.bool
+    """CloseSession: 会话存在并已关闭"""
+    def __init__(
+        self,
+        *,
+        session_id: builtins.str = ...,
+        closed: builtins.bool = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing.Literal["closed", b"closed", "session_id", b"session_id"],
+    ) -> None: ...
+
+global___SessionResponse = SessionResponse
+
+@typing.final
+class FileRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    PATH_FIELD_NUMBER: builtins.int
+    OFFSET_FIELD_NUMBER: builtins.int
+    CHUNK_SIZE_FIELD_NUMBER: builtins.int
+    path: builtins.str
+    """服务端文件路径"""
+    offset: builtins.int
+    """PullFile: 从该位置开始传输（断点续传）"""
+    chunk_size: builtins.int
+    """PullFile: 每块字节数，0 为默认 1 MiB"""
+    def __init__(
+        self,
+        *,
+        path: builtins.str = ...,
+        offset: builtins.int = ...,
+        chunk_size: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing.Literal[
+            "chunk_size", b"chunk_size", "offset", b"offset", "path", b"path"
+        ],
+    ) -> None: ...
+
+global___FileRequest = FileRequest
+
+@typing.final
+class FileChunk(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    PATH_FIELD_NUMBER: builtins.int
+    OFFSET_FIELD_NUMBER: builtins.int
+    DATA_FIELD_NUMBER: builtins.int
+    CRC32_FIELD_NUMBER: builtins.int
+    SIZE_FIELD_NUMBER: builtins.int
+    MODE_FIELD_NUMBER: builtins.int
+    path: builtins.str
+    """PushFile: 第一块携带目标路径"""
+    offset: builtins.int
+    """data 在文件中的位置；PushFile 第一块的 offset 为续传位置"""
+    data: builtins.bytes
+    """文件内容"""
+    crc32: builtins.int
+    """data 的 zlib.crc32，接收方校验"""
+    size: builtins.int
+    """第一块: 文件总大小"""
+    mode: builtins.int
+    """PushFile 第一块: 文件权限，0 为不修改"""
+    def __init__(
+        self,
+        *,
+        path: builtins.str = ...,
+        offset: builtins.int = ...,
+        data: builtins.bytes = ...,
+        crc32: builtins.int = ...,
+        size: builtins.int = ...,
+        mode: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing.Literal[
+            "crc32",
+            b"crc32",
+            "data",
+            b"data",
+            "mode",
+            b"mode",
+            "offset",
+            b"offset",
+            "path",
+            b"path",
+            "size",
+            b"size",
+        ],
+    ) -> None: ...
+
+global___FileChunk = FileChunk
+
+@typing.final
+class FileStatus(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    PATH_FIELD_NUMBER: builtins.int
+    SIZE_FIELD_NUMBER: builtins.int
+    EXISTS_FIELD_NUMBER: builtins.int
+    path: builtins.str
+    """文件路径"""
+    size: builtins.int
+    """文件大小"""
+    exists: builtins.bool
+    """StatFile: 文件是否存在"""
+    def __init__(
+        self,
+        *,
+        path: builtins.str = ...,
+        size: builtins.int = ...,
+        exists: builtins.bool = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing.Literal[
+            "exists", b"exists", "path", b"path", "size", b"size"
+        ],
+    ) -> None: ...
+
+global___FileStatus = FileStatus
+
+@typing.final
+class JobRequest(google.protobuf.message.Message):
+    """后台任务：在服务端运行，与客户端的连接无关，见 src/jobs.py"""
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    COMMAND_FIELD_NUMBER: builtins.int
+    JOB_ID_FIELD_NUMBER: builtins.int
+    SPOOL_BYTES_FIELD_NUMBER: builtins.int
+    command: builtins.str
+    """StartJob: shell command，stdout 与 stderr 合并写入 spool"""
+    job_id: builtins.str
+    """JobStatus / CancelJob"""
+    spool_bytes: builtins.int
+    """StartJob: 磁盘上最多保留的输出字节数，0 为服务端默认 64 MiB"""
+    def __init__(
+        self,
+        *,
+        command: builtins.str = ...,
+        job_id: builtins.str = ...,
+        spool_bytes: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing.Literal[
+            "command", b"command", "job_id", b"job_id", "spool_bytes", b"spool_bytes"
+        ],
+    ) -> None: ...
+
+global___JobRequest = JobRequest
+
+@typing.final
+class JobInfo(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    JOB_ID_FIELD_NUMBER: builtins.int
+    COMMAND_FIELD_NUMBER: builtins.int
+    RUNNING_FIELD_NUMBER: builtins.int
+    RETURNCODE_FIELD_NUMBER: builtins.int
+    SIZE_FIELD_NUMBER: builtins.int
+    START_OFFSET_FIELD_NUMBER: builtins.int
+    STARTED_MS_FIELD_NUMBER: builtins.int
+    FINISHED_MS_FIELD_NUMBER: builtins.int
+    job_id: builtins.str
+    command: builtins.str
+    running: builtins.bool
+    returncode: builtins.int
+    """running 为 false 时有效"""
+    size: builtins.int
+    """已输出的总字节数"""
+    start_offset: builtins.int
+    """spool 中仍保留的最早 offset，更早的输出已被丢弃"""
+    started_ms: builtins.int
+    """unix 时间（毫秒）"""
+    finished_ms: builtins.int
+    """unix 时间（毫秒），运行中为 0"""
+    def __init__(
+        self,
+        *,
+        job_id: builtins.str = ...,
+        command: builtins.str = ...,
+        running: builtins.bool = ...,
+        returncode: builtins.int = ...,
+        size: builtins.int = ...,
+        start_offset: builtins.int = ...,
+        started_ms: builtins.int = ...,
+        finished_ms: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing.Literal[
+            "command",
+            b"command",
+            "finished_ms",
+            b"finished_ms",
+            "job_id",
+            b"job_id",
+            "returncode",
+            b"returncode",
+            "running",
+            b"running",
+            "size",
+            b"size",
+            "start_offset",
+            b"start_offset",
+            "started_ms",
+            b"started_ms",
+        ],
+    ) -> None: ...
+
+global___JobInfo = JobInfo
+
+@typing.final
+class AttachRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    JOB_ID_FIELD_NUMBER: builtins.int
+    OFFSET_FIELD_NUMBER: builtins.int
+    FOLLOW_FIELD_NUMBER: builtins.int
+    CHUNK_SIZE_FIELD_NUMBER: builtins.int
+    job_id: builtins.str
+    offset: builtins.int
+    """从该位置开始读取输出，早于 start_offset 时从 start_offset 开始"""
+    follow: builtins.bool
+    """true: 读到末尾后等待新输出，直到任务结束"""
+    chunk_size: builtins.int
+    """每块最多字节数，0 为默认 64 KiB"""
+    def __init__(
+        self,
+        *,
+        job_id: builtins.str = ...,
+        offset: builtins.int = ...,
+        follow: builtins.bool = ...,
+        chunk_size: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing.Literal[
+            "chunk_size",
+            b"chunk_size",
+            "follow",
+            b"follow",
+            "job_id",
+            b"job_id",
+            "offset",
+            b"offset",
+        ],
+    ) -> None: ...
+
+global___AttachRequest = AttachRequest
+
+@typing.final
+class JobChunk(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    OFFSET_FIELD_NUMBER: builtins.int
+    DATA_FIELD_NUMBER: builtins.int
+    INFO_FIELD_NUMBER: builtins.int
+    offset: builtins.int
+    """data 在任务输出中的位置"""
+    data: builtins.bytes
+    @property
+    def info(self) -> global___JobInfo:
+        """最后一条消息: 任务状态，data 为空"""
+
+    def __init__(
+        self,
+        *,
+        offset: builtins.int = ...,
+        data: builtins.bytes = ...,
+        info: global___JobInfo | None = ...,
+    ) -> None: ...
+    def HasField(
+        self, field_name: typing.Literal["info", b"info"]
+    ) -> builtins.bool: ...
+    def ClearField(
+        self,
+        field_name: typing.Literal[
+            "data", b"data", "info", b"info", "offset", b"offset"
+        ],
+    ) -> None: ...
+
+global___JobChunk = JobChunk
+
+@typing.final
+class ReadRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    JOB_ID_FIELD_NUMBER: builtins.int
+    OFFSET_FIELD_NUMBER: builtins.int
+    LENGTH_FIELD_NUMBER: builtins.int
+    LINE_FIELD_NUMBER: builtins.int
+    job_id: builtins.str
+    offset: builtins.int
+    """早于 start_offset 时从 start_offset 开始"""
+    length: builtins.int
+    """最多读取的字节数，0 为默认 64 KiB，最大 3 MiB"""
+    line: builtins.int
+    """>0: 忽略 offset，从第 line 行（从 1 开始）的开头读取"""
+    def __init__(
+        self,
+        *,
+        job_id: builtins.str = ...,
+        offset: builtins.int = ...,
+        length: builtins.int = ...,
+        line: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing.Literal[
+            "job_id",
+            b"job_id",
+            "length",
+            b"length",
+            "line",
+            b"line",
+            "offset",
+            b"offset",
+        ],
+    ) -> None: ...
+
+global___ReadRequest = ReadRequest
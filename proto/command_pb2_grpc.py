@@ -25,6 +25,66 @@ class CommandStub(object):
             request_serializer=command__pb2.CommandRequest.SerializeToString,
             response_deserializer=command__pb2.CommandResponse.FromString,
         )
+        self.ExecuteBatch = channel.unary_unary(
+            "/rpi.command.Command/ExecuteBatch",
+            request_serializer=command__pb2.BatchRequest.SerializeToString,
+            response_deserializer=command__pb2.BatchResponse.FromString,
+        )
+        self.OpenSession = channel.unary_unary(
+            "/rpi.command.Command/OpenSession",
+            request_serializer=command__pb2.SessionRequest.SerializeToString,
+            response_deserializer=command__pb2.SessionResponse.FromString,
+        )
+        self.CloseSession = channel.unary_unary(
+            "/rpi.command.Command/CloseSession",
+            request_serializer=command__pb2.SessionRequest.SerializeToString,
+            response_deserializer=command__pb2.SessionResponse.FromString,
+        )
+        self.PushFile = channel.stream_unary(
+            "/rpi.command.Command/PushFile",
+            request_serializer=command__pb2.FileChunk.SerializeToString,
+            response_deserializer=command__pb2.FileStatus.FromString,
+        )
+        self.PullFile = channel.unary_stream(
+            "/rpi.command.Command/PullFile",
+            request_serializer=command__pb2.FileRequest.SerializeToString,
+            response_deserializer=command__pb2.FileChunk.FromString,
+        )
+        self.StatFile = channel.unary_unary(
+            "/rpi.command.Command/StatFile",
+            request_serializer=command__pb2.FileRequest.SerializeToString,
+            response_deserializer=command__pb2.FileStatus.FromString,
+        )
+        self.StartJob = channel.unary_unary(
+            "/rpi.command.Command/StartJob",
+            request_serializer=command__pb2.JobRequest.SerializeToString,
+            response_deserializer=command__pb2.JobInfo.FromString,
+        )
+        self.AttachJob = channel.unary_stream(
+            "/rpi.command.Command/AttachJob",
+            request_serializer=command__pb2.AttachRequest.SerializeToString,
+            response_deserializer=command__pb2.JobChunk.FromString,
+        )
+        self.JobStatus = channel.unary_unary(
+            "/rpi.command.Command/JobStatus",
+            request_serializer=command__pb2.JobRequest.SerializeToString,
+            response_deserializer=command__pb2.JobInfo.FromString,
+        )
+        self.CancelJob = channel.unary_unary(
+            "/rpi.command.Command/CancelJob",
+            request_serializer=command__pb2.JobRequest.SerializeToString,
+            response_deserializer=command__pb2.JobInfo.FromString,
+        )
+        self.ReadOutput = channel.unary_unary(
+            "/rpi.command.Command/ReadOutput",
+            request_serializer=command__pb2.ReadRequest.SerializeToString,
+            response_deserializer=command__pb2.JobChunk.FromString,
+        )
+        self.ExecuteEvents = channel.unary_stream(
+            "/rpi.command.Command/ExecuteEvents",
+            request_serializer=command__pb2.CommandRequest.SerializeToString,
+            response_deserializer=command__pb2.StreamEvent.FromString,
+        )
 
 
 class CommandServicer(object):
@@ -42,6 +102,78 @@ class CommandServicer(object):
         context.set_details("Method not implemented!")
         raise NotImplementedError("Method not implemented!")
 
+    def ExecuteBatch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def OpenSession(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def CloseSession(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def PushFile(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def PullFile(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def StatFile(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def StartJob(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def AttachJob(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def JobStatus(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def CancelJob(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def ReadOutput(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def ExecuteEvents(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
 
 def add_CommandServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -55,6 +187,66 @@ def add_CommandServicer_to_server(servicer, server):
             request_deserializer=command__pb2.CommandRequest.FromString,
             response_serializer=command__pb2.CommandResponse.SerializeToString,
         ),
+        "ExecuteBatch": grpc.unary_unary_rpc_method_handler(
+            servicer.ExecuteBatch,
+            request_deserializer=command__pb2.BatchRequest.FromString,
+            response_serializer=command__pb2.BatchResponse.SerializeToString,
+        ),
+        "OpenSession": grpc.unary_unary_rpc_method_handler(
+            servicer.OpenSession,
+            request_deserializer=command__pb2.SessionRequest.FromString,
+            response_serializer=command__pb2.SessionResponse.SerializeToString,
+        ),
+        "CloseSession": grpc.unary_unary_rpc_method_handler(
+            servicer.CloseSession,
+            request_deserializer=command__pb2.SessionRequest.FromString,
+            response_serializer=command__pb2.SessionResponse.SerializeToString,
+        ),
+        "PushFile": grpc.stream_unary_rpc_method_handler(
+            servicer.PushFile,
+            request_deserializer=command__pb2.FileChunk.FromString,
+            response_serializer=command__pb2.FileStatus.SerializeToString,
+        ),
+        "PullFile": grpc.unary_stream_rpc_method_handler(
+            servicer.PullFile,
+            request_deserializer=command__pb2.FileRequest.FromString,
+            response_serializer=command__pb2.FileChunk.SerializeToString,
+        ),
+        "StatFile": grpc.unary_unary_rpc_method_handler(
+            servicer.StatFile,
+            request_deserializer=command__pb2.FileRequest.FromString,
+            response_serializer=command__pb2.FileStatus.SerializeToString,
+        ),
+        "StartJob": grpc.unary_unary_rpc_method_handler(
+            servicer.StartJob,
+            request_deserializer=command__pb2.JobRequest.FromString,
+            response_serializer=command__pb2.JobInfo.SerializeToString,
+        ),
+        "AttachJob": grpc.unary_stream_rpc_method_handler(
+            servicer.AttachJob,
+            request_deserializer=command__pb2.AttachRequest.FromString,
+            response_serializer=command__pb2.JobChunk.SerializeToString,
+        ),
+        "JobStatus": grpc.unary_unary_rpc_method_handler(
+            servicer.JobStatus,
+            request_deserializer=command__pb2.JobRequest.FromString,
+            response_serializer=command__pb2.JobInfo.SerializeToString,
+        ),
+        "CancelJob": grpc.unary_unary_rpc_method_handler(
+            servicer.CancelJob,
+            request_deserializer=command__pb2.JobRequest.FromString,
+            response_serializer=command__pb2.JobInfo.SerializeToString,
+        ),
+        "ReadOutput": grpc.unary_unary_rpc_method_handler(
+            servicer.ReadOutput,
+            request_deserializer=command__pb2.ReadRequest.FromString,
+            response_serializer=command__pb2.JobChunk.SerializeToString,
+        ),
+        "ExecuteEvents": grpc.unary_stream_rpc_method_handler(
+            servicer.ExecuteEvents,
+            request_deserializer=command__pb2.CommandRequest.FromString,
+            response_serializer=command__pb2.StreamEvent.SerializeToString,
+        ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
         "rpi.command.Command", rpc_method_handlers
@@ -123,3 +315,351 @@ class Command(object):
             timeout,
             metadata,
         )
+
+    @staticmethod
+    def ExecuteBatch(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/rpi.command.Command/ExecuteBatch",
+            command__pb2.BatchRequest.SerializeToString,
+            command__pb2.BatchResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
+
+    @staticmethod
+    def OpenSession(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/rpi.command.Command/OpenSession",
+            command__pb2.SessionRequest.SerializeToString,
+            command__pb2.SessionResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
+
+    @staticmethod
+    def CloseSession(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/rpi.command.Command/CloseSession",
+            command__pb2.SessionRequest.SerializeToString,
+            command__pb2.SessionResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
+
+    @staticmethod
+    def PushFile(
+        request_iterator,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            "/rpi.command.Command/PushFile",
+            command__pb2.FileChunk.SerializeToString,
+            command__pb2.FileStatus.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
+
+    @staticmethod
+    def PullFile(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            "/rpi.command.Command/PullFile",
+            command__pb2.FileRequest.SerializeToString,
+            command__pb2.FileChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
+
+    @staticmethod
+    def StatFile(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/rpi.command.Command/StatFile",
+            command__pb2.FileRequest.SerializeToString,
+            command__pb2.FileStatus.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
+
+    @staticmethod
+    def StartJob(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/rpi.command.Command/StartJob",
+            command__pb2.JobRequest.SerializeToString,
+            command__pb2.JobInfo.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
+
+    @staticmethod
+    def AttachJob(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            "/rpi.command.Command/AttachJob",
+            command__pb2.AttachRequest.SerializeToString,
+            command__pb2.JobChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
+
+    @staticmethod
+    def JobStatus(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/rpi.command.Command/JobStatus",
+            command__pb2.JobRequest.SerializeToString,
+            command__pb2.JobInfo.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
+
+    @staticmethod
+    def CancelJob(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/rpi.command.Command/CancelJob",
+            command__pb2.JobRequest.SerializeToString,
+            command__pb2.JobInfo.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
+
+    @staticmethod
+    def ReadOutput(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/rpi.command.Command/ReadOutput",
+            command__pb2.ReadRequest.SerializeToString,
+            command__pb2.JobChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
+
+    @staticmethod
+    def ExecuteEvents(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            "/rpi.command.Command/ExecuteEvents",
+            command__pb2.CommandRequest.SerializeToString,
+            command__pb2.StreamEvent.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
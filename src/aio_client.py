@@ -0,0 +1,263 @@
+import asyncio
+import time
+import weakref
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
+
+import grpc
+from loguru import logger
+
+from proto import command_pb2, command_pb2_grpc
+from src.fanout import (
+    DEFAULT_FANOUT_PARALLEL,
+    DEFAULT_HOST_TIMEOUT,
+    HostResult,
+    error_result,
+    fanout_request,
+)
+from src.client import NOT_EXIT, batch_request, policy_value, response_output
+from src.pool import KEEPALIVE_OPTIONS
+from src.pushdown import StreamFilter
+
+# grpc.aio channel 绑定创建它的事件循环，所以按事件循环分别缓存
+_channels: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _channel(addr_port: str) -> grpc.aio.Channel:
+    channels: Dict[str, grpc.aio.Channel] = _channels.setdefault(
+        asyncio.get_running_loop(), {}
+    )
+    channel = channels.get(addr_port)
+    if channel is None:
+        channel = grpc.aio.insecure_channel(addr_port, options=KEEPALIVE_OPTIONS)
+        channels[addr_port] = channel
+    return channel
+
+
+def _stub(addr_port: str) -> command_pb2_grpc.CommandStub:
+    return command_pb2_grpc.CommandStub(_channel(addr_port))
+
+
+async def aclose():
+    """close the channels cached for the running event loop"""
+    channels = _channels.pop(asyncio.get_running_loop(), {})
+    for channel in channels.values():
+        await channel.close()
+
+
+async def arpc(
+    command: str,
+    addr_port: str = "localhost:50051",
+    timeout: Optional[float] = None,
+    binary: bool = False,
+    compression: grpc.Compression = grpc.Compression.NoCompression,
+    cache_ttl_ms: int = 0,
+) -> tuple[int, str, str]:
+    """
+    asyncio version of rpc()
+    :param command: bash command. notice that shell's builtin command is not supported
+    :param addr_port: eg. "192.168.1.1:50051"
+    :param binary: return stdout/stderr as raw bytes instead of text
+    :param compression: grpc.Compression.Gzip/Deflate to compress the response
+    :param cache_ttl_ms: accept the server's cached result if at most this old
+    :return: tuple[returncode: int, stdout: str, stderr: str], bytes if binary
+    """
+    response = await _stub(addr_port).Execute(
+        command_pb2.CommandRequest(
+            command=command,
+            binary=binary,
+            compression=compression,
+            cache_ttl_ms=cache_ttl_ms,
+        ),
+        timeout=timeout,
+    )
+    return response_output(response, binary)
+
+
+async def arpc_batch(
+    commands: Sequence[Union[str, Tuple[str, float]]],
+    addr_port: str = "localhost:50051",
+    parallel: bool = False,
+    max_parallel: int = 0,
+) -> List[tuple[int, str, str]]:
+    """
+    asyncio version of rpc_batch()
+    :return: list of tuple[returncode: int, stdout: str, stderr: str], in order
+    """
+    response = await _stub(addr_port).ExecuteBatch(
+        batch_request(commands, parallel, max_parallel)
+    )
+    return [(r.returncode, r.stdout, r.stderr) for r in response.results]
+
+
+async def arpc_fanout(
+    command: str,
+    addr_ports: Sequence[str],
+    max_parallel: int = DEFAULT_FANOUT_PARALLEL,
+    timeout: float = DEFAULT_HOST_TIMEOUT,
+) -> AsyncIterator[HostResult]:
+    """
+    asyncio version of rpc_fanout(): yields HostResult in completion order
+    """
+    limit = asyncio.Semaphore(max_parallel)
+
+    async def execute_on(addr_port: str) -> HostResult:
+        async with limit:
+            start = time.perf_counter()
+            try:
+                response = await _stub(addr_port).Execute(
+                    fanout_request(command, timeout), timeout=timeout + 1
+                )
+            except grpc.RpcError as e:
+                return error_result(addr_port, e, time.perf_counter() - start)
+            return HostResult(
+                addr_port,
+                response.returncode,
+                response.stdout,
+                response.stderr,
+                time.perf_counter() - start,
+            )
+
+    tasks = [asyncio.ensure_future(execute_on(a)) for a in addr_ports]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class AsyncRpcStream:
+    """
+    output of a streaming command as an async iterator of text chunks
+    (bytes chunks for binary streams).
+
+    stdout and stderr chunks are yielded in arrival order, like the messages
+    PipedRpcStreamProcess puts on its queue. returncode is set once the
+    stream ended with a final status message (chunk mode), else stays None.
+    watches of a StreamFilter that completed are appended to matches as
+    (watch index, matched lines). dropped_bytes and coalesced_bytes are the
+    output the server did not deliver because of the backpressure policy.
+    """
+
+    def __init__(self, call, binary: bool = False):
+        self.call = call
+        self.binary = binary
+        self.returncode: Optional[int] = None
+        self.matches: List[Tuple[int, List[str]]] = []
+        self.dropped_bytes = 0
+        self.coalesced_bytes = 0
+
+    def __aiter__(self) -> AsyncIterator[Union[str, bytes]]:
+        return self._iter()
+
+    async def _iter(self) -> AsyncIterator[Union[str, bytes]]:
+        async for response in self.call:
+            if response.HasField("match"):
+                self.matches.append((response.match.watch, list(response.match.lines)))
+                continue
+            returncode, stdout, stderr = response_output(response, self.binary)
+            if stdout:
+                yield stdout
+            if stderr:
+                yield stderr
+            if returncode != NOT_EXIT:
+                self.returncode = returncode
+                self.dropped_bytes = response.dropped_bytes
+                self.coalesced_bytes = response.coalesced_bytes
+
+    def cancel(self) -> bool:
+        """cancel the rpc, the server terminates the command"""
+        return self.call.cancel()
+
+
+def arpc_stream(
+    command: str,
+    addr_port: str = "localhost:50051",
+    chunk_size: int = 0,
+    flush_interval_ms: int = 0,
+    binary: bool = False,
+    compression: grpc.Compression = grpc.Compression.NoCompression,
+    stream_filter: Optional[StreamFilter] = None,
+    backpressure: str = "block",
+    buffer_bytes: int = 0,
+) -> AsyncRpcStream:
+    """
+    asyncio version of rpc_bg(): no process is forked, iterate the result
+    :param command: bash command. notice that shell's builtin command is not supported
+    :param addr_port: eg. "192.168.1.1:50051"
+    :param chunk_size: >0 to receive output in byte chunks instead of lines
+    :param flush_interval_ms: max latency of a partially filled chunk, 0 for 20ms
+    :param binary: receive raw bytes chunks (64 KiB if chunk_size is 0)
+    :param compression: grpc.Compression.Gzip/Deflate to compress the stream
+    :param stream_filter: filter and watch the lines on the server (line mode)
+    :param backpressure: see rpc_bg()
+    :param buffer_bytes: see rpc_bg()
+    :return: AsyncRpcStream
+    """
+    call = _stub(addr_port).ExecuteStream(
+        command_pb2.CommandRequest(
+            command=command,
+            chunk_size=chunk_size,
+            flush_interval_ms=flush_interval_ms,
+            binary=binary,
+            compression=compression,
+            backpressure=policy_value(backpressure),
+            buffer_bytes=buffer_bytes,
+            **(stream_filter.request_fields() if stream_filter else {}),
+        )
+    )
+    return AsyncRpcStream(call, binary)
+
+
+def arpc_events(
+    command: str,
+    addr_port: str = "localhost:50051",
+    chunk_size: int = 0,
+    flush_interval_ms: int = 0,
+    binary: bool = False,
+    compression: grpc.Compression = grpc.Compression.NoCompression,
+    stream_filter: Optional[StreamFilter] = None,
+    backpressure: str = "block",
+    buffer_bytes: int = 0,
+):
+    """
+    asyncio version of rpc_events()
+    :return: the grpc.aio call, an async iterator of StreamEvent; cancel()
+        ends the command
+    """
+    return _stub(addr_port).ExecuteEvents(
+        command_pb2.CommandRequest(
+            command=command,
+            chunk_size=chunk_size,
+            flush_interval_ms=flush_interval_ms,
+            binary=binary,
+            compression=compression,
+            backpressure=policy_value(backpressure),
+            buffer_bytes=buffer_bytes,
+            **(stream_filter.request_fields() if stream_filter else {}),
+        )
+    )
+
+
+async def arpc_echo_test(addr_port: str, timeout: float = 10) -> bool:
+    """
+    asyncio version of rpc_echo_test()
+    :param addr_port: 服务器地址（如 "localhost:50051"）
+    :param timeout: 超时时间（秒）
+    :return: True 或 False 如果连接失败
+    """
+    try:
+        await asyncio.wait_for(_channel(addr_port).channel_ready(), timeout)
+    except asyncio.TimeoutError:
+        logger.info(f"gRPC 服务器连接超时（{timeout}秒）")
+        return False
+    try:
+        returncode, stdout, _ = await arpc("echo $USER", addr_port, timeout=2)
+    except grpc.RpcError as e:
+        logger.info(f"gRPC 服务器未响应: {str(e)}")
+        return False
+    if returncode != 0:
+        logger.error(f"rpc returncode: {returncode}")
+        return False
+    logger.info(f"rpc USER: {stdout.strip()}")
+    return True
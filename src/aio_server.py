@@ -0,0 +1,560 @@
+import asyncio
+import functools
+import os
+import signal
+import sys
+import time
+from typing import Dict, Optional
+
+import grpc
+from loguru import logger
+
+from proto import command_pb2, command_pb2_grpc
+from src.impl import (
+    DEFAULT_MAX_PARALLEL,
+    DEFAULT_TIMEOUT,
+    NOT_EXIT,
+    TERMINATE_GRACE,
+    StreamEnd,
+    command_response,
+    command_timeout,
+    run_command,
+    set_compression,
+    shell_args,
+    stream_responses,
+)
+from src.backpressure import (
+    DEFAULT_BUFFER_BYTES,
+    ResponseBuffer,
+    buffered_async,
+    buffered_request,
+)
+from src.cache import ResultCache, cache_key
+from src.events import EventSequence, resource_usage
+from src.jobs import WAIT_INTERVAL, JobError, JobManager, check_attach, read_output
+from src.metrics import ServerMetrics
+from src.pushdown import LineFilter
+from src.scheduler import EXECUTE, STREAM, Scheduler, SchedulerFull
+from src.session import SessionLimitError, SessionManager
+from src.streaming import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_FLUSH_INTERVAL,
+    READ_SIZE,
+    ChunkBuffer,
+    flush_buffers,
+    next_deadline,
+)
+from src.transfer import FileReceiver, TransferError, file_chunks, file_status
+
+# 主进程退出后继续读取管道的最长时间
+EXIT_DRAIN_GRACE = 0.05
+
+
+def install_child_watcher():
+    """
+    python < 3.12 waits for asyncio subprocesses with one thread per child
+    (ThreadedChildWatcher); use a pidfd watcher instead where available.
+    must be called from the running event loop.
+    """
+    if sys.version_info >= (3, 12) or not hasattr(os, "pidfd_open"):
+        return
+    watcher = asyncio.PidfdChildWatcher()
+    watcher.attach_loop(asyncio.get_running_loop())
+    asyncio.set_child_watcher(watcher)
+
+
+async def create_subprocess(command: str) -> asyncio.subprocess.Process:
+    return await asyncio.create_subprocess_exec(
+        *shell_args(command),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+        env=os.environ,
+    )
+
+
+def kill_group(process: asyncio.subprocess.Process, sig=signal.SIGINT):
+    """same policy as impl.terminate_group: SIGINT, then SIGKILL after a grace"""
+    if process.returncode is not None:
+        return
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        return
+    if sig != signal.SIGKILL:
+        asyncio.get_running_loop().call_later(
+            TERMINATE_GRACE, kill_group, process, signal.SIGKILL
+        )
+
+
+async def run_command_async(
+    request,
+    sessions: Optional[SessionManager] = None,
+    scheduler: Optional[Scheduler] = None,
+    metrics: Optional[ServerMetrics] = None,
+) -> command_pb2.CommandResponse:
+    """
+    asyncio version of impl.run_command
+    :raise SchedulerFull: no slot for the command
+    """
+    if request.session_id:
+        # 会话 shell 的读写是阻塞的，放到线程中执行
+        return await asyncio.to_thread(run_command, request, sessions)
+    if scheduler is None:
+        return await _run_command_async(request, metrics)
+    await scheduler.acquire_async(EXECUTE)
+    try:
+        return await _run_command_async(request, metrics)
+    finally:
+        scheduler.release(EXECUTE)
+
+
+async def _run_command_async(
+    request, metrics: Optional[ServerMetrics] = None
+) -> command_pb2.CommandResponse:
+    timeout = command_timeout(request)
+    returncode = -1
+    stdout = b""
+    stderr = b""
+    process = None
+    try:
+        start = time.perf_counter()
+        process = await create_subprocess(request.command)
+        if metrics is not None:
+            metrics.spawned(EXECUTE, time.perf_counter() - start)
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        returncode = process.returncode
+    except asyncio.TimeoutError:
+        process.kill()  # type: ignore
+        if metrics is not None:
+            metrics.timed_out(EXECUTE)
+        stderr = f"Command timed out after {timeout:g} seconds".encode()
+    except asyncio.CancelledError:
+        if process is not None:
+            kill_group(process)
+        raise
+    except Exception as e:
+        stderr = f"Command execution failed: {str(e)}".encode()
+
+    return command_response(request, returncode, stdout, stderr)
+
+
+async def run_batch_command_async(
+    request,
+    sessions: Optional[SessionManager] = None,
+    scheduler: Optional[Scheduler] = None,
+    metrics: Optional[ServerMetrics] = None,
+) -> command_pb2.CommandResponse:
+    """asyncio version of impl.run_batch_command"""
+    try:
+        return await run_command_async(request, sessions, scheduler, metrics)
+    except SchedulerFull as e:
+        return command_response(request, -1, b"", str(e).encode())
+
+
+async def run_cached_async(
+    request,
+    sessions: Optional[SessionManager] = None,
+    cache: Optional[ResultCache] = None,
+    scheduler: Optional[Scheduler] = None,
+    metrics: Optional[ServerMetrics] = None,
+) -> command_pb2.CommandResponse:
+    """asyncio version of impl.run_cached, sharing the cache with threads"""
+    key = cache_key(request) if cache is not None else None
+    if key is None:
+        return await run_command_async(request, sessions, scheduler, metrics)
+    response, future, leader = cache.claim(  # type: ignore
+        key, request.cache_ttl_ms / 1000
+    )
+    if response is not None:
+        return response
+    if not leader:
+        # shield: 取消等待者不能取消其他请求共享的 future
+        response = await asyncio.shield(asyncio.wrap_future(future))  # type: ignore
+        if response is not None:
+            return response
+        return await run_command_async(request, sessions, scheduler, metrics)
+    try:
+        response = await run_command_async(request, sessions, scheduler, metrics)
+    finally:
+        cache.finish(key, future, response)  # type: ignore
+    return response
+
+
+class AsyncCommander(command_pb2_grpc.CommandServicer):
+    """
+    grpc.aio 版本的 Commander：所有命令由同一个事件循环驱动，
+    长时间运行的 ExecuteStream 不再占用线程池中的线程。
+    """
+
+    def __init__(
+        self,
+        sessions: Optional[SessionManager] = None,
+        cache: Optional[ResultCache] = None,
+        scheduler: Optional[Scheduler] = None,
+        metrics: Optional[ServerMetrics] = None,
+        log_lines: bool = False,
+        jobs: Optional[JobManager] = None,
+    ):
+        self.sessions = sessions if sessions is not None else SessionManager()
+        self.cache = cache if cache is not None else ResultCache()
+        self.scheduler = scheduler if scheduler is not None else Scheduler()
+        self.jobs = jobs if jobs is not None else JobManager()
+        if self.jobs.scheduler is None:
+            # StartJob 和 spool 请求的子进程同样受调度器的限制
+            self.jobs.scheduler = self.scheduler
+        self.metrics = metrics if metrics is not None else ServerMetrics()
+        self.metrics.track(self.scheduler, self.cache)
+        self.log_lines = log_lines
+
+    async def Execute(self, request, context):
+        with self.metrics.call("Execute") as call:
+            set_compression(request, context)
+            try:
+                return await run_cached_async(
+                    request, self.sessions, self.cache, self.scheduler, self.metrics
+                )
+            except SchedulerFull as e:
+                call.code = grpc.StatusCode.RESOURCE_EXHAUSTED
+                await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+
+    async def ExecuteBatch(self, request, context):
+        commands = list(request.commands)
+        run = functools.partial(
+            run_batch_command_async,
+            sessions=self.sessions,
+            scheduler=self.scheduler,
+            metrics=self.metrics,
+        )
+        with self.metrics.call("ExecuteBatch"):
+            if not request.parallel:
+                results = [await run(command) for command in commands]
+            else:
+                limit = asyncio.Semaphore(request.max_parallel or DEFAULT_MAX_PARALLEL)
+
+                async def limited(command):
+                    async with limit:
+                        return await run(command)
+
+                results = await asyncio.gather(*(limited(c) for c in commands))
+            return command_pb2.BatchResponse(results=results)
+
+    async def OpenSession(self, request, context):
+        try:
+            session = await asyncio.to_thread(
+                self.sessions.open, request.cwd, dict(request.env)
+            )
+        except SessionLimitError as e:
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+        except OSError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        return command_pb2.SessionResponse(session_id=session.id)
+
+    async def CloseSession(self, request, context):
+        closed = await asyncio.to_thread(self.sessions.close, request.session_id)
+        return command_pb2.SessionResponse(session_id=request.session_id, closed=closed)
+
+    async def PushFile(self, request_iterator, context):
+        receiver = FileReceiver()
+        try:
+            async for chunk in request_iterator:
+                await asyncio.to_thread(receiver.write, chunk)
+            if receiver.fd is None:
+                raise TransferError(
+                    grpc.StatusCode.INVALID_ARGUMENT, "no chunk received"
+                )
+        except TransferError as e:
+            await context.abort(e.code, str(e))
+        finally:
+            status = receiver.close()
+        return status
+
+    async def PullFile(self, request, context):
+        # 在线程中读取文件；生成器被释放时关闭文件
+        chunks = file_chunks(request.path, request.offset, request.chunk_size)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        except TransferError as e:
+            await context.abort(e.code, str(e))
+
+    async def StatFile(self, request, context):
+        try:
+            return await asyncio.to_thread(file_status, request.path)
+        except TransferError as e:
+            await context.abort(e.code, str(e))
+
+    async def StartJob(self, request, context):
+        try:
+            job = await asyncio.to_thread(
+                self.jobs.start,
+                request.command,
+                shell_args(request.command),
+                request.spool_bytes,
+            )
+        except JobError as e:
+            await context.abort(e.code, str(e))
+        return job.info()
+
+    async def AttachJob(self, request, context):
+        """see jobs.job_chunks(); the reader thread wakes the waiting coroutine"""
+        try:
+            job = self.jobs.get(request.job_id)
+            offset, chunk_size = check_attach(job, request)
+        except JobError as e:
+            await context.abort(e.code, str(e))
+        while True:
+            running = job.running
+            offset, data = job.read(offset, chunk_size)
+            if data:
+                yield command_pb2.JobChunk(offset=offset, data=data)
+                offset += len(data)
+                continue
+            if not request.follow or not running:
+                break
+            await job.wait_async(offset, WAIT_INTERVAL)
+        yield command_pb2.JobChunk(offset=offset, info=job.info())
+
+    async def JobStatus(self, request, context):
+        try:
+            return self.jobs.get(request.job_id).info()
+        except JobError as e:
+            await context.abort(e.code, str(e))
+
+    async def CancelJob(self, request, context):
+        try:
+            return self.jobs.cancel(request.job_id).info()
+        except JobError as e:
+            await context.abort(e.code, str(e))
+
+    async def ReadOutput(self, request, context):
+        """see jobs.read_output(); one pread() of the spool, no thread needed"""
+        try:
+            return read_output(self.jobs.get(request.job_id), request)
+        except JobError as e:
+            await context.abort(e.code, str(e))
+
+    async def ExecuteStream(self, request, context):
+        """
+        与 Commander.ExecuteStream 相同的协议：chunk_size 为 0 时逐行返回，
+        否则（或 binary 请求）按字节块返回并在最后发送 returncode；
+        行模式下按 LineFilter 过滤并发送 MatchEvent。
+        客户端断开时当前协程被取消，子进程组随之被结束。
+        """
+        with self.metrics.call("ExecuteStream") as call:
+            async for response in self._execute_stream(
+                request, context, call, StreamEnd()
+            ):
+                yield response
+
+    async def ExecuteEvents(self, request, context):
+        """see Commander.ExecuteEvents()"""
+        with self.metrics.call("ExecuteEvents") as call:
+            end = StreamEnd(final=True, raw=True)
+            sequence = EventSequence()
+            # 计数的是实际发送的 StreamEvent，见 Commander.ExecuteEvents()
+            async for response in self._execute_stream(
+                request, context, call.uncounted(), end
+            ):
+                for event in sequence.events(response, end.usage):
+                    call.sent(event)
+                    yield event
+
+    async def _execute_stream(self, request, context, call, end: StreamEnd):
+        flush_interval = (
+            request.flush_interval_ms / 1000
+            if request.flush_interval_ms
+            else DEFAULT_FLUSH_INTERVAL
+        )
+        chunk_size = request.chunk_size or (DEFAULT_CHUNK_SIZE if request.binary else 0)
+        try:
+            line_filter = LineFilter.from_request(request)
+        except ValueError as e:
+            call.code = grpc.StatusCode.INVALID_ARGUMENT
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        set_compression(request, context)
+        if request.spool:
+            async for response in self._spooled_stream(
+                request, context, call, line_filter, flush_interval, chunk_size, end
+            ):
+                yield response
+            return
+        try:
+            await self.scheduler.acquire_async(STREAM)
+        except SchedulerFull as e:
+            call.code = grpc.StatusCode.RESOURCE_EXHAUSTED
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+        responses = self._command_output(
+            request, line_filter, flush_interval, chunk_size, end
+        )
+        if buffered_request(request):
+            # 输出由单独的任务读入有界缓冲，见 backpressure.py
+            responses = buffered_async(
+                responses,
+                ResponseBuffer(
+                    request.backpressure,
+                    request.buffer_bytes or DEFAULT_BUFFER_BYTES,
+                ),
+                lambda: end.response(request),
+            )
+        try:
+            async for response in responses:
+                call.sent(response)
+                if self.log_lines:
+                    logger.debug(f"`{request.command}`: {response}")
+                yield response
+        finally:
+            # 被取消时立即结束命令、释放 slot，而不是等到生成器被回收
+            await responses.aclose()
+        # 行模式的 ExecuteStream 保持原有协议：不发送带 returncode 的结束消息
+        if (chunk_size or end.final) and not buffered_request(request):
+            response = end.response(request)
+            if response is not None:
+                call.sent(response)
+                yield response
+
+    async def _command_output(
+        self, request, line_filter, flush_interval, chunk_size, end: StreamEnd
+    ):
+        """
+        run the command (the STREAM slot is already taken) and yield its
+        output messages; returncode and errors are left in end
+        """
+        timeout = DEFAULT_TIMEOUT
+        process: Optional[asyncio.subprocess.Process] = None
+        readers: Dict[asyncio.Future, ChunkBuffer] = {}
+        try:
+            start = time.perf_counter()
+            process = await create_subprocess(request.command)
+            self.metrics.spawned(STREAM, time.perf_counter() - start)
+            pipes = {"stdout": process.stdout, "stderr": process.stderr}
+
+            def read(buffer: ChunkBuffer):
+                pipe: asyncio.StreamReader = pipes[buffer.src]  # type: ignore
+                readers[asyncio.ensure_future(pipe.read(READ_SIZE))] = buffer
+
+            read(ChunkBuffer("stdout", request.binary, end.errors))
+            read(ChunkBuffer("stderr", request.binary, end.errors))
+            exited = asyncio.ensure_future(process.wait())
+            while readers:
+                timeout_ = next_deadline(readers.values(), chunk_size)
+                draining = exited.done()
+                if draining:
+                    # 主进程已退出：只再读取已经到达的数据，不等待持有管道的孙进程
+                    timeout_ = EXIT_DRAIN_GRACE
+                done, _ = await asyncio.wait(
+                    readers if draining else [*readers, exited],
+                    timeout=timeout_,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                # 只有在宽限时间内没有读到任何数据时才停止读取；
+                # 刚等到退出的这一轮，读取任务可能还没来得及被调度
+                if draining and not done:
+                    break
+                for task in done & readers.keys():
+                    buffer = readers.pop(task)
+                    data = task.result()
+                    if data:
+                        buffer.append(data, flush_interval)
+                        read(buffer)
+                    else:
+                        buffer.eof = True
+                        for response in stream_responses(
+                            request,
+                            line_filter,
+                            flush_buffers([buffer], chunk_size),
+                            end.raw,
+                        ):
+                            yield response
+                for response in stream_responses(
+                    request,
+                    line_filter,
+                    flush_buffers(readers.values(), chunk_size),
+                    end.raw,
+                ):
+                    yield response
+                if line_filter is not None and line_filter.finished:
+                    # 所有 watch 已完成：finally 中结束进程组
+                    end.cancelled = True
+                    return
+            for response in stream_responses(
+                request,
+                line_filter,
+                flush_buffers(readers.values(), chunk_size, True),
+                end.raw,
+            ):
+                yield response
+            end.returncode = await asyncio.wait_for(exited, timeout)
+            # 子进程由 asyncio 的 child watcher 回收，拿不到 rusage，只有 wall time
+            end.usage = resource_usage(time.perf_counter() - start)
+        except asyncio.TimeoutError:
+            process.kill()  # type: ignore
+            self.metrics.timed_out(STREAM)
+            end.stderr = f"Command timed out after {timeout} seconds"
+        except asyncio.CancelledError:
+            logger.info("context is not active, terminating process")
+            raise
+        except Exception as e:
+            end.stderr = f"Command execution failed: {str(e)}"
+        finally:
+            for task in readers:
+                task.cancel()
+            if process is not None:
+                kill_group(process)
+            self.scheduler.release(STREAM)
+
+    async def _spooled_stream(
+        self, request, context, call, line_filter, flush_interval, chunk_size, end
+    ):
+        """
+        see Commander._spooled_stream(): the output is read back from the
+        spool; a client going away cancels this coroutine, not the job
+        """
+        try:
+            job = await asyncio.to_thread(
+                self.jobs.start, request.command, shell_args(request.command)
+            )
+        except JobError as e:
+            call.code = e.code
+            await context.abort(e.code, str(e))
+        response = command_pb2.CommandResponse(returncode=NOT_EXIT, job_id=job.id)
+        call.sent(response)
+        yield response
+        buffer = ChunkBuffer("stdout", request.binary, end.errors)
+        offset = 0
+        while True:
+            running = job.running
+            offset, data = job.read(offset, READ_SIZE)
+            if data:
+                buffer.append(data, flush_interval)
+                offset += len(data)
+            elif not running:
+                buffer.eof = True
+            else:
+                timeout = next_deadline([buffer], chunk_size)
+                await job.wait_async(
+                    offset, WAIT_INTERVAL if timeout is None else timeout
+                )
+            for response in stream_responses(
+                request,
+                line_filter,
+                flush_buffers([buffer], chunk_size, buffer.eof),
+                end.raw,
+            ):
+                call.sent(response)
+                if self.log_lines:
+                    logger.debug(f"`{request.command}`: {response}")
+                yield response
+            if line_filter is not None and line_filter.finished:
+                self.jobs.cancel(job.id)
+                return
+            if buffer.eof:
+                break
+        if chunk_size or end.final:
+            end.usage = job.resource_usage()
+            response = command_response(request, job.returncode, b"", b"")
+            call.sent(response)
+            yield response
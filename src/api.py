@@ -1,2 +1,53 @@
-from src.impl import Commander, PipedRpcStreamProcess, rpc, rpc_bg, rpc_echo_test
+"""
+public api. names are imported from their module on first access (PEP 562),
+so `from src.api import rpc` only loads the client half (src.client), not
+the servers, asyncio clients, metrics or loguru.
+"""
 
+import importlib
+
+_EXPORTS = {
+    "AsyncRpcStream": "src.aio_client",
+    "arpc": "src.aio_client",
+    "arpc_batch": "src.aio_client",
+    "arpc_echo_test": "src.aio_client",
+    "arpc_events": "src.aio_client",
+    "arpc_fanout": "src.aio_client",
+    "arpc_stream": "src.aio_client",
+    "AsyncCommander": "src.aio_server",
+    "HostResult": "src.fanout",
+    "fanout_summary": "src.fanout",
+    "rpc_fanout": "src.fanout",
+    "Commander": "src.impl",
+    "PipedRpcStreamProcess": "src.impl",
+    "RpcClient": "src.client",
+    "RpcJob": "src.client",
+    "RpcSession": "src.client",
+    "RpcStreamThread": "src.client",
+    "rpc": "src.client",
+    "rpc_batch": "src.client",
+    "rpc_bg": "src.client",
+    "rpc_echo_test": "src.client",
+    "rpc_events": "src.client",
+    "rpc_pull": "src.client",
+    "rpc_push": "src.client",
+    "ChannelPool": "src.pool",
+    "default_pool": "src.pool",
+    "StreamFilter": "src.pushdown",
+    "TransferError": "src.transfer",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,280 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Iterable, Iterator, Optional, Tuple
+
+from loguru import logger
+
+from proto import command_pb2
+
+BLOCK = command_pb2.BLOCK
+DROP_OLDEST = command_pb2.DROP_OLDEST
+COALESCE = command_pb2.COALESCE
+SAMPLE = command_pb2.SAMPLE
+DEFAULT_BUFFER_BYTES = 1024 * 1024
+# 一条消息发送了这么久（秒）仍未完成时结束 RPC 和命令，释放服务端线程和 slot
+STALL_TIMEOUT = 30.0
+# 生产者线程等待缓冲空间、检查停滞的间隔（秒）
+WAIT_INTERVAL = 1.0
+
+
+def buffered_request(request) -> bool:
+    """an ExecuteStream request that goes through a ResponseBuffer"""
+    return bool(request.backpressure or request.buffer_bytes)
+
+
+def payload_size(response: command_pb2.CommandResponse) -> int:
+    """output bytes of a NOT_EXIT message"""
+    if response.stdout_bytes or response.stderr_bytes:
+        return len(response.stdout_bytes) + len(response.stderr_bytes)
+    return len(response.stdout.encode()) + len(response.stderr.encode())
+
+
+def source(response: command_pb2.CommandResponse) -> str:
+    return "stderr" if response.stderr or response.stderr_bytes else "stdout"
+
+
+class ResponseBuffer:
+    """
+    bounded queue of ExecuteStream messages between the reader of the
+    child's pipes and the grpc writer. when the output messages exceed
+    max_bytes the policy decides:
+
+    BLOCK        the reader waits until the writer took enough (full())
+    DROP_OLDEST  the oldest messages are dropped to make room
+    COALESCE     only the newest message of each source (stdout/stderr) is
+                 kept: older progress lines are superseded, not delivered
+    SAMPLE       every other buffered message is dropped, repeatedly while
+                 still full, so what arrives is spread evenly over the output
+
+    MatchEvent messages are never dropped and go out before buffered output.
+    dropped and coalesced count the output bytes that were not delivered.
+    not thread safe, see BufferedStream and buffered_async().
+    """
+
+    def __init__(self, policy: int = BLOCK, max_bytes: int = DEFAULT_BUFFER_BYTES):
+        self.policy = policy
+        self.max_bytes = max(max_bytes, 1)
+        self.output: Deque[Tuple[command_pb2.CommandResponse, int]] = deque()
+        self.events: Deque[command_pb2.CommandResponse] = deque()
+        self.size = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self.output) + len(self.events)
+
+    def full(self) -> bool:
+        """BLOCK: the reader must wait before put()"""
+        return self.policy == BLOCK and self.size >= self.max_bytes
+
+    def put(self, response: command_pb2.CommandResponse):
+        if response.HasField("match"):
+            self.events.append(response)
+            return
+        size = payload_size(response)
+        if self.size + size > self.max_bytes and self.policy != BLOCK:
+            self._make_room(response, size)
+        self.output.append((response, size))
+        self.size += size
+
+    def take(self) -> Optional[command_pb2.CommandResponse]:
+        if self.events:
+            return self.events.popleft()
+        if not self.output:
+            return None
+        response, size = self.output.popleft()
+        self.size -= size
+        return response
+
+    def _make_room(self, response: command_pb2.CommandResponse, size: int):
+        if self.policy == COALESCE:
+            # 从新到旧，每个来源只保留最新的一条（新消息本身就是其来源最新的）
+            seen = {source(response)}
+            kept: Deque[Tuple[command_pb2.CommandResponse, int]] = deque()
+            for item in reversed(self.output):
+                src = source(item[0])
+                if src in seen:
+                    self.coalesced += item[1]
+                    self.size -= item[1]
+                else:
+                    seen.add(src)
+                    kept.appendleft(item)
+            self.output = kept
+            return
+        while self.output and self.size + size > self.max_bytes:
+            if self.policy == DROP_OLDEST or len(self.output) == 1:
+                _, dropped = self.output.popleft()
+                self.size -= dropped
+                self.dropped += dropped
+                continue
+            kept = deque()
+            for i, item in enumerate(self.output):
+                if i % 2:
+                    self.size -= item[1]
+                    self.dropped += item[1]
+                else:
+                    kept.append(item)
+            self.output = kept
+
+    def finish(self, response: command_pb2.CommandResponse):
+        """report what was not delivered in the final message"""
+        response.dropped_bytes = self.dropped
+        response.coalesced_bytes = self.coalesced
+
+
+class BufferedStream:
+    """
+    ExecuteStream of the thread pool server through a ResponseBuffer:
+    responses (the output of the child) are read in a thread of their own,
+    so a slow client no longer blocks the child on a full pipe (unless the
+    policy is BLOCK). the servicer thread yields from the buffer, then the
+    message of final().
+
+    a stalled client still pins the servicer thread inside a send, and
+    with it the STREAM slot of a command that may never end (tail -f): a
+    watchdog thread calls on_stall (eg. context.cancel, whose callbacks
+    terminate the child) once a send did not complete within STALL_TIMEOUT,
+    whether or not the command is still running.
+    """
+
+    def __init__(
+        self,
+        responses: Iterator[command_pb2.CommandResponse],
+        buffer: ResponseBuffer,
+        final: Callable[[], Optional[command_pb2.CommandResponse]],
+        on_stall: Callable[[], None],
+    ):
+        """
+        :param final: message sent after all output, None for no message
+        """
+        self.responses = responses
+        self.buffer = buffer
+        self.final = final
+        self.on_stall = on_stall
+        self.cond = threading.Condition()
+        self.done = False
+        self.closed = False
+        self.error: Optional[BaseException] = None
+        # 正在发送的消息被交出的时间，None 为没有消息在发送
+        self.sending_since: Optional[float] = None
+        self.producer = threading.Thread(target=self._produce, daemon=True)
+        self.watchdog = threading.Thread(target=self._watch, daemon=True)
+
+    def close(self):
+        """the client went away: stop reading (eg. from a grpc callback)"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def __iter__(self) -> Iterator[command_pb2.CommandResponse]:
+        self.producer.start()
+        self.watchdog.start()
+        try:
+            while True:
+                with self.cond:
+                    while not len(self.buffer) and not self.done and not self.closed:
+                        self.cond.wait()
+                    response = self.buffer.take()
+                    if response is None:
+                        break
+                    self.cond.notify_all()
+                yield from self._send(response)
+            if self.error is not None:
+                raise self.error
+            response = self.final()
+            if response is not None:
+                self.buffer.finish(response)
+                yield from self._send(response)
+        finally:
+            self.close()
+
+    def _send(self, response) -> Iterable[command_pb2.CommandResponse]:
+        with self.cond:
+            self.sending_since = time.monotonic()
+            # 唤醒 watchdog，按这次发送的开始时间计时
+            self.cond.notify_all()
+        yield response
+        self.sending_since = None
+
+    def _produce(self):
+        try:
+            for response in self.responses:
+                with self.cond:
+                    while self.buffer.full() and not self.closed:
+                        self.cond.wait(WAIT_INTERVAL)
+                    if self.closed:
+                        break
+                    self.buffer.put(response)
+                    self.cond.notify_all()
+        except BaseException as e:
+            self.error = e
+        finally:
+            # 提前退出时结束 responses，由它结束子进程并释放 slot
+            self.responses.close()  # type: ignore
+            with self.cond:
+                self.done = True
+                self.cond.notify_all()
+
+    def _watch(self):
+        with self.cond:
+            while not self.closed:
+                since = self.sending_since
+                if since is None:
+                    self.cond.wait(WAIT_INTERVAL)
+                    continue
+                left = since + STALL_TIMEOUT - time.monotonic()
+                if left <= 0:
+                    break
+                self.cond.wait(min(left, WAIT_INTERVAL))
+            else:
+                return
+        logger.warning(f"client stalled for {STALL_TIMEOUT}s, cancelling the stream")
+        self.on_stall()
+
+
+async def buffered_async(
+    responses: AsyncIterator[command_pb2.CommandResponse],
+    buffer: ResponseBuffer,
+    final: Callable[[], Optional[command_pb2.CommandResponse]],
+) -> AsyncIterator[command_pb2.CommandResponse]:
+    """
+    grpc.aio version of BufferedStream: responses are read by a task while
+    this generator waits for the client. a stalled client only suspends a
+    coroutine, so nothing needs to be cancelled
+    """
+    ready = asyncio.Event()
+    space = asyncio.Event()
+
+    async def produce():
+        try:
+            async for response in responses:
+                while buffer.full():
+                    space.clear()
+                    await space.wait()
+                buffer.put(response)
+                ready.set()
+        finally:
+            ready.set()
+            await responses.aclose()  # type: ignore
+
+    task = asyncio.ensure_future(produce())
+    try:
+        while True:
+            response = buffer.take()
+            if response is not None:
+                space.set()
+                yield response
+                continue
+            if task.done():
+                break
+            ready.clear()
+            await ready.wait()
+        task.result()
+        response = final()
+        if response is not None:
+            buffer.finish(response)
+            yield response
+    finally:
+        task.cancel()
@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent import futures
+from typing import Dict, Hashable, Optional, Tuple
+
+from proto import command_pb2
+
+DEFAULT_CACHE_ENTRIES = 256
+DEFAULT_CACHE_BYTES = 16 * 1024 * 1024
+
+
+def cache_key(request) -> Optional[Hashable]:
+    """
+    key of a CommandRequest in the ResultCache, None if it is not cached.
+    commands without session_id all run in the server's cwd and environment.
+    session commands are never cached: any command of the session (`cd`,
+    `export`, the cached command itself) may change the cwd and environment
+    the result depends on.
+    """
+    if not request.cache_ttl_ms or request.session_id:
+        return None
+    return request.command, request.binary
+
+
+class ResultCache:
+    """
+    responses of idempotent commands, for Execute requests with cache_ttl_ms.
+
+    an entry is reused by a request while it is younger than that request's
+    cache_ttl_ms. at most max_entries entries and max_bytes of serialized
+    responses are kept, the least recently used go first. concurrent misses
+    of the same key are single-flight: one caller runs the command (the
+    leader), the others wait for its response. responses with returncode -1
+    (timeouts, server errors) are not stored.
+
+    thread safe; the async server waits on the same futures through
+    asyncio.wrap_future.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_CACHE_ENTRIES,
+        max_bytes: int = DEFAULT_CACHE_BYTES,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (存入时间, 响应, 序列化大小)
+        self.entries: (
+            "OrderedDict[Hashable, Tuple[float, command_pb2.CommandResponse, int]]"
+        ) = OrderedDict()
+        self.inflight: Dict[Hashable, futures.Future] = {}
+        self.bytes = 0
+        self.lock = threading.Lock()
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def claim(
+        self, key: Hashable, ttl: float
+    ) -> Tuple[Optional[command_pb2.CommandResponse], Optional[futures.Future], bool]:
+        """
+        :param ttl: maximum age in seconds of a usable entry
+        :return: (response, None, False) on a hit; (None, future, False) when
+            another caller is running the command, the future gives its
+            response or None if it failed; (None, future, True) on a miss,
+            the caller must run the command and call finish(key, future, ...)
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if time.monotonic() - entry[0] <= ttl:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1], None, False
+                self._remove(key)
+            future = self.inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return None, future, False
+            self.misses += 1
+            future = futures.Future()
+            self.inflight[key] = future
+            return None, future, True
+
+    def finish(
+        self,
+        key: Hashable,
+        future: futures.Future,
+        response: Optional[command_pb2.CommandResponse],
+    ):
+        """
+        leader: store response and hand it to the waiting callers;
+        None (the command raised or was cancelled) lets them run it themselves
+        """
+        with self.lock:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+            if response is not None and response.returncode != -1:
+                self._store(key, response)
+        if not future.cancelled():
+            future.set_result(response)
+
+    def _store(self, key: Hashable, response: command_pb2.CommandResponse):
+        size = response.ByteSize()
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (time.monotonic(), response, size)
+        self.bytes += size
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        _, _, size = self.entries.pop(key)
+        self.bytes -= size
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,866 @@
+import os
+import queue
+import stat
+import time
+from threading import Event, Lock, Thread
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+import grpc
+
+from proto import command_pb2
+from src.log import catch, logger
+from src.pool import ChannelPool, default_pool
+from src.pushdown import StreamFilter
+from src.transfer import TransferError, file_chunks, receive_file
+
+# client half of the api: only what a one-shot client call needs is imported
+# here (no server, asyncio servers, metrics, multiprocessing or loguru until
+# something is logged), see bench/bench_startup.py
+
+NOT_EXIT = 65537
+# 客户端使用的 backpressure 策略名，取值见 proto Backpressure
+POLICIES = {
+    "block": command_pb2.BLOCK,
+    "drop-oldest": command_pb2.DROP_OLDEST,
+    "coalesce": command_pb2.COALESCE,
+    "sample": command_pb2.SAMPLE,
+}
+
+
+def policy_value(policy: str) -> int:
+    """
+    :raise ValueError: unknown policy name
+    """
+    try:
+        return POLICIES[policy]
+    except KeyError:
+        raise ValueError(
+            f"unknown backpressure policy {policy!r}, one of {', '.join(POLICIES)}"
+        )
+
+
+class RpcStreamThread(Thread):
+    """
+    in-process replacement of PipedRpcStreamProcess with the same API.
+
+    the stream (ExecuteEvents) is consumed on a daemon thread over a pooled
+    channel, output goes to a queue.Queue without pickling, and stop()
+    cancels the rpc (the server then terminates the command) instead of
+    terminating a process. the last message is "returncode: N" with the exit
+    status of the command, in line mode too; a failed stream ends with its
+    error and "returncode: -1". binary streams put bytes chunks on the
+    queue (the final "returncode: N" message stays str).
+    with a StreamFilter the server only sends the lines that pass it, and
+    completed watches arrive on matchq() as (watch index, matched lines).
+    with spool the command runs as a server job whose output goes through
+    a spool on disk (stderr merged into stdout): a slow reader does not
+    stall it, stop() does not end it, and job_id is set once the server
+    started it, eg. for RpcJob.read().
+    with a backpressure policy other than "block" (see backpressure.py) a
+    slow reader loses output instead of stalling the command, and
+    dropped_bytes / coalesced_bytes tell how much output was not delivered.
+    """
+
+    def __init__(
+        self,
+        command: str,
+        addr_port: str,
+        chunk_size: int = 0,
+        flush_interval_ms: int = 0,
+        pool: Optional[ChannelPool] = None,
+        binary: bool = False,
+        compression: grpc.Compression = grpc.Compression.NoCompression,
+        stream_filter: Optional[StreamFilter] = None,
+        spool: bool = False,
+        backpressure: str = "block",
+        buffer_bytes: int = 0,
+    ):
+        super().__init__(daemon=True)
+        self.command = command
+        self.addr_ip = addr_port
+        self.chunk_size = chunk_size
+        self.flush_interval_ms = flush_interval_ms
+        self.binary = binary
+        self.compression = compression
+        self.stream_filter = stream_filter
+        self.spool = spool
+        self.job_id = ""
+        self.backpressure = policy_value(backpressure)
+        self.buffer_bytes = buffer_bytes
+        self.dropped_bytes = 0
+        self.coalesced_bytes = 0
+        self.pool = pool if pool is not None else default_pool()
+        self.msgQ: queue.Queue = queue.Queue()
+        self.matchQ: queue.Queue = queue.Queue()
+        self.oK = Event()
+        self.call = None
+        self.stopped = False
+        self.lock = Lock()
+
+    def run(self):
+        with self.pool.lease(self.addr_ip) as pooled:
+            with self.lock:
+                if self.stopped:
+                    return
+                self.call = pooled.stub.ExecuteEvents(
+                    command_pb2.CommandRequest(
+                        command=self.command,
+                        chunk_size=self.chunk_size,
+                        flush_interval_ms=self.flush_interval_ms,
+                        binary=self.binary,
+                        compression=self.compression,
+                        spool=self.spool,
+                        backpressure=self.backpressure,
+                        buffer_bytes=self.buffer_bytes,
+                        **(
+                            self.stream_filter.request_fields()
+                            if self.stream_filter
+                            else {}
+                        ),
+                    )
+                )
+            returncode = -1
+            try:
+                for event in self.call:
+                    kind = event.WhichOneof("event")
+                    if kind == "data":
+                        data = event.data.data
+                        self.msgQ.put(
+                            data
+                            if self.binary
+                            else data.decode("utf-8", errors="replace")
+                        )
+                    elif kind == "match":
+                        self.matchQ.put((event.match.watch, list(event.match.lines)))
+                    elif kind == "job_id":
+                        self.job_id = event.job_id
+                    elif kind == "exit":
+                        returncode = event.exit.returncode
+                        self.dropped_bytes = event.exit.dropped_bytes
+                        self.coalesced_bytes = event.exit.coalesced_bytes
+                        if event.exit.error:
+                            self.msgQ.put(
+                                event.exit.error.encode()
+                                if self.binary
+                                else event.exit.error
+                            )
+            except grpc.RpcError as e:
+                if self.stopped:
+                    return
+                logger.error(f"stream of `{self.command}` failed: {e}")
+                # 读取 msgq() 直到 returncode 的调用方（如 rpc_monitor）不会一直等下去
+                error = f"stream failed: {e.code().name}: {e.details()}"
+                self.msgQ.put(error.encode() if self.binary else error)
+                self.msgQ.put(f"returncode: {returncode}")
+                return
+            self.msgQ.put(f"returncode: {returncode}")
+            self.oK.set()
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+            if self.call is not None and not self.oK.is_set():
+                self.call.cancel()
+        if self.is_alive():
+            self.join()
+
+    def msgq(self):
+        return self.msgQ
+
+    def matchq(self) -> queue.Queue:
+        """(watch index, matched lines) of the watches of stream_filter"""
+        return self.matchQ
+
+    def ok(self) -> bool:
+        return self.oK.is_set()
+
+
+def response_output(response, binary: bool = False) -> tuple:
+    """(returncode, stdout, stderr) of a CommandResponse, bytes if binary"""
+    if binary:
+        return response.returncode, response.stdout_bytes, response.stderr_bytes
+    return response.returncode, response.stdout, response.stderr
+
+
+def _execute(
+    stub,
+    command: str,
+    timeout=None,
+    binary: bool = False,
+    compression: grpc.Compression = grpc.Compression.NoCompression,
+    cache_ttl_ms: int = 0,
+) -> tuple:
+    response = stub.Execute(
+        command_pb2.CommandRequest(
+            command=command,
+            binary=binary,
+            compression=compression,
+            cache_ttl_ms=cache_ttl_ms,
+        ),
+        timeout=timeout,
+    )
+    return response_output(response, binary)
+
+
+@catch()
+def rpc(
+    command: str,
+    addr_port: str = "localhost:50051",
+    binary: bool = False,
+    compression: grpc.Compression = grpc.Compression.NoCompression,
+    cache_ttl_ms: int = 0,
+) -> tuple[int, str, str]:
+    """
+    blocking execution
+    :param command: bash command. notice that shell's builtin command is not supported
+    :param addr_port: eg. "192.168.1.1:50051"
+    :param binary: return stdout/stderr as raw bytes instead of text
+    :param compression: grpc.Compression.Gzip/Deflate to compress the response
+    :param cache_ttl_ms: for idempotent commands, accept the server's cached
+        result of the same command if it is at most this old
+    :return: tuple[returncode: int, stdout: str, stderr: str], bytes if binary
+    """
+    with default_pool().lease(addr_port) as pooled:
+        returncode, stdout, stderr = _execute(
+            pooled.stub,
+            command,
+            binary=binary,
+            compression=compression,
+            cache_ttl_ms=cache_ttl_ms,
+        )
+        print(f"Greeter client received: \n{returncode} \n{stdout} \n{stderr}")
+        return returncode, stdout, stderr
+
+
+def batch_request(
+    commands: Sequence[Union[str, Tuple[str, float]]],
+    parallel: bool = False,
+    max_parallel: int = 0,
+) -> command_pb2.BatchRequest:
+    requests = []
+    for item in commands:
+        command, timeout = (item, 0) if isinstance(item, str) else item
+        requests.append(
+            command_pb2.CommandRequest(command=command, timeout_ms=int(timeout * 1000))
+        )
+    return command_pb2.BatchRequest(
+        commands=requests, parallel=parallel, max_parallel=max_parallel
+    )
+
+
+@catch()
+def rpc_batch(
+    commands: Sequence[Union[str, Tuple[str, float]]],
+    addr_port: str = "localhost:50051",
+    parallel: bool = False,
+    max_parallel: int = 0,
+) -> List[tuple[int, str, str]]:
+    """
+    blocking execution of several commands in one round trip
+    :param commands: bash commands, or (command, timeout in seconds) tuples
+    :param addr_port: eg. "192.168.1.1:50051"
+    :param parallel: run the commands concurrently on the server
+    :param max_parallel: concurrency limit when parallel, 0 for the server default
+    :return: list of tuple[returncode: int, stdout: str, stderr: str], in order
+    """
+    with default_pool().lease(addr_port) as pooled:
+        response = pooled.stub.ExecuteBatch(
+            batch_request(commands, parallel, max_parallel)
+        )
+        return [(r.returncode, r.stdout, r.stderr) for r in response.results]
+
+
+@catch()
+def rpc_bg(
+    command: str,
+    addr_port: str = "localhost:50051",
+    chunk_size: int = 0,
+    flush_interval_ms: int = 0,
+    binary: bool = False,
+    compression: grpc.Compression = grpc.Compression.NoCompression,
+    stream_filter: Optional[StreamFilter] = None,
+    spool: bool = False,
+    backpressure: str = "block",
+    buffer_bytes: int = 0,
+):
+    """
+    unblocking execution
+    :param command: bash command. notice that shell's builtin command is not supported
+    :param addr_port: eg. "192.168.1.1:50051"
+    :param chunk_size: >0 to receive output in byte chunks instead of lines
+    :param flush_interval_ms: max latency of a partially filled chunk, 0 for 20ms
+    :param binary: receive raw bytes chunks (64 KiB if chunk_size is 0)
+    :param compression: grpc.Compression.Gzip/Deflate to compress the stream
+    :param stream_filter: filter and watch the lines on the server (line mode)
+    :param spool: run as a server job with its output spooled on disk, see
+        RpcStreamThread
+    :param backpressure: what the server does when this client reads too
+        slowly: "block", "drop-oldest", "coalesce" or "sample"
+    :param buffer_bytes: server buffer between the command and the client,
+        0 for 1 MiB ("block": no buffer)
+    :return: RpcStreamThread
+    """
+    p = RpcStreamThread(
+        command=command,
+        addr_port=addr_port,
+        chunk_size=chunk_size,
+        flush_interval_ms=flush_interval_ms,
+        binary=binary,
+        compression=compression,
+        stream_filter=stream_filter,
+        spool=spool,
+        backpressure=backpressure,
+        buffer_bytes=buffer_bytes,
+    )
+    p.start()
+    return p
+
+
+def rpc_events(
+    command: str,
+    addr_port: str = "localhost:50051",
+    chunk_size: int = 0,
+    flush_interval_ms: int = 0,
+    binary: bool = False,
+    compression: grpc.Compression = grpc.Compression.NoCompression,
+    stream_filter: Optional[StreamFilter] = None,
+    spool: bool = False,
+    backpressure: str = "block",
+    buffer_bytes: int = 0,
+    pool: Optional[ChannelPool] = None,
+) -> Iterator[command_pb2.StreamEvent]:
+    """
+    streaming execution as structured events (ExecuteEvents): each event has
+    a seq and the server time_us, and one of data (src, bytes), match,
+    job_id, usage or exit. a stream that was not cancelled ends with usage
+    and exit, in line mode too. closing the iterator cancels the rpc
+    :param command: bash command. notice that shell's builtin command is not supported
+    :param addr_port: eg. "192.168.1.1:50051"
+    :param chunk_size: >0 for output in byte chunks instead of lines
+    :param flush_interval_ms: max latency of a partially filled chunk, 0 for 20ms
+    :param binary: raw bytes chunks (64 KiB if chunk_size is 0)
+    :param compression: grpc.Compression.Gzip/Deflate to compress the stream
+    :param stream_filter: filter and watch the lines on the server (line mode)
+    :param spool: see rpc_bg()
+    :param backpressure: see rpc_bg()
+    :param buffer_bytes: see rpc_bg()
+    :param pool: channel pool, default_pool() if omitted
+    :return: iterator of StreamEvent
+    """
+    pool = pool if pool is not None else default_pool()
+    with pool.lease(addr_port) as pooled:
+        call = pooled.stub.ExecuteEvents(
+            command_pb2.CommandRequest(
+                command=command,
+                chunk_size=chunk_size,
+                flush_interval_ms=flush_interval_ms,
+                binary=binary,
+                compression=compression,
+                spool=spool,
+                backpressure=policy_value(backpressure),
+                buffer_bytes=buffer_bytes,
+                **(stream_filter.request_fields() if stream_filter else {}),
+            )
+        )
+        try:
+            yield from call
+        finally:
+            call.cancel()
+
+
+def _push(stub, local: str, remote: str, chunk_size: int, resume: bool) -> int:
+    st = os.stat(local)
+    offset = 0
+    if resume:
+        status = stub.StatFile(command_pb2.FileRequest(path=remote))
+        offset = status.size if status.exists else 0
+        if offset > st.st_size:
+            raise TransferError(
+                grpc.StatusCode.OUT_OF_RANGE,
+                f"{remote} ({offset} bytes) is larger than {local} ({st.st_size})",
+            )
+    chunks = file_chunks(local, offset, chunk_size, stat.S_IMODE(st.st_mode), remote)
+    return stub.PushFile(chunks).size
+
+
+def _pull(stub, remote: str, local: str, chunk_size: int, resume: bool) -> int:
+    offset = os.path.getsize(local) if resume and os.path.exists(local) else 0
+    call = stub.PullFile(
+        command_pb2.FileRequest(path=remote, offset=offset, chunk_size=chunk_size)
+    )
+    try:
+        return receive_file(call, local).size
+    except TransferError:
+        call.cancel()
+        raise
+
+
+@catch(reraise=True)
+def rpc_push(
+    local: str,
+    remote: str,
+    addr_port: str = "localhost:50051",
+    chunk_size: int = 0,
+    resume: bool = False,
+) -> int:
+    """
+    upload a file in checksummed chunks with PushFile
+    :param local: local file path
+    :param remote: destination path on the server, permission bits are copied
+    :param addr_port: eg. "192.168.1.1:50051"
+    :param chunk_size: bytes per chunk, 0 for 1 MiB
+    :param resume: append to what an interrupted upload left on the server
+    :return: size of the remote file
+    :raise grpc.RpcError: the server rejected the transfer
+    """
+    with default_pool().lease(addr_port) as pooled:
+        return _push(pooled.stub, local, remote, chunk_size, resume)
+
+
+@catch(reraise=True)
+def rpc_pull(
+    remote: str,
+    local: str,
+    addr_port: str = "localhost:50051",
+    chunk_size: int = 0,
+    resume: bool = False,
+) -> int:
+    """
+    download a file in checksummed chunks with PullFile
+    :param remote: file path on the server
+    :param local: local destination path
+    :param addr_port: eg. "192.168.1.1:50051"
+    :param chunk_size: bytes per chunk, 0 for 1 MiB
+    :param resume: continue after what an interrupted download left in local
+    :return: size of the local file
+    :raise grpc.RpcError: the server rejected the transfer
+    :raise TransferError: a chunk failed its checksum
+    """
+    with default_pool().lease(addr_port) as pooled:
+        return _pull(pooled.stub, remote, local, chunk_size, resume)
+
+
+def wait_rpc_ready(channel, timeout=10):
+    """
+    等待 gRPC 服务器就绪（带超时）
+    :param channel: grpc.Channel
+    :param timeout: 超时时间（秒）
+    :return: True 如果服务器就绪，False 如果超时
+    """
+    try:
+        grpc.channel_ready_future(channel).result(timeout=timeout)
+        return True
+    except grpc.FutureTimeoutError:
+        logger.info("gRPC 服务器连接超时（{timeout}秒）")
+        return False
+    except Exception:
+        logger.info("gRPC 服务器连接失败: {str(e)}")
+        return False
+
+
+def rpc_echo_test(addr_port, timeout=10, pool: Optional[ChannelPool] = None):
+    """
+    创建 gRPC 客户端并检查服务器是否就绪
+    :param server_address: 服务器地址（如 "localhost:50051"）
+    :param timeout: 超时时间（秒）
+    :param pool: 使用的 channel 池，默认为进程共享的 default_pool()
+    :return: True 或 False 如果连接失败
+    """
+    try:
+        if pool is None:
+            pool = default_pool()
+        with pool.lease(addr_port) as pooled:
+            if not wait_rpc_ready(pooled.channel, timeout):
+                return False
+            stub = pooled.stub
+            try:
+                response = stub.Execute(
+                    command_pb2.CommandRequest(command="echo $USER"), timeout=2
+                )
+                if response.returncode == 0:
+                    logger.info(f"rpc USER: {response.stdout.strip()}")
+                    if response.stdout.strip() == "smtbf":
+                        return True
+                    elif response.stdout.strip() == "fanyx":
+                        return True
+                    elif response.stdout.strip() == "fanyuxin":
+                        return True
+                    elif response.stdout.strip() == "bytedance":
+                        return True
+                    else:
+                        logger.warning(f"rpc USER: {response.stdout.strip()}")
+                        return True
+                else:
+                    logger.error(f"rpc returncode: {response.returncode}")
+                return False
+            except grpc.RpcError as e:
+                logger.info(f"gRPC 服务器未响应: {str(e)}")
+                return False
+    except Exception as e:
+        logger.info(f"gRPC 客户端创建失败: {str(e)}")
+        return False
+
+
+class RpcSession:
+    """
+    a warm shell on the server: commands run without spawning bash + stdbuf
+    each time, and cd/export persist between them.
+
+        with RpcSession("192.168.1.1:50051") as session:
+            session.rpc("cd /tmp")
+            session.rpc("pwd")  # (0, "/tmp\\n", "")
+    """
+
+    def __init__(
+        self,
+        addr_port: str = "localhost:50051",
+        cwd: str = "",
+        env: Optional[dict] = None,
+        pool: Optional[ChannelPool] = None,
+    ):
+        """
+        :param addr_port: eg. "192.168.1.1:50051"
+        :param cwd: initial working directory of the shell
+        :param env: extra environment variables of the shell
+        :param pool: channel pool, defaults to default_pool()
+        """
+        self.addr_port = addr_port
+        self.pool = pool if pool is not None else default_pool()
+        with self.pool.lease(addr_port) as pooled:
+            response = pooled.stub.OpenSession(
+                command_pb2.SessionRequest(cwd=cwd, env=env or {})
+            )
+        self.session_id = response.session_id
+
+    def rpc(self, command: str, timeout: float = 0) -> tuple[int, str, str]:
+        """
+        run command in the session; a timeout closes the session on the server
+        :return: tuple[returncode: int, stdout: str, stderr: str]
+        """
+        with self.pool.lease(self.addr_port) as pooled:
+            response = pooled.stub.Execute(
+                command_pb2.CommandRequest(
+                    command=command,
+                    timeout_ms=int(timeout * 1000),
+                    session_id=self.session_id,
+                )
+            )
+        return response.returncode, response.stdout, response.stderr
+
+    def close(self) -> bool:
+        with self.pool.lease(self.addr_port) as pooled:
+            response = pooled.stub.CloseSession(
+                command_pb2.SessionRequest(session_id=self.session_id)
+            )
+        return response.closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RpcJob:
+    """
+    a command running on the server independently of any connection: it
+    survives client disconnects and restarts, and its output is kept in a
+    spool on the server to be read from any offset.
+
+        job = RpcJob.start("ffmpeg ...", "192.168.1.1:50051")
+        for offset, data in job.attach():
+            ...
+        job.info.returncode
+
+        # another process, later
+        job = RpcJob(job_id, "192.168.1.1:50051")
+        for offset, data in job.attach(saved_offset):
+            ...
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        addr_port: str = "localhost:50051",
+        pool: Optional[ChannelPool] = None,
+    ):
+        """
+        :param job_id: id returned by StartJob
+        :param pool: channel pool, defaults to default_pool()
+        """
+        self.job_id = job_id
+        self.addr_port = addr_port
+        self.pool = pool if pool is not None else default_pool()
+        self.info: Optional[command_pb2.JobInfo] = None
+        self.offset = 0  # attach() 读到的位置，重新连接时从这里继续
+
+    @classmethod
+    def start(
+        cls,
+        command: str,
+        addr_port: str = "localhost:50051",
+        spool_bytes: int = 0,
+        pool: Optional[ChannelPool] = None,
+    ) -> "RpcJob":
+        """
+        :param spool_bytes: output kept on the server, 0 for its default
+        """
+        pool = pool if pool is not None else default_pool()
+        with pool.lease(addr_port) as pooled:
+            info = pooled.stub.StartJob(
+                command_pb2.JobRequest(command=command, spool_bytes=spool_bytes)
+            )
+        job = cls(info.job_id, addr_port, pool)
+        job.info = info
+        return job
+
+    def attach(
+        self, offset: Optional[int] = None, follow: bool = True, chunk_size: int = 0
+    ) -> Iterator[Tuple[int, bytes]]:
+        """
+        read the output; ends when the job ended (follow) or at the current
+        end of the output, then self.info is the final JobInfo
+        :param offset: where to start, default self.offset; output older
+            than info.start_offset is gone and skipped
+        :param follow: wait for new output until the job ends
+        :return: iterator of (offset, data)
+        """
+        request = command_pb2.AttachRequest(
+            job_id=self.job_id,
+            offset=self.offset if offset is None else offset,
+            follow=follow,
+            chunk_size=chunk_size,
+        )
+        with self.pool.lease(self.addr_port) as pooled:
+            call = pooled.stub.AttachJob(request)
+            try:
+                for chunk in call:
+                    if chunk.HasField("info"):
+                        self.info = chunk.info
+                        self.offset = chunk.offset
+                        continue
+                    self.offset = chunk.offset + len(chunk.data)
+                    yield chunk.offset, chunk.data
+            finally:
+                # 提前停止读取时结束这次 RPC，任务不受影响
+                call.cancel()
+
+    def read(
+        self, offset: Optional[int] = None, length: int = 0, line: int = 0
+    ) -> Tuple[int, bytes]:
+        """
+        one range of the output, without waiting for more; updates self.info
+        :param offset: default self.offset; output older than
+            info.start_offset is gone and skipped
+        :param length: at most this many bytes, 0 for 64 KiB (max 3 MiB)
+        :param line: >0 to start at the beginning of this line (from 1)
+            instead of offset
+        :return: (offset, data), data is empty at the end of the output
+        """
+        with self.pool.lease(self.addr_port) as pooled:
+            chunk = pooled.stub.ReadOutput(
+                command_pb2.ReadRequest(
+                    job_id=self.job_id,
+                    offset=self.offset if offset is None else offset,
+                    length=length,
+                    line=line,
+                )
+            )
+        self.info = chunk.info
+        self.offset = chunk.offset + len(chunk.data)
+        return chunk.offset, chunk.data
+
+    def status(self) -> command_pb2.JobInfo:
+        with self.pool.lease(self.addr_port) as pooled:
+            self.info = pooled.stub.JobStatus(
+                command_pb2.JobRequest(job_id=self.job_id)
+            )
+        return self.info
+
+    def cancel(self) -> command_pb2.JobInfo:
+        """SIGINT the job, SIGKILL after a grace period; its output stays readable"""
+        with self.pool.lease(self.addr_port) as pooled:
+            self.info = pooled.stub.CancelJob(
+                command_pb2.JobRequest(job_id=self.job_id)
+            )
+        return self.info
+
+
+class RpcClient:
+    """
+    client bound to one server, owning a ChannelPool and a reusable CommandStub
+    """
+
+    def __init__(
+        self, addr_port: str = "localhost:50051", pool: Optional[ChannelPool] = None
+    ):
+        """
+        :param addr_port: eg. "192.168.1.1:50051"
+        :param pool: channel pool, a private one is created if omitted
+        """
+        self.addr_port = addr_port
+        self.pool = pool if pool is not None else ChannelPool(max_size=1)
+
+    def rpc(
+        self,
+        command: str,
+        timeout=None,
+        binary: bool = False,
+        compression: grpc.Compression = grpc.Compression.NoCompression,
+        cache_ttl_ms: int = 0,
+    ) -> tuple[int, str, str]:
+        """
+        blocking execution, see rpc()
+        :return: tuple[returncode: int, stdout: str, stderr: str], bytes if binary
+        """
+        with self.pool.lease(self.addr_port) as pooled:
+            return _execute(
+                pooled.stub, command, timeout, binary, compression, cache_ttl_ms
+            )
+
+    def rpc_batch(
+        self,
+        commands: Sequence[Union[str, Tuple[str, float]]],
+        parallel: bool = False,
+        max_parallel: int = 0,
+    ) -> List[tuple[int, str, str]]:
+        """
+        several commands in one round trip, see rpc_batch()
+        """
+        with self.pool.lease(self.addr_port) as pooled:
+            response = pooled.stub.ExecuteBatch(
+                batch_request(commands, parallel, max_parallel)
+            )
+            return [(r.returncode, r.stdout, r.stderr) for r in response.results]
+
+    def rpc_bg(
+        self,
+        command: str,
+        chunk_size: int = 0,
+        flush_interval_ms: int = 0,
+        binary: bool = False,
+        compression: grpc.Compression = grpc.Compression.NoCompression,
+        stream_filter: Optional[StreamFilter] = None,
+        spool: bool = False,
+        backpressure: str = "block",
+        buffer_bytes: int = 0,
+    ):
+        """
+        unblocking execution, see rpc_bg()
+        :return: RpcStreamThread
+        """
+        p = RpcStreamThread(
+            command,
+            self.addr_port,
+            chunk_size,
+            flush_interval_ms,
+            pool=self.pool,
+            binary=binary,
+            compression=compression,
+            stream_filter=stream_filter,
+            spool=spool,
+            backpressure=backpressure,
+            buffer_bytes=buffer_bytes,
+        )
+        p.start()
+        return p
+
+    def rpc_events(
+        self,
+        command: str,
+        chunk_size: int = 0,
+        flush_interval_ms: int = 0,
+        binary: bool = False,
+        compression: grpc.Compression = grpc.Compression.NoCompression,
+        stream_filter: Optional[StreamFilter] = None,
+        spool: bool = False,
+        backpressure: str = "block",
+        buffer_bytes: int = 0,
+    ) -> Iterator[command_pb2.StreamEvent]:
+        """
+        streaming execution as structured events, see rpc_events()
+        """
+        return rpc_events(
+            command,
+            self.addr_port,
+            chunk_size,
+            flush_interval_ms,
+            binary,
+            compression,
+            stream_filter,
+            spool,
+            backpressure,
+            buffer_bytes,
+            pool=self.pool,
+        )
+
+    def rpc_push(
+        self, local: str, remote: str, chunk_size: int = 0, resume: bool = False
+    ) -> int:
+        """
+        upload a file, see rpc_push()
+        :return: size of the remote file
+        """
+        with self.pool.lease(self.addr_port) as pooled:
+            return _push(pooled.stub, local, remote, chunk_size, resume)
+
+    def rpc_pull(
+        self, remote: str, local: str, chunk_size: int = 0, resume: bool = False
+    ) -> int:
+        """
+        download a file, see rpc_pull()
+        :return: size of the local file
+        """
+        with self.pool.lease(self.addr_port) as pooled:
+            return _pull(pooled.stub, remote, local, chunk_size, resume)
+
+    def session(self, cwd: str = "", env: Optional[dict] = None) -> RpcSession:
+        """open a persistent shell session, see RpcSession"""
+        return RpcSession(self.addr_port, cwd, env, pool=self.pool)
+
+    def start_job(self, command: str, spool_bytes: int = 0) -> RpcJob:
+        """start a background job on the server, see RpcJob"""
+        return RpcJob.start(command, self.addr_port, spool_bytes, pool=self.pool)
+
+    def job(self, job_id: str) -> RpcJob:
+        """an existing job, eg. to reattach after a restart"""
+        return RpcJob(job_id, self.addr_port, pool=self.pool)
+
+    def echo_test(self, timeout=10) -> bool:
+        return rpc_echo_test(self.addr_port, timeout, pool=self.pool)
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    assert rpc_echo_test("localhost:50051", timeout=2)
+    ret = rpc("ls -la $HOME")
+    p = rpc_bg("sleep 2; echo finished", "localhost:50051")
+
+    q = p.msgq()
+
+    def work():
+        while True:
+            if not p.is_alive():
+                logger.debug("p not alive")
+                break
+            if p.ok():
+                logger.debug("p is ok")
+                break
+            try:
+                msg = q.get(timeout=1)
+                print(f"Received: {msg.strip()}")
+            except queue.Empty:
+                continue
+
+    Thread(target=work).start()
+    time.sleep(3)
+    p.stop()
+    time.sleep(3)
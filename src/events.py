@@ -0,0 +1,73 @@
+"""
+ExecuteEvents: the messages of ExecuteStream as StreamEvents.
+
+the servers produce the same CommandResponse messages for both rpcs (so
+filters, watches, spool and backpressure behave the same) and ExecuteEvents
+turns each of them into events numbered by seq and stamped with the server
+time, ending with the ResourceUsage and ExitStatus of the command.
+"""
+
+import time
+from typing import Iterator, Optional
+
+from proto import command_pb2
+from src.client import NOT_EXIT
+
+
+def resource_usage(wall: float, rusage=None) -> command_pb2.ResourceUsage:
+    """
+    :param wall: seconds from start to exit
+    :param rusage: resource.struct_rusage of the child, eg. from os.wait4
+    """
+    usage = command_pb2.ResourceUsage(wall_us=int(wall * 1e6))
+    if rusage is not None:
+        usage.user_us = int(rusage.ru_utime * 1e6)
+        usage.system_us = int(rusage.ru_stime * 1e6)
+        # Linux 以 KiB 计，macOS 以字节计
+        usage.max_rss_kb = rusage.ru_maxrss
+    return usage
+
+
+class EventSequence:
+    """seq and time_us of the events of one call"""
+
+    def __init__(self):
+        self.seq = 0
+
+    def event(self, **fields) -> command_pb2.StreamEvent:
+        self.seq += 1
+        return command_pb2.StreamEvent(
+            seq=self.seq, time_us=time.time_ns() // 1000, **fields
+        )
+
+    def events(
+        self, response, usage: Optional[command_pb2.ResourceUsage] = None
+    ) -> Iterator[command_pb2.StreamEvent]:
+        """
+        the events of one ExecuteStream message; usage goes right before the
+        exit event of the final message
+        """
+        if response.job_id:
+            yield self.event(job_id=response.job_id)
+        elif response.HasField("match"):
+            yield self.event(match=response.match)
+        elif response.returncode != NOT_EXIT:
+            if usage is not None:
+                yield self.event(usage=usage)
+            yield self.event(
+                exit=command_pb2.ExitStatus(
+                    returncode=response.returncode,
+                    error=response.stderr
+                    or response.stderr_bytes.decode("utf-8", errors="replace"),
+                    dropped_bytes=response.dropped_bytes,
+                    coalesced_bytes=response.coalesced_bytes,
+                )
+            )
+        else:
+            # 文本输出也以原始字节发送（StreamEnd.raw），由客户端解码
+            for src, data in (
+                (command_pb2.STDOUT, response.stdout_bytes),
+                (command_pb2.STDERR, response.stderr_bytes),
+            ):
+                if data:
+                    yield self.event(data=command_pb2.DataChunk(src=src, data=data))
@@ -0,0 +1,131 @@
+import time
+from concurrent import futures
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import grpc
+
+from proto import command_pb2
+from src.pool import ChannelPool, default_pool
+
+# 同时执行的主机数
+DEFAULT_FANOUT_PARALLEL = 16
+# 每台主机的超时（秒），同时作为服务端的命令超时
+DEFAULT_HOST_TIMEOUT = 60.0
+
+
+class HostResult:
+    """outcome of a command on one host of a fan-out"""
+
+    def __init__(
+        self,
+        addr_port: str,
+        returncode: int,
+        stdout: str,
+        stderr: str,
+        latency: float,
+        code: grpc.StatusCode = grpc.StatusCode.OK,
+    ):
+        """
+        :param latency: seconds from sending the request to the response
+        :param code: status of the rpc; on failure returncode is -1 and
+            stderr holds the error
+        """
+        self.addr_port = addr_port
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.latency = latency
+        self.code = code
+
+    @property
+    def ok(self) -> bool:
+        """the rpc succeeded and the command exited with 0"""
+        return self.code == grpc.StatusCode.OK and self.returncode == 0
+
+    def __repr__(self) -> str:
+        return (
+            f"HostResult({self.addr_port!r}, returncode={self.returncode}, "
+            f"code={self.code.name}, latency={self.latency:.3f})"
+        )
+
+
+def fanout_request(command: str, timeout: float) -> command_pb2.CommandRequest:
+    # 服务端在客户端的 deadline 之前结束命令，返回 "Command timed out"
+    return command_pb2.CommandRequest(command=command, timeout_ms=int(timeout * 1000))
+
+
+def error_result(addr_port: str, e: grpc.RpcError, latency: float) -> HostResult:
+    return HostResult(addr_port, -1, "", e.details() or str(e), latency, e.code())
+
+
+def _execute_on(
+    pool: ChannelPool, addr_port: str, command: str, timeout: float
+) -> HostResult:
+    start = time.perf_counter()
+    try:
+        with pool.lease(addr_port) as pooled:
+            response = pooled.stub.Execute(
+                fanout_request(command, timeout), timeout=timeout + 1
+            )
+    except grpc.RpcError as e:
+        return error_result(addr_port, e, time.perf_counter() - start)
+    return HostResult(
+        addr_port,
+        response.returncode,
+        response.stdout,
+        response.stderr,
+        time.perf_counter() - start,
+    )
+
+
+def rpc_fanout(
+    command: str,
+    addr_ports: Sequence[str],
+    max_parallel: int = DEFAULT_FANOUT_PARALLEL,
+    timeout: float = DEFAULT_HOST_TIMEOUT,
+    pool: Optional[ChannelPool] = None,
+) -> Iterator[HostResult]:
+    """
+    run command on every host, at most max_parallel at a time, and yield
+    the results in completion order. a host that cannot be reached or times
+    out yields a failed HostResult instead of raising. closing the iterator
+    early cancels the hosts that have not started yet.
+    :param command: bash command
+    :param addr_ports: eg. ["192.168.1.11:50051", "192.168.1.12:50051"]
+    :param max_parallel: hosts running the command at the same time
+    :param timeout: seconds per host
+    :param pool: channels to reuse, defaults to default_pool()
+    """
+    pool = pool if pool is not None else default_pool()
+    executor = futures.ThreadPoolExecutor(
+        max_workers=max(1, min(max_parallel, len(addr_ports)))
+    )
+    try:
+        pending = [
+            executor.submit(_execute_on, pool, addr_port, command, timeout)
+            for addr_port in addr_ports
+        ]
+        for future in futures.as_completed(pending):
+            yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def fanout_summary(results: Sequence[HostResult]) -> Dict[str, float]:
+    """host counts and latency percentiles (seconds) of a fan-out"""
+    latencies = [r.latency for r in results]
+    return {
+        "hosts": len(results),
+        "ok": sum(r.ok for r in results),
+        "failed": sum(not r.ok for r in results),
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies, default=0.0),
+    }
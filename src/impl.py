@@ -1,44 +1,100 @@
+import functools
 import multiprocessing
 import os
 import platform
-import queue
-import select
 import signal
 import subprocess
 import time
-from threading import Thread
-from typing import List, TextIO
+from concurrent import futures
+from contextlib import nullcontext
+from threading import Event, Timer
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 
 import grpc
 from loguru import logger
 
 from proto import command_pb2, command_pb2_grpc
-
-
-NOT_EXIT = 65537
+from src.backpressure import (
+    DEFAULT_BUFFER_BYTES,
+    BufferedStream,
+    ResponseBuffer,
+    buffered_request,
+)
+from src.cache import ResultCache, cache_key
+from src.events import EventSequence, resource_usage
+from src.client import (  # noqa: F401  客户端的名字仍可从 src.impl 导入
+    NOT_EXIT,
+    RpcClient,
+    RpcJob,
+    RpcSession,
+    RpcStreamThread,
+    _execute,
+    batch_request,
+    response_output,
+    rpc,
+    rpc_batch,
+    rpc_bg,
+    rpc_echo_test,
+    rpc_pull,
+    rpc_push,
+    wait_rpc_ready,
+)
+from src.jobs import JobError, JobManager, job_chunks, read_output, spooled_output
+from src.metrics import ServerMetrics
+from src.pushdown import LineFilter
+from src.scheduler import EXECUTE, STREAM, Scheduler, SchedulerFull
+from src.session import SessionError, SessionLimitError, SessionManager
+from src.streaming import DEFAULT_FLUSH_INTERVAL, RAW_ERRORS, OutputPump, wait_usage
+from src.transfer import TransferError, file_chunks, file_status, receive_file
+
+# Execute / ExecuteBatch 默认的命令超时（秒）
+DEFAULT_TIMEOUT = 60
+# ExecuteBatch 并行执行时默认的最大并发数
+DEFAULT_MAX_PARALLEL = 8
+# 结束进程组时 SIGINT 与 SIGKILL 之间的等待时间（秒）
+TERMINATE_GRACE = 3.0
 
 
 class PipedRpcStreamProcess(multiprocessing.Process):
-    def __init__(self, command: str, addr_port: str, *args, **kwargs):
+    def __init__(
+        self,
+        command: str,
+        addr_port: str,
+        *args,
+        chunk_size: int = 0,
+        flush_interval_ms: int = 0,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         self.command = command
         self.addr_ip = addr_port
+        self.chunk_size = chunk_size
+        self.flush_interval_ms = flush_interval_ms
         self.msgQ = multiprocessing.Queue()
 
         self.oK = multiprocessing.Event()
 
     def run(self):
+        # 子进程中不能复用父进程的 grpc channel，这里单独建立连接
         with grpc.insecure_channel(self.addr_ip) as channel:
             stub = command_pb2_grpc.CommandStub(channel)
-            response = stub.ExecuteStream(
-                command_pb2.CommandRequest(command=self.command)
+            # ExecuteEvents 在行模式下也以 ExitStatus 结束，returncode 总是命令的退出码
+            events = stub.ExecuteEvents(
+                command_pb2.CommandRequest(
+                    command=self.command,
+                    chunk_size=self.chunk_size,
+                    flush_interval_ms=self.flush_interval_ms,
+                )
             )
-            returncode = 0
-            for stream in response:
-                returncode = stream.returncode
-                self.msgQ.put(stream.stdout)
-                if stream.stderr != None and stream.stderr != "":
-                    self.msgQ.put(stream.stderr)
+            returncode = -1
+            for event in events:
+                kind = event.WhichOneof("event")
+                if kind == "data":
+                    self.msgQ.put(event.data.data.decode("utf-8", errors="replace"))
+                elif kind == "exit":
+                    returncode = event.exit.returncode
+                    if event.exit.error:
+                        self.msgQ.put(event.exit.error)
             self.msgQ.put(f"returncode: {returncode}")
             self.oK.set()
 
@@ -55,94 +111,6 @@ class PipedRpcStreamProcess(multiprocessing.Process):
         return self.oK.is_set()
 
 
-@logger.catch
-def rpc(command: str, addr_port: str = "localhost:50051") -> tuple[int, str, str]:
-    """
-    blocking execution
-    :param command: bash command. notice that shell's builtin command is not supported
-    :param addr_port: eg. "192.168.1.1:50051"
-    :return: tuple[returncode: int, stdout: str, stderr: str]
-    """
-    with grpc.insecure_channel(addr_port) as channel:
-        stub = command_pb2_grpc.CommandStub(channel)
-        response = stub.Execute(command_pb2.CommandRequest(command=command))
-        print(
-            f"Greeter client received: \n{response.returncode} \n{response.stdout} \n{response.stderr}"
-        )
-        return response.returncode, response.stdout, response.stderr
-
-
-@logger.catch
-def rpc_bg(command: str, addr_port: str = "localhost:50051"):
-    """
-    unblocking execution
-    :param command: bash command. notice that shell's builtin command is not supported
-    :param addr_port: eg. "192.168.1.1:50051"
-    :return: PipedRpcStreamProcess
-    """
-    p = PipedRpcStreamProcess(command=command, addr_port=addr_port)
-    p.start()
-    return p
-
-
-def wait_rpc_ready(channel, timeout=10):
-    """
-    等待 gRPC 服务器就绪（带超时）
-    :param channel: grpc.Channel
-    :param timeout: 超时时间（秒）
-    :return: True 如果服务器就绪，False 如果超时
-    """
-    try:
-        grpc.channel_ready_future(channel).result(timeout=timeout)
-        return True
-    except grpc.FutureTimeoutError:
-        logger.info("gRPC 服务器连接超时（{timeout}秒）")
-        return False
-    except Exception:
-        logger.info("gRPC 服务器连接失败: {str(e)}")
-        return False
-
-
-def rpc_echo_test(addr_port, timeout=10):
-    """
-    创建 gRPC 客户端并检查服务器是否就绪
-    :param server_address: 服务器地址（如 "localhost:50051"）
-    :param timeout: 超时时间（秒）
-    :return: True 或 False 如果连接失败
-    """
-    try:
-        channel = grpc.insecure_channel(addr_port)
-        if not wait_rpc_ready(channel, timeout):
-            return False
-        stub = command_pb2_grpc.CommandStub(channel)
-        try:
-            response = stub.Execute(
-                command_pb2.CommandRequest(command="echo $USER"), timeout=2
-            )
-            if response.returncode == 0:
-                logger.info(f"rpc USER: {response.stdout.strip()}")
-                if response.stdout.strip() == "smtbf":
-                    return True
-                elif response.stdout.strip() == "fanyx":
-                    return True
-                elif response.stdout.strip() == "fanyuxin":
-                    return True
-                elif response.stdout.strip() == "bytedance":
-                    return True
-                else:
-                    logger.warning(f"rpc USER: {response.stdout.strip()}")
-                    return True
-            else:
-                logger.error(f"rpc returncode: {response.returncode}")
-            return False
-        except grpc.RpcError as e:
-            logger.info(f"gRPC 服务器未响应: {str(e)}")
-            return False
-    except Exception as e:
-        logger.info(f"gRPC 客户端创建失败: {str(e)}")
-        return False
-
-
 def get_system():
     system = platform.system().lower()
     machine = platform.machine().lower()
@@ -155,32 +123,211 @@ def get_system():
         return "unknown"
 
 
-def popen(command):
+def shell_args(command: str) -> List[str]:
+    """argv running command in bash with unbuffered stdout/stderr"""
+    if get_system() == "macos":
+        return ["bash", "-c", f"gstdbuf -o0 -e0 {command}"]
+    return ["bash", "-c", f"stdbuf -o0 -e0 {command}"]
+
+
+def popen(command, text: bool = True):
     process = subprocess.Popen(
-        ["bash", "-c", f"gstdbuf -o0 -e0 {command}"]
-        if get_system() == "macos"
-        else ["bash", "-c", f"stdbuf -o0 -e0 {command}"],
+        shell_args(command),
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
-        preexec_fn=os.setsid,
-        text=True,
+        start_new_session=True,
+        text=text,
         shell=False,
         env=os.environ,
     )
     return process
 
 
-class Commander(command_pb2_grpc.CommandServicer):
-    def Execute(self, request, context):
-        command = request.command
-        timeout = 60
-        returncode = -1
-        stdout = ""
+def terminate_group(process: subprocess.Popen):
+    """
+    SIGINT 整个进程组，让 ffmpeg 等程序正常收尾；
+    TERMINATE_GRACE 秒后主进程仍未退出（例如 bash 忽略了 SIGINT）则 SIGKILL
+    """
+    try:
+        os.killpg(process.pid, signal.SIGINT)
+    except ProcessLookupError:
+        return
+
+    def escalate():
+        if process.poll() is None:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    timer = Timer(TERMINATE_GRACE, escalate)
+    timer.daemon = True
+    timer.start()
+
+
+def terminate_on_cancel(process: subprocess.Popen, pump: OutputPump):
+    """
+    grpc context 回调：RPC 结束时唤醒 OutputPump，若子进程仍在运行则结束整个进程组。
+    客户端断开时 grpc 可能不再驱动响应生成器，所以不能只在生成器中检查。
+    """
+    pump.cancel()
+    if process.poll() is None:
+        logger.info("context is not active, terminating process")
+        terminate_group(process)
+
+
+def command_timeout(request) -> float:
+    """timeout of a CommandRequest in seconds"""
+    return request.timeout_ms / 1000 if request.timeout_ms else DEFAULT_TIMEOUT
+
+
+def command_response(
+    request, returncode: int, stdout: bytes, stderr: bytes
+) -> command_pb2.CommandResponse:
+    """
+    binary 请求原样返回字节，否则按 utf-8 解码（非法字节替换为 U+FFFD）
+    """
+    if request.binary:
+        return command_pb2.CommandResponse(
+            returncode=returncode, stdout_bytes=stdout, stderr_bytes=stderr
+        )
+    return command_pb2.CommandResponse(
+        returncode=returncode,
+        stdout=stdout.decode("utf-8", errors="replace"),
+        stderr=stderr.decode("utf-8", errors="replace"),
+    )
+
+
+def stream_response(
+    request, src: str, data, raw: bool = False
+) -> command_pb2.CommandResponse:
+    """
+    one NOT_EXIT message of ExecuteStream carrying data of src
+    :param raw: text decoded with RAW_ERRORS, sent as its original bytes
+    """
+    if raw and isinstance(data, str):
+        data = data.encode("utf-8", RAW_ERRORS)
+    field = f"{src}_bytes" if request.binary or raw else src
+    return command_pb2.CommandResponse(returncode=NOT_EXIT, **{field: data})
+
+
+def match_response(index: int, lines: List[Optional[str]], raw: bool = False):
+    """NOT_EXIT message of ExecuteStream reporting a completed watch"""
+    if raw:
+        # string 字段不接受代理字符：非法字节在这里才替换为 U+FFFD
+        lines = [
+            (
+                line.encode("utf-8", RAW_ERRORS).decode("utf-8", errors="replace")
+                if line is not None
+                else line
+            )
+            for line in lines
+        ]
+    return command_pb2.CommandResponse(
+        returncode=NOT_EXIT,
+        match=command_pb2.MatchEvent(watch=index, lines=lines),
+    )
+
+
+def stream_responses(
+    request,
+    line_filter: Optional[LineFilter],
+    output: Iterable[Tuple[str, Union[str, bytes]]],
+    raw: bool = False,
+) -> Iterator[command_pb2.CommandResponse]:
+    """
+    ExecuteStream messages of (src, data) output, filtered by line_filter;
+    stops after the MatchEvents of the line that finished all watches
+    :param raw: see stream_response()
+    """
+    if line_filter is None:
+        for src, data in output:
+            yield stream_response(request, src, data, raw)
+        return
+    for src, data in output:
+        send, completed = line_filter.feed(data)  # type: ignore
+        if send:
+            yield stream_response(request, src, data, raw)
+        for index in completed:
+            yield match_response(index, line_filter.watches[index].matched_lines, raw)
+        if line_filter.finished:
+            return
+
+
+class StreamEnd:
+    """how the command of an ExecuteStream ended, for its final message"""
+
+    def __init__(self, final: bool = False, raw: bool = False):
+        """
+        :param final: send the final message in line mode too (ExecuteEvents),
+            not only for chunk/binary/buffered streams
+        :param raw: send text output as its original bytes in the *_bytes
+            fields (ExecuteEvents), see stream_response()
+        """
+        self.final = final
+        self.raw = raw
+        self.returncode = -1
+        self.stderr = ""
+        # 客户端断开或所有 watch 已完成：不发送结束消息
+        self.cancelled = False
+        # 命令退出后的 ResourceUsage，见 events.py
+        self.usage: Optional[command_pb2.ResourceUsage] = None
+
+    def response(self, request) -> Optional[command_pb2.CommandResponse]:
+        if self.cancelled:
+            return None
+        return command_response(request, self.returncode, b"", self.stderr.encode())
+
+    @property
+    def errors(self) -> str:
+        """decode error handler of the text output"""
+        return RAW_ERRORS if self.raw else "replace"
+
+
+def set_compression(request, context):
+    """compress the responses of this call as the client asked"""
+    if request.compression:
+        context.set_compression(grpc.Compression(request.compression))
+
+
+def run_command(
+    request,
+    sessions: Optional[SessionManager] = None,
+    scheduler: Optional[Scheduler] = None,
+    metrics: Optional[ServerMetrics] = None,
+) -> command_pb2.CommandResponse:
+    """
+    阻塞执行 request.command，供 Execute / ExecuteBatch 使用
+    :param request: CommandRequest，timeout_ms 为 0 时超时为 DEFAULT_TIMEOUT
+    :param sessions: request.session_id 非空时在该会话的 shell 中执行
+    :param scheduler: 启动子进程前等待 EXECUTE slot（会话命令不启动子进程）
+    :param metrics: 记录启动子进程的耗时与超时次数
+    :raise SchedulerFull: 没有空闲的 slot
+    """
+    command = request.command
+    timeout = command_timeout(request)
+    if request.session_id:
         try:
-            process = popen(command)
+            returncode, stdout, stderr = sessions.run(  # type: ignore
+                request.session_id, command, timeout
+            )
+        except SessionError as e:
+            returncode, stdout, stderr = -1, b"", str(e).encode()
+        return command_response(request, returncode, stdout, stderr)
+
+    returncode = -1
+    stdout = b""
+    with scheduler.slot(EXECUTE) if scheduler is not None else nullcontext():
+        try:
+            start = time.perf_counter()
+            process = popen(command, text=False)
+            if metrics is not None:
+                metrics.spawned(EXECUTE, time.perf_counter() - start)
             stdout, stderr = process.communicate(timeout=timeout)
             returncode = process.returncode
         except subprocess.TimeoutExpired:
+            if metrics is not None:
+                metrics.timed_out(EXECUTE)
             try:
                 process  # type: ignore
             except NameError:
@@ -188,163 +335,401 @@ class Commander(command_pb2_grpc.CommandServicer):
             else:
                 process.kill()  # type: ignore
             finally:
-                stderr = f"Command timed out after {timeout} seconds"
+                stderr = f"Command timed out after {timeout:g} seconds".encode()
         except Exception as e:
-            stderr = f"Command execution failed: {str(e)}"
+            stderr = f"Command execution failed: {str(e)}".encode()
 
-        return command_pb2.CommandResponse(
-            returncode=returncode, stdout=stdout, stderr=stderr
+    return command_response(request, returncode, stdout, stderr)
+
+
+def run_batch_command(
+    request,
+    sessions: Optional[SessionManager] = None,
+    scheduler: Optional[Scheduler] = None,
+    metrics: Optional[ServerMetrics] = None,
+) -> command_pb2.CommandResponse:
+    """run_command for ExecuteBatch: a rejected command fails on its own"""
+    try:
+        return run_command(request, sessions, scheduler, metrics)
+    except SchedulerFull as e:
+        return command_response(request, -1, b"", str(e).encode())
+
+
+def run_cached(
+    request,
+    sessions: Optional[SessionManager] = None,
+    cache: Optional[ResultCache] = None,
+    scheduler: Optional[Scheduler] = None,
+    metrics: Optional[ServerMetrics] = None,
+) -> command_pb2.CommandResponse:
+    """
+    run_command, reusing the result of an identical command when the request
+    has cache_ttl_ms; concurrent identical requests run the command once
+    :raise SchedulerFull: see run_command
+    """
+    run = functools.partial(
+        run_command, sessions=sessions, scheduler=scheduler, metrics=metrics
+    )
+    key = cache_key(request) if cache is not None else None
+    if key is None:
+        return run(request)
+    response, future, leader = cache.claim(  # type: ignore
+        key, request.cache_ttl_ms / 1000
+    )
+    if response is not None:
+        return response
+    if not leader:
+        response = future.result()  # type: ignore
+        # 执行命令的请求失败时自己执行
+        return response if response is not None else run(request)
+    try:
+        response = run(request)
+    finally:
+        cache.finish(key, future, response)  # type: ignore
+    return response
+
+
+class Commander(command_pb2_grpc.CommandServicer):
+    def __init__(
+        self,
+        sessions: Optional[SessionManager] = None,
+        cache: Optional[ResultCache] = None,
+        scheduler: Optional[Scheduler] = None,
+        metrics: Optional[ServerMetrics] = None,
+        log_lines: bool = False,
+        jobs: Optional[JobManager] = None,
+    ):
+        """
+        :param sessions: shell sessions for OpenSession / session_id requests
+        :param cache: results of Execute requests with cache_ttl_ms
+        :param scheduler: limits the commands running at the same time
+        :param metrics: instrumentation of Execute / ExecuteBatch / ExecuteStream
+        :param log_lines: logger.debug every message of ExecuteStream, off by
+            default because it costs more than streaming the line
+        :param jobs: background jobs of StartJob / AttachJob
+        """
+        self.sessions = sessions if sessions is not None else SessionManager()
+        self.cache = cache if cache is not None else ResultCache()
+        self.scheduler = scheduler if scheduler is not None else Scheduler()
+        self.jobs = jobs if jobs is not None else JobManager()
+        if self.jobs.scheduler is None:
+            # StartJob 和 spool 请求的子进程同样受调度器的限制
+            self.jobs.scheduler = self.scheduler
+        self.metrics = metrics if metrics is not None else ServerMetrics()
+        self.metrics.track(self.scheduler, self.cache)
+        self.log_lines = log_lines
+
+    def Execute(self, request, context):
+        with self.metrics.call("Execute") as call:
+            set_compression(request, context)
+            try:
+                return run_cached(
+                    request, self.sessions, self.cache, self.scheduler, self.metrics
+                )
+            except SchedulerFull as e:
+                call.code = grpc.StatusCode.RESOURCE_EXHAUSTED
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+
+    def ExecuteBatch(self, request, context):
+        """
+        在一次 RPC 中执行多条命令，结果与 request.commands 一一对应。
+        parallel 为 True 时最多 max_parallel 条命令同时执行。
+        """
+        commands = list(request.commands)
+        run = functools.partial(
+            run_batch_command,
+            sessions=self.sessions,
+            scheduler=self.scheduler,
+            metrics=self.metrics,
         )
+        with self.metrics.call("ExecuteBatch"):
+            if not request.parallel or len(commands) <= 1:
+                results = [run(command) for command in commands]
+            else:
+                workers = min(
+                    len(commands), request.max_parallel or DEFAULT_MAX_PARALLEL
+                )
+                with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(run, commands))
+            return command_pb2.BatchResponse(results=results)
+
+    def OpenSession(self, request, context):
+        """
+        启动一个常驻 shell，之后带 session_id 的 Execute 在其中执行，
+        省去每条命令启动 bash + stdbuf 的开销，cwd 与环境变量在命令间保留
+        """
+        try:
+            session = self.sessions.open(request.cwd, dict(request.env))
+        except SessionLimitError as e:
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+        except OSError as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        return command_pb2.SessionResponse(session_id=session.id)
+
+    def CloseSession(self, request, context):
+        closed = self.sessions.close(request.session_id)
+        return command_pb2.SessionResponse(session_id=request.session_id, closed=closed)
+
+    def PushFile(self, request_iterator, context):
+        """
+        按块接收客户端上传的文件，逐块校验 crc32；
+        第一块的 offset 非 0 时从该位置续传
+        """
+        try:
+            return receive_file(request_iterator)
+        except TransferError as e:
+            context.abort(e.code, str(e))
+
+    def PullFile(self, request, context):
+        """
+        从 request.offset 开始按块发送文件，不经过 shell，也不受单条消息 4 MB 的限制
+        """
+        try:
+            yield from file_chunks(request.path, request.offset, request.chunk_size)
+        except TransferError as e:
+            context.abort(e.code, str(e))
+
+    def StatFile(self, request, context):
+        try:
+            return file_status(request.path)
+        except TransferError as e:
+            context.abort(e.code, str(e))
+
+    def StartJob(self, request, context):
+        """
+        启动一个与本次 RPC 无关的后台任务，输出写入服务端的 spool，
+        之后用 AttachJob 从任意 offset 读取，客户端重启后也可以重新连接
+        """
+        try:
+            job = self.jobs.start(
+                request.command, shell_args(request.command), request.spool_bytes
+            )
+        except JobError as e:
+            context.abort(e.code, str(e))
+        return job.info()
+
+    def AttachJob(self, request, context):
+        """
+        从 request.offset 读取任务输出，follow 时等待新输出直到任务结束；
+        最后一条消息携带 JobInfo。断开连接不影响任务
+        """
+        cancelled = Event()
+        try:
+            job = self.jobs.get(request.job_id)
+            context.add_callback(cancelled.set)
+            yield from job_chunks(job, request, cancelled)
+        except JobError as e:
+            context.abort(e.code, str(e))
+
+    def JobStatus(self, request, context):
+        try:
+            return self.jobs.get(request.job_id).info()
+        except JobError as e:
+            context.abort(e.code, str(e))
+
+    def CancelJob(self, request, context):
+        try:
+            return self.jobs.cancel(request.job_id).info()
+        except JobError as e:
+            context.abort(e.code, str(e))
+
+    def ReadOutput(self, request, context):
+        """
+        读取任务输出的任意区间（request.line 时从该行开始），
+        数据直接从 spool 文件中 pread，不等待新输出
+        """
+        try:
+            return read_output(self.jobs.get(request.job_id), request)
+        except JobError as e:
+            context.abort(e.code, str(e))
 
     def ExecuteStream(self, request, context):
         """
         执行命令并流式返回输出（stdout/stderr）。
 
+        子进程输出、子进程退出和客户端断开都通过 OutputPump 的 selector 事件
+        唤醒，不再轮询。chunk_size 为 0 时逐行返回，否则按字节块返回；
+        binary 请求总是按字节块返回原始字节。
+        行模式下 include/exclude/sample_every/watches 在服务端过滤行，
+        watch 完成时发送 MatchEvent，stop_on_match 时随后结束命令。
+        spool 请求见 _spooled_stream()。
+        backpressure/buffer_bytes 请求经有界缓冲发送，客户端缓慢时按策略丢弃输出，
+        子进程不再阻塞，见 backpressure.py。
+
         Args:
-            command: 要执行的命令（str）
+            request: CommandRequest
             context: gRPC 上下文（ServicerContext）
-            timeout: select 超时时间（秒）
 
         Yields:
             CommandResponse: 流式响应的 Protobuf 消息
         """
+        with self.metrics.call("ExecuteStream") as call:
+            yield from self._execute_stream(request, context, call)
+
+    def ExecuteEvents(self, request, context):
+        """
+        与 ExecuteStream 相同的命令执行与请求字段，消息是带 seq 和服务端时间的
+        StreamEvent（输出、MatchEvent、job_id），未被取消的流总是以
+        ResourceUsage 和 ExitStatus 结束，行模式也是。见 events.py
+        """
+        with self.metrics.call("ExecuteEvents") as call:
+            end = StreamEnd(final=True, raw=True)
+            sequence = EventSequence()
+            # 计数的是实际发送的 StreamEvent，而不是内部的 ExecuteStream 消息
+            for response in self._execute_stream(
+                request, context, call.uncounted(), end
+            ):
+                for event in sequence.events(response, end.usage):
+                    call.sent(event)
+                    yield event
+
+    def _execute_stream(self, request, context, call, end: Optional[StreamEnd] = None):
+        end = end if end is not None else StreamEnd()
+        flush_interval = (
+            request.flush_interval_ms / 1000
+            if request.flush_interval_ms
+            else DEFAULT_FLUSH_INTERVAL
+        )
+        try:
+            line_filter = LineFilter.from_request(request)
+        except ValueError as e:
+            call.code = grpc.StatusCode.INVALID_ARGUMENT
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        set_compression(request, context)
+        if request.spool:
+            yield from self._spooled_stream(
+                request, context, call, line_filter, flush_interval, end
+            )
+            return
+        try:
+            self.scheduler.acquire(STREAM)
+        except SchedulerFull as e:
+            call.code = grpc.StatusCode.RESOURCE_EXHAUSTED
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+        responses = self._command_output(
+            request, context, call, line_filter, flush_interval, end
+        )
+        if buffered_request(request):
+            # 子进程的输出由单独的线程读入有界缓冲，客户端缓慢时按策略丢弃，
+            # 结束消息总是发送（行模式也是），并报告丢弃的字节数
+            responses = BufferedStream(
+                responses,
+                ResponseBuffer(
+                    request.backpressure, request.buffer_bytes or DEFAULT_BUFFER_BYTES
+                ),
+                lambda: end.response(request),
+                context.cancel,
+            )
+            if not context.add_callback(responses.close):
+                responses.close()
+        for response in responses:
+            call.sent(response)
+            if self.log_lines:
+                logger.debug(f"`{request.command}`: {response}")
+            yield response
+        if buffered_request(request):
+            return
+        # 行模式的 ExecuteStream 保持原有协议：不发送带 returncode 的结束消息
+        if (request.chunk_size or request.binary or end.final) and context.is_active():
+            response = end.response(request)
+            if response is not None:
+                call.sent(response)
+                yield response
+
+    def _command_output(
+        self, request, context, call, line_filter, flush_interval, end: "StreamEnd"
+    ):
+        """
+        run the command (the STREAM slot is already taken) and yield its
+        output messages; returncode and errors are left in end
+        """
         command = request.command
-        timeout = 60
-        returncode = -1
-        stdout = ""
-        stderr = ""
+        timeout = DEFAULT_TIMEOUT
+        process = None
+        # 客户端断开后 grpc 可能不再驱动生成器，slot 也在 RPC 结束的回调中释放
+        release = self.scheduler.releaser(STREAM)
         try:
             logger.debug(f"popen: {command}")
+            start = time.perf_counter()
             process = popen(command)
-            while True:
-                logger.debug("checking context.is_active()")
-                # 检测客户端是否断开
-                if not context.is_active():
-                    logger.info("context is not active, terminating process")
-                    os.killpg(os.getpgid(process.pid), signal.SIGINT)
-                    break
-
-                logger.debug("selecting readable streams")
-                # select 监听可读流
-                rx_io_list: List[TextIO]  # type hint
-                rx_io_list, _, _ = select.select(
-                    [process.stdout, process.stderr], [], [], 0.1
-                )
-
-                logger.debug("checking process.poll()")
-                if process.poll() is not None:
-                    logger.debug("poll is not None, process had terminated")
-                    for rx_io in rx_io_list:
-                        if not rx_io:
-                            continue
-                        src: str = "stdout" if rx_io is process.stdout else "stderr"
-                        while True:
-                            logger.debug(f"reading line from {src}")
-                            line: str = rx_io.readline()
-                            logger.debug(f"line: {line}")
-
-                            if not line:  # b'' is EOF, meet EOF
-                                logger.debug("read an EOF, break")
-                                break
-
-                            if context.is_active():
-                                logger.debug("context is active, yielding response")
-                                response: command_pb2.CommandResponse = (
-                                    command_pb2.CommandResponse(
-                                        returncode=NOT_EXIT,
-                                        stdout=line if src == "stdout" else "",
-                                        stderr=line if src == "stderr" else "",
-                                    )
-                                )
-                                yield response
-                            else:
-                                logger.info("context is not active, skip yield")
-                                continue
-                    break
-                logger.debug("checking rd_io_list")
-                if not rx_io_list:
-                    logger.debug(f"not readable: {rx_io_list}")
-                    continue
-
-                logger.debug("readable streams found, reading lines")
-                for rx_io in rx_io_list:
-                    if not rx_io:
-                        logger.warning("invalid rx_io, skipping")
-                        continue
-                    src: str = "stdout" if rx_io is process.stdout else "stderr"
-                    logger.debug(f"reading line from {src}")
-                    line: str = rx_io.readline()
-                    logger.debug(f"line: {line}")
-
-                    if not line:  # b'' is EOF, meet EOF
-                        logger.debug("read an EOF, break")
-                        continue
-
-                    if context.is_active():
-                        logger.debug("context is active, yielding response")
-                        response: command_pb2.CommandResponse = (
-                            command_pb2.CommandResponse(
-                                returncode=NOT_EXIT,
-                                stdout=line if src == "stdout" else "",
-                                stderr=line if src == "stderr" else "",
-                            )
-                        )
-                        yield response
-                    else:
-                        logger.info("context is not active, skip yield")
-                        continue
-            stdout, stderr = process.communicate(timeout=timeout)
-            returncode: int = process.returncode
+            self.metrics.spawned(STREAM, time.perf_counter() - start)
+            pump = OutputPump(
+                process, request.chunk_size, flush_interval, request.binary, end.errors
+            )
 
+            def on_done():
+                terminate_on_cancel(process, pump)
+                release()
+
+            if not context.add_callback(on_done):
+                on_done()
+            for response in stream_responses(request, line_filter, pump, end.raw):
+                yield response
+            if line_filter is not None and line_filter.finished:
+                logger.debug(f"all watches matched, terminating `{command}`")
+                pump.cancel()
+                terminate_group(process)
+                end.cancelled = True
+                return
+            if pump.cancelled:
+                call.code = grpc.StatusCode.CANCELLED
+                end.cancelled = True
+                return
+            end.returncode, rusage = wait_usage(process, timeout)
+            end.usage = resource_usage(time.perf_counter() - start, rusage)
         except subprocess.TimeoutExpired:
-            logger.debug("TimeoutExpired")
-            try:
-                process  # type: ignore
-            except NameError:
-                logger.debug("NameError")
-                pass
-            else:
-                logger.debug("process.kill")
-                process.kill()  # type: ignore
-            finally:
-                logger.debug("finally")
-                stderr = f"Command timed out after {timeout} seconds"
+            process.kill()  # type: ignore
+            self.metrics.timed_out(STREAM)
+            end.stderr = f"Command timed out after {timeout} seconds"
         except Exception as e:
             logger.debug(f"exception {str(e)}")
-            stderr = f"Command execution failed: {str(e)}"
-
-        if context.is_active():
-            command_pb2.CommandResponse(
-                returncode=returncode, stdout=stdout, stderr=stderr
-            )
-            logger.debug("context is active, yielding final response")
-            yield
+            end.stderr = f"Command execution failed: {str(e)}"
+        finally:
+            release()
 
-    pass
-
-
-if __name__ == "__main__":
-    assert rpc_echo_test("localhost:50051", timeout=2)
-    ret = rpc("ls -la $HOME")
-    p = rpc_bg("sleep 2; echo finished", "localhost:50051")
-
-    q = p.msgq()
-
-    def work():
-        while True:
-            if not p.is_alive():
-                logger.debug("p not alive")
-                break
-            if p.ok():
-                logger.debug("p is ok")
-                break
-            try:
-                msg = q.get(timeout=1)
-                print(f"Received: {msg.strip()}")
-            except queue.Empty:
-                continue
-
-    Thread(target=work).start()
-    time.sleep(3)
-    p.stop()
-    time.sleep(3)
+    def _spooled_stream(
+        self, request, context, call, line_filter, flush_interval, end: StreamEnd
+    ):
+        """
+        命令作为后台任务运行，输出经 spool 发送：客户端读取缓慢时子进程不会因
+        管道写满而阻塞，输出留在磁盘上。第一条消息携带 job_id，断开后可用
+        ReadOutput / AttachJob 继续读取；断开连接不结束命令（stop_on_match 除外）。
+        stderr 并入 stdout。任务运行期间占用一个 STREAM slot，
+        调度器已满时以 RESOURCE_EXHAUSTED 拒绝
+        """
+        try:
+            job = self.jobs.start(request.command, shell_args(request.command))
+        except JobError as e:
+            call.code = e.code
+            context.abort(e.code, str(e))
+        cancelled = Event()
+        if not context.add_callback(cancelled.set):
+            cancelled.set()
+        response = command_pb2.CommandResponse(returncode=NOT_EXIT, job_id=job.id)
+        call.sent(response)
+        yield response
+        output = spooled_output(
+            job,
+            request.chunk_size,
+            flush_interval,
+            request.binary,
+            cancelled,
+            end.errors,
+        )
+        for response in stream_responses(request, line_filter, output, end.raw):
+            call.sent(response)
+            if self.log_lines:
+                logger.debug(f"`{request.command}`: {response}")
+            yield response
+        if line_filter is not None and line_filter.finished:
+            logger.debug(f"all watches matched, terminating job {job.id}")
+            self.jobs.cancel(job.id)
+            return
+        if cancelled.is_set():
+            call.code = grpc.StatusCode.CANCELLED
+            return
+        if request.chunk_size or request.binary or end.final:
+            end.usage = job.resource_usage()
+            response = command_response(request, job.returncode, b"", b"")
+            call.sent(response)
+            yield response
@@ -0,0 +1,472 @@
+import asyncio
+import os
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import grpc
+from loguru import logger
+
+from proto import command_pb2
+from src.events import resource_usage
+from src.scheduler import STREAM, Scheduler, SchedulerFull
+from src.spool import DEFAULT_SPOOL_BYTES, Spool
+from src.streaming import (
+    DEFAULT_CHUNK_SIZE,
+    ChunkBuffer,
+    flush_buffers,
+    next_deadline,
+    wait_usage,
+)
+
+DEFAULT_MAX_JOBS = 64
+# 结束的任务及其输出保留的时间（秒）
+DEFAULT_KEEP_FINISHED = 3600.0
+DEFAULT_JOB_CHUNK_SIZE = 64 * 1024
+MAX_JOB_CHUNK_SIZE = 3 * 1024 * 1024
+# CancelJob: SIGINT 与 SIGKILL 之间的等待时间（秒）
+DEFAULT_TERMINATE_GRACE = 3.0
+# AttachJob follow 时检查客户端是否断开的间隔（秒）
+WAIT_INTERVAL = 1.0
+READ_SIZE = 64 * 1024
+
+
+def default_spool_dir() -> str:
+    return os.path.join(tempfile.gettempdir(), "rpi-rpc-jobs")
+
+
+class JobError(Exception):
+    """a failed job request, with the grpc status code the server aborts with"""
+
+    def __init__(self, code: grpc.StatusCode, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class Job:
+    """
+    a command running on the server independently of any rpc: its stdout
+    and stderr go (merged, like 2>&1) through a reader thread into a Spool,
+    from which any number of clients read, follow and reattach by offset.
+    """
+
+    def __init__(
+        self,
+        command: str,
+        argv: Sequence[str],
+        spool_dir: str,
+        spool_bytes: int = DEFAULT_SPOOL_BYTES,
+        on_exit: Optional[Callable[[], None]] = None,
+    ):
+        """
+        :param on_exit: called from the reader thread once the process exited,
+            eg. to release its scheduler slot
+        """
+        self.id = uuid.uuid4().hex
+        self.on_exit = on_exit
+        self.command = command
+        self.spool = Spool(os.path.join(spool_dir, self.id), spool_bytes)
+        self.cond = threading.Condition()
+        self.running = True
+        self.returncode = -1
+        self.started = time.time()
+        self.finished = 0.0
+        self.rusage = None
+        # asyncio 等待者，见 wait_async()
+        self.wakers: List[Callable[[], None]] = []
+        try:
+            self.process = subprocess.Popen(
+                argv,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+                env=os.environ,
+            )
+        except OSError:
+            self.spool.close()
+            raise
+        self.reader = threading.Thread(target=self._read, daemon=True)
+        self.reader.start()
+
+    def _read(self):
+        fd = self.process.stdout.fileno()  # type: ignore
+        spool_failed = False
+        try:
+            while True:
+                data = os.read(fd, READ_SIZE)
+                if not data:
+                    break
+                try:
+                    self.spool.append(data)
+                except OSError as e:
+                    # 磁盘写满时丢弃输出但继续读取管道，子进程不会因此阻塞
+                    if not spool_failed:
+                        logger.warning(f"job {self.id}: output dropped: {e}")
+                        spool_failed = True
+                    continue
+                self._notify()
+        except OSError as e:
+            logger.warning(f"job {self.id}: {e}")
+        returncode, rusage = wait_usage(self.process)
+        self.process.stdout.close()  # type: ignore
+        # 先释放 slot：看到 running 为 False 的调用者可以立即启动新的命令
+        if self.on_exit is not None:
+            self.on_exit()
+        with self.cond:
+            self.returncode = returncode
+            self.rusage = rusage
+            self.finished = time.time()
+            self.running = False
+        self._notify()
+        logger.debug(f"job {self.id} exited with {returncode}")
+
+    def _notify(self):
+        with self.cond:
+            self.cond.notify_all()
+            wakers, self.wakers = self.wakers, []
+        for wake in wakers:
+            wake()
+
+    @property
+    def size(self) -> int:
+        return self.spool.size
+
+    def read(self, offset: int, length: int) -> Tuple[int, bytes]:
+        """see Spool.read()"""
+        return self.spool.read(offset, length)
+
+    def wait(self, offset: int, timeout: float) -> bool:
+        """
+        wait until there is output past offset or the job ended
+        :return: False on timeout
+        """
+        with self.cond:
+            return self.cond.wait_for(
+                lambda: self.size > offset or not self.running, timeout
+            )
+
+    async def wait_async(self, offset: int, timeout: float) -> bool:
+        """asyncio version of wait(), woken by the reader thread"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def set_result():
+            if not future.done():
+                future.set_result(None)
+
+        def wake():
+            loop.call_soon_threadsafe(set_result)
+
+        with self.cond:
+            if self.size > offset or not self.running:
+                return True
+            self.wakers.append(wake)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self.cond:
+                if wake in self.wakers:
+                    self.wakers.remove(wake)
+
+    def terminate(self, grace: float = DEFAULT_TERMINATE_GRACE):
+        """SIGINT the process group, SIGKILL it if still running after grace"""
+        if not self.running:
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGINT)
+        except ProcessLookupError:
+            return
+
+        def escalate():
+            if self.process.poll() is None:
+                try:
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+        timer = threading.Timer(grace, escalate)
+        timer.daemon = True
+        timer.start()
+
+    def resource_usage(self) -> command_pb2.ResourceUsage:
+        """usage of the finished job, for the usage event of ExecuteEvents"""
+        return resource_usage(self.finished - self.started, self.rusage)
+
+    def info(self) -> command_pb2.JobInfo:
+        with self.cond:
+            return command_pb2.JobInfo(
+                job_id=self.id,
+                command=self.command,
+                running=self.running,
+                returncode=self.returncode,
+                size=self.size,
+                start_offset=self.spool.start,
+                started_ms=int(self.started * 1000),
+                finished_ms=int(self.finished * 1000),
+            )
+
+    def close(self):
+        """kill the process group and delete the spool"""
+        if self.running:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            self.reader.join(5)
+        self.spool.close()
+
+
+def check_attach(job: Job, request) -> Tuple[int, int]:
+    """
+    :return: (offset, chunk_size) of an AttachRequest
+    :raise JobError: offset past the end of the output
+    """
+    if request.offset > job.size:
+        raise JobError(
+            grpc.StatusCode.OUT_OF_RANGE,
+            f"offset {request.offset} is past the end of the output ({job.size})",
+        )
+    chunk_size = min(request.chunk_size or DEFAULT_JOB_CHUNK_SIZE, MAX_JOB_CHUNK_SIZE)
+    return request.offset, chunk_size
+
+
+def job_chunks(
+    job: Job, request, cancelled: threading.Event
+) -> Iterator[command_pb2.JobChunk]:
+    """
+    AttachJob messages: the output from request.offset, then (with follow)
+    new output until the job ends, then one message with the JobInfo
+    :param cancelled: set when the client went away
+    :raise JobError: see check_attach()
+    """
+    offset, chunk_size = check_attach(job, request)
+    while True:
+        # running 在最后一块输出写入之后才变为 False：读取之前已结束则读到的是全部输出
+        running = job.running
+        offset, data = job.read(offset, chunk_size)
+        if data:
+            yield command_pb2.JobChunk(offset=offset, data=data)
+            offset += len(data)
+            continue
+        if not request.follow or not running or cancelled.is_set():
+            break
+        job.wait(offset, WAIT_INTERVAL)
+    yield command_pb2.JobChunk(offset=offset, info=job.info())
+
+
+def read_output(job: Job, request) -> command_pb2.JobChunk:
+    """
+    ReadOutput: one range of the output of a job, read from its spool with
+    pread(). the JobInfo tells whether more output may follow
+    :raise JobError: offset past the end, or the line was already deleted
+    """
+    offset = request.offset
+    if request.line:
+        try:
+            offset = job.spool.line_offset(request.line)
+        except ValueError as e:
+            raise JobError(grpc.StatusCode.OUT_OF_RANGE, str(e))
+    elif offset > job.size:
+        raise JobError(
+            grpc.StatusCode.OUT_OF_RANGE,
+            f"offset {offset} is past the end of the output ({job.size})",
+        )
+    length = min(request.length or DEFAULT_JOB_CHUNK_SIZE, MAX_JOB_CHUNK_SIZE)
+    info = job.info()
+    offset, data = job.read(offset, length)
+    return command_pb2.JobChunk(offset=offset, data=data, info=info)
+
+
+def spooled_output(
+    job: Job,
+    chunk_size: int,
+    flush_interval: float,
+    binary: bool,
+    cancelled: threading.Event,
+    errors: str = "replace",
+) -> Iterator[Tuple[str, Union[str, bytes]]]:
+    """
+    ExecuteStream output of a spool request, read back from the spool of
+    job: ("stdout", line) or ("stdout", chunk) like OutputPump. the child
+    writes at its own pace; a slow client only falls behind in the spool.
+    ends when the whole output was read after the job ended, or when the
+    client went away (the job keeps running)
+    :param cancelled: set when the client went away
+    """
+    chunk_size = chunk_size or (DEFAULT_CHUNK_SIZE if binary else 0)
+    buffer = ChunkBuffer("stdout", binary, errors)
+    offset = 0
+    while not cancelled.is_set():
+        running = job.running
+        offset, data = job.read(offset, READ_SIZE)
+        if data:
+            buffer.append(data, flush_interval)
+            offset += len(data)
+            yield from flush_buffers([buffer], chunk_size)
+            continue
+        if not running:
+            break
+        timeout = next_deadline([buffer], chunk_size)
+        job.wait(offset, WAIT_INTERVAL if timeout is None else timeout)
+        yield from flush_buffers([buffer], chunk_size)
+    yield from flush_buffers([buffer], chunk_size, True)
+
+
+class JobManager:
+    """
+    server-side table of Job. at most max_jobs are kept: starting one more
+    drops the oldest finished job, or fails if all of them are running.
+    finished jobs and their spools are deleted keep_finished seconds after
+    they ended.
+
+    with a scheduler a running job holds a STREAM slot until its process
+    exits, so jobs count against max_children / max_streams like streams do
+    (max_jobs only bounds the table, finished jobs included): starting a job
+    waits in the stream queue and fails once the scheduler is full.
+    """
+
+    def __init__(
+        self,
+        spool_dir: Optional[str] = None,
+        max_jobs: int = DEFAULT_MAX_JOBS,
+        spool_bytes: int = DEFAULT_SPOOL_BYTES,
+        keep_finished: float = DEFAULT_KEEP_FINISHED,
+        grace: float = DEFAULT_TERMINATE_GRACE,
+        scheduler: Optional[Scheduler] = None,
+    ):
+        """
+        :param spool_dir: directory of the spool files, default
+            $TMPDIR/rpi-rpc-jobs
+        :param spool_bytes: default output kept on disk per job
+        :param grace: CancelJob: seconds between SIGINT and SIGKILL
+        :param scheduler: admission control shared with the commands of the
+            server, None for no limit but max_jobs
+        """
+        self.scheduler = scheduler
+        self.spool_dir = spool_dir or default_spool_dir()
+        self.max_jobs = max_jobs
+        self.spool_bytes = spool_bytes
+        self.keep_finished = keep_finished
+        self.grace = grace
+        self.jobs: Dict[str, Job] = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.reaper: Optional[threading.Thread] = None
+
+    def start(self, command: str, argv: Sequence[str], spool_bytes: int = 0) -> Job:
+        """
+        :param argv: how to run command, eg. impl.shell_args(command)
+        :param spool_bytes: output kept on disk, 0 for the default
+        :raise JobError: max_jobs jobs are running, the scheduler is full, or
+            the command could not be started
+        """
+        self.reap()
+        release = self._acquire()
+        try:
+            job = self._start(command, argv, spool_bytes, release)
+        except BaseException:
+            release()
+            raise
+        logger.debug(f"job {job.id} started: {command}")
+        return job
+
+    def _acquire(self) -> Callable[[], None]:
+        """take a STREAM slot for a new job, return its release()"""
+        if self.scheduler is None:
+            return lambda: None
+        try:
+            self.scheduler.acquire(STREAM)
+        except SchedulerFull as e:
+            raise JobError(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+        return self.scheduler.releaser(STREAM)
+
+    def _start(
+        self,
+        command: str,
+        argv: Sequence[str],
+        spool_bytes: int,
+        release: Callable[[], None],
+    ) -> Job:
+        with self.lock:
+            if len(self.jobs) >= self.max_jobs:
+                finished = [job for job in self.jobs.values() if not job.running]
+                if not finished:
+                    raise JobError(
+                        grpc.StatusCode.RESOURCE_EXHAUSTED,
+                        f"too many jobs ({self.max_jobs} running)",
+                    )
+                oldest = min(finished, key=lambda job: job.finished)
+                del self.jobs[oldest.id]
+                oldest.close()
+            os.makedirs(self.spool_dir, exist_ok=True)
+            try:
+                job = Job(
+                    command,
+                    argv,
+                    self.spool_dir,
+                    spool_bytes or self.spool_bytes,
+                    on_exit=release,
+                )
+            except OSError as e:
+                raise JobError(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+            self.jobs[job.id] = job
+            if self.reaper is None:
+                self.reaper = threading.Thread(target=self._reap_loop, daemon=True)
+                self.reaper.start()
+        return job
+
+    def get(self, job_id: str) -> Job:
+        """
+        :raise JobError: no such job
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            raise JobError(grpc.StatusCode.NOT_FOUND, f"no such job: {job_id}")
+        return job
+
+    def cancel(self, job_id: str) -> Job:
+        """
+        end a running job; its output stays readable until it is reaped
+        :raise JobError: no such job
+        """
+        job = self.get(job_id)
+        job.terminate(self.grace)
+        return job
+
+    def reap(self):
+        """delete jobs that ended more than keep_finished seconds ago"""
+        now = time.time()
+        with self.lock:
+            expired = [
+                job
+                for job in self.jobs.values()
+                if not job.running and now - job.finished > self.keep_finished
+            ]
+            for job in expired:
+                del self.jobs[job.id]
+        for job in expired:
+            job.close()
+
+    def _reap_loop(self):
+        while not self.stopped.wait(max(1.0, min(self.keep_finished / 4, 60.0))):
+            self.reap()
+
+    def shutdown(self):
+        self.stopped.set()
+        with self.lock:
+            jobs = list(self.jobs.values())
+            self.jobs.clear()
+        for job in jobs:
+            job.close()
+
+    def __len__(self) -> int:
+        return len(self.jobs)
@@ -0,0 +1,42 @@
+import functools
+from typing import Callable
+
+
+class _LazyLogger:
+    """
+    stands in for loguru's logger in client modules: loguru and the setup
+    of its default handler cost about 20 ms of startup, so it is imported
+    the first time something is logged instead of at import time
+    """
+
+    def __getattr__(self, name: str):
+        from loguru import logger
+
+        return getattr(logger, name)
+
+
+logger = _LazyLogger()
+
+
+def catch(reraise: bool = False) -> Callable:
+    """
+    logger.catch() for client functions: exceptions are logged with their
+    traceback (importing loguru only then), then returned as None or raised
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                logger.opt(exception=True).error(
+                    f"An error has been caught in function '{fn.__name__}'"
+                )
+                if reraise:
+                    raise
+                return None
+
+        return wrapper
+
+    return decorator
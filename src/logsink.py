@@ -0,0 +1,250 @@
+import gzip
+import os
+import shutil
+import threading
+import time
+from typing import List, Optional
+
+from loguru import logger
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_FLUSH_BYTES = 64 * 1024
+DEFAULT_FLUSH_INTERVAL = 1.0
+COMPRESSIONS = (None, "gzip", "zstd")
+# never: 交给操作系统; flush: 每次批量写入后 fsync; rotate: 轮转和关闭时 fsync
+FSYNC_POLICIES = ("never", "flush", "rotate")
+
+
+class LogSink:
+    """
+    writes lines to a file from a dedicated thread.
+
+    write() only appends the line to a bounded buffer (and blocks when the
+    writer falls queue_size lines behind); the writer thread takes the whole
+    buffer once flush_bytes are buffered or the oldest line is flush_interval
+    seconds old, and issues one write() per batch. the reader thread never
+    waits for the disk, and is woken at most once per batch. with rotate_bytes the
+    file is rotated to path.1 ... path.<backups>, rotated files optionally
+    compressed with gzip or zstd (needs the zstandard package).
+
+    a batch that cannot be written (eg. ENOSPC on a full SD card) is dropped
+    and counted, the file is reopened for the next batch. once the sink is
+    closed or its writer thread is gone, write() drops the line instead of
+    waiting, so the reader thread is never stuck on the disk.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        flush_bytes: int = DEFAULT_FLUSH_BYTES,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        rotate_bytes: int = 0,
+        backups: int = 5,
+        compress: Optional[str] = None,
+        fsync: str = "never",
+    ):
+        """
+        :param path: log file, appended to
+        :param queue_size: lines buffered between write() and the writer thread
+        :param flush_bytes: write a batch once this many bytes are buffered
+        :param flush_interval: max seconds a line stays buffered
+        :param rotate_bytes: rotate once the file would exceed this size, 0 to never
+        :param backups: rotated files to keep
+        :param compress: None, "gzip" or "zstd" for rotated files
+        :param fsync: one of FSYNC_POLICIES
+        """
+        if compress not in COMPRESSIONS:
+            raise ValueError(f"compress must be one of {COMPRESSIONS}")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+        if compress == "zstd":
+            import zstandard  # noqa: F401  缺少依赖时在创建时就报错
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.backups = backups
+        self.compress = compress
+        self.fsync = fsync
+        self.queue_size = queue_size
+        self.pending: List[str] = []  # 等待写线程写入的行
+        self.buffered = 0  # pending 中的字符数
+        self.first_at = 0.0  # pending 中最早一行的写入时间
+        self.flushing = False  # 已因 flush_bytes 唤醒写线程
+        self.closed = False
+        self.stopped = False  # 写线程已退出
+        self.cond = threading.Condition()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._open()
+        # 统计
+        self.lines = 0
+        self.batches = 0
+        self.rotations = 0
+        self.dropped = 0  # 写入失败或写线程已退出而丢弃的行
+        self.errors = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, line: str):
+        """buffer line (including its newline) for the writer thread"""
+        with self.cond:
+            while (
+                len(self.pending) >= self.queue_size
+                and not self.closed
+                and not self.stopped
+            ):
+                self.cond.wait()
+            if self.closed or self.stopped:
+                self.dropped += 1
+                return
+            if not self.pending:
+                # 写线程按最早一行的时间决定何时写入
+                self.first_at = time.monotonic()
+                self.cond.notify()
+            self.pending.append(line)
+            self.buffered += len(line)
+            if self.buffered >= self.flush_bytes and not self.flushing:
+                self.flushing = True
+                self.cond.notify()
+
+    def close(self):
+        """write what is buffered, then close the file"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.thread.join()
+
+    def _ready(self) -> bool:
+        return self.closed or self.buffered >= self.flush_bytes
+
+    def _run(self):
+        try:
+            self._loop()
+        finally:
+            with self.cond:
+                self.stopped = True
+                self.dropped += len(self.pending)
+                self.pending = []
+                self.cond.notify_all()
+            try:
+                self._sync(self.fsync != "never")
+                self.file.close()
+            except (OSError, ValueError) as e:
+                logger.warning(f"close {self.path}: {e}")
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                while not self._ready():
+                    if not self.pending:
+                        self.cond.wait()
+                        continue
+                    timeout = self.first_at + self.flush_interval - time.monotonic()
+                    if timeout <= 0 or self.cond.wait(timeout) is False:
+                        break
+                batch, self.pending = self.pending, []
+                self.buffered = 0
+                self.flushing = False
+                closed = self.closed
+                # 唤醒因缓冲区满而等待的 write()
+                self.cond.notify_all()
+            if batch:
+                self._write(batch)
+            if closed:
+                break
+
+    def _write(self, batch: List[str]):
+        try:
+            self._write_batch(batch)
+        except (OSError, ValueError) as e:
+            # ValueError: 轮转时重新打开失败，file 已关闭
+            with self.cond:
+                self.errors += 1
+                self.dropped += len(batch)
+            if not self.file.closed:
+                # 可能已部分写入，size 以文件的实际大小为准
+                self.size = os.fstat(self.file.fileno()).st_size
+            if self.errors == 1 or self.errors % 100 == 0:
+                logger.warning(
+                    f"write {self.path}: {e}, {self.dropped} lines dropped so far"
+                )
+
+    def _write_batch(self, batch: List[str]):
+        if self.file.closed:
+            # 上一批写入失败时文件可能已关闭（例如轮转中途），空间恢复后继续写入
+            self._open()
+        data = "".join(batch).encode("utf-8", errors="ignore")
+        while self.rotate_bytes and self.size + len(data) > self.rotate_bytes:
+            # 在行边界处切开，写满当前文件后轮转
+            cut = data.rfind(b"\n", 0, self.rotate_bytes - self.size) + 1
+            if not cut and not self.size:
+                # 单行超过上限，整行写入
+                cut = data.find(b"\n") + 1 or len(data)
+            self._append(data[:cut])
+            self.size += cut
+            data = data[cut:]
+            if not data:
+                break
+            self._rotate()
+        self._append(data)
+        self.size += len(data)
+        self.lines += len(batch)
+        self.batches += 1
+        self._sync(self.fsync == "flush")
+
+    def _open(self):
+        # 每批只 write() 一次，不需要 BufferedWriter；写失败时也不会有残留在其中的数据
+        self.file = open(self.path, "ab", buffering=0)
+        self.size = self.file.tell()
+
+    def _append(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            view = view[self.file.write(view) :]
+
+    def _sync(self, fsync: bool):
+        self.file.flush()
+        if fsync:
+            os.fsync(self.file.fileno())
+
+    def _rotate(self):
+        self._sync(self.fsync != "never")
+        self.file.close()
+        suffix = {"gzip": ".gz", "zstd": ".zst"}.get(self.compress, "")  # type: ignore
+        for n in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{n}{suffix}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{n + 1}{suffix}")
+        if self.backups:
+            rotated = f"{self.path}.1"
+            os.replace(self.path, rotated)
+            if self.compress:
+                self._compress(rotated, rotated + suffix)
+        else:
+            os.remove(self.path)
+        self._open()
+        self.rotations += 1
+
+    def _compress(self, src: str, dst: str):
+        with open(src, "rb") as fin:
+            if self.compress == "gzip":
+                with gzip.open(dst, "wb") as fout:
+                    shutil.copyfileobj(fin, fout)
+            else:
+                import zstandard
+
+                with open(dst, "wb") as fout:
+                    zstandard.ZstdCompressor().copy_stream(fin, fout)
+        os.remove(src)
+
+    def stats(self) -> dict:
+        return {
+            "lines": self.lines,
+            "batches": self.batches,
+            "rotations": self.rotations,
+            "queued": len(self.pending),
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
@@ -0,0 +1,206 @@
+import re
+from typing import Dict, Iterable, List, Optional, Pattern, Set, Tuple, Union
+
+# 关键词：普通字符串按子串匹配，re.compile() 的结果按 search() 匹配
+Keyword = Union[str, Pattern[str]]
+
+# 合并成一个正则后编号会变化的反向引用
+BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+def trie_regex(words: Iterable[str]) -> str:
+    """
+    regex alternation of words shaped like a trie, eg. ab|ac|b -> (?:a(?:b|c)|b).
+
+    re tries the alternatives of a branch one by one, so a flat alternation
+    of thousands of keywords costs thousands of checks per character; as a
+    trie only the children of the current node are tried. at each position
+    the longest word wins.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node: dict) -> str:
+        alternatives = [
+            re.escape(char) + build(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not alternatives:
+            return ""
+        if len(alternatives) == 1:
+            body = alternatives[0]
+        else:
+            body = "(?:" + "|".join(alternatives) + ")"
+        if "" in node:
+            # 该节点本身是一个完整的词，更长的词可选
+            body = "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class Watch:
+    """
+    one subscriber of a MatchEngine: a list of keywords and which of them
+    were seen. ordered watches must see keyword i on a later line than
+    keyword i-1, other watches accept the keywords in any order.
+    """
+
+    def __init__(self, keywords: List[Keyword], ordered: bool = False):
+        self.keywords = list(keywords)
+        self.ordered = ordered
+        self.found = [False] * len(self.keywords)
+        self.matched_lines: List[Optional[str]] = [None] * len(self.keywords)
+        self.position = 0  # ordered: 下一个等待的关键词
+
+    def hit(self, indices: Iterable[int], line: str) -> bool:
+        """record that keywords[indices] matched line, return True once done"""
+        if self.ordered:
+            # 每行最多前进一步
+            if self.position in indices:
+                self.found[self.position] = True
+                self.matched_lines[self.position] = line
+                self.position += 1
+        else:
+            for index in indices:
+                if not self.found[index]:
+                    self.found[index] = True
+                    self.matched_lines[index] = line
+        return self.done()
+
+    def done(self) -> bool:
+        return all(self.found)
+
+
+class MatchEngine:
+    """
+    matches every line once against the keywords of all watches.
+
+    literal keywords of all watches are compiled into one trie regex, which
+    is scanned with a lookahead so that every position reports its longest
+    keyword; keywords that are prefixes of it are looked up in a table, so
+    overlapping keywords ("error", "error 42") are all reported. regex
+    keywords with the same flags are OR'ed into one prefilter, and searched
+    one by one only when the prefilter matches. both are rebuilt lazily when
+    keywords are added; removed literal keywords stay in the regex (and are
+    ignored) until they make up half of it, so completing a task does not
+    cost a rebuild.
+
+    not thread safe, the caller serializes add/remove/feed.
+    """
+
+    def __init__(self):
+        self.watches: Set[Watch] = set()
+        self.literals: Dict[str, List[Tuple[Watch, int]]] = {}
+        self.regexes: List[Tuple[Pattern[str], Watch, int]] = []
+        self.pattern: Optional[Pattern[str]] = None
+        self.prefixes: Dict[str, List[str]] = {}
+        # (prefilter, regex keywords it covers)，prefilter 为 None 时总是逐个匹配
+        self.regex_groups: List[
+            Tuple[Optional[Pattern[str]], List[Tuple[Pattern[str], Watch, int]]]
+        ] = []
+        self.dirty = False
+        self.stale = 0  # 已移除但仍在 pattern 中的关键词数
+
+    def add(self, watch: Watch):
+        self.watches.add(watch)
+        for index, keyword in enumerate(watch.keywords):
+            if isinstance(keyword, str):
+                self.literals.setdefault(keyword, []).append((watch, index))
+                self.dirty = True
+            else:
+                self.regexes.append((keyword, watch, index))
+                self.dirty = True
+
+    def remove(self, watch: Watch):
+        if watch not in self.watches:
+            return
+        self.watches.discard(watch)
+        for keyword in watch.keywords:
+            if not isinstance(keyword, str):
+                continue
+            subscribers = [
+                s for s in self.literals.get(keyword, []) if s[0] is not watch
+            ]
+            if subscribers:
+                self.literals[keyword] = subscribers
+            elif self.literals.pop(keyword, None) is not None:
+                self.stale += 1
+                if self.stale > len(self.literals):
+                    self.dirty = True
+        regexes = [r for r in self.regexes if r[1] is not watch]
+        if len(regexes) != len(self.regexes):
+            self.regexes = regexes
+            self.dirty = True
+
+    def _compile(self):
+        self.dirty = False
+        self.stale = 0
+        self.regex_groups = self._compile_regexes()
+        if not self.literals:
+            self.pattern = None
+            self.prefixes = {}
+            return
+        self.pattern = re.compile(f"(?=({trie_regex(self.literals)}))")
+        # 每个关键词 -> 它的所有同样是关键词的前缀（含自身）
+        self.prefixes = {
+            word: [word[:n] for n in range(len(word) + 1) if word[:n] in self.literals]
+            for word in self.literals
+        }
+
+    def _compile_regexes(self):
+        by_flags: Dict[int, List[Tuple[Pattern[str], Watch, int]]] = {}
+        groups = []
+        for entry in self.regexes:
+            if BACKREFERENCE.search(entry[0].pattern):
+                groups.append((None, [entry]))
+            else:
+                by_flags.setdefault(entry[0].flags, []).append(entry)
+        for flags, entries in by_flags.items():
+            sources = {entry[0].pattern for entry in entries}
+            try:
+                prefilter = re.compile(
+                    "|".join(f"(?:{source})" for source in sources), flags
+                )
+            except re.error:
+                # 例如重名的命名分组，退回逐个匹配
+                prefilter = None
+            groups.append((prefilter, entries))
+        return groups
+
+    def feed(self, line: str) -> List[Watch]:
+        """
+        match line against all watches
+        :return: watches completed by this line, already removed from the engine
+        """
+        if self.dirty:
+            self._compile()
+        hits: Dict[Watch, Set[int]] = {}
+        if self.pattern is not None:
+            texts: Set[str] = set()
+            for match in self.pattern.finditer(line):
+                texts.update(self.prefixes[match.group(1)])
+            for text in texts:
+                for watch, index in self.literals.get(text, ()):
+                    hits.setdefault(watch, set()).add(index)
+        for prefilter, entries in self.regex_groups:
+            if prefilter is not None and not prefilter.search(line):
+                continue
+            for pattern, watch, index in entries:
+                if pattern.search(line):
+                    hits.setdefault(watch, set()).add(index)
+
+        completed = [
+            watch for watch, indices in hits.items() if watch.hit(indices, line)
+        ]
+        for watch in completed:
+            self.remove(watch)
+        return completed
+
+    def __len__(self) -> int:
+        return len(self.watches)
@@ -0,0 +1,508 @@
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import grpc
+
+from src.cache import ResultCache
+from src.scheduler import KINDS, Scheduler
+
+# 秒，覆盖 fork/exec 的毫秒级到长命令的分钟级
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+)
+# 流式响应的计数在本地累积，每隔这么多条消息才合并到共享计数器
+STREAM_FLUSH_MESSAGES = 256
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (名称, 标签, 值)
+Sample = Tuple[str, Dict[str, str], float]
+# (名称, 类型, 说明, 样本)
+Family = Tuple[str, str, str, List[Sample]]
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render_families(families: Iterable[Family]) -> str:
+    """prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for name, kind, help, samples in families:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for sample_name, labels, value in samples:
+            if labels:
+                pairs = ",".join(f'{k}="{escape(v)}"' for k, v in labels.items())
+                lines.append(f"{sample_name}{{{pairs}}} {format_value(value)}")
+            else:
+                lines.append(f"{sample_name} {format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class _CounterChild:
+    def __init__(self, lock: threading.Lock):
+        self.lock = lock
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+
+class Counter:
+    """
+    monotonically increasing value per label combination:
+
+        requests = Counter("requests_total", "finished rpcs", ("method",))
+        requests.labels("Execute").inc()
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.children: Dict[Tuple[str, ...], _CounterChild] = {}
+
+    def labels(self, *values: str) -> _CounterChild:
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} has labels {self.labelnames}")
+            with self.lock:
+                child = self.children.setdefault(values, _CounterChild(self.lock))
+        return child
+
+    def inc(self, amount: float = 1):
+        """for a counter without labels"""
+        self.labels().inc(amount)
+
+    def value(self, *values: str) -> float:
+        child = self.children.get(values)
+        return child.value if child is not None else 0.0
+
+    def samples(self) -> List[Sample]:
+        with self.lock:
+            return [
+                (self.name, dict(zip(self.labelnames, values)), child.value)
+                for values, child in self.children.items()
+            ]
+
+
+class _HistogramChild:
+    def __init__(self, lock: threading.Lock, bounds: Tuple[float, ...]):
+        self.lock = lock
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # 最后一个是 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Histogram:
+    """
+    observations counted in cumulative buckets (upper bounds in seconds),
+    with their sum and count
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        self.children: Dict[Tuple[str, ...], _HistogramChild] = {}
+
+    def labels(self, *values: str) -> _HistogramChild:
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} has labels {self.labelnames}")
+            with self.lock:
+                child = self.children.setdefault(
+                    values, _HistogramChild(self.lock, self.bounds)
+                )
+        return child
+
+    def observe(self, value: float):
+        """for a histogram without labels"""
+        self.labels().observe(value)
+
+    def samples(self) -> List[Sample]:
+        samples = []
+        with self.lock:
+            for values, child in self.children.items():
+                labels = dict(zip(self.labelnames, values))
+                cumulative = 0
+                for bound, count in zip(self.bounds + (float("inf"),), child.counts):
+                    cumulative += count
+                    samples.append(
+                        (
+                            f"{self.name}_bucket",
+                            {**labels, "le": format_value(bound)},
+                            cumulative,
+                        )
+                    )
+                samples.append((f"{self.name}_sum", labels, child.sum))
+                samples.append((f"{self.name}_count", labels, child.count))
+        return samples
+
+
+class Registry:
+    """
+    metrics of one server, plus collectors that produce families when
+    scraped (for state that already lives elsewhere, eg. Scheduler.stats())
+    """
+
+    def __init__(self):
+        self.metrics: List = []
+        self.collectors: List[Callable[[], List[Family]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[Family]]):
+        self.collectors.append(collector)
+
+    def families(self) -> List[Family]:
+        families = [(m.name, m.kind, m.help, m.samples()) for m in self.metrics]
+        for collector in self.collectors:
+            families.extend(collector())
+        return families
+
+    def render(self) -> str:
+        return render_families(self.families())
+
+
+def scheduler_families(scheduler: Scheduler) -> List[Family]:
+    stats = scheduler.stats()
+    waits: List[Sample] = []
+    for kind in KINDS:
+        for quantile in ("0.5", "0.99"):
+            key = "wait_p50" if quantile == "0.5" else "wait_p99"
+            waits.append(
+                (
+                    "rpi_rpc_queue_wait_seconds",
+                    {"kind": kind, "quantile": quantile},
+                    stats[kind][key],
+                )
+            )
+        waits.append(
+            ("rpi_rpc_queue_wait_seconds_sum", {"kind": kind}, stats[kind]["wait_sum"])
+        )
+        waits.append(
+            (
+                "rpi_rpc_queue_wait_seconds_count",
+                {"kind": kind},
+                stats[kind]["admitted"],
+            )
+        )
+
+    def per_kind(name: str, key: str) -> List[Sample]:
+        return [(name, {"kind": kind}, stats[kind][key]) for kind in KINDS]
+
+    return [
+        (
+            "rpi_rpc_children_running",
+            "gauge",
+            "commands holding a scheduler slot",
+            per_kind("rpi_rpc_children_running", "running"),
+        ),
+        (
+            "rpi_rpc_queue_waiting",
+            "gauge",
+            "requests waiting for a scheduler slot",
+            per_kind("rpi_rpc_queue_waiting", "waiting"),
+        ),
+        (
+            "rpi_rpc_queue_rejected_total",
+            "counter",
+            "requests rejected because the queue was full or the wait timed out",
+            per_kind("rpi_rpc_queue_rejected_total", "rejected"),
+        ),
+        (
+            "rpi_rpc_queue_wait_seconds",
+            "summary",
+            "time admitted requests waited for a slot (recent samples)",
+            waits,
+        ),
+    ]
+
+
+def cache_families(cache: ResultCache) -> List[Family]:
+    stats = cache.stats()
+    return [
+        (
+            f"rpi_rpc_cache_{key}_total",
+            "counter",
+            f"result cache {key}",
+            [(f"rpi_rpc_cache_{key}_total", {}, stats[key])],
+        )
+        for key in ("hits", "misses", "coalesced", "evictions")
+    ] + [
+        (
+            "rpi_rpc_cache_bytes",
+            "gauge",
+            "serialized responses in the result cache",
+            [("rpi_rpc_cache_bytes", {}, stats["bytes"])],
+        )
+    ]
+
+
+class RpcCall:
+    """
+    one rpc being measured, see ServerMetrics.call(). set code before
+    aborting; an exception leaving the block without one counts as
+    CANCELLED (client gone) or UNKNOWN.
+    """
+
+    def __init__(self, metrics: "ServerMetrics", method: str):
+        self.metrics = metrics
+        self.method = method
+        self.code = grpc.StatusCode.OK
+        self.start = time.perf_counter()
+        self.first = True
+        # 流式响应的本地计数，见 sent()
+        self.messages = 0
+        self.bytes = 0
+
+    def sent(self, response):
+        """
+        count a streamed response; cheap enough for every line: the totals
+        reach the shared counters every STREAM_FLUSH_MESSAGES messages
+        """
+        if self.first:
+            self.first = False
+            self.metrics.first_byte.labels(self.method).observe(
+                time.perf_counter() - self.start
+            )
+        self.messages += 1
+        self.bytes += response.ByteSize()
+        if self.messages >= STREAM_FLUSH_MESSAGES:
+            self.flush()
+
+    def uncounted(self) -> "RpcCall":
+        """
+        this call for code producing messages that are not the ones sent,
+        eg. the ExecuteStream messages ExecuteEvents turns into events:
+        status codes still end up here, sent() does nothing
+        """
+        return _UncountedCall(self)
+
+    def flush(self):
+        if self.messages:
+            self.metrics.stream_messages.labels(self.method).inc(self.messages)
+            self.metrics.stream_bytes.labels(self.method).inc(self.bytes)
+            self.messages = 0
+            self.bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self.code == grpc.StatusCode.OK:
+            cancelled = exc_type is GeneratorExit or exc_type.__name__ in (
+                "CancelledError",
+                "AbortError",
+            )
+            self.code = (
+                grpc.StatusCode.CANCELLED if cancelled else grpc.StatusCode.UNKNOWN
+            )
+        self.flush()
+        self.metrics.requests.labels(self.method, self.code.name).inc()
+        self.metrics.duration.labels(self.method).observe(
+            time.perf_counter() - self.start
+        )
+        return False
+
+
+class ServerMetrics:
+    """
+    metrics of Commander / AsyncCommander: rpcs per method and status code,
+    their duration, process spawn latency, time to the first streamed
+    message, streamed messages and bytes, command timeouts, and (collected
+    when scraped) the scheduler queue and the result cache.
+    """
+
+    def __init__(self, registry: Optional[Registry] = None):
+        self.registry = registry if registry is not None else Registry()
+        r = self.registry
+        self.requests = r.counter(
+            "rpi_rpc_requests_total", "finished rpcs", ("method", "code")
+        )
+        self.duration = r.histogram(
+            "rpi_rpc_request_duration_seconds", "rpc duration", ("method",)
+        )
+        self.spawn = r.histogram(
+            "rpi_rpc_spawn_seconds", "time to start the command process", ("kind",)
+        )
+        self.first_byte = r.histogram(
+            "rpi_rpc_stream_first_byte_seconds",
+            "time from the request to the first streamed message",
+            ("method",),
+        )
+        self.stream_messages = r.counter(
+            "rpi_rpc_stream_messages_total",
+            "streamed messages: lines in line mode, chunks otherwise",
+            ("method",),
+        )
+        self.stream_bytes = r.counter(
+            "rpi_rpc_stream_bytes_total", "serialized bytes streamed", ("method",)
+        )
+        self.timeouts = r.counter(
+            "rpi_rpc_command_timeouts_total", "commands killed by timeout", ("kind",)
+        )
+
+    def track(self, scheduler: Optional[Scheduler], cache: Optional[ResultCache]):
+        """export the state of scheduler and cache on every scrape"""
+        if scheduler is not None:
+            self.registry.add_collector(lambda: scheduler_families(scheduler))
+        if cache is not None:
+            self.registry.add_collector(lambda: cache_families(cache))
+
+    def call(self, method: str) -> RpcCall:
+        """
+        measure an rpc:
+
+            with metrics.call("Execute") as call:
+                ...
+        """
+        return RpcCall(self, method)
+
+    def spawned(self, kind: str, seconds: float):
+        self.spawn.labels(kind).observe(seconds)
+
+    def timed_out(self, kind: str):
+        self.timeouts.labels(kind).inc()
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+class _UncountedCall(RpcCall):
+    def __init__(self, call: RpcCall):
+        self.call = call
+
+    @property  # type: ignore
+    def code(self):
+        return self.call.code
+
+    @code.setter
+    def code(self, code):
+        self.call.code = code
+
+    def sent(self, response):
+        pass
+
+
+class _NullCall(RpcCall):
+    def __init__(self):
+        self.code = grpc.StatusCode.OK
+
+    def sent(self, response):
+        pass
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class NullMetrics(ServerMetrics):
+    """instrumentation turned off, eg. to measure what it costs"""
+
+    def __init__(self):
+        super().__init__()
+
+    def track(self, scheduler, cache):
+        pass
+
+    def call(self, method: str) -> RpcCall:
+        return _NullCall()
+
+    def spawned(self, kind: str, seconds: float):
+        pass
+
+    def timed_out(self, kind: str):
+        pass
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: Registry
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(registry: Registry, port: int, host: str = "") -> ThreadingHTTPServer:
+    """
+    serve GET /metrics from a daemon thread; server.shutdown() stops it
+    :param port: 0 for an ephemeral port, see server.server_address
+    """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
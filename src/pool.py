@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+import grpc
+
+from proto import command_pb2_grpc
+from src.log import logger
+
+# 客户端 keepalive：空闲时也发送 ping，及时发现断开的 TCP 连接
+# 注意服务端需要放宽 grpc.http2.min_ping_interval_without_data_ms，见 apps/server.py
+KEEPALIVE_OPTIONS: List[Tuple[str, int]] = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+]
+
+UNHEALTHY_STATES = (
+    grpc.ChannelConnectivity.TRANSIENT_FAILURE,
+    grpc.ChannelConnectivity.SHUTDOWN,
+)
+
+
+class PooledChannel:
+    """
+    a long-lived channel owned by ChannelPool, with its reusable CommandStub
+    """
+
+    def __init__(self, addr_port: str, options: List[Tuple[str, int]]):
+        self.addr_port = addr_port
+        self.channel = grpc.insecure_channel(addr_port, options=options)
+        self.stub = command_pb2_grpc.CommandStub(self.channel)
+        self.state = grpc.ChannelConnectivity.IDLE
+        self.leases = 0
+        self.last_used = time.monotonic()
+        self.channel.subscribe(self._on_state, try_to_connect=False)
+
+    def _on_state(self, state: grpc.ChannelConnectivity):
+        self.state = state
+
+    def healthy(self) -> bool:
+        return self.state not in UNHEALTHY_STATES
+
+    def close(self):
+        try:
+            self.channel.unsubscribe(self._on_state)
+        except ValueError:
+            pass
+        self.channel.close()
+
+
+class ChannelPool:
+    """
+    client-side channel pool keyed by addr_port.
+
+    channels are kept open between calls so that only the first call to a host
+    pays the TCP + HTTP/2 handshake. entries idle longer than idle_timeout are
+    closed, at most max_size channels are kept (least recently used goes first),
+    and a channel found in TRANSIENT_FAILURE/SHUTDOWN is replaced on the next
+    lease instead of waiting out grpc's reconnect backoff. leased channels are
+    never closed by eviction, so long-lived streams are not cut off.
+
+    channels must not cross fork(), see PipedRpcStreamProcess.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 32,
+        idle_timeout: float = 300.0,
+        options: Optional[List[Tuple[str, int]]] = None,
+    ):
+        """
+        :param max_size: maximum number of cached channels
+        :param idle_timeout: seconds an unused channel is kept open
+        :param options: grpc channel options, defaults to KEEPALIVE_OPTIONS
+        """
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.options = list(KEEPALIVE_OPTIONS if options is None else options)
+        self.entries: "OrderedDict[str, PooledChannel]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def lease(self, addr_port: str) -> Iterator[PooledChannel]:
+        """
+        borrow the pooled channel of addr_port for the duration of a call
+        :param addr_port: eg. "192.168.1.1:50051"
+        """
+        entry = self._acquire(addr_port)
+        try:
+            yield entry
+        finally:
+            with self.lock:
+                entry.leases -= 1
+                entry.last_used = time.monotonic()
+
+    def _acquire(self, addr_port: str) -> PooledChannel:
+        stale: List[PooledChannel] = []
+        with self.lock:
+            entry = self.entries.get(addr_port)
+            if entry is not None and not entry.healthy() and entry.leases == 0:
+                logger.debug(f"replace unhealthy channel {addr_port}: {entry.state}")
+                stale.append(self.entries.pop(addr_port))
+                entry = None
+            if entry is None:
+                entry = PooledChannel(addr_port, self.options)
+                self.entries[addr_port] = entry
+            self.entries.move_to_end(addr_port)
+            entry.leases += 1
+            entry.last_used = time.monotonic()
+            stale.extend(self._evict_locked())
+        for old in stale:
+            old.close()
+        return entry
+
+    def _evict_locked(self) -> List[PooledChannel]:
+        now = time.monotonic()
+        evicted = []
+        for addr_port, entry in list(self.entries.items()):
+            if entry.leases:
+                continue
+            if now - entry.last_used > self.idle_timeout:
+                evicted.append(self.entries.pop(addr_port))
+        # OrderedDict 按最近使用排序，超出上限时从最久未用的开始关闭
+        for addr_port, entry in list(self.entries.items()):
+            if len(self.entries) <= self.max_size:
+                break
+            if entry.leases == 0:
+                evicted.append(self.entries.pop(addr_port))
+        return evicted
+
+    def evict(self, addr_port: str):
+        """close the channel of addr_port if it is not leased"""
+        with self.lock:
+            entry = self.entries.get(addr_port)
+            if entry is None or entry.leases:
+                return
+            del self.entries[addr_port]
+        entry.close()
+
+    def close(self):
+        """close all channels, including leased ones"""
+        with self.lock:
+            entries = list(self.entries.values())
+            self.entries.clear()
+        for entry in entries:
+            entry.close()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+_default_pool: Optional[ChannelPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def default_pool() -> ChannelPool:
+    """the process-wide pool shared by rpc() / rpc_echo_test() / rpc_bg()"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ChannelPool()
+        return _default_pool
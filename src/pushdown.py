@@ -0,0 +1,179 @@
+import re
+from typing import List, Optional, Pattern, Sequence, Tuple
+
+from proto import command_pb2
+from src.matcher import Keyword, MatchEngine, Watch
+
+
+def any_of(patterns: Sequence[str]) -> Optional[Pattern[str]]:
+    """
+    one regex matching any of patterns, None if there are none
+    :raise ValueError: a pattern is not a valid regex
+    """
+    if not patterns:
+        return None
+    try:
+        return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+    except re.error as e:
+        raise ValueError(f"invalid pattern: {e}")
+
+
+def keyword_message(keyword: Keyword) -> command_pb2.Keyword:
+    if isinstance(keyword, str):
+        return command_pb2.Keyword(text=keyword)
+    return command_pb2.Keyword(
+        text=keyword.pattern,
+        regex=True,
+        ignore_case=bool(keyword.flags & re.IGNORECASE),
+    )
+
+
+def keyword_of(message: command_pb2.Keyword) -> Keyword:
+    """
+    :raise ValueError: an invalid regex
+    """
+    if not message.regex:
+        return message.text
+    try:
+        return re.compile(message.text, re.IGNORECASE if message.ignore_case else 0)
+    except re.error as e:
+        raise ValueError(f"invalid keyword {message.text!r}: {e}")
+
+
+class StreamFilter:
+    """
+    client side: what ExecuteStream should do with the output lines before
+    sending them, see LineFilter. only valid in line mode (chunk_size 0, not
+    binary).
+    """
+
+    def __init__(
+        self,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        sample_every: int = 0,
+        watches: Sequence[Sequence[Keyword]] = (),
+        ordered: bool = False,
+        stop_on_match: bool = False,
+    ):
+        """
+        :param include: regexes, only lines matching one of them are sent
+        :param exclude: regexes, lines matching one of them are not sent
+        :param sample_every: send every Nth line that passed include/exclude
+        :param watches: keyword lists matched against every line on the
+            server, like RpcStreamIOMonitor.assert_keywords(); each completed
+            list is reported once with a MatchEvent
+        :param ordered: keywords of a watch must appear in order
+        :param stop_on_match: end the command and the stream once every
+            watch completed
+        """
+        self.include = list(include)
+        self.exclude = list(exclude)
+        self.sample_every = sample_every
+        self.watches = [list(keywords) for keywords in watches]
+        self.ordered = ordered
+        self.stop_on_match = stop_on_match
+
+    def request_fields(self) -> dict:
+        """CommandRequest fields of this filter"""
+        return {
+            "include": self.include,
+            "exclude": self.exclude,
+            "sample_every": self.sample_every,
+            "watches": [
+                command_pb2.WatchList(
+                    keywords=[keyword_message(k) for k in keywords],
+                    ordered=self.ordered,
+                )
+                for keywords in self.watches
+            ],
+            "stop_on_match": self.stop_on_match,
+        }
+
+
+class LineFilter:
+    """
+    server side of StreamFilter, applied by ExecuteStream to every line.
+
+    watches see every line; include, exclude and then sample_every decide
+    which lines are sent. a line is matched without its trailing newline.
+    """
+
+    def __init__(
+        self,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        sample_every: int = 0,
+        watches: Sequence[Watch] = (),
+        stop_on_match: bool = False,
+    ):
+        """
+        :raise ValueError: an invalid regex
+        """
+        self.include = any_of(include)
+        self.exclude = any_of(exclude)
+        self.sample_every = max(sample_every, 1)
+        self.watches = list(watches)
+        self.stop_on_match = stop_on_match
+        self.engine = MatchEngine()
+        self.indices = {}
+        for index, watch in enumerate(self.watches):
+            self.engine.add(watch)
+            self.indices[watch] = index
+        self.pending = sum(not w.done() for w in self.watches)  # 未完成的 watch 数
+        self.passed = 0  # 通过 include/exclude 的行数
+        # 统计
+        self.lines = 0
+        self.sent = 0
+
+    @classmethod
+    def from_request(cls, request) -> Optional["LineFilter"]:
+        """
+        :return: None if the request asks for no filtering
+        :raise ValueError: an invalid regex, or filtering outside line mode
+        """
+        if not (
+            request.include
+            or request.exclude
+            or request.sample_every > 1
+            or request.watches
+        ):
+            return None
+        if request.chunk_size or request.binary:
+            raise ValueError("include/exclude/sample_every/watches need line mode")
+        watches = [
+            Watch([keyword_of(k) for k in watch.keywords], watch.ordered)
+            for watch in request.watches
+        ]
+        return cls(
+            request.include,
+            request.exclude,
+            request.sample_every,
+            watches,
+            request.stop_on_match,
+        )
+
+    def feed(self, line: str) -> Tuple[bool, List[int]]:
+        """
+        :return: (whether to send line, indices of the watches it completed)
+        """
+        self.lines += 1
+        text = line.rstrip("\r\n")
+        completed: List[int] = []
+        if self.pending:
+            completed = [self.indices[w] for w in self.engine.feed(text)]
+            self.pending -= len(completed)
+        if self.include is not None and not self.include.search(text):
+            return False, completed
+        if self.exclude is not None and self.exclude.search(text):
+            return False, completed
+        self.passed += 1
+        if (self.passed - 1) % self.sample_every:
+            return False, completed
+        self.sent += 1
+        return True, completed
+
+    @property
+    def finished(self) -> bool:
+        """stop_on_match and every watch completed"""
+        return self.stop_on_match and bool(self.watches) and not self.pending
@@ -0,0 +1,158 @@
+import sys
+import threading
+import time
+from collections import Counter, deque
+from itertools import islice
+from typing import Deque, List, Optional
+
+DEFAULT_MAX_LINES = 100_000
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+# evict: 丢弃最旧的行; drop: 丢弃新到的行; block: 不丢弃被游标引用的行，写入方等待
+OVERFLOW_POLICIES = ("evict", "drop", "block")
+
+
+class LineRing:
+    """
+    bounded history of lines, each numbered by a sequence number (its cursor).
+
+    the ring holds at most max_lines lines and max_bytes bytes (as counted by
+    sys.getsizeof). what happens when it is full depends on overflow:
+
+    - evict: the oldest lines go, readers of old cursors lose them
+    - drop: new lines are not stored (the history stops at the cap)
+    - block: lines at or after a pinned cursor are kept; wait_writable()
+      blocks the writer until unpin() releases them or close() is called
+
+    a single writer is assumed; readers and pin/unpin are thread safe.
+    """
+
+    def __init__(
+        self,
+        max_lines: int = DEFAULT_MAX_LINES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        overflow: str = "evict",
+    ):
+        """
+        :param max_lines: maximum number of lines kept
+        :param max_bytes: maximum memory of the kept lines
+        :param overflow: one of OVERFLOW_POLICIES
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.overflow = overflow
+        self.lines: Deque[str] = deque()
+        self.first = 0  # lines[0] 的序号
+        self.bytes = 0
+        self.pins: Counter = Counter()
+        self.closed = False
+        self.cond = threading.Condition()
+        # 统计
+        self.appended = 0
+        self.evicted = 0
+        self.dropped = 0
+        self.blocked_seconds = 0.0
+        self.peak_bytes = 0
+
+    @property
+    def end(self) -> int:
+        """cursor of the next line to be appended"""
+        return self.first + len(self.lines)
+
+    def _full(self, size: int) -> bool:
+        if not self.lines:
+            # 超过上限的单行也要能写入，否则 block 会永远等待
+            return False
+        return len(self.lines) >= self.max_lines or self.bytes + size > self.max_bytes
+
+    def _evict(self):
+        self.bytes -= sys.getsizeof(self.lines.popleft())
+        self.first += 1
+        self.evicted += 1
+
+    def _make_room(self, size: int) -> bool:
+        """block: evict unpinned lines until size fits, return whether it fits"""
+        oldest_pin = min(self.pins) if self.pins else self.end
+        while self._full(size) and self.first < oldest_pin:
+            self._evict()
+        return not self._full(size)
+
+    def wait_writable(self, line: str, timeout: Optional[float] = None) -> bool:
+        """
+        block policy: wait until line fits without evicting pinned lines;
+        returns at once for the other policies
+        :return: False on timeout
+        """
+        if self.overflow != "block":
+            return True
+        size = sys.getsizeof(line)
+        with self.cond:
+            if self._make_room(size):
+                return True
+            start = time.monotonic()
+            try:
+                return self.cond.wait_for(
+                    lambda: self.closed or self._make_room(size), timeout
+                )
+            finally:
+                self.blocked_seconds += time.monotonic() - start
+
+    def append(self, line: str) -> Optional[int]:
+        """
+        :return: cursor of line, None if the drop policy discarded it
+        """
+        size = sys.getsizeof(line)
+        with self.cond:
+            self.appended += 1
+            if self._full(size):
+                if self.overflow == "drop":
+                    self.dropped += 1
+                    return None
+                while self._full(size):
+                    self._evict()
+            self.lines.append(line)
+            self.bytes += size
+            if self.bytes > self.peak_bytes:
+                self.peak_bytes = self.bytes
+            return self.first + len(self.lines) - 1
+
+    def since(self, cursor: int, until: Optional[int] = None) -> List[str]:
+        """lines from cursor (inclusive) to until (exclusive) still in the ring"""
+        with self.cond:
+            start = max(cursor - self.first, 0)
+            stop = len(self.lines) if until is None else max(until - self.first, 0)
+            return list(islice(self.lines, start, stop))
+
+    def pin(self, cursor: int):
+        """keep lines from cursor on (block policy)"""
+        with self.cond:
+            self.pins[cursor] += 1
+
+    def unpin(self, cursor: int):
+        with self.cond:
+            self.pins[cursor] -= 1
+            if self.pins[cursor] <= 0:
+                del self.pins[cursor]
+            self.cond.notify_all()
+
+    def close(self):
+        """wake up a writer blocked in wait_writable()"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def stats(self) -> dict:
+        with self.cond:
+            return {
+                "lines": len(self.lines),
+                "bytes": self.bytes,
+                "peak_bytes": self.peak_bytes,
+                "appended": self.appended,
+                "evicted": self.evicted,
+                "dropped": self.dropped,
+                "blocked_seconds": self.blocked_seconds,
+            }
+
+    def __len__(self) -> int:
+        return len(self.lines)
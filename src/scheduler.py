@@ -0,0 +1,213 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent import futures
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Deque, Dict, List, Optional
+
+# 任务类别，按优先级从高到低：短的 Execute / ExecuteBatch 命令优先于长的 ExecuteStream
+EXECUTE = "execute"
+STREAM = "stream"
+KINDS = (EXECUTE, STREAM)
+
+DEFAULT_MAX_CHILDREN = 32
+DEFAULT_MAX_QUEUE = 64
+DEFAULT_QUEUE_TIMEOUT = 10.0
+# 用于统计排队时间分位数的最近样本数
+WAIT_SAMPLES = 1024
+
+
+class SchedulerFull(Exception):
+    """no child slot: the queue is full or the wait timed out"""
+
+
+class Scheduler:
+    """
+    admission control in front of popen.
+
+    at most max_children commands run at once, of which at most max_streams
+    are ExecuteStream commands, so long streams cannot take the slots of
+    short commands. a request over the limit waits in the queue of its kind
+    (at most max_queue requests, at most queue_timeout seconds) and is
+    rejected with SchedulerFull after that; a freed slot goes to the oldest
+    waiting Execute before any waiting stream.
+
+    thread safe; the async server waits on the same queues.
+    """
+
+    def __init__(
+        self,
+        max_children: int = DEFAULT_MAX_CHILDREN,
+        max_streams: Optional[int] = None,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        queue_timeout: float = DEFAULT_QUEUE_TIMEOUT,
+    ):
+        """
+        :param max_children: commands running at the same time
+        :param max_streams: of which ExecuteStream commands, default 3/4
+        :param max_queue: waiting requests per kind, 0 to reject at once
+        :param queue_timeout: seconds a request waits for a slot
+        """
+        if max_streams is None:
+            max_streams = max(1, max_children * 3 // 4)
+        self.max_children = max_children
+        self.limits = {EXECUTE: max_children, STREAM: min(max_streams, max_children)}
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.lock = threading.Lock()
+        self.running = {kind: 0 for kind in KINDS}
+        self.queues: Dict[str, Deque[futures.Future]] = {k: deque() for k in KINDS}
+        # 统计
+        self.admitted = {kind: 0 for kind in KINDS}
+        self.rejected = {kind: 0 for kind in KINDS}
+        self.waits: Dict[str, Deque[float]] = {
+            kind: deque(maxlen=WAIT_SAMPLES) for kind in KINDS
+        }
+        self.max_wait = {kind: 0.0 for kind in KINDS}
+        self.wait_sum = {kind: 0.0 for kind in KINDS}
+
+    def _can_run(self, kind: str) -> bool:
+        return (
+            sum(self.running.values()) < self.max_children
+            and self.running[kind] < self.limits[kind]
+        )
+
+    def _enqueue(self, kind: str) -> Optional[futures.Future]:
+        """take a slot (None) or a place in the queue (a future set when granted)"""
+        with self.lock:
+            if not self.queues[kind] and self._can_run(kind):
+                self.running[kind] += 1
+                self.admitted[kind] += 1
+                self.waits[kind].append(0.0)
+                return None
+            if len(self.queues[kind]) >= self.max_queue:
+                self.rejected[kind] += 1
+                raise SchedulerFull(
+                    f"too many commands: {sum(self.running.values())} running, "
+                    f"{len(self.queues[kind])} {kind} requests waiting"
+                )
+            future: futures.Future = futures.Future()
+            self.queues[kind].append(future)
+            return future
+
+    def _abandon(self, kind: str, future: futures.Future) -> bool:
+        """stop waiting, return False if the slot was granted meanwhile"""
+        with self.lock:
+            try:
+                self.queues[kind].remove(future)
+            except ValueError:
+                return False
+            self.rejected[kind] += 1
+            return True
+
+    def _waited(self, kind: str, start: float):
+        wait = time.monotonic() - start
+        with self.lock:
+            self.waits[kind].append(wait)
+            self.max_wait[kind] = max(self.max_wait[kind], wait)
+            self.wait_sum[kind] += wait
+
+    def acquire(self, kind: str):
+        """
+        wait for a slot of kind
+        :raise SchedulerFull: the queue is full or queue_timeout passed
+        """
+        future = self._enqueue(kind)
+        if future is None:
+            return
+        start = time.monotonic()
+        try:
+            future.result(self.queue_timeout)
+        except futures.TimeoutError:
+            if self._abandon(kind, future):
+                raise SchedulerFull(
+                    f"no slot for a {kind} request after {self.queue_timeout:g} seconds"
+                )
+        self._waited(kind, start)
+
+    async def acquire_async(self, kind: str):
+        """asyncio version of acquire()"""
+        future = self._enqueue(kind)
+        if future is None:
+            return
+        start = time.monotonic()
+        try:
+            # shield: 超时或取消时由 _abandon 决定是否已经拿到 slot
+            await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), self.queue_timeout
+            )
+        except asyncio.TimeoutError:
+            if self._abandon(kind, future):
+                raise SchedulerFull(
+                    f"no slot for a {kind} request after {self.queue_timeout:g} seconds"
+                )
+        except asyncio.CancelledError:
+            if not self._abandon(kind, future):
+                self.release(kind)
+            raise
+        self._waited(kind, start)
+
+    def release(self, kind: str):
+        with self.lock:
+            self.running[kind] -= 1
+            granted = self._dispatch()
+        for future in granted:
+            future.set_result(True)
+
+    def releaser(self, kind: str) -> Callable[[], None]:
+        """release() of a held slot that may be called more than once"""
+        lock = threading.Lock()
+        held = [True]
+
+        def release():
+            with lock:
+                if not held[0]:
+                    return
+                held[0] = False
+            self.release(kind)
+
+        return release
+
+    def _dispatch(self) -> List[futures.Future]:
+        granted = []
+        for kind in KINDS:
+            while self.queues[kind] and self._can_run(kind):
+                granted.append(self.queues[kind].popleft())
+                self.running[kind] += 1
+                self.admitted[kind] += 1
+        return granted
+
+    @contextmanager
+    def slot(self, kind: str):
+        self.acquire(kind)
+        try:
+            yield
+        finally:
+            self.release(kind)
+
+    @asynccontextmanager
+    async def slot_async(self, kind: str):
+        await self.acquire_async(kind)
+        try:
+            yield
+        finally:
+            self.release(kind)
+
+    def stats(self) -> dict:
+        """per kind: running, waiting, admitted, rejected and queue wait (seconds)"""
+        with self.lock:
+            stats = {}
+            for kind in KINDS:
+                waits = sorted(self.waits[kind])
+                stats[kind] = {
+                    "running": self.running[kind],
+                    "waiting": len(self.queues[kind]),
+                    "admitted": self.admitted[kind],
+                    "rejected": self.rejected[kind],
+                    "wait_p50": waits[len(waits) // 2] if waits else 0.0,
+                    "wait_p99": waits[int(len(waits) * 0.99)] if waits else 0.0,
+                    "wait_max": self.max_wait[kind],
+                    "wait_sum": self.wait_sum[kind],
+                }
+            return stats
@@ -0,0 +1,233 @@
+import os
+import selectors
+import shlex
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+DEFAULT_MAX_SESSIONS = 16
+DEFAULT_IDLE_TIMEOUT = 600.0
+READ_SIZE = 64 * 1024
+
+
+class SessionError(Exception):
+    pass
+
+
+class SessionLimitError(SessionError):
+    pass
+
+
+class ShellSession:
+    """
+    a warm bash process running commands one after another.
+
+    each command is eval'ed (so a syntax error cannot kill the shell) with
+    stdin from /dev/null, then a per-command random sentinel carrying $? is
+    printed on stdout and another on stderr; output is everything before the
+    sentinels. cd/export done by a command are kept for the next one.
+    """
+
+    def __init__(self, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None):
+        self.id = uuid.uuid4().hex
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.process = subprocess.Popen(
+            ["bash", "--noprofile", "--norc"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+            cwd=cwd or None,
+            env={**os.environ, **(env or {})},
+        )
+        self.stdout_fd = self.process.stdout.fileno()  # type: ignore
+        self.stderr_fd = self.process.stderr.fileno()  # type: ignore
+        os.set_blocking(self.stdout_fd, False)
+        os.set_blocking(self.stderr_fd, False)
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, command: str, timeout: float) -> Tuple[int, bytes, bytes]:
+        """
+        run command inside the shell
+        :return: tuple[returncode: int, stdout: bytes, stderr: bytes]
+        :raise SessionError: the shell died or the command timed out; the
+            session is closed and cannot be used any more
+        """
+        with self.lock:
+            self.last_used = time.monotonic()
+            try:
+                return self._run(command, timeout)
+            finally:
+                self.last_used = time.monotonic()
+
+    def _run(self, command: str, timeout: float) -> Tuple[int, bytes, bytes]:
+        sentinel = f"__rpi_rpc_{uuid.uuid4().hex}__"
+        script = (
+            f"eval {shlex.quote(command)} </dev/null\n"
+            f"printf '{sentinel} %d\\n' $?\n"
+            f"printf '{sentinel}\\n' >&2\n"
+        )
+        try:
+            self.process.stdin.write(script.encode())  # type: ignore
+            self.process.stdin.flush()  # type: ignore
+        except (BrokenPipeError, ValueError):
+            self.close()
+            raise SessionError("session shell has exited")
+
+        marker = sentinel.encode()
+        outputs = {self.stdout_fd: bytearray(), self.stderr_fd: bytearray()}
+        pending = set(outputs)
+        deadline = time.monotonic() + timeout
+        with selectors.DefaultSelector() as selector:
+            for fd in outputs:
+                selector.register(fd, selectors.EVENT_READ)
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.close()
+                    raise SessionError(f"Command timed out after {timeout:g} seconds")
+                for key, _ in selector.select(remaining):
+                    fd: int = key.fd  # type: ignore
+                    try:
+                        data = os.read(fd, READ_SIZE)
+                    except BlockingIOError:
+                        continue
+                    if not data:
+                        self.close()
+                        raise SessionError("session shell has exited")
+                    # 只在新数据附近查找 sentinel，避免大输出时反复扫描整个缓冲区
+                    start = max(0, len(outputs[fd]) - len(marker))
+                    outputs[fd] += data
+                    if outputs[fd].find(marker, start) >= 0:
+                        pending.discard(fd)
+                        selector.unregister(fd)
+
+        stdout, _, status = bytes(outputs[self.stdout_fd]).partition(marker)
+        stderr, _, _ = bytes(outputs[self.stderr_fd]).partition(marker)
+        return int(status.split()[0]), stdout, stderr
+
+    def close(self):
+        if self.alive():
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout, self.process.stderr):
+            try:
+                pipe.close()  # type: ignore
+            except OSError:
+                pass
+
+
+class SessionManager:
+    """
+    server-side table of ShellSession, capped at max_sessions; sessions idle
+    for more than idle_timeout seconds are closed by a reaper thread
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions: Dict[str, ShellSession] = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.reaper = threading.Thread(target=self._reap_loop, daemon=True)
+        self.reaper.start()
+
+    def open(
+        self, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None
+    ) -> ShellSession:
+        """
+        :raise SessionLimitError: max_sessions sessions are already open
+        """
+        self.reap()
+        with self.lock:
+            if len(self.sessions) >= self.max_sessions:
+                raise SessionLimitError(
+                    f"too many sessions ({self.max_sessions}), close one first"
+                )
+            session = ShellSession(cwd, env)
+            self.sessions[session.id] = session
+        logger.debug(f"session {session.id} opened")
+        return session
+
+    def get(self, session_id: str) -> ShellSession:
+        """
+        :raise SessionError: no such session
+        """
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                # 与 reap() 在同一把锁下：取出的会话不会在开始执行前被当作空闲回收
+                session.last_used = time.monotonic()
+        if session is None or not session.alive():
+            self.close(session_id)
+            raise SessionError(f"no such session: {session_id}")
+        return session
+
+    def run(
+        self, session_id: str, command: str, timeout: float
+    ) -> Tuple[int, bytes, bytes]:
+        session = self.get(session_id)
+        try:
+            return session.run(command, timeout)
+        except SessionError:
+            self.close(session_id)
+            raise
+
+    def close(self, session_id: str) -> bool:
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        logger.debug(f"session {session_id} closed")
+        return True
+
+    def reap(self):
+        """close sessions idle for longer than idle_timeout"""
+        now = time.monotonic()
+        idle = []
+        with self.lock:
+            # 在判断空闲的同一临界区内移出会话，之后的 get() 已找不到它
+            for sid, session in list(self.sessions.items()):
+                if not session.lock.acquire(blocking=False):
+                    continue  # 正在执行命令
+                try:
+                    if (
+                        now - session.last_used > self.idle_timeout
+                        or not session.alive()
+                    ):
+                        idle.append(self.sessions.pop(sid))
+                finally:
+                    session.lock.release()
+        for session in idle:
+            session.close()
+            logger.debug(f"session {session.id} closed")
+
+    def _reap_loop(self):
+        while not self.stopped.wait(max(1.0, self.idle_timeout / 4)):
+            self.reap()
+
+    def shutdown(self):
+        self.stopped.set()
+        with self.lock:
+            ids = list(self.sessions)
+        for sid in ids:
+            self.close(sid)
+
+    def __len__(self) -> int:
+        return len(self.sessions)
@@ -0,0 +1,170 @@
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from typing import List, Tuple
+
+DEFAULT_SPOOL_BYTES = 64 * 1024 * 1024
+# 行索引的粒度：每 INDEX_BYTES 字节记录一次之前的换行数
+INDEX_BYTES = 64 * 1024
+
+
+class _Segment:
+    def __init__(self, path: str, base: int, lines: int, line_start: bool):
+        """
+        :param base: offset of the first byte of the segment
+        :param lines: newlines before base
+        :param line_start: a line starts at base
+        """
+        self.path = path
+        self.base = base
+        self.lines = lines
+        self.line_start = line_start
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+
+    def close(self, remove: bool):
+        os.close(self.fd)
+        if remove:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class Spool:
+    """
+    append-only output of one command on disk, with at most max_bytes kept.
+
+    offsets are positions in everything ever appended. the data is written
+    to segment files of max_bytes / 2 named {prefix}.{n}; when a third
+    segment is started the oldest is deleted, so start (the oldest offset
+    still readable) moves forward while size keeps growing.
+
+    appends are pwrite()s and reads are pread()s of the segment files, served
+    from the page cache shared with the writer. segments are not mmap'ed: a
+    mapping per segment would reserve max_bytes of address space per job,
+    more than a 32-bit Raspberry Pi OS process has for 64 jobs of 64 MiB. a
+    small in-memory index (the newline count every INDEX_BYTES) lets
+    line_offset() find a line without scanning the whole output.
+
+    one writer, any number of readers: all thread safe.
+    """
+
+    def __init__(self, prefix: str, max_bytes: int = DEFAULT_SPOOL_BYTES):
+        """
+        :param prefix: path of the segment files without the .n suffix
+        :param max_bytes: bytes kept on disk, at least 2
+        """
+        self.prefix = prefix
+        self.segment_bytes = max(max_bytes // 2, 1)
+        self.lock = threading.Lock()
+        self.segments: List[_Segment] = []
+        self.next_segment = 0
+        self.size = 0
+        self.lines = 0
+        self.line_start = True  # 下一个字节是一行的开头
+        # line_index[k]: offset k * INDEX_BYTES 之前的换行数
+        self.line_index = array("Q", [0])
+        self._open_segment()
+
+    @property
+    def start(self) -> int:
+        return self.segments[0].base if self.segments else self.size
+
+    def _open_segment(self):
+        path = f"{self.prefix}.{self.next_segment}"
+        self.next_segment += 1
+        self.segments.append(_Segment(path, self.size, self.lines, self.line_start))
+        while len(self.segments) > 2:
+            self.segments.pop(0).close(remove=True)
+
+    def append(self, data: bytes):
+        """
+        :raise OSError: eg. the disk is full; the data is not kept
+        """
+        pos = 0
+        with self.lock:
+            while pos < len(data):
+                segment = self.segments[-1]
+                room = self.segment_bytes - (self.size - segment.base)
+                if room <= 0:
+                    self._open_segment()
+                    continue
+                written = os.pwrite(
+                    segment.fd,
+                    memoryview(data)[pos : pos + room],
+                    self.size - segment.base,
+                )
+                self._index(data, pos, pos + written)
+                self.size += written
+                pos += written
+
+    def _index(self, data: bytes, lo: int, hi: int):
+        """count the newlines of data[lo:hi], about to be appended at size"""
+        boundary = len(self.line_index) * INDEX_BYTES
+        while boundary <= self.size + hi - lo:
+            self.line_index.append(
+                self.lines + data.count(b"\n", lo, lo + boundary - self.size)
+            )
+            boundary += INDEX_BYTES
+        self.lines += data.count(b"\n", lo, hi)
+        if hi > lo:
+            self.line_start = data[hi - 1] == ord("\n")
+
+    def _read(self, offset: int, length: int) -> bytes:
+        for segment in reversed(self.segments):
+            if segment.base <= offset:
+                end = min(offset + length, segment.base + self.segment_bytes, self.size)
+                if end <= offset:
+                    return b""
+                return os.pread(segment.fd, end - offset, offset - segment.base)
+        return b""
+
+    def read(self, offset: int, length: int) -> Tuple[int, bytes]:
+        """
+        at most length bytes from offset; an offset that was already
+        deleted is moved forward to start
+        :return: (offset of the data, data), data is empty at the end
+        """
+        with self.lock:
+            offset = max(offset, self.start)
+            return offset, self._read(offset, length)
+
+    def line_offset(self, line: int) -> int:
+        """
+        offset of the first byte of line (counted from 1), size if the
+        output has fewer lines
+        :raise ValueError: the line was already deleted
+        """
+        wanted = max(line - 1, 0)  # 该行之前的换行数
+        with self.lock:
+            if wanted > self.lines:
+                return self.size
+            # 之前换行数小于 wanted 的最后一个索引点，该行从它之后开始
+            k = max(bisect_left(self.line_index, wanted) - 1, 0)
+            offset, seen = k * INDEX_BYTES, self.line_index[k]
+            if offset < self.start:
+                first = self.segments[0]
+                if first.lines > wanted or (
+                    first.lines == wanted and not first.line_start
+                ):
+                    raise ValueError(f"line {line} is no longer in the spool")
+                offset, seen = first.base, first.lines
+            while seen < wanted:
+                data = self._read(offset, INDEX_BYTES)
+                count = data.count(b"\n")
+                if seen + count < wanted:
+                    seen += count
+                    offset += len(data)
+                    continue
+                index = -1
+                for _ in range(wanted - seen):
+                    index = data.find(b"\n", index + 1)
+                return offset + index + 1
+            return offset
+
+    def close(self, remove: bool = True):
+        with self.lock:
+            for segment in self.segments:
+                segment.close(remove)
+            self.segments = []
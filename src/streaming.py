@@ -0,0 +1,277 @@
+import codecs
+import os
+import select
+import selectors
+import subprocess
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_FLUSH_INTERVAL = 0.02
+READ_SIZE = 64 * 1024
+# 行模式下单行的上限，超过后不再等待换行直接发送
+MAX_LINE_SIZE = 64 * 1024
+# 无法获得进程退出通知时（既没有 pidfd 也没有 kqueue）退回到定时 poll
+EXIT_POLL_INTERVAL = 1.0
+# 需要原样转发字节的文本输出（ExecuteEvents）：非法字节解码为代理字符，
+# 按行拆分和 LineFilter 照常工作，再以同样的方式编码回原来的字节
+RAW_ERRORS = "surrogateescape"
+
+
+class ChunkBuffer:
+    """
+    accumulates raw bytes of one pipe until a size or latency threshold is hit.
+    binary buffers hand out bytes instead of decoded text, errors is the
+    decode error handler of text buffers.
+    """
+
+    def __init__(self, src: str, binary: bool = False, errors: str = "replace"):
+        self.src = src
+        self.binary = binary
+        self.data = bytearray()
+        self.deadline = 0.0
+        self.eof = False
+        # 按字节切块可能截断多字节字符，增量解码器会把残缺部分留到下一块
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors=errors)
+
+    def append(self, data: bytes, flush_interval: float):
+        if not self.data:
+            self.deadline = time.monotonic() + flush_interval
+        self.data += data
+
+    def take(self, size: int, final: bool = False) -> Union[str, bytes]:
+        chunk = bytes(self.data[:size])
+        del self.data[:size]
+        if self.data:
+            self.deadline = time.monotonic()
+        if self.binary:
+            return chunk
+        return self.decoder.decode(chunk, final)
+
+
+def flush_buffers(
+    buffers: Iterable[ChunkBuffer], chunk_size: int, force: bool = False
+) -> Iterator[Tuple[str, Union[str, bytes]]]:
+    """
+    yield (src, text) messages that are due in buffers.
+
+    chunk_size == 0 yields complete lines (and over-long partial lines);
+    chunk_size > 0 yields full chunks and chunks past their deadline.
+    force, or EOF of a buffer, flushes everything that is left.
+    """
+    now = time.monotonic()
+    for buffer in buffers:
+        final = force or buffer.eof
+        if chunk_size:
+            while len(buffer.data) >= chunk_size:
+                yield buffer.src, buffer.take(chunk_size)
+            if buffer.data and (final or now >= buffer.deadline):
+                yield buffer.src, buffer.take(len(buffer.data), final)
+            continue
+        complete = buffer.data.rfind(b"\n") + 1
+        if complete:
+            # 一次解码所有完整的行，再按行拆分，避免逐行解码
+            lines = buffer.take(complete).split("\n")  # type: ignore
+            for line in lines[:-1]:
+                yield buffer.src, line + "\n"
+        if buffer.data and (final or len(buffer.data) >= MAX_LINE_SIZE):
+            yield buffer.src, buffer.take(len(buffer.data), final)
+
+
+def next_deadline(buffers: Iterable[ChunkBuffer], chunk_size: int) -> Optional[float]:
+    """seconds until the next chunk is due, None if nothing is pending"""
+    if not chunk_size:
+        return None
+    pending = [b.deadline for b in buffers if b.data]
+    if not pending:
+        return None
+    return max(0.0, min(pending) - time.monotonic())
+
+
+def exit_notifier(pid: int):
+    """
+    return an object with fileno() that becomes readable when pid exits:
+    a pidfd on Linux >= 5.3, a kqueue watching NOTE_EXIT on macOS, else None
+    """
+    if hasattr(os, "pidfd_open"):
+        try:
+            return _PidFd(os.pidfd_open(pid))
+        except OSError:
+            return None
+    if hasattr(select, "kqueue"):
+        kq = select.kqueue()
+        try:
+            kq.control(
+                [
+                    select.kevent(
+                        pid,
+                        filter=select.KQ_FILTER_PROC,
+                        flags=select.KQ_EV_ADD | select.KQ_EV_ONESHOT,
+                        fflags=select.KQ_NOTE_EXIT,
+                    )
+                ],
+                0,
+            )
+        except OSError:
+            kq.close()
+            return None
+        return kq
+    return None
+
+
+def wait_usage(process: subprocess.Popen, timeout: Optional[float] = None) -> tuple:
+    """
+    process.wait() that also returns the resource usage of the child (with
+    the descendants it waited for) from os.wait4: (returncode, rusage),
+    rusage is None where the exit cannot be waited for without reaping
+    :raise subprocess.TimeoutExpired: the child did not exit within timeout
+    """
+    notifier = exit_notifier(process.pid)
+    if notifier is None:
+        return process.wait(timeout), None
+    try:
+        if not select.select([notifier], [], [], timeout)[0]:
+            raise subprocess.TimeoutExpired(process.args, timeout)  # type: ignore
+    finally:
+        notifier.close()
+    try:
+        _, status, rusage = os.wait4(process.pid, 0)
+    except ChildProcessError:
+        # 已被其他线程的 process.poll() 回收，例如 terminate_on_cancel
+        return process.wait(timeout), None
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, rusage
+
+
+class _PidFd:
+    def __init__(self, fd: int):
+        self.fd = fd
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def close(self):
+        os.close(self.fd)
+
+
+class OutputPump:
+    """
+    event-driven reader of a child's stdout/stderr.
+
+    the loop sleeps in one selector (epoll/kqueue) and only wakes up when a
+    pipe has data, the child exits (pidfd/kqueue), cancel() is called from
+    another thread, or a partially filled chunk reaches its flush deadline.
+
+    chunk_size == 0 yields one (src, line) per line; chunk_size > 0 yields
+    (src, text) chunks of at most chunk_size bytes, flushed after at most
+    flush_interval seconds. binary yields (src, bytes) chunks, lines are not
+    looked for (chunk_size 0 means DEFAULT_CHUNK_SIZE). errors is passed to
+    the ChunkBuffers of text output.
+    """
+
+    def __init__(
+        self,
+        process: subprocess.Popen,
+        chunk_size: int = 0,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        binary: bool = False,
+        errors: str = "replace",
+    ):
+        self.process = process
+        self.chunk_size = chunk_size or (DEFAULT_CHUNK_SIZE if binary else 0)
+        self.flush_interval = flush_interval
+        self.cancelled = False
+        self.lock = threading.Lock()
+        self.closed = False
+        self.selector = selectors.DefaultSelector()
+        self.buffers: Dict[int, ChunkBuffer] = {}
+        for src, pipe in (("stdout", process.stdout), ("stderr", process.stderr)):
+            fd = pipe.fileno()  # type: ignore
+            os.set_blocking(fd, False)
+            self.buffers[fd] = ChunkBuffer(src, binary, errors)
+            self.selector.register(fd, selectors.EVENT_READ, "pipe")
+        self.wakeup_r, self.wakeup_w = os.pipe()
+        os.set_blocking(self.wakeup_w, False)
+        self.selector.register(self.wakeup_r, selectors.EVENT_READ, "cancel")
+        self.exit_fd = exit_notifier(process.pid)
+        if self.exit_fd is not None:
+            self.selector.register(self.exit_fd, selectors.EVENT_READ, "exit")
+
+    def cancel(self):
+        """stop the pump from any thread, eg. a grpc context callback"""
+        with self.lock:
+            self.cancelled = True
+            if not self.closed:
+                try:
+                    os.write(self.wakeup_w, b"\0")
+                except BlockingIOError:
+                    pass
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.selector.close()
+            os.close(self.wakeup_r)
+            os.close(self.wakeup_w)
+            if self.exit_fd is not None:
+                self.exit_fd.close()
+
+    def __iter__(self) -> Iterator[Tuple[str, Union[str, bytes]]]:
+        try:
+            yield from self._pump()
+        finally:
+            self.close()
+
+    def _read(self, fd: int) -> bool:
+        """read what is available on fd, return False once it hit EOF"""
+        try:
+            data = os.read(fd, READ_SIZE)
+        except BlockingIOError:
+            return True
+        if not data:
+            self.selector.unregister(fd)
+            self.buffers[fd].eof = True
+            return False
+        self.buffers[fd].append(data, self.flush_interval)
+        return True
+
+    def _drain(self):
+        """child exited: read what is left, without waiting for grandchildren"""
+        for fd in list(self.buffers):
+            while fd in self.selector.get_map() and self._read(fd):
+                if not select.select([fd], [], [], 0)[0]:
+                    break
+
+    def _open_pipes(self) -> int:
+        return sum(1 for fd in self.buffers if fd in self.selector.get_map())
+
+    def _flush(self, force: bool) -> Iterator[Tuple[str, Union[str, bytes]]]:
+        return flush_buffers(self.buffers.values(), self.chunk_size, force)
+
+    def _timeout(self) -> Optional[float]:
+        deadline = next_deadline(self.buffers.values(), self.chunk_size)
+        if deadline is not None:
+            return deadline
+        return None if self.exit_fd is not None else EXIT_POLL_INTERVAL
+
+    def _pump(self) -> Iterator[Tuple[str, Union[str, bytes]]]:
+        exited = False
+        while self._open_pipes() and not exited:
+            for key, _ in self.selector.select(self._timeout()):
+                if key.data == "pipe":
+                    self._read(key.fd)  # type: ignore
+                elif key.data == "exit":
+                    exited = True
+                else:
+                    return
+            if self.cancelled:
+                return
+            if self.exit_fd is None and self.process.poll() is not None:
+                exited = True
+            if exited:
+                self._drain()
+            yield from self._flush(force=False)
+        yield from self._flush(force=True)
@@ -0,0 +1,180 @@
+import os
+import stat
+import zlib
+from typing import Iterator, Optional
+
+import grpc
+
+from proto import command_pb2
+
+# PushFile / PullFile 默认的块大小，远小于 gRPC 默认 4 MB 的消息上限
+FILE_CHUNK_SIZE = 1024 * 1024
+MAX_FILE_CHUNK_SIZE = 3 * 1024 * 1024
+
+
+class TransferError(Exception):
+    """a failed transfer, with the grpc status code the server aborts with"""
+
+    def __init__(self, code: grpc.StatusCode, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def os_error(e: OSError, path: str) -> TransferError:
+    if isinstance(e, FileNotFoundError):
+        code = grpc.StatusCode.NOT_FOUND
+    elif isinstance(e, PermissionError):
+        code = grpc.StatusCode.PERMISSION_DENIED
+    else:
+        code = grpc.StatusCode.INVALID_ARGUMENT
+    return TransferError(code, f"{path}: {e.strerror or e}")
+
+
+def file_status(path: str) -> command_pb2.FileStatus:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return command_pb2.FileStatus(path=path, exists=False)
+    except OSError as e:
+        raise os_error(e, path)
+    return command_pb2.FileStatus(path=path, size=st.st_size, exists=True)
+
+
+def file_chunks(
+    path: str, offset: int = 0, chunk_size: int = 0, mode: int = 0, dest: str = ""
+) -> Iterator[command_pb2.FileChunk]:
+    """
+    read path from offset as checksummed FileChunk messages.
+
+    the first chunk carries the total size (and dest/mode for PushFile); an
+    empty file, or offset == size, still yields one empty chunk. reads are
+    os.pread straight from the fd: no Python file buffering in between and
+    no mmap, which would SIGBUS if the file got truncated while being read
+    (eg. logrotate copytruncate).
+    :raise TransferError: path cannot be read or offset is past its end
+    """
+    chunk_size = min(chunk_size or FILE_CHUNK_SIZE, MAX_FILE_CHUNK_SIZE)
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError as e:
+        raise os_error(e, path)
+    try:
+        st = os.fstat(fd)
+        if stat.S_ISDIR(st.st_mode):
+            raise TransferError(
+                grpc.StatusCode.INVALID_ARGUMENT, f"{path}: Is a directory"
+            )
+        regular = stat.S_ISREG(st.st_mode)
+        if regular and offset > st.st_size:
+            raise TransferError(
+                grpc.StatusCode.OUT_OF_RANGE,
+                f"{path}: offset {offset} is past the end ({st.st_size})",
+            )
+        if regular and hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, offset, 0, os.POSIX_FADV_SEQUENTIAL)
+        first = command_pb2.FileChunk(
+            path=dest, offset=offset, size=st.st_size, mode=mode
+        )
+        while True:
+            try:
+                data = os.pread(fd, chunk_size, offset)
+            except OSError as e:
+                raise os_error(e, path)
+            if not data and first is None:
+                return
+            chunk = first or command_pb2.FileChunk(offset=offset)
+            first = None
+            chunk.data = data
+            chunk.crc32 = zlib.crc32(data)
+            yield chunk
+            if not data:
+                return
+            offset += len(data)
+    finally:
+        os.close(fd)
+
+
+class FileReceiver:
+    """
+    writes a stream of FileChunk to a file, checking the crc32 and that the
+    chunks are contiguous. the first chunk opens the file: it is truncated to
+    the first offset, so a resumed transfer continues where the file ends.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        :param path: file to write, defaults to the path of the first chunk
+        """
+        self.path = path
+        self.fd: Optional[int] = None
+        self.offset = 0
+
+    def write(self, chunk: command_pb2.FileChunk):
+        """
+        :raise TransferError: checksum mismatch, gap in offsets, or OSError
+        """
+        if self.fd is None:
+            self._open(chunk)
+        if chunk.offset != self.offset:
+            raise TransferError(
+                grpc.StatusCode.INVALID_ARGUMENT,
+                f"{self.path}: expected offset {self.offset}, got {chunk.offset}",
+            )
+        if zlib.crc32(chunk.data) != chunk.crc32:
+            raise TransferError(
+                grpc.StatusCode.DATA_LOSS,
+                f"{self.path}: checksum mismatch at offset {chunk.offset}",
+            )
+        view = memoryview(chunk.data)
+        try:
+            while view:
+                written = os.pwrite(self.fd, view, self.offset)  # type: ignore
+                view = view[written:]
+                self.offset += written
+        except OSError as e:
+            raise os_error(e, self.path)  # type: ignore
+
+    def _open(self, chunk: command_pb2.FileChunk):
+        self.path = self.path or chunk.path
+        if not self.path:
+            raise TransferError(
+                grpc.StatusCode.INVALID_ARGUMENT, "first chunk has no path"
+            )
+        try:
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_CREAT, 0o644)
+            size = os.fstat(self.fd).st_size
+            if chunk.offset > size:
+                raise TransferError(
+                    grpc.StatusCode.OUT_OF_RANGE,
+                    f"{self.path}: cannot resume at {chunk.offset}, size is {size}",
+                )
+            os.ftruncate(self.fd, chunk.offset)
+            if chunk.mode:
+                os.fchmod(self.fd, chunk.mode)
+        except OSError as e:
+            raise os_error(e, self.path)
+        self.offset = chunk.offset
+
+    def close(self) -> command_pb2.FileStatus:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        return command_pb2.FileStatus(path=self.path, size=self.offset, exists=True)
+
+
+def receive_file(
+    chunks: Iterator[command_pb2.FileChunk], path: Optional[str] = None
+) -> command_pb2.FileStatus:
+    """
+    write chunks to path (or the path of the first chunk)
+    :raise TransferError: the stream is empty or a chunk is rejected
+    """
+    receiver = FileReceiver(path)
+    try:
+        for chunk in chunks:
+            receiver.write(chunk)
+        if receiver.fd is None:
+            raise TransferError(grpc.StatusCode.INVALID_ARGUMENT, "no chunk received")
+    finally:
+        status = receiver.close()
+    return status
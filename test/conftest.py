@@ -0,0 +1,79 @@
+import os
+import queue
+import socket
+import subprocess
+import sys
+from concurrent import futures
+
+os.environ.setdefault("GRPC_VERBOSITY", "ERROR")
+
+import grpc
+import pytest
+
+from proto import command_pb2_grpc
+from src.impl import Commander
+
+
+@pytest.fixture(scope="session")
+def local_addr_port():
+    """in-process Commander server on an ephemeral port"""
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    command_pb2_grpc.add_CommandServicer_to_server(Commander(), server)
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    yield f"localhost:{port}"
+    server.stop(grace=None)
+
+
+@pytest.fixture(scope="session")
+def local_aio_addr_port():
+    """
+    apps/server.py --backend async in a subprocess: grpc.aio and the sync
+    server do not shut down cleanly when they share one process
+    """
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "apps.server",
+            "--backend",
+            "async",
+            "--port",
+            str(port),
+        ],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    addr_port = f"localhost:{port}"
+    with grpc.insecure_channel(addr_port) as channel:
+        grpc.channel_ready_future(channel).result(timeout=10)
+    yield addr_port
+    process.terminate()
+    process.wait(10)
+
+
+@pytest.fixture(params=["sync", "async"])
+def any_addr_port(request):
+    """run a test against both the thread pool and the grpc.aio server"""
+    if request.param == "sync":
+        return request.getfixturevalue("local_addr_port")
+    return request.getfixturevalue("local_aio_addr_port")
+
+
+class FakeStream:
+    """stands in for RpcStreamThread: RpcStreamIOMonitor only calls msgq()"""
+
+    def __init__(self):
+        self.q: queue.Queue = queue.Queue()
+
+    def msgq(self):
+        return self.q
+
+
+@pytest.fixture
+def fake_stream():
+    return FakeStream()
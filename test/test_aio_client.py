@@ -0,0 +1,42 @@
+import asyncio
+
+from src.aio_client import aclose, arpc, arpc_echo_test, arpc_stream
+from src.impl import rpc
+
+
+def run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await aclose()
+
+    return asyncio.run(main())
+
+
+def test_arpc_matches_rpc(local_aio_addr_port):
+    expected = rpc("echo 123; echo err >&2; exit 2", local_aio_addr_port)
+    got = run(arpc("echo 123; echo err >&2; exit 2", local_aio_addr_port))
+    assert got == expected == (2, "123\n", "err\n")
+
+
+def test_arpc_echo_test(local_aio_addr_port):
+    assert run(arpc_echo_test(local_aio_addr_port, timeout=5))
+
+
+def test_arpc_stream(local_aio_addr_port):
+    async def collect():
+        stream = arpc_stream("seq 1 3; exit 5", local_aio_addr_port, chunk_size=1024)
+        return "".join([text async for text in stream]), stream.returncode
+
+    assert run(collect()) == ("1\n2\n3\n", 5)
+
+
+def test_arpc_fan_out(local_aio_addr_port):
+    async def fan_out():
+        return await asyncio.gather(
+            *(arpc(f"sleep 0.5; echo {i}", local_aio_addr_port) for i in range(20))
+        )
+
+    results = run(fan_out())
+    assert [out for _, out, _ in results] == [f"{i}\n" for i in range(20)]
@@ -0,0 +1,181 @@
+import os
+import time
+from concurrent import futures
+
+import grpc
+import pytest
+
+from proto import command_pb2, command_pb2_grpc
+from src import backpressure
+from src.backpressure import BLOCK, COALESCE, DROP_OLDEST, SAMPLE, ResponseBuffer
+from src.impl import NOT_EXIT, Commander
+from src.scheduler import Scheduler
+
+SIZE = 16 * 1024 * 1024
+
+
+def output(text: str, src: str = "stdout") -> command_pb2.CommandResponse:
+    return command_pb2.CommandResponse(returncode=NOT_EXIT, **{src: text})
+
+
+def drain(buffer: ResponseBuffer) -> list:
+    taken = []
+    while (response := buffer.take()) is not None:
+        taken.append(
+            response.match.watch
+            if response.HasField("match")
+            else response.stdout or response.stderr
+        )
+    return taken
+
+
+def test_drop_oldest_and_events():
+    buffer = ResponseBuffer(DROP_OLDEST, max_bytes=6)
+    for i in range(5):
+        buffer.put(output(f"{i}\n"))
+    buffer.put(
+        command_pb2.CommandResponse(
+            returncode=NOT_EXIT, match=command_pb2.MatchEvent(watch=7)
+        )
+    )
+    assert buffer.dropped == 4
+    # MatchEvent 不会被丢弃，并且先于缓冲的输出发送
+    assert drain(buffer) == [7, "2\n", "3\n", "4\n"]
+
+
+def test_coalesce_keeps_newest_per_source():
+    buffer = ResponseBuffer(COALESCE, max_bytes=8)
+    buffer.put(output("err 1\n", "stderr"))
+    for i in range(4):
+        buffer.put(output(f"{i}%\n"))
+    assert drain(buffer) == ["err 1\n", "3%\n"]
+    assert buffer.coalesced == 9 and buffer.dropped == 0
+
+
+def test_sample_thins_evenly():
+    buffer = ResponseBuffer(SAMPLE, max_bytes=8)
+    for i in range(8):
+        buffer.put(output(f"{i}\n"))
+    assert drain(buffer) == ["0\n", "4\n", "6\n", "7\n"]
+    assert buffer.dropped == 8
+
+
+def slow_request(marker, policy: int = DROP_OLDEST) -> command_pb2.CommandRequest:
+    return command_pb2.CommandRequest(
+        command=f"sh -c 'head -c {SIZE} /dev/zero; touch {marker}'",
+        binary=True,
+        backpressure=policy,
+        buffer_bytes=256 * 1024,
+    )
+
+
+def wait_for(path, timeout: float = 20) -> bool:
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return os.path.exists(path)
+
+
+def test_stalled_client_does_not_freeze_child(any_addr_port, tmp_path):
+    marker = tmp_path / "done"
+    with grpc.insecure_channel(any_addr_port) as channel:
+        stub = command_pb2_grpc.CommandStub(channel)
+        call = stub.ExecuteStream(slow_request(marker))
+        received = len(next(call).stdout_bytes)
+        # 客户端不读取，子进程仍然写完全部输出
+        assert wait_for(marker)
+        responses = list(call)
+    final = responses[-1]
+    received += sum(len(r.stdout_bytes) for r in responses)
+    assert final.returncode == 0
+    assert final.dropped_bytes > 0
+    assert received + final.dropped_bytes == SIZE
+
+
+def test_line_mode_reports_returncode(any_addr_port):
+    with grpc.insecure_channel(any_addr_port) as channel:
+        stub = command_pb2_grpc.CommandStub(channel)
+        responses = list(
+            stub.ExecuteStream(
+                command_pb2.CommandRequest(
+                    command="sh -c 'echo a; exit 3'", backpressure=SAMPLE
+                )
+            )
+        )
+    assert [r.stdout for r in responses] == ["a\n", ""]
+    assert responses[-1].returncode == 3
+
+
+def test_stalled_client_does_not_starve_other_rpcs(tmp_path, monkeypatch):
+    monkeypatch.setattr(backpressure, "STALL_TIMEOUT", 0.5)
+    # 一个工作线程、一个 stream slot：旧的实现下停滞的客户端会占住两者
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=1))
+    command_pb2_grpc.add_CommandServicer_to_server(
+        Commander(scheduler=Scheduler(max_children=2, max_streams=1)), server
+    )
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    try:
+        with grpc.insecure_channel(f"localhost:{port}") as channel:
+            stub = command_pb2_grpc.CommandStub(channel)
+            stalled = stub.ExecuteStream(slow_request(tmp_path / "done"))
+            next(stalled)
+            assert wait_for(tmp_path / "done")
+            response = stub.Execute(
+                command_pb2.CommandRequest(command="echo ok"), timeout=10
+            )
+            assert response.stdout == "ok\n"
+            with pytest.raises(grpc.RpcError) as e:
+                list(stalled)
+            assert e.value.code() == grpc.StatusCode.CANCELLED
+    finally:
+        server.stop(grace=None)
+
+
+def running(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.parametrize("policy", [BLOCK, DROP_OLDEST], ids=["block", "drop-oldest"])
+def test_stalled_client_of_endless_command_is_cancelled(tmp_path, monkeypatch, policy):
+    monkeypatch.setattr(backpressure, "STALL_TIMEOUT", 0.5)
+    monkeypatch.setattr(backpressure, "WAIT_INTERVAL", 0.1)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=1))
+    command_pb2_grpc.add_CommandServicer_to_server(
+        Commander(scheduler=Scheduler(max_children=2, max_streams=1)), server
+    )
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    pidfile = tmp_path / "pid"
+    try:
+        with grpc.insecure_channel(f"localhost:{port}") as channel:
+            stub = command_pb2_grpc.CommandStub(channel)
+            # 输出写满客户端的窗口后命令一直不结束
+            stalled = stub.ExecuteStream(
+                command_pb2.CommandRequest(
+                    command=f"sh -c 'echo $$ > {pidfile}; "
+                    f"head -c {SIZE} /dev/zero; exec sleep 1000'",
+                    binary=True,
+                    backpressure=policy,
+                    buffer_bytes=256 * 1024,
+                )
+            )
+            next(stalled)
+            response = stub.Execute(
+                command_pb2.CommandRequest(command="echo ok"), timeout=10
+            )
+            assert response.stdout == "ok\n"
+            with pytest.raises(grpc.RpcError) as e:
+                list(stalled)
+            assert e.value.code() == grpc.StatusCode.CANCELLED
+            pid = int(pidfile.read_text())
+            deadline = time.monotonic() + 10
+            while running(pid) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert not running(pid)
+    finally:
+        server.stop(grace=None)
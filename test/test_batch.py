@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+from src.aio_client import aclose, arpc_batch
+from src.impl import RpcClient, rpc_batch
+
+
+def test_batch_sequential_keeps_order(any_addr_port):
+    results = rpc_batch(["echo a", "echo b >&2; exit 3", "echo c"], any_addr_port)
+    assert results == [(0, "a\n", ""), (3, "", "b\n"), (0, "c\n", "")]
+
+
+def test_batch_parallel(any_addr_port):
+    start = time.monotonic()
+    results = rpc_batch(
+        [f"sleep 0.5; echo {i}" for i in range(8)], any_addr_port, parallel=True
+    )
+    assert time.monotonic() - start < 2
+    assert [out for _, out, _ in results] == [f"{i}\n" for i in range(8)]
+
+
+def test_batch_per_command_timeout(any_addr_port):
+    with RpcClient(any_addr_port) as client:
+        results = client.rpc_batch([("sleep 5", 0.2), "echo ok"])
+    assert results[0][0] == -1
+    assert "timed out after 0.2 seconds" in results[0][2]
+    assert results[1] == (0, "ok\n", "")
+
+
+def test_arpc_batch(local_aio_addr_port):
+    async def main():
+        try:
+            return await arpc_batch(["echo 1", "echo 2"], local_aio_addr_port, True)
+        finally:
+            await aclose()
+
+    assert asyncio.run(main()) == [(0, "1\n", ""), (0, "2\n", "")]
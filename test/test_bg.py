@@ -0,0 +1,65 @@
+import time
+from concurrent import futures
+
+import grpc
+
+from proto import command_pb2_grpc
+from src import impl
+from src.impl import RpcClient, RpcStreamThread, rpc_bg
+
+
+def drain(p, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not p.ok() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    messages = []
+    while not p.msgq().empty():
+        messages.append(p.msgq().get())
+    return messages
+
+
+def test_rpc_bg_returns_thread_handle(local_addr_port):
+    p = rpc_bg("echo hi; echo oops >&2", local_addr_port)
+    assert isinstance(p, RpcStreamThread)
+    messages = drain(p)
+    assert p.ok()
+    assert "hi\n" in messages and "oops\n" in messages
+    assert messages[-1].startswith("returncode: ")
+    p.stop()
+    assert not p.is_alive()
+
+
+def test_line_mode_reports_exit_status(any_addr_port):
+    p = rpc_bg("sh -c 'echo hi; exit 7'", any_addr_port)
+    assert drain(p) == ["hi\n", "returncode: 7"]
+    p.stop()
+
+
+def test_failed_stream_ends_with_returncode():
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    command_pb2_grpc.add_CommandServicer_to_server(impl.Commander(), server)
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    p = rpc_bg("echo started; sleep 30", f"localhost:{port}")
+    try:
+        assert p.msgq().get(timeout=5) == "started\n"
+        server.stop(grace=None)
+        assert p.msgq().get(timeout=5).startswith("stream failed: ")
+        assert p.msgq().get(timeout=5) == "returncode: -1"
+        assert not p.ok()
+    finally:
+        server.stop(grace=None)
+        p.stop()
+
+
+def test_stop_cancels_remote_command(local_addr_port, tmp_path, monkeypatch):
+    monkeypatch.setattr(impl, "TERMINATE_GRACE", 0.5)
+    marker = tmp_path / "alive"
+    with RpcClient(local_addr_port) as client:
+        p = client.rpc_bg(f"echo started; sleep 2; touch {marker}")
+        assert p.msgq().get(timeout=5) == "started\n"
+        p.stop()
+        assert not p.is_alive()
+        assert not p.ok()
+    time.sleep(2.5)
+    assert not marker.exists()
@@ -0,0 +1,74 @@
+import asyncio
+import os
+
+import grpc
+import pytest
+
+from proto import command_pb2
+from src.aio_client import aclose, arpc, arpc_stream
+from src.impl import RpcClient
+
+
+@pytest.fixture(scope="module")
+def blob(tmp_path_factory):
+    data = bytes(range(256)) * 64 + os.urandom(300 * 1024)
+    path = tmp_path_factory.mktemp("binary") / "blob.bin"
+    path.write_bytes(data)
+    return path, data
+
+
+@pytest.mark.parametrize(
+    "compression", [grpc.Compression.NoCompression, grpc.Compression.Gzip]
+)
+def test_execute_binary(any_addr_port, blob, compression):
+    path, data = blob
+    with RpcClient(any_addr_port) as client:
+        returncode, stdout, stderr = client.rpc(
+            f"cat {path}; printf '\\377' >&2", binary=True, compression=compression
+        )
+    assert (returncode, stdout, stderr) == (0, data, b"\xff")
+
+
+def test_execute_text_replaces_invalid_utf8(any_addr_port):
+    with RpcClient(any_addr_port) as client:
+        assert client.rpc("printf 'a\\377b'") == (0, "a�b", "")
+
+
+def test_execute_binary_error_in_stderr_bytes(any_addr_port):
+    with RpcClient(any_addr_port) as client, client.pool.lease(any_addr_port) as pooled:
+        response = pooled.stub.Execute(
+            command_pb2.CommandRequest(command="sleep 5", timeout_ms=200, binary=True)
+        )
+    assert response.returncode == -1
+    assert response.stderr_bytes == b"Command timed out after 0.2 seconds"
+    assert response.stderr == ""
+
+
+def test_stream_binary(any_addr_port, blob):
+    path, data = blob
+    with RpcClient(any_addr_port) as client:
+        p = client.rpc_bg(f"cat {path}", binary=True, compression=grpc.Compression.Gzip)
+        p.join(10)
+        messages = list(p.msgq().queue)
+    assert messages[-1] == "returncode: 0"
+    assert b"".join(messages[:-1]) == data
+
+
+def test_arpc_binary(local_aio_addr_port, blob):
+    path, data = blob
+
+    async def main():
+        try:
+            out = await arpc(f"cat {path}", local_aio_addr_port, binary=True)
+            stream = arpc_stream(
+                f"cat {path}",
+                local_aio_addr_port,
+                binary=True,
+                compression=grpc.Compression.Deflate,
+            )
+            chunks = [chunk async for chunk in stream]
+            return out, b"".join(chunks), stream.returncode
+        finally:
+            await aclose()
+
+    assert asyncio.run(main()) == ((0, data, b""), data, 0)
@@ -0,0 +1,129 @@
+import threading
+import time
+import uuid
+from concurrent import futures
+
+from proto import command_pb2
+from src.cache import ResultCache, cache_key
+from src.impl import RpcClient, run_cached
+
+
+def request(command, ttl_ms=10_000, **kwargs):
+    return command_pb2.CommandRequest(command=command, cache_ttl_ms=ttl_ms, **kwargs)
+
+
+def response(stdout, returncode=0):
+    return command_pb2.CommandResponse(returncode=returncode, stdout=stdout)
+
+
+def fill(cache, key, value, returncode=0):
+    _, future, leader = cache.claim(key, 1)
+    assert leader
+    cache.finish(key, future, response(value, returncode))
+
+
+def test_hit_until_ttl():
+    cache = ResultCache()
+    fill(cache, "k", "a")
+    assert cache.claim("k", 10)[0].stdout == "a"
+    time.sleep(0.02)
+    assert cache.claim("k", 0.01)[2] is True
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 2)
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = ResultCache(max_entries=2)
+    fill(cache, "a", "1")
+    fill(cache, "b", "2")
+    cache.claim("a", 10)
+    fill(cache, "c", "3")
+    assert set(cache.entries) == {"a", "c"}
+    assert cache.stats()["evictions"] == 1
+
+    cache = ResultCache(max_bytes=250)
+    for key in "abc":
+        fill(cache, key, key * 100)
+    assert list(cache.entries) == ["b", "c"]
+    assert cache.bytes <= 250
+
+
+def test_failed_results_are_not_stored():
+    cache = ResultCache()
+    fill(cache, "k", "timed out", returncode=-1)
+    assert len(cache) == 0
+
+
+def test_single_flight():
+    cache = ResultCache()
+    runs = []
+    gate = threading.Event()
+
+    def run():
+        _, future, leader = cache.claim("k", 10)
+        if not leader:
+            return future.result(5).stdout
+        runs.append(1)
+        gate.wait(5)
+        cache.finish("k", future, response("once"))
+        return "once"
+
+    with futures.ThreadPoolExecutor(8) as executor:
+        results = [executor.submit(run) for _ in range(8)]
+        time.sleep(0.1)
+        gate.set()
+        assert [r.result() for r in results] == ["once"] * 8
+    assert len(runs) == 1
+    assert cache.stats()["coalesced"] == 7
+
+
+def test_waiters_run_themselves_when_leader_fails():
+    cache = ResultCache()
+    _, leader_future, _ = cache.claim(cache_key(request("echo hi")), 10)
+    waiter = futures.ThreadPoolExecutor(1).submit(
+        run_cached, request("echo hi"), None, cache
+    )
+    time.sleep(0.1)
+    cache.finish(cache_key(request("echo hi")), leader_future, None)
+    assert waiter.result(5).stdout == "hi\n"
+
+
+def test_key_includes_binary():
+    assert cache_key(request("ls", ttl_ms=0)) is None
+    assert cache_key(request("ls")) != cache_key(request("ls", binary=True))
+
+
+def test_session_commands_are_not_cached(any_addr_port):
+    with RpcClient(any_addr_port) as client, client.session() as session:
+        with client.pool.lease(any_addr_port) as pooled:
+
+            def pwd():
+                return pooled.stub.Execute(
+                    request("pwd", session_id=session.session_id)
+                ).stdout
+
+            session.rpc("cd /tmp")
+            assert pwd() == "/tmp\n"
+            session.rpc("cd /")
+            assert pwd() == "/\n"
+
+
+def test_execute_uses_cache(any_addr_port):
+    command = f"echo {uuid.uuid4().hex} $(date +%s%N)"
+    with RpcClient(any_addr_port) as client:
+        first = client.rpc(command, cache_ttl_ms=10_000)
+        assert client.rpc(command, cache_ttl_ms=10_000) == first
+        assert client.rpc(command) != first
+
+
+def test_concurrent_identical_requests_run_once(any_addr_port):
+    command = f"sleep 0.3; echo {uuid.uuid4().hex} $(date +%s%N)"
+    with RpcClient(any_addr_port) as client:
+        start = time.monotonic()
+        with futures.ThreadPoolExecutor(8) as executor:
+            results = list(
+                executor.map(
+                    lambda _: client.rpc(command, cache_ttl_ms=10_000), range(8)
+                )
+            )
+        assert time.monotonic() - start < 1.5
+    assert len(set(results)) == 1
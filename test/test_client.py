@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+
+from apps import rpi_rpc
+from bench.bench_startup import SERVER_ONLY
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_client_imports_no_server_modules():
+    for code in ("from src.api import rpc", "import apps.rpi_rpc"):
+        result = subprocess.run(
+            [sys.executable, "-c", f"{code}\nimport sys\nprint(' '.join(sys.modules))"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        modules = set(result.stdout.split())
+        assert [name for name in SERVER_ONLY if name in modules] == [], code
+
+
+def test_api_names_resolve():
+    from src import api
+
+    for name in api.__all__:
+        assert getattr(api, name) is not None
+    assert api.rpc is __import__("src.impl").impl.rpc
+
+
+def test_cli_exec(local_addr_port, capsys):
+    assert (
+        rpi_rpc.main(["-a", local_addr_port, "exec", "echo out; echo err >&2; exit 3"])
+        == 3
+    )
+    out, err = capsys.readouterr()
+    assert out == "out\n" and err == "err\n"
+
+
+def test_cli_stream(local_addr_port, capsys):
+    assert rpi_rpc.main(["-a", local_addr_port, "stream", "seq 3"]) == 0
+    assert capsys.readouterr().out == "1\n2\n3\n"
+    assert rpi_rpc.main(["-a", local_addr_port, "stream", "sh -c 'exit 4'"]) == 4
+
+
+def test_cli_ping(local_addr_port, capsys):
+    assert rpi_rpc.main(["-a", local_addr_port, "ping", "-n", "2"]) == 0
+    assert capsys.readouterr().out.count(f"{local_addr_port}: seq=") == 2
+    # 无法连接：超时后以 EXIT_RPC_ERROR 退出
+    assert (
+        rpi_rpc.main(["-a", "localhost:1", "ping", "-t", "0.5"])
+        == rpi_rpc.EXIT_RPC_ERROR
+    )
+    assert "DEADLINE_EXCEEDED" in capsys.readouterr().err
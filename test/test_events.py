@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import grpc
+import pytest
+
+from proto import command_pb2
+from src.aio_client import aclose, arpc_events
+from src.client import rpc_events
+from src.pushdown import StreamFilter
+
+
+def kinds(events):
+    return [event.WhichOneof("event") for event in events]
+
+
+def test_line_events_end_with_usage_and_exit(any_addr_port):
+    before = time.time_ns() // 1000
+    events = list(rpc_events("printf 'a\\nb\\n'; echo err >&2; exit 3", any_addr_port))
+    after = time.time_ns() // 1000
+    assert [event.seq for event in events] == list(range(1, len(events) + 1))
+    assert all(before <= event.time_us <= after for event in events)
+    assert all(a.time_us <= b.time_us for a, b in zip(events, events[1:]))
+    assert kinds(events)[-2:] == ["usage", "exit"]
+    data = [event.data for event in events if event.HasField("data")]
+    assert [d.data for d in data if d.src == command_pb2.STDOUT] == [b"a\n", b"b\n"]
+    assert [d.data for d in data if d.src == command_pb2.STDERR] == [b"err\n"]
+    assert events[-1].exit.returncode == 3 and not events[-1].exit.error
+    assert events[-2].usage.wall_us > 0
+
+
+def test_usage_reports_cpu_time(local_addr_port):
+    events = list(
+        rpc_events("python3 -c 'sum(range(3 * 10**6))'", local_addr_port, chunk_size=1)
+    )
+    usage = events[-2].usage
+    assert usage.user_us + usage.system_us > 0
+    assert usage.max_rss_kb > 0
+    assert usage.wall_us >= usage.user_us // 2
+
+
+def test_binary_chunk_events(any_addr_port):
+    events = list(rpc_events("head -c 3000 /dev/zero", any_addr_port, binary=True))
+    assert b"".join(e.data.data for e in events if e.HasField("data")) == bytes(3000)
+    assert events[-1].exit.returncode == 0
+
+
+def test_spooled_events_start_with_job_id(any_addr_port):
+    events = list(rpc_events("seq 3", any_addr_port, spool=True))
+    assert kinds(events)[0] == "job_id" and events[0].job_id
+    assert [e.data.data for e in events if e.HasField("data")] == [
+        b"1\n",
+        b"2\n",
+        b"3\n",
+    ]
+    assert kinds(events)[-2:] == ["usage", "exit"]
+    assert events[-1].exit.returncode == 0
+
+
+def test_match_event_and_stop_on_match(any_addr_port):
+    stream_filter = StreamFilter(watches=[["ready"]], stop_on_match=True)
+    start = time.monotonic()
+    events = list(
+        rpc_events(
+            "echo starting; echo ready; sleep 10",
+            any_addr_port,
+            stream_filter=stream_filter,
+        )
+    )
+    assert time.monotonic() - start < 5
+    # 所有 watch 完成后命令被结束：没有 exit
+    assert "exit" not in kinds(events)
+    (match,) = [event.match for event in events if event.HasField("match")]
+    assert [line.strip() for line in match.lines] == ["ready"]
+
+
+def test_text_events_carry_raw_bytes(any_addr_port):
+    command = "printf 'a\\377\\n'; printf '\\303\\251\\376' >&2"
+    for chunk_size in (0, 64):
+        events = list(rpc_events(command, any_addr_port, chunk_size=chunk_size))
+        data = [event.data for event in events if event.HasField("data")]
+        assert b"".join(d.data for d in data if d.src == command_pb2.STDOUT) == (
+            b"a\xff\n"
+        )
+        assert b"".join(d.data for d in data if d.src == command_pb2.STDERR) == (
+            b"\xc3\xa9\xfe"
+        )
+        assert events[-1].exit.returncode == 0
+
+
+def test_watch_of_non_utf8_output(any_addr_port):
+    stream_filter = StreamFilter(watches=[["ready"]])
+    events = list(
+        rpc_events(
+            "printf '\\377 ready\\n'", any_addr_port, stream_filter=stream_filter
+        )
+    )
+    (match,) = [event.match for event in events if event.HasField("match")]
+    assert match.lines == ["\ufffd ready"]
+    assert [e.data.data for e in events if e.HasField("data")] == [b"\xff ready\n"]
+
+
+@pytest.mark.parametrize(
+    "compression", [grpc.Compression.Gzip, grpc.Compression.Deflate]
+)
+def test_compressed_events(any_addr_port, local_aio_addr_port, compression):
+    command = "head -c 100000 /dev/zero; exit 4"
+
+    def output(events):
+        assert events[-1].exit.returncode == 4
+        return b"".join(e.data.data for e in events if e.HasField("data"))
+
+    events = list(
+        rpc_events(command, any_addr_port, binary=True, compression=compression)
+    )
+    assert output(events) == bytes(100000)
+
+    async def main():
+        try:
+            call = arpc_events(
+                command, local_aio_addr_port, binary=True, compression=compression
+            )
+            return [event async for event in call]
+        finally:
+            await aclose()
+
+    assert output(asyncio.run(main())) == bytes(100000)
@@ -0,0 +1,92 @@
+import asyncio
+import socket
+import time
+from concurrent import futures
+
+import grpc
+import pytest
+
+from apps import fanout as fanout_app
+from proto import command_pb2_grpc
+from src.aio_client import aclose, arpc_fanout
+from src.fanout import fanout_summary, rpc_fanout
+from src.impl import Commander
+
+
+@pytest.fixture(scope="module")
+def hosts():
+    """three Commander servers on different ports"""
+    servers, addr_ports = [], []
+    for _ in range(3):
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+        command_pb2_grpc.add_CommandServicer_to_server(Commander(), server)
+        port = server.add_insecure_port("localhost:0")
+        server.start()
+        servers.append(server)
+        addr_ports.append(f"localhost:{port}")
+    yield addr_ports
+    for server in servers:
+        server.stop(grace=None)
+
+
+@pytest.fixture
+def dead_host():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return f"localhost:{sock.getsockname()[1]}"
+
+
+def test_fanout_runs_in_parallel(hosts):
+    start = time.monotonic()
+    results = list(rpc_fanout("sleep 0.5; echo $PPID", hosts))
+    assert time.monotonic() - start < 1.4
+    assert sorted(r.addr_port for r in results) == sorted(hosts)
+    assert all(r.ok and r.stdout.strip() for r in results)
+
+
+def test_fanout_limits_concurrency(hosts):
+    start = time.monotonic()
+    list(rpc_fanout("sleep 0.3", hosts, max_parallel=1))
+    assert time.monotonic() - start >= 0.9
+
+
+def test_fanout_streams_results(hosts):
+    start = time.monotonic()
+    results = rpc_fanout("sleep 0.3", hosts, max_parallel=1)
+    next(results)
+    # 第一台主机完成即返回，不等待其余主机
+    assert time.monotonic() - start < 0.6
+    results.close()
+
+
+def test_fanout_reports_failures(hosts, dead_host):
+    results = {
+        r.addr_port: r
+        for r in rpc_fanout("sleep 2", [hosts[0], dead_host], timeout=0.3)
+    }
+    assert results[dead_host].code == grpc.StatusCode.UNAVAILABLE
+    assert results[hosts[0]].returncode == -1
+    assert "timed out" in results[hosts[0]].stderr
+    summary = fanout_summary(list(results.values()))
+    assert (summary["hosts"], summary["ok"], summary["failed"]) == (2, 0, 2)
+
+
+def test_arpc_fanout(hosts):
+    async def main():
+        results = [r async for r in arpc_fanout("echo hi", hosts, max_parallel=2)]
+        await aclose()
+        return results
+
+    results = asyncio.run(main())
+    assert sorted(r.addr_port for r in results) == sorted(hosts)
+    assert all(r.stdout == "hi\n" for r in results)
+
+
+def test_cli(hosts, dead_host, capsys):
+    assert fanout_app.main(["-q", "-H", ",".join(hosts), "echo hi"]) == 0
+    out = capsys.readouterr().out
+    assert "3/3 ok, 0 failed" in out
+    assert fanout_app.main(["-H", hosts[0], "-H", dead_host, "echo hi"]) == 1
+    out = capsys.readouterr().out
+    assert f"[{hosts[0]}] hi" in out
+    assert f"[{dead_host}] UNAVAILABLE" in out
@@ -0,0 +1,227 @@
+import os
+import subprocess
+import sys
+import time
+
+import grpc
+import pytest
+
+from proto import command_pb2
+from src import spool as spool_module
+from src.impl import RpcClient, RpcJob, shell_args
+from src.jobs import JobError, JobManager
+from src.scheduler import STREAM, Scheduler
+from src.spool import Spool
+
+TICKS = "sh -c 'for i in 1 2 3 4 5; do echo tick $i; sleep 0.2; done'"
+TICKS_OUTPUT = b"".join(f"tick {i}\n".encode() for i in range(1, 6))
+
+
+def test_spool_keeps_at_most_max_bytes(tmp_path):
+    spool = Spool(str(tmp_path / "job"), max_bytes=100)
+    for i in range(30):
+        spool.append(b"%09d\n" % i)
+    assert spool.size == 300
+    on_disk = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+    assert on_disk <= 100
+    assert spool.start == 200
+    # 已丢弃的位置从 start 开始读取
+    assert spool.read(0, 20) == (200, b"000000020\n000000021\n")
+    assert spool.read(290, 100) == (290, b"000000029\n")
+    assert spool.read(300, 100) == (300, b"")
+    spool.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_spools_do_not_reserve_address_space(tmp_path):
+    # 32 位系统的用户地址空间约 3 GiB：64 个 64 MiB 的 spool 不能各自映射整个 segment
+    code = f"""
+import resource
+from src.spool import Spool
+soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+with open("/proc/self/statm") as f:
+    used = int(f.read().split()[0]) * resource.getpagesize()
+resource.setrlimit(resource.RLIMIT_AS, (used + 256 * 2**20, hard))
+spools = [Spool({str(tmp_path)!r} + f"/job{{i}}") for i in range(64)]
+for spool in spools:
+    spool.append(b"x" * 1000)
+    assert spool.read(0, 10) == (0, b"x" * 10)
+"""
+    subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True,
+    )
+
+
+def test_spool_line_offset(tmp_path, monkeypatch):
+    monkeypatch.setattr(spool_module, "INDEX_BYTES", 16)
+    spool = Spool(str(tmp_path / "job"), max_bytes=200)
+    lines = [b"x" * (i % 7) + b"%d\n" % i for i in range(1, 40)]
+    output = b"".join(lines)
+    for i in range(0, len(output), 9):
+        spool.append(output[i : i + 9])
+    starts = [0]
+    for line in lines:
+        starts.append(starts[-1] + len(line))
+    assert spool.start > 0
+    for number in range(1, len(lines) + 2):
+        if starts[number - 1] < spool.start:
+            with pytest.raises(ValueError):
+                spool.line_offset(number)
+        else:
+            assert spool.line_offset(number) == starts[number - 1]
+    assert spool.line_offset(1000) == spool.size
+    spool.close()
+
+
+def test_manager_limit(tmp_path):
+    jobs = JobManager(str(tmp_path), max_jobs=1, keep_finished=0)
+    job = jobs.start("sleep 30", shell_args("sleep 30"))
+    with pytest.raises(JobError) as e:
+        jobs.start("true", shell_args("true"))
+    assert e.value.code == grpc.StatusCode.RESOURCE_EXHAUSTED
+    jobs.cancel(job.id)
+    assert job.wait(job.size, 5) and not job.running
+    # 已结束的任务让位于新任务
+    jobs.start("true", shell_args("true"))
+    with pytest.raises(JobError):
+        jobs.get(job.id)
+    jobs.shutdown()
+    assert os.listdir(tmp_path) == []
+
+
+def test_running_jobs_take_scheduler_slots(tmp_path):
+    scheduler = Scheduler(max_children=2, max_queue=0)
+    jobs = JobManager(str(tmp_path), scheduler=scheduler)
+    job = jobs.start("sleep 30", shell_args("sleep 30"))
+    assert scheduler.stats()[STREAM]["running"] == 1
+    # 一个 slot 留给 Execute（max_streams 为 3/4），第二个任务被拒绝
+    with pytest.raises(JobError) as e:
+        jobs.start("sleep 30", shell_args("sleep 30"))
+    assert e.value.code == grpc.StatusCode.RESOURCE_EXHAUSTED
+    jobs.cancel(job.id)
+    assert job.wait(job.size, 5) and not job.running
+    assert scheduler.stats()[STREAM]["running"] == 0
+    jobs.start("true", shell_args("true"))
+    jobs.shutdown()
+
+
+def test_attach_follow(any_addr_port):
+    with RpcClient(any_addr_port) as client:
+        job = client.start_job(TICKS)
+        assert job.info.running
+        output = b"".join(data for _, data in job.attach())
+        assert output == TICKS_OUTPUT
+        assert not job.info.running
+        assert job.info.returncode == 0
+        assert job.info.size == len(TICKS_OUTPUT) == job.offset
+        assert job.status().finished_ms >= job.info.started_ms
+
+
+def test_reattach_from_offset(any_addr_port):
+    with RpcClient(any_addr_port) as client:
+        job = client.start_job(TICKS)
+        job_id = job.job_id
+        for _, data in job.attach():
+            first = data
+            break
+        offset = job.offset
+    assert offset == len(first)
+
+    # 客户端已经关闭，任务仍在运行，从上次的位置重新连接
+    with RpcClient(any_addr_port) as client:
+        job = client.job(job_id)
+        chunks = list(job.attach(offset))
+    assert chunks[0][0] == offset
+    assert first + b"".join(data for _, data in chunks) == TICKS_OUTPUT
+    assert job.info.returncode == 0
+
+
+def test_attach_without_follow(any_addr_port):
+    with RpcClient(any_addr_port) as client:
+        job = client.start_job("echo one; sleep 30")
+        deadline = time.monotonic() + 5
+        # stdbuf -o0 下 echo 可能分两次写入 "one" 与 "\n"
+        while job.status().size < 4 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert b"".join(data for _, data in job.attach(follow=False)) == b"one\n"
+        assert job.info.running
+        info = job.cancel()
+        assert info.job_id == job.job_id
+        deadline = time.monotonic() + 5
+        while job.status().running and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not job.info.running
+        assert job.info.returncode != 0
+
+
+def test_errors(any_addr_port):
+    with RpcClient(any_addr_port) as client:
+        with pytest.raises(grpc.RpcError) as e:
+            client.job("nope").status()
+        assert e.value.code() == grpc.StatusCode.NOT_FOUND
+        job = client.start_job("echo hi")
+        list(job.attach())
+        with pytest.raises(grpc.RpcError) as e:
+            list(job.attach(100))
+        assert e.value.code() == grpc.StatusCode.OUT_OF_RANGE
+        with pytest.raises(grpc.RpcError) as e:
+            list(RpcJob("nope", any_addr_port, client.pool).attach())
+        assert e.value.code() == grpc.StatusCode.NOT_FOUND
+
+
+def test_read_output(any_addr_port):
+    with RpcClient(any_addr_port) as client:
+        job = client.start_job("seq 1000")
+        list(job.attach())
+        assert job.read(0, 6) == (0, b"1\n2\n3\n")
+        assert job.read() == (6, b"".join(b"%d\n" % i for i in range(4, 1001)))
+        assert job.read() == (job.info.size, b"")
+        assert not job.info.running
+        assert job.read(line=500, length=8) == (len(output_of(499)), b"500\n501\n")
+        assert job.read(line=2000) == (job.info.size, b"")
+        with pytest.raises(grpc.RpcError) as e:
+            job.read(job.info.size + 1)
+        assert e.value.code() == grpc.StatusCode.OUT_OF_RANGE
+
+
+def output_of(lines: int) -> bytes:
+    return b"".join(b"%d\n" % i for i in range(1, lines + 1))
+
+
+def test_spooled_stream(any_addr_port):
+    with RpcClient(any_addr_port) as client:
+        p = client.rpc_bg("seq 3", spool=True)
+        p.join(10)
+        q = p.msgq()
+        # 行模式没有带 returncode 的结束消息，退出状态由任务查询
+        assert [q.get_nowait() for _ in range(3)] == ["1\n", "2\n", "3\n"]
+        job = client.job(p.job_id)
+        assert job.read() == (0, b"1\n2\n3\n")
+        assert job.info.returncode == 0
+
+        p = client.rpc_bg("seq 3; exit 3", chunk_size=1024, spool=True)
+        p.join(10)
+        assert (
+            b"".join(msg.encode() for msg in list(p.msgq().queue)[:-1]) == b"1\n2\n3\n"
+        )
+        assert p.msgq().queue[-1] == "returncode: 3"
+
+
+def test_spooled_stream_slow_reader(any_addr_port):
+    size = 8 * 1024 * 1024
+    with RpcClient(any_addr_port) as client, client.pool.lease(any_addr_port) as pooled:
+        call = pooled.stub.ExecuteStream(
+            command_pb2.CommandRequest(
+                command=f"head -c {size} /dev/zero", binary=True, spool=True
+            )
+        )
+        job = client.job(next(call).job_id)
+        # 客户端不读取，子进程仍然写完全部输出
+        deadline = time.monotonic() + 10
+        while job.status().running and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert job.info.returncode == 0 and job.info.size == size
+        received = sum(len(response.stdout_bytes) for response in call)
+        assert received == size
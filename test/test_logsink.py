@@ -0,0 +1,139 @@
+import gzip
+import os
+import time
+
+import pytest
+
+from apps.rpc_monitor import RpcStreamIOMonitor
+from src.logsink import LogSink
+
+
+def test_lines_are_written_in_batches(tmp_path):
+    path = tmp_path / "out.log"
+    sink = LogSink(str(path), flush_interval=5)
+    for i in range(1000):
+        sink.write(f"line {i}\n")
+    sink.close()
+    assert path.read_text().splitlines() == [f"line {i}" for i in range(1000)]
+    stats = sink.stats()
+    assert stats["lines"] == 1000
+    assert stats["batches"] < 100
+
+
+def test_flush_interval_bounds_delay(tmp_path):
+    path = tmp_path / "out.log"
+    sink = LogSink(str(path), flush_interval=0.05)
+    try:
+        sink.write("hello\n")
+        deadline = time.monotonic() + 2
+        while path.read_text() != "hello\n" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert path.read_text() == "hello\n"
+    finally:
+        sink.close()
+
+
+def test_rotation_with_gzip(tmp_path):
+    path = tmp_path / "out.log"
+    sink = LogSink(
+        str(path), flush_bytes=100, rotate_bytes=1000, backups=2, compress="gzip"
+    )
+    for i in range(300):
+        sink.write(f"{i:09d}\n")
+    sink.close()
+    assert sink.stats()["rotations"] >= 2
+    assert path.stat().st_size <= 1000
+    assert not (tmp_path / "out.log.3.gz").exists()
+    newest = gzip.decompress((tmp_path / "out.log.1.gz").read_bytes()).decode()
+    assert newest.splitlines()[-1] < path.read_text().splitlines()[0]
+
+
+def test_invalid_options(tmp_path):
+    with pytest.raises(ValueError):
+        LogSink(str(tmp_path / "out.log"), fsync="always")
+    with pytest.raises(ValueError):
+        LogSink(str(tmp_path / "out.log"), compress="bz2")
+
+
+def test_monitor_writes_through_sink(fake_stream, tmp_path):
+    path = tmp_path / "nested" / "monitor.log"
+    monitor = RpcStreamIOMonitor(fake_stream, str(path))
+    task_id = monitor.assert_keywords(["done"], timeout=5)
+    for line in ("a", "b", "done"):
+        fake_stream.q.put(line + "\n")
+    assert monitor.result(task_id, wait=True)[0] is True
+    monitor.stop()
+    assert path.read_text() == "a\nb\ndone\n"
+
+
+def test_write_errors_drop_batches(tmp_path):
+    sink = LogSink(str(tmp_path / "out.log"), flush_interval=0.01)
+    sink.write("kept\n")
+    deadline = time.monotonic() + 2
+    while sink.stats()["lines"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # 磁盘写满：之后的每次写入都失败（ENOSPC）
+    with sink.cond:
+        sink.file.close()
+        sink.file = open("/dev/full", "ab", buffering=0)
+    for i in range(100):
+        sink.write(f"line {i}\n")
+    sink.close()
+    stats = sink.stats()
+    assert stats["errors"] >= 1 and stats["lines"] + stats["dropped"] == 101
+    assert (tmp_path / "out.log").read_text() == "kept\n"
+    # 关闭后写入直接丢弃，不再阻塞
+    sink.write("late\n")
+    assert sink.stats()["dropped"] == stats["dropped"] + 1
+
+
+def wait_stats(sink, key, value):
+    deadline = time.monotonic() + 2
+    while sink.stats()[key] < value and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sink.stats()[key] >= value
+
+
+def test_write_errors_after_rotation_leave_nothing_behind(tmp_path):
+    path = tmp_path / "out.log"
+    sink = LogSink(str(path), flush_interval=0.01, rotate_bytes=100, backups=1)
+    sink.write("x" * 95 + "\n")
+    sink.write("rotated\n")
+    wait_stats(sink, "lines", 2)
+    assert sink.stats()["rotations"] == 1
+    # 轮转后打开的文件描述符临时指向 /dev/full：写入失败（ENOSPC）
+    with sink.cond:
+        fd = sink.file.fileno()
+        saved = os.dup(fd)
+        with open("/dev/full", "wb") as full:
+            os.dup2(full.fileno(), fd)
+    sink.write("lost\n")
+    wait_stats(sink, "errors", 1)
+    with sink.cond:
+        os.dup2(saved, fd)
+        os.close(saved)
+    sink.write("after\n")
+    sink.close()
+    # 失败的批次被丢弃，不会在之后的写入中再次出现
+    assert path.read_text() == "rotated\nafter\n"
+    assert sink.stats()["dropped"] == 1
+
+
+def test_monitor_survives_unwritable_log(fake_stream, tmp_path):
+    sink = LogSink(str(tmp_path / "monitor.log"), queue_size=10, flush_interval=0.01)
+    monitor = RpcStreamIOMonitor(fake_stream, sink=sink)
+    first = monitor.assert_keywords(["first"], timeout=5)
+    fake_stream.q.put("first\n")
+    assert monitor.result(first, wait=True)[0] is True
+    with sink.cond:
+        sink.file.close()
+        sink.file = open("/dev/full", "ab", buffering=0)
+    task_id = monitor.assert_keywords(["done"], timeout=5)
+    for i in range(1000):
+        fake_stream.q.put(f"line {i}\n")
+    fake_stream.q.put("done\n")
+    assert monitor.result(task_id, wait=True)[0] is True
+    start = time.monotonic()
+    monitor.stop()
+    assert time.monotonic() - start < 5
+    assert sink.stats()["dropped"] > 0
@@ -0,0 +1,77 @@
+import re
+import time
+
+from apps.rpc_monitor import RpcStreamIOMonitor
+from src.matcher import MatchEngine, Watch, trie_regex
+
+
+def test_trie_regex_longest_first():
+    pattern = re.compile(trie_regex(["ab", "abc", "b", "a.c"]))
+    assert pattern.match("abcd").group() == "abc"
+    assert pattern.match("a.c").group() == "a.c"
+    assert pattern.match("axc") is None
+
+
+def test_overlapping_keywords_all_reported():
+    engine = MatchEngine()
+    watch = Watch(["error", "error 42", "or 4", "42"])
+    engine.add(watch)
+    assert engine.feed("fatal error 42 occurred") == [watch]
+    assert len(engine) == 0
+
+
+def test_keywords_across_lines_and_regex():
+    engine = MatchEngine()
+    watch = Watch(["boot", re.compile(r"temp=\d+C")])
+    other = Watch(["never"])
+    engine.add(watch)
+    engine.add(other)
+    assert engine.feed("boot ok") == []
+    assert engine.feed("temp=xC") == []
+    assert engine.feed("temp=42C") == [watch]
+    assert watch.matched_lines == ["boot ok", "temp=42C"]
+    assert len(engine) == 1
+    engine.remove(other)
+    assert engine.feed("never") == []
+
+
+def test_ordered_watch():
+    engine = MatchEngine()
+    watch = Watch(["start", "stop"], ordered=True)
+    engine.add(watch)
+    assert engine.feed("stop") == []
+    assert engine.feed("start stop") == []  # 每行最多前进一步
+    assert watch.found == [True, False]
+    assert engine.feed("stop") == [watch]
+
+
+def test_monitor_completes_on_arrival(fake_stream):
+    stream = fake_stream
+    monitor = RpcStreamIOMonitor(stream)
+    try:
+        task_id = monitor.assert_keywords(["ready", re.compile(r"v\d")], timeout=5)
+        missed = monitor.assert_keywords(["never"], timeout=0.2)
+        start = time.monotonic()
+        stream.q.put("version v2\n")
+        stream.q.put("ready\n")
+        assert monitor.result(task_id, wait=True) == (
+            True,
+            [True, True],
+            ["ready", "version v2"],
+        )
+        assert time.monotonic() - start < 0.5
+        assert monitor.result(missed, wait=True) == (False, [False], [None])
+    finally:
+        monitor.stop()
+
+
+def test_regex_prefilter_fallbacks():
+    engine = MatchEngine()
+    backref = Watch([re.compile(r"(\w)\1x")])
+    named = Watch([re.compile(r"(?P<n>id)=1")])
+    named_again = Watch([re.compile(r"(?P<n>id)=2")])
+    ignorecase = Watch([re.compile("ERROR", re.I)])
+    for watch in (backref, named, named_again, ignorecase):
+        engine.add(watch)
+    assert engine.feed("aax id=2 error") == [backref, named_again, ignorecase]
+    assert engine.feed("id=1") == [named]
@@ -0,0 +1,181 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent import futures
+
+import grpc
+import pytest
+
+from proto import command_pb2, command_pb2_grpc
+from src.impl import Commander, RpcClient
+from src.metrics import Counter, Histogram, Registry, ServerMetrics, serve_metrics
+from src.pushdown import StreamFilter
+
+
+@pytest.fixture
+def metrics_server():
+    """in-process Commander with its ServerMetrics"""
+    metrics = ServerMetrics()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    command_pb2_grpc.add_CommandServicer_to_server(Commander(metrics=metrics), server)
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    yield f"localhost:{port}", metrics
+    server.stop(grace=None)
+
+
+def scrape(port: int) -> str:
+    with urllib.request.urlopen(f"http://localhost:{port}/metrics", timeout=5) as r:
+        assert r.headers["Content-Type"].startswith("text/plain")
+        return r.read().decode()
+
+
+def test_render_counter_and_histogram():
+    registry = Registry()
+    counter = registry.counter("calls_total", "calls", ("method",))
+    histogram = registry.histogram("latency_seconds", "latency", buckets=(0.1, 1.0))
+    counter.labels('say "hi"').inc()
+    counter.labels('say "hi"').inc(2)
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    text = registry.render()
+    assert "# TYPE calls_total counter" in text
+    assert 'calls_total{method="say \\"hi\\""} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+    assert "latency_seconds_sum 5.55" in text
+
+
+def test_wrong_label_count():
+    with pytest.raises(ValueError):
+        Counter("c", "c", ("a", "b")).labels("x")
+    with pytest.raises(ValueError):
+        Histogram("h", "h", ("a",)).observe(1)
+
+
+def test_execute_and_stream_metrics(metrics_server):
+    addr_port, metrics = metrics_server
+    with RpcClient(addr_port) as client:
+        assert client.rpc("echo hi")[0] == 0
+        with client.pool.lease(addr_port) as pooled:
+            timed_out = pooled.stub.Execute(
+                command_pb2.CommandRequest(command="sleep 1", timeout_ms=200)
+            )
+            assert timed_out.returncode == -1
+            responses = list(
+                pooled.stub.ExecuteStream(
+                    command_pb2.CommandRequest(command="seq 1 300")
+                )
+            )
+    assert len(responses) == 300
+
+    assert metrics.requests.value("Execute", "OK") == 2
+    assert metrics.requests.value("ExecuteStream", "OK") == 1
+    assert metrics.stream_messages.value("ExecuteStream") == 300
+    assert metrics.stream_bytes.value("ExecuteStream") == sum(
+        r.ByteSize() for r in responses
+    )
+    assert metrics.timeouts.value("execute") == 1
+    assert metrics.spawn.labels("execute").count == 2
+    assert metrics.spawn.labels("stream").count == 1
+    assert metrics.first_byte.labels("ExecuteStream").count == 1
+    text = metrics.render()
+    assert 'rpi_rpc_children_running{kind="execute"} 0' in text
+    assert "rpi_rpc_cache_misses_total 0" in text
+
+
+def test_events_metrics_count_sent_events(metrics_server):
+    addr_port, metrics = metrics_server
+    with RpcClient(addr_port) as client:
+        events = list(client.rpc_events("seq 1 3"))
+        with pytest.raises(grpc.RpcError):
+            list(client.rpc_events("true", stream_filter=StreamFilter(include=["("])))
+    # 3 行输出、usage 和 exit
+    assert len(events) == 5
+    assert metrics.stream_messages.value("ExecuteEvents") == 5
+    assert metrics.stream_bytes.value("ExecuteEvents") == sum(
+        e.ByteSize() for e in events
+    )
+    assert metrics.requests.value("ExecuteEvents", "OK") == 1
+    assert metrics.requests.value("ExecuteEvents", "INVALID_ARGUMENT") == 1
+    assert metrics.stream_messages.value("ExecuteStream") == 0
+
+
+def test_invalid_argument_code(metrics_server):
+    addr_port, metrics = metrics_server
+    with RpcClient(addr_port) as client:
+        with client.pool.lease(addr_port) as pooled:
+            with pytest.raises(grpc.RpcError):
+                list(
+                    pooled.stub.ExecuteStream(
+                        command_pb2.CommandRequest(command="true", include=["("])
+                    )
+                )
+    assert metrics.requests.value("ExecuteStream", "INVALID_ARGUMENT") == 1
+
+
+def test_http_endpoint():
+    registry = Registry()
+    registry.counter("up_total", "up").inc()
+    server = serve_metrics(registry, 0, "localhost")
+    try:
+        port = server.server_address[1]
+        assert "up_total 1" in scrape(port)
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(f"http://localhost:{port}/other", timeout=5)
+        assert e.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_async_server_metrics_port():
+    ports = []
+    for _ in range(2):
+        with socket.socket() as sock:
+            sock.bind(("localhost", 0))
+            ports.append(sock.getsockname()[1])
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "apps.server",
+            "--backend",
+            "async",
+            "--port",
+            str(ports[0]),
+            "--metrics-port",
+            str(ports[1]),
+        ],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with RpcClient(f"localhost:{ports[0]}") as client:
+            assert client.echo_test(timeout=10)
+            client.rpc("true")
+            assert len(list(client.rpc_events("seq 1 3"))) == 5
+        deadline = time.monotonic() + 5
+        while True:
+            try:
+                text = scrape(ports[1])
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+        assert 'rpi_rpc_requests_total{method="Execute",code="OK"} 2' in text
+        assert 'rpi_rpc_spawn_seconds_count{kind="execute"} 2' in text
+        assert 'rpi_rpc_stream_messages_total{method="ExecuteEvents"} 5' in text
+    finally:
+        process.terminate()
+        process.wait(10)
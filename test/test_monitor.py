@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import time
+
+from apps.rpc_monitor import RpcStreamIOMonitor
+
+
+def test_tasks_do_not_start_threads(fake_stream):
+    monitor = RpcStreamIOMonitor(fake_stream)
+    try:
+        before = threading.active_count()
+        task_ids = [monitor.assert_keywords([f"k{i}"], timeout=5) for i in range(200)]
+        assert threading.active_count() == before
+        fake_stream.q.put("k7")
+        assert monitor.future(task_ids[7]).result(timeout=1) == (True, [True], ["k7"])
+    finally:
+        monitor.stop()
+
+
+def test_timeouts_expire_in_deadline_order(fake_stream):
+    monitor = RpcStreamIOMonitor(fake_stream)
+    try:
+        slow = monitor.assert_keywords(["never"], timeout=0.6)
+        fast = monitor.assert_keywords(["never"], timeout=0.1)
+        start = time.monotonic()
+        assert monitor.future(fast).result(timeout=1) == (False, [False], [None])
+        assert time.monotonic() - start < 0.4
+        assert not monitor.future(slow).done()
+        assert monitor.future(slow).result(timeout=2)[0] is False
+    finally:
+        monitor.stop()
+
+
+def test_future_callback_may_use_monitor(fake_stream):
+    monitor = RpcStreamIOMonitor(fake_stream)
+    try:
+        first = monitor.assert_keywords(["step 1"], timeout=5)
+        chained = []
+        monitor.future(first).add_done_callback(
+            lambda _: chained.append(monitor.assert_keywords(["step 2"], timeout=5))
+        )
+        fake_stream.q.put("step 1")
+        monitor.future(first).result(timeout=1)
+        fake_stream.q.put("step 2")
+        assert monitor.result(chained[0], wait=True)[0] is True
+    finally:
+        monitor.stop()
+
+
+def test_result_async(fake_stream):
+    monitor = RpcStreamIOMonitor(fake_stream)
+
+    async def main():
+        task_id = monitor.assert_keywords(["ready"], timeout=5)
+        asyncio.get_running_loop().call_later(0.05, fake_stream.q.put, "ready")
+        return await monitor.result_async(task_id)
+
+    try:
+        assert asyncio.run(main()) == (True, [True], ["ready"])
+    finally:
+        monitor.stop()
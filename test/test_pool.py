@@ -0,0 +1,48 @@
+from src.impl import RpcClient, rpc, rpc_echo_test
+from src.pool import ChannelPool, default_pool
+
+
+def test_rpc_reuses_pooled_channel(local_addr_port):
+    assert rpc("echo 1", local_addr_port)[0] == 0
+    with default_pool().lease(local_addr_port) as first:
+        pass
+    assert rpc("echo 2", local_addr_port)[1].strip() == "2"
+    with default_pool().lease(local_addr_port) as second:
+        assert second is first
+
+
+def test_echo_test_uses_pool(local_addr_port):
+    pool = ChannelPool()
+    assert rpc_echo_test(local_addr_port, timeout=5, pool=pool)
+    assert len(pool) == 1
+    pool.close()
+
+
+def test_rpc_client(local_addr_port):
+    with RpcClient(local_addr_port) as client:
+        assert client.echo_test(timeout=5)
+        assert client.rpc("echo hello") == (0, "hello\n", "")
+
+
+def test_pool_max_size_evicts_lru():
+    pool = ChannelPool(max_size=2)
+    with pool.lease("localhost:1"):
+        pass
+    with pool.lease("localhost:2"):
+        pass
+    with pool.lease("localhost:3"):
+        pass
+    assert list(pool.entries) == ["localhost:2", "localhost:3"]
+    pool.close()
+
+
+def test_pool_keeps_leased_channels():
+    pool = ChannelPool(max_size=1, idle_timeout=0)
+    with pool.lease("localhost:1") as leased:
+        with pool.lease("localhost:2"):
+            pass
+        assert pool.entries["localhost:1"] is leased
+    with pool.lease("localhost:3"):
+        pass
+    assert list(pool.entries) == ["localhost:3"]
+    pool.close()
@@ -0,0 +1,107 @@
+import asyncio
+import re
+import time
+
+import grpc
+import pytest
+
+from proto import command_pb2
+from src.aio_client import aclose, arpc_stream
+from src.impl import RpcClient
+from src.pool import default_pool
+from src.pushdown import LineFilter, StreamFilter
+
+
+def stream(addr_port, command, stream_filter, **kwargs):
+    with default_pool().lease(addr_port) as pooled:
+        request = command_pb2.CommandRequest(
+            command=command, **stream_filter.request_fields(), **kwargs
+        )
+        return list(pooled.stub.ExecuteStream(request))
+
+
+def test_line_filter_include_exclude_sample():
+    line_filter = LineFilter(include=["^a"], exclude=["x$"], sample_every=2)
+    lines = ["a1\n", "b2\n", "a3x\n", "a4\n", "a5\n", "a6\n"]
+    sent = [line for line in lines if line_filter.feed(line)[0]]
+    assert sent == ["a1\n", "a5\n"]
+    assert (line_filter.lines, line_filter.sent) == (6, 2)
+
+
+def test_line_filter_watches_see_filtered_lines():
+    request = command_pb2.CommandRequest(
+        **StreamFilter(
+            include=["never"],
+            watches=[["ready"], [re.compile("ERR(OR)? \\d+", re.I)]],
+            stop_on_match=True,
+        ).request_fields()
+    )
+    line_filter = LineFilter.from_request(request)
+    assert line_filter.feed("error 42\n") == (False, [1])
+    assert not line_filter.finished
+    assert line_filter.feed("ready\n") == (False, [0])
+    assert line_filter.finished
+
+
+def test_line_filter_needs_line_mode():
+    request = command_pb2.CommandRequest(
+        chunk_size=1024, **StreamFilter(include=["a"]).request_fields()
+    )
+    with pytest.raises(ValueError):
+        LineFilter.from_request(request)
+    assert LineFilter.from_request(command_pb2.CommandRequest()) is None
+
+
+def test_stream_sends_filtered_lines(any_addr_port):
+    responses = stream(
+        any_addr_port,
+        "seq 1 1000; echo 500 >&2",
+        StreamFilter(include=["^5"], exclude=["0$"]),
+    )
+    expected = [f"{i}\n" for i in range(1, 1001) if str(i)[0] == "5" and i % 10]
+    assert [r.stdout for r in responses if r.stdout] == expected
+    assert not [r.stderr for r in responses if r.stderr]
+
+
+def test_stream_rejects_invalid_filter(any_addr_port):
+    with pytest.raises(grpc.RpcError) as e:
+        stream(any_addr_port, "true", StreamFilter(include=["("]))
+    assert e.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+    with pytest.raises(grpc.RpcError) as e:
+        stream(any_addr_port, "true", StreamFilter(include=["a"]), chunk_size=64)
+    assert e.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+
+def test_match_event_stops_command(any_addr_port):
+    stream_filter = StreamFilter(
+        include=["^$"], watches=[["line 5"], ["line 3"]], stop_on_match=True
+    )
+    start = time.monotonic()
+    with RpcClient(any_addr_port) as client:
+        p = client.rpc_bg(
+            "sh -c 'for i in $(seq 1 100); do echo line $i; sleep 0.05; done'",
+            stream_filter=stream_filter,
+        )
+        p.join(timeout=4)
+        assert not p.is_alive()
+    assert time.monotonic() - start < 3
+    matches = []
+    while not p.matchq().empty():
+        matches.append(p.matchq().get())
+    assert matches == [(1, ["line 3"]), (0, ["line 5"])]
+
+
+def test_arpc_stream_filter(local_aio_addr_port):
+    async def main():
+        call = arpc_stream(
+            "seq 1 20",
+            local_aio_addr_port,
+            stream_filter=StreamFilter(sample_every=5, watches=[["1", "20"]]),
+        )
+        lines = [line async for line in call]
+        await aclose()
+        return lines, call.matches
+
+    lines, matches = asyncio.run(main())
+    assert lines == ["1\n", "6\n", "11\n", "16\n"]
+    assert matches == [(0, ["1", "20"])]
@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from apps.rpc_monitor import RpcStreamIOMonitor
+from src.ring import LineRing
+
+
+def test_evict_oldest():
+    ring = LineRing(max_lines=3)
+    for i in range(5):
+        assert ring.append(str(i)) == i
+    assert ring.since(0) == ["2", "3", "4"]
+    assert ring.since(3, 4) == ["3"]
+    assert ring.stats()["evicted"] == 2
+
+
+def test_byte_cap():
+    ring = LineRing(max_bytes=200)
+    for _ in range(10):
+        ring.append("x" * 60)
+    stats = ring.stats()
+    assert 0 < stats["bytes"] <= 200
+    assert stats["lines"] + stats["evicted"] == 10
+
+
+def test_drop_newest():
+    ring = LineRing(max_lines=2, overflow="drop")
+    assert [ring.append(line) for line in "abc"] == [0, 1, None]
+    assert ring.since(0) == ["a", "b"]
+    assert ring.stats()["dropped"] == 1
+
+
+def test_block_until_unpinned():
+    ring = LineRing(max_lines=2, overflow="block")
+    ring.pin(1)
+    ring.append("a")
+    ring.append("b")
+    # 行 0 未被引用，可以丢弃；行 1 被引用
+    assert ring.wait_writable("c", timeout=0)
+    ring.append("c")
+    assert not ring.wait_writable("d", timeout=0.05)
+    threading.Timer(0.05, ring.unpin, (1,)).start()
+    assert ring.wait_writable("d", timeout=5)
+    ring.append("d")
+    assert ring.since(0) == ["c", "d"]
+    assert ring.stats()["blocked_seconds"] > 0
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        LineRing(overflow="spill")
+
+
+def test_monitor_since_replays_history(fake_stream):
+    stream = fake_stream
+    monitor = RpcStreamIOMonitor(stream, max_lines=100)
+    try:
+        cursor = monitor.cursor()
+        stream.q.put("booted\n")
+        stream.q.put("ready\n")
+        deadline = time.monotonic() + 5
+        while monitor.cursor() < cursor + 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert monitor.lines(cursor) == ["booted", "ready"]
+        late = monitor.assert_keywords(["booted"], timeout=0.1)
+        replayed = monitor.assert_keywords(["booted", "ready"], 5, since=cursor)
+        assert monitor.result(replayed) == (True, [True, True], ["booted", "ready"])
+        assert monitor.result(late, wait=True)[0] is False
+    finally:
+        monitor.stop()
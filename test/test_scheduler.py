@@ -0,0 +1,153 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent import futures
+
+import grpc
+import pytest
+
+from proto import command_pb2, command_pb2_grpc
+from src.impl import Commander, RpcClient
+from src.scheduler import EXECUTE, STREAM, Scheduler, SchedulerFull
+
+
+def test_stream_limit_leaves_slots_for_execute():
+    scheduler = Scheduler(max_children=4, max_streams=2, max_queue=0)
+    scheduler.acquire(STREAM)
+    scheduler.acquire(STREAM)
+    with pytest.raises(SchedulerFull):
+        scheduler.acquire(STREAM)
+    scheduler.acquire(EXECUTE)
+    scheduler.acquire(EXECUTE)
+    with pytest.raises(SchedulerFull):
+        scheduler.acquire(EXECUTE)
+    stats = scheduler.stats()
+    assert stats[STREAM]["running"] == 2 and stats[STREAM]["rejected"] == 1
+    assert stats[EXECUTE]["running"] == 2 and stats[EXECUTE]["rejected"] == 1
+
+
+def test_freed_slot_goes_to_execute_first():
+    scheduler = Scheduler(max_children=1, max_queue=4)
+    scheduler.acquire(EXECUTE)
+    order = []
+
+    def wait(kind):
+        with scheduler.slot(kind):
+            order.append(kind)
+
+    stream = threading.Thread(target=wait, args=(STREAM,))
+    stream.start()
+    time.sleep(0.05)
+    execute = threading.Thread(target=wait, args=(EXECUTE,))
+    execute.start()
+    time.sleep(0.05)
+    scheduler.release(EXECUTE)
+    stream.join(2)
+    execute.join(2)
+    assert order == [EXECUTE, STREAM]
+    assert scheduler.stats()[STREAM]["wait_max"] >= 0.1
+
+
+def test_queue_timeout():
+    scheduler = Scheduler(max_children=1, queue_timeout=0.1)
+    scheduler.acquire(EXECUTE)
+    with pytest.raises(SchedulerFull):
+        scheduler.acquire(EXECUTE)
+    scheduler.release(EXECUTE)
+    # 超时的请求已离开队列，不会占用 slot
+    scheduler.acquire(EXECUTE)
+
+
+def test_cancelled_async_waiter_leaves_queue():
+    scheduler = Scheduler(max_children=1)
+
+    async def main():
+        scheduler.acquire(EXECUTE)
+        waiter = asyncio.ensure_future(scheduler.acquire_async(EXECUTE))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        scheduler.release(EXECUTE)
+        await asyncio.wait_for(scheduler.acquire_async(EXECUTE), 1)
+
+    asyncio.run(main())
+    assert scheduler.stats()[EXECUTE]["running"] == 1
+
+
+@pytest.fixture(scope="module")
+def busy_addr_ports():
+    """sync and async servers allowing one command and no queue"""
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    command_pb2_grpc.add_CommandServicer_to_server(
+        Commander(scheduler=Scheduler(max_children=1, max_queue=0)), server
+    )
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        aio_port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, "-m", "apps.server", "--backend", "async"]
+        + ["--port", str(aio_port), "--max-children", "1", "--max-queue", "0"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    with grpc.insecure_channel(f"localhost:{aio_port}") as channel:
+        grpc.channel_ready_future(channel).result(timeout=10)
+    yield {"sync": f"localhost:{port}", "async": f"localhost:{aio_port}"}
+    process.terminate()
+    process.wait(10)
+    server.stop(grace=None)
+
+
+@pytest.mark.parametrize("backend", ["sync", "async"])
+def test_requests_over_limit_are_rejected(busy_addr_ports, backend):
+    addr_port = busy_addr_ports[backend]
+    with RpcClient(addr_port) as client, client.pool.lease(addr_port) as pooled:
+        call = pooled.stub.ExecuteStream(
+            command_pb2.CommandRequest(command="echo started; sleep 5")
+        )
+        assert next(call).stdout == "started\n"
+        with pytest.raises(grpc.RpcError) as e:
+            client.rpc("true")
+        assert e.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+        batch = client.rpc_batch(["true"])
+        assert batch[0][0] == -1 and "too many commands" in batch[0][2]
+        call.cancel()
+        # 取消的流释放 slot
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            try:
+                assert client.rpc("echo ok") == (0, "ok\n", "")
+                break
+            except grpc.RpcError:
+                time.sleep(0.1)
+        else:
+            pytest.fail("slot of the cancelled stream was not released")
+
+
+@pytest.mark.parametrize("backend", ["sync", "async"])
+def test_jobs_and_spooled_streams_are_admitted(busy_addr_ports, backend):
+    addr_port = busy_addr_ports[backend]
+    with RpcClient(addr_port) as client, client.pool.lease(addr_port) as pooled:
+        call = pooled.stub.ExecuteStream(
+            command_pb2.CommandRequest(command="echo started; sleep 5")
+        )
+        assert next(call).stdout == "started\n"
+        with pytest.raises(grpc.RpcError) as e:
+            list(
+                pooled.stub.ExecuteStream(
+                    command_pb2.CommandRequest(command="true", spool=True)
+                )
+            )
+        assert e.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+        with pytest.raises(grpc.RpcError) as e:
+            pooled.stub.StartJob(command_pb2.JobRequest(command="true"))
+        assert e.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+        call.cancel()
@@ -0,0 +1,68 @@
+import time
+from concurrent import futures
+
+import grpc
+import pytest
+
+from proto import command_pb2_grpc
+from src.impl import Commander, RpcClient, RpcSession
+from src.session import SessionError, SessionManager
+
+
+def test_session_keeps_cwd_and_env(any_addr_port):
+    with RpcClient(any_addr_port) as client, client.session(env={"A": "1"}) as s:
+        assert s.rpc("cd /tmp && export B=2") == (0, "", "")
+        assert s.rpc("pwd; echo $A$B") == (0, "/tmp\n12\n", "")
+        assert s.rpc("echo err >&2; false") == (1, "", "err\n")
+        # 语法错误和 exit 不会影响后续命令
+        assert s.rpc("if")[0] != 0
+        assert s.rpc("echo still here") == (0, "still here\n", "")
+
+
+def test_session_timeout_closes_session(any_addr_port):
+    with RpcClient(any_addr_port) as client:
+        session = client.session()
+        returncode, _, stderr = session.rpc("sleep 5", timeout=0.2)
+        assert returncode == -1
+        assert "timed out after 0.2 seconds" in stderr
+        returncode, _, stderr = session.rpc("true")
+        assert returncode == -1
+        assert "no such session" in stderr
+        assert session.close() is False
+
+
+def test_session_limit():
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    sessions = SessionManager(max_sessions=1)
+    command_pb2_grpc.add_CommandServicer_to_server(Commander(sessions), server)
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    try:
+        addr_port = f"localhost:{port}"
+        with RpcSession(addr_port) as session:
+            with pytest.raises(grpc.RpcError) as e:
+                RpcSession(addr_port)
+            assert e.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+            assert session.rpc("echo ok") == (0, "ok\n", "")
+        assert len(sessions) == 0
+    finally:
+        sessions.shutdown()
+        server.stop(grace=None)
+
+
+def test_reaper_spares_session_taken_by_a_request():
+    sessions = SessionManager(idle_timeout=0.1)
+    try:
+        session = sessions.open()
+        time.sleep(0.2)
+        # 请求已取出会话、尚未开始执行时回收线程运行
+        assert sessions.get(session.id) is session
+        sessions.reap()
+        assert sessions.run(session.id, "echo ok", timeout=5) == (0, b"ok\n", b"")
+        time.sleep(0.2)
+        sessions.reap()
+        assert len(sessions) == 0
+        with pytest.raises(SessionError):
+            sessions.get(session.id)
+    finally:
+        sessions.shutdown()
@@ -0,0 +1,70 @@
+import time
+
+from proto import command_pb2
+from src import impl
+from src.pool import default_pool
+
+
+def stream(addr_port, command, **kwargs):
+    with default_pool().lease(addr_port) as pooled:
+        request = command_pb2.CommandRequest(command=command, **kwargs)
+        return list(pooled.stub.ExecuteStream(request))
+
+
+def test_chunked_stream_batches_lines(any_addr_port):
+    responses = stream(any_addr_port, "seq 1 10000", chunk_size=65536)
+    assert len(responses) < 100
+    assert "".join(r.stdout for r in responses) == "".join(
+        f"{i}\n" for i in range(1, 10001)
+    )
+    assert responses[-1].returncode == 0
+
+
+def test_chunked_stream_respects_chunk_size(any_addr_port):
+    responses = stream(any_addr_port, "head -c 10000 /dev/zero", chunk_size=1000)
+    assert all(len(r.stdout) <= 1000 for r in responses)
+    assert sum(len(r.stdout) for r in responses) == 10000
+
+
+def test_chunked_stream_flushes_line_without_newline(any_addr_port):
+    with default_pool().lease(any_addr_port) as pooled:
+        request = command_pb2.CommandRequest(
+            command="printf partial; sleep 2", chunk_size=65536, flush_interval_ms=10
+        )
+        start = time.monotonic()
+        first = next(iter(pooled.stub.ExecuteStream(request)))
+        assert first.stdout == "partial"
+        assert time.monotonic() - start < 1
+
+
+def test_chunked_stream_stderr_and_returncode(any_addr_port):
+    responses = stream(any_addr_port, "echo oops >&2; exit 3", chunk_size=1024)
+    assert "".join(r.stderr for r in responses) == "oops\n"
+    assert responses[-1].returncode == 3
+
+
+def test_line_stream_yields_one_message_per_line(any_addr_port):
+    responses = stream(any_addr_port, "printf 'a\\nb\\nc'; echo err >&2")
+    assert sorted(r.stdout for r in responses if r.stdout) == ["a\n", "b\n", "c"]
+    assert [r.stderr for r in responses if r.stderr] == ["err\n"]
+
+
+def test_stream_exit_is_detected_without_polling(any_addr_port):
+    start = time.monotonic()
+    responses = stream(any_addr_port, "sleep 0.3; exit 4", chunk_size=1024)
+    assert responses[-1].returncode == 4
+    assert time.monotonic() - start < 1
+
+
+def test_cancelled_stream_kills_process(any_addr_port, tmp_path, monkeypatch):
+    # bash 偶尔会在 SIGINT 后继续执行，依赖 SIGKILL 兜底
+    monkeypatch.setattr(impl, "TERMINATE_GRACE", 0.5)
+    marker = tmp_path / "alive"
+    with default_pool().lease(any_addr_port) as pooled:
+        call = pooled.stub.ExecuteStream(
+            command_pb2.CommandRequest(command=f"echo started; sleep 4; touch {marker}")
+        )
+        assert next(call).stdout == "started\n"
+        call.cancel()
+    time.sleep(4.5)
+    assert not marker.exists()
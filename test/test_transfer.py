@@ -0,0 +1,77 @@
+import os
+import zlib
+
+import grpc
+import pytest
+
+from proto import command_pb2
+from src.impl import RpcClient
+
+
+@pytest.fixture
+def payload(tmp_path):
+    # 大于 gRPC 单条消息 4 MB 的上限
+    data = os.urandom(6 * 1024 * 1024 + 123)
+    path = tmp_path / "payload.bin"
+    path.write_bytes(data)
+    path.chmod(0o750)
+    return path, data
+
+
+def test_push_pull_round_trip(any_addr_port, payload, tmp_path):
+    path, data = payload
+    remote = tmp_path / "remote.bin"
+    local = tmp_path / "local.bin"
+    with RpcClient(any_addr_port) as client:
+        assert client.rpc_push(str(path), str(remote), chunk_size=256 * 1024) == len(
+            data
+        )
+        assert client.rpc_pull(str(remote), str(local)) == len(data)
+    assert remote.read_bytes() == data
+    assert remote.stat().st_mode & 0o777 == 0o750
+    assert local.read_bytes() == data
+
+
+def test_empty_file(any_addr_port, tmp_path):
+    empty = tmp_path / "empty"
+    empty.write_bytes(b"")
+    with RpcClient(any_addr_port) as client:
+        assert client.rpc_push(str(empty), str(tmp_path / "remote")) == 0
+        assert client.rpc_pull(str(empty), str(tmp_path / "local")) == 0
+    assert (tmp_path / "remote").read_bytes() == b""
+    assert (tmp_path / "local").read_bytes() == b""
+
+
+def test_resume(any_addr_port, payload, tmp_path):
+    path, data = payload
+    remote = tmp_path / "remote.bin"
+    local = tmp_path / "local.bin"
+    remote.write_bytes(data[:1000000])
+    local.write_bytes(data[:3000000])
+    with RpcClient(any_addr_port) as client:
+        assert client.rpc_push(str(path), str(remote), resume=True) == len(data)
+        assert client.rpc_pull(str(path), str(local), resume=True) == len(data)
+    assert remote.read_bytes() == data
+    assert local.read_bytes() == data
+
+
+def test_pull_missing_file(any_addr_port, tmp_path):
+    with RpcClient(any_addr_port) as client:
+        with pytest.raises(grpc.RpcError) as e:
+            client.rpc_pull(str(tmp_path / "missing"), str(tmp_path / "local"))
+    assert e.value.code() == grpc.StatusCode.NOT_FOUND
+
+
+def test_push_rejects_bad_checksum(any_addr_port, tmp_path):
+    remote = tmp_path / "remote.bin"
+
+    def chunks():
+        yield command_pb2.FileChunk(
+            path=str(remote), data=b"abc", crc32=zlib.crc32(b"abc")
+        )
+        yield command_pb2.FileChunk(offset=3, data=b"def", crc32=0)
+
+    with RpcClient(any_addr_port) as client, client.pool.lease(any_addr_port) as p:
+        with pytest.raises(grpc.RpcError) as e:
+            p.stub.PushFile(chunks())
+    assert e.value.code() == grpc.StatusCode.DATA_LOSS